@@ -11,6 +11,7 @@ from agents.tools.vector_search import rag_service
 from src.api.config import settings
 from src.database.supabase_client import db
 from src.services.embedding_service import embedding_service
+from src.services.embedding_version_service import embedding_version_service
 
 
 def run_async(coro):
@@ -31,6 +32,9 @@ def run_async(coro):
 
     rag_service.client = AsyncOpenAI(api_key=settings.openai_api_key)
     embedding_service.client = AsyncOpenAI(api_key=settings.openai_api_key)
+    # Services for the live knowledge model (rag_service reads the registry itself)
+    for embedder in embedding_version_service._embedders.values():
+        embedder.client = AsyncOpenAI(api_key=settings.openai_api_key)
 
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
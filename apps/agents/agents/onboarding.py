@@ -7,8 +7,10 @@ from src.database.supabase_client import db
 from agents.core.state import OnboardingProfile
 from agents.prompts import get_onboarding_prompt
 from agents.helpers import calculate_maturity_level, parse_json_response, validate_onboarding_responses
-from typing import Dict, Any, Optional
+from agents.core.background import background_tasks
+from typing import Dict, Any, Optional, Tuple
 from uuid import UUID
+import asyncio
 import logging
 import json
 
@@ -47,77 +49,16 @@ class OnboardingAgent(BaseAgent):
             Onboarding assessment results
         """
         try:
-            # Parse responses
-            if isinstance(user_input, str):
-                try:
-                    responses = json.loads(user_input)
-                except json.JSONDecodeError:
-                    responses = parse_json_response(user_input)
-            else:
-                responses = user_input
-            
-            # Validate responses
-            if not validate_onboarding_responses(responses):
-                raise ValueError("Invalid onboarding responses: missing required questions (Q1-Q16)")
-            
-            # Build user message with responses
-            user_message = self._build_assessment_message(responses)
-            
-            # Call LLM for assessment
-            llm_response = await self._call_llm(
-                user_message=user_message,
-                temperature=0.3,  # Lower temperature for more consistent assessments
-                max_tokens=3000
-            )
-            
-            # Parse the structured response
-            assessment = parse_json_response(llm_response)
-            
-            # Extract resumen if it's separate in the response
-            if "resumen" not in assessment:
-                # Extract resumen from the text after JSON
-                lines = llm_response.split('\n')
-                resumen_lines = []
-                capture = False
-                for line in lines:
-                    if 'Resumen:' in line or 'resumen:' in line.lower():
-                        capture = True
-                        continue
-                    if capture and line.strip():
-                        resumen_lines.append(line.strip())
-                
-                assessment["resumen"] = ' '.join(resumen_lines) if resumen_lines else assessment.get(
-                    "madurez_general", "Resumen no disponible"
-                )
-            
-            # Calculate overall maturity if not provided
-            if "madurez_general" not in assessment:
-                maturity_scores = {
-                    'identidad': assessment.get('madurez_identidad_artesanal', 'Inicial'),
-                    'comercial': assessment.get('madurez_realidad_comercial', 'Inicial'),
-                    'clientes': assessment.get('madurez_clientes_y_mercado', 'Inicial'),
-                    'operacion': assessment.get('madurez_operacion_y_crecimiento', 'Inicial')
-                }
-                assessment["madurez_general"] = calculate_maturity_level(maturity_scores)
+            responses, assessment = await self._run_assessment(user_input)
             
             # Save to database if context includes session_id
             if context and 'session_id' in context:
-                await self._save_profile(
-                    session_id=context['session_id'],
-                    user_id=context.get('user_id'),
+                await self._persist_onboarding(
+                    context=context,
                     responses=responses,
                     assessment=assessment,
                     metadata=metadata
                 )
-                
-                # Store as profile memory
-                await self._store_onboarding_memory(
-                    context=context,
-                    responses=responses,
-                    assessment=assessment
-                )
-            
-            logger.info(f"Onboarding assessment completed: {assessment['madurez_general']}")
             
             # Format response in standard agent format
             # Build human-readable answer from assessment
@@ -176,6 +117,100 @@ class OnboardingAgent(BaseAgent):
             logger.error(f"Onboarding processing failed: {str(e)}")
             raise
     
+    async def _run_assessment(self, user_input: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Parse and validate the Q1-Q16 responses and run the assessment LLM call.
+        
+        Args:
+            user_input: JSON string or dict with question responses (Q1-Q16)
+            
+        Returns:
+            (responses, assessment) tuple
+        """
+        # Parse responses
+        if isinstance(user_input, str):
+            try:
+                responses = json.loads(user_input)
+            except json.JSONDecodeError:
+                responses = parse_json_response(user_input)
+        else:
+            responses = user_input
+        
+        # Validate responses
+        if not validate_onboarding_responses(responses):
+            raise ValueError("Invalid onboarding responses: missing required questions (Q1-Q16)")
+        
+        # Build user message with responses
+        user_message = self._build_assessment_message(responses)
+        
+        # Call LLM for assessment
+        llm_response = await self._call_llm(
+            user_message=user_message,
+            temperature=0.3,  # Lower temperature for more consistent assessments
+            max_tokens=3000
+        )
+        
+        # Parse the structured response
+        assessment = parse_json_response(llm_response)
+        
+        # Extract resumen if it's separate in the response
+        if "resumen" not in assessment:
+            # Extract resumen from the text after JSON
+            lines = llm_response.split('\n')
+            resumen_lines = []
+            capture = False
+            for line in lines:
+                if 'Resumen:' in line or 'resumen:' in line.lower():
+                    capture = True
+                    continue
+                if capture and line.strip():
+                    resumen_lines.append(line.strip())
+            
+            assessment["resumen"] = ' '.join(resumen_lines) if resumen_lines else assessment.get(
+                "madurez_general", "Resumen no disponible"
+            )
+        
+        # Calculate overall maturity if not provided
+        if "madurez_general" not in assessment:
+            maturity_scores = {
+                'identidad': assessment.get('madurez_identidad_artesanal', 'Inicial'),
+                'comercial': assessment.get('madurez_realidad_comercial', 'Inicial'),
+                'clientes': assessment.get('madurez_clientes_y_mercado', 'Inicial'),
+                'operacion': assessment.get('madurez_operacion_y_crecimiento', 'Inicial')
+            }
+            assessment["madurez_general"] = calculate_maturity_level(maturity_scores)
+        
+        logger.info(f"Onboarding assessment completed: {assessment['madurez_general']}")
+        return responses, assessment
+    
+    async def _persist_onboarding(
+        self,
+        context: Dict[str, Any],
+        responses: Dict[str, Any],
+        assessment: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        Save the onboarding profile and the profile memory.
+        
+        The writes are independent of each other and each one logs its own
+        failures, so they run concurrently and never raise.
+        """
+        await asyncio.gather(
+            self._save_profile(
+                session_id=context['session_id'],
+                user_id=context.get('user_id'),
+                responses=responses,
+                assessment=assessment,
+                metadata=metadata
+            ),
+            self._store_onboarding_memory(
+                context=context,
+                responses=responses,
+                assessment=assessment
+            ),
+        )
+    
     def _build_assessment_message(self, responses: Dict[str, Any]) -> str:
         """
         Build the user message with formatted responses.
@@ -340,14 +375,22 @@ class OnboardingAgent(BaseAgent):
             "ubicacion": meta.get("ubicacion") or meta.get("location"),
         }
 
-        import json as _json
-        assessment_result = await self.process(
-            user_input=_json.dumps(responses),
-            context=context,
-            metadata={"user_profile": user_profile},
-        )
+        # Dependency DAG:
+        #   assessment ─┬─> welcome message  ┐ concurrent; the response waits
+        #               ├─> dimension messages┘ for the slower of the two
+        #               └─> persistence (profile, memory, global profile) in background
+        _, assessment = await self._run_assessment(responses)
 
-        assessment = assessment_result.get("assessment") or {}
+        if context and 'session_id' in context:
+            background_tasks.spawn(
+                self._persist_onboarding(
+                    context=context,
+                    responses=responses,
+                    assessment=assessment,
+                    metadata={"user_profile": user_profile},
+                ),
+                name=f"onboarding-persist-{context['session_id']}",
+            )
 
         # Map maturity level to the new enum values
         maturity_raw = assessment.get("madurez_general", "Inicial")
@@ -388,17 +431,19 @@ class OnboardingAgent(BaseAgent):
                 "Define los precios con nuestra calculadora",
             ]
 
-        # Build a friendly, motivational welcome message via a dedicated prompt
-        title, body = await self._generate_welcome_message(
-            artisan_name=artisan_name,
-            maturity_level=maturity_level,
-            assessment=assessment,
-            q16_value=q16_value,
-            recommendations=recommendations,
+        # Friendly welcome message and per-dimension messages only depend on the
+        # assessment; both fall back to templated text on failure, so neither raises.
+        (title, body), dimensions = await asyncio.gather(
+            self._generate_welcome_message(
+                artisan_name=artisan_name,
+                maturity_level=maturity_level,
+                assessment=assessment,
+                q16_value=q16_value,
+                recommendations=recommendations,
+            ),
+            self._build_dimensions_breakdown(assessment, artisan_name),
         )
 
-        dimensions = await self._build_dimensions_breakdown(assessment, artisan_name)
-
         from agents.helpers import format_timestamp
         return {
             "onboarding_response": {
@@ -590,61 +635,71 @@ Madurez Clientes y Mercado: {assessment.get('madurez_clientes_y_mercado', 'N/A')
 Madurez Operación y Crecimiento: {assessment.get('madurez_operacion_y_crecimiento', 'N/A')}
 Resumen: {assessment.get('resumen', 'N/A')}"""
             
-            # Store as profile memory with high importance
-            await self._store_agent_memory(
-                content=memory_content,
-                memory_type='profile',
-                context=context,
-                importance_score=0.95,  # Onboarding is very important
-                summary=f"Onboarding: {assessment.get('madurez_general', 'N/A')}",
-                metadata={
-                    'tipo_artesania': responses.get('Q1'),
-                    'madurez_general': assessment.get('madurez_general')
-                }
-            )
-            
-            # Update artisan global profile if user_id available
-            # Extract user_id (can be nested in context.context.user_id or direct)
-            user_id_str = context.get('user_id') or context.get('context', {}).get('user_id')
-            logger.info(f"📝 Attempting to create artisan profile with user_id={user_id_str}")
-            if user_id_str:
-                try:
-                    artisan_id = UUID(user_id_str)
-                    
-                    # Create maturity snapshot
-                    maturity_snapshot = {
-                        'identidad_artesanal': assessment.get('madurez_identidad_artesanal'),
-                        'realidad_comercial': assessment.get('madurez_realidad_comercial'),
-                        'clientes_y_mercado': assessment.get('madurez_clientes_y_mercado'),
-                        'operacion_y_crecimiento': assessment.get('madurez_operacion_y_crecimiento'),
-                        'general': assessment.get('madurez_general')
-                    }
-                    
-                    # Create key insights
-                    key_insights = {
+            # Profile memory and the global profile update are independent writes
+            await asyncio.gather(
+                # Store as profile memory with high importance
+                self._store_agent_memory(
+                    content=memory_content,
+                    memory_type='profile',
+                    context=context,
+                    importance_score=0.95,  # Onboarding is very important
+                    summary=f"Onboarding: {assessment.get('madurez_general', 'N/A')}",
+                    metadata={
                         'tipo_artesania': responses.get('Q1'),
-                        'onboarding_completed': True,
-                        'maturity_levels': maturity_snapshot,
-                        'top_priorities': assessment.get('madurez_identidad_artesanal_tareas', [])[:3]
+                        'madurez_general': assessment.get('madurez_general')
                     }
-                    
-                    # Create profile summary
-                    profile_summary = assessment.get('resumen', f"Artisan with {assessment.get('madurez_general', 'N/A')} maturity level")
-                    
-                    # Update global profile
-                    await self.memory_service.update_artisan_profile(
-                        artisan_id=artisan_id,
-                        profile_summary=profile_summary,
-                        key_insights=key_insights,
-                        maturity_snapshot=maturity_snapshot,
-                        increment_interaction=False  # Don't increment for onboarding
-                    )
-                    
-                    logger.info(f"Created artisan global profile from onboarding for {artisan_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to update artisan global profile: {str(e)}")
+                ),
+                self._update_artisan_global_profile(context, responses, assessment),
+            )
             
         except Exception as e:
             logger.error(f"Failed to store onboarding memory: {str(e)}")
-
+    
+    async def _update_artisan_global_profile(
+        self,
+        context: Dict[str, Any],
+        responses: Dict[str, Any],
+        assessment: Dict[str, Any]
+    ) -> None:
+        """Create/update the artisan global profile from the onboarding assessment."""
+        # Extract user_id (can be nested in context.context.user_id or direct)
+        user_id_str = context.get('user_id') or context.get('context', {}).get('user_id')
+        logger.info(f"📝 Attempting to create artisan profile with user_id={user_id_str}")
+        if not user_id_str:
+            return
+        try:
+            artisan_id = UUID(user_id_str)
+            
+            # Create maturity snapshot
+            maturity_snapshot = {
+                'identidad_artesanal': assessment.get('madurez_identidad_artesanal'),
+                'realidad_comercial': assessment.get('madurez_realidad_comercial'),
+                'clientes_y_mercado': assessment.get('madurez_clientes_y_mercado'),
+                'operacion_y_crecimiento': assessment.get('madurez_operacion_y_crecimiento'),
+                'general': assessment.get('madurez_general')
+            }
+            
+            # Create key insights
+            key_insights = {
+                'tipo_artesania': responses.get('Q1'),
+                'onboarding_completed': True,
+                'maturity_levels': maturity_snapshot,
+                'top_priorities': assessment.get('madurez_identidad_artesanal_tareas', [])[:3]
+            }
+            
+            # Create profile summary
+            profile_summary = assessment.get('resumen', f"Artisan with {assessment.get('madurez_general', 'N/A')} maturity level")
+            
+            # Update global profile
+            await self.memory_service.update_artisan_profile(
+                artisan_id=artisan_id,
+                profile_summary=profile_summary,
+                key_insights=key_insights,
+                maturity_snapshot=maturity_snapshot,
+                increment_interaction=False  # Don't increment for onboarding
+            )
+            
+            logger.info(f"Created artisan global profile from onboarding for {artisan_id}")
+            
+        except Exception as e:
+            logger.error(f"Failed to update artisan global profile: {str(e)}")
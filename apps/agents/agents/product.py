@@ -4,10 +4,12 @@ Product agent for catalog, inventory, and store description support.
 
 from agents.agents.base import BaseAgent
 from agents.tools.vector_search import rag_service
-from src.services.product_recommendation_service import product_recommendation_service
 from agents.tools.database import get_shop_data_tool
 from agents.prompts import get_product_prompt as get_producto_agent_prompt
 from agents.helpers import extract_context_summary
+from agents.services.semantic_search_service import ProductSearchFilters, semantic_search_service
+from agents.services.taxonomy_service import TaxonomySnapshot, taxonomy_service
+from src.services.product_recommendation_service import product_recommendation_service
 from typing import Dict, Any, Optional
 import logging
 import json
@@ -43,6 +45,7 @@ class ProductoAgent(BaseAgent):
             - needs_semantic_search: bool (if user wants to find/buy products)
             - needs_shop_data: bool (if user asks about THEIR OWN products)
             - query_type: str (products, sales, inventory, top_products, analytics)
+            - price_min / price_max: COP pesos, oficio, region (product search filters)
             - reasoning: str
         """
         # Note: Semantic search doesn't need user_id (searches all products)
@@ -80,6 +83,11 @@ Clasifica en UNA o MÁS de estas categorías:
 - Si dice "MI producto", "MIS productos", "TENGO" → needs_shop_data=true (solo si user_id disponible)
 - Ambos pueden ser true al mismo tiempo si la pregunta tiene ambas intenciones
 
+Filtros de búsqueda (solo si needs_semantic_search=true, si no null):
+- price_min / price_max: presupuesto en pesos colombianos ("hasta 200 mil" → price_max=200000, "50.000" = 50000)
+- oficio: oficio artesanal mencionado (ej. "tejeduría", "cerámica", "orfebrería")
+- region: departamento o ciudad de Colombia de donde quiere los productos (ej. "Boyacá", "Pasto")
+
 Tipos de consulta para shop_data:
 - "products": Productos en general
 - "sales": Ventas, órdenes
@@ -92,6 +100,10 @@ Responde SOLO con JSON (sin markdown, sin explicaciones adicionales):
   "needs_semantic_search": true/false,
   "needs_shop_data": true/false,
   "query_type": "products|sales|inventory|top_products|analytics|null",
+  "price_min": número o null,
+  "price_max": número o null,
+  "oficio": "texto o null",
+  "region": "texto o null",
   "reasoning": "breve explicación"
 }}"""
 
@@ -168,9 +180,11 @@ Responde SOLO con JSON (sin markdown, sin explicaciones adicionales):
             if needs_semantic_search:
                 logger.info("🎯 Performing semantic product search for recommendations...")
                 try:
-                    product_recommendations = await product_recommendation_service.recommend_products(
+                    product_recommendations = await semantic_search_service.search_products(
                         query=user_input,
-                        limit=5
+                        top_k=5,
+                        min_similarity=0.35,
+                        filters=await self._search_filters(classification),
                     )
                     if product_recommendations:
                         sources.append("Búsqueda semántica de productos")
@@ -181,6 +195,23 @@ Responde SOLO con JSON (sin markdown, sin explicaciones adicionales):
                     logger.warning(f"❌ Semantic search failed: {str(e)}")
                     product_recommendations = []
             
+            # "More like this" for the product the user is viewing, else for the best match
+            related_products = []
+            reference_id = (context or {}).get('product_id') or (
+                product_recommendations[0].product_id if product_recommendations else None
+            )
+            if reference_id:
+                try:
+                    shown = {r.product_id for r in product_recommendations}
+                    related_products = [
+                        r for r in await product_recommendation_service.get_related_products(reference_id, limit=6)
+                        if r["id"] not in shown
+                    ][:3]
+                    if related_products:
+                        sources.append("Productos relacionados")
+                except Exception as e:
+                    logger.warning(f"❌ Related products failed: {str(e)}")
+            
             # Query shop database if needed and user_id available
             if needs_shop_data and user_id:
                 logger.info(f"🔎 Querying shop database for user_id: {user_id}, query_type: {query_type}")
@@ -240,14 +271,14 @@ Responde SOLO con JSON (sin markdown, sin explicaciones adicionales):
             
             # Generate response based on available data
             # Priority: product_recommendations > shop_data + RAG > shop_data > RAG > general
-            if product_recommendations:
+            if product_recommendations or related_products:
                 # We have product recommendations from semantic search
                 logger.info("Generating response with product recommendations...")
                 
                 # Format recommendations for LLM
-                recommendations_text = product_recommendation_service.format_recommendations_for_llm(
-                    product_recommendations
-                )
+                recommendations_text = self._format_recommendations(product_recommendations)
+                if related_products:
+                    recommendations_text += "\n\n" + self._format_related(related_products)
                 
                 context_summary = ""
                 if context:
@@ -416,17 +447,42 @@ Incluye recomendaciones concretas y mejores prácticas basadas en tu experiencia
         """
         from agents.prompts import get_product_creation_step1_prompt
         from agents.helpers import parse_json_response
-        from src.database.supabase_client import db
 
-        taxonomy = await db.get_taxonomy_options()
-        top_level_categories = [c for c in taxonomy["categories"] if not c.get("parent_id")]
+        taxonomy = await taxonomy_service.get_snapshot()
 
         prompt_context = dict(artisan_context or {})
-        prompt_context["taxonomy_categories"] = top_level_categories
-        prompt_context["taxonomy_crafts"] = taxonomy["crafts"]
-        prompt_context["taxonomy_materials"] = taxonomy["materials"]
-
-        system_prompt = get_product_creation_step1_prompt(prompt_context)
+        prompt_context["taxonomy_categories"] = taxonomy.top_level_categories
+        prompt_context["taxonomy_crafts"] = taxonomy.crafts
+        prompt_context["taxonomy_materials"] = taxonomy.materials
+        full_prompt = get_product_creation_step1_prompt(prompt_context)
+
+        # Only the crafts/materials closest to this product go to the LLM;
+        # suggestions are still validated against the full snapshot below.
+        product_text = "\n".join(
+            t for t in (product_name, short_description, history_context, prompt_context.get("tipo_artesania")) if t
+        )
+        candidates = await taxonomy_service.candidates(taxonomy, product_text, kinds=("crafts", "materials"))
+        if candidates is not None:
+            prompt_context["taxonomy_crafts"] = candidates["crafts"]
+            prompt_context["taxonomy_materials"] = candidates["materials"]
+            system_prompt = get_product_creation_step1_prompt(prompt_context)
+        else:
+            system_prompt = full_prompt
+
+        count_tokens = rag_service.chunker.count_tokens
+        prefilter = {
+            "enabled": candidates is not None,
+            "crafts": len(prompt_context["taxonomy_crafts"]),
+            "materials": len(prompt_context["taxonomy_materials"]),
+            "prompt_tokens": count_tokens(system_prompt),
+            "full_prompt_tokens": count_tokens(full_prompt),
+        }
+        if candidates is not None:
+            logger.info(
+                f"Step 1 taxonomy prefilter: {prefilter['crafts']}/{len(taxonomy.crafts)} crafts, "
+                f"{prefilter['materials']}/{len(taxonomy.materials)} materials, "
+                f"{prefilter['full_prompt_tokens'] - prefilter['prompt_tokens']} prompt tokens saved"
+            )
 
         main_photo_url: Optional[str] = (photos or {}).get("main") if photos else None
 
@@ -476,46 +532,56 @@ Incluye recomendaciones concretas y mejores prácticas basadas en tu experiencia
 
         result = parse_json_response(raw)
         self._validate_identity_suggestions(result, taxonomy)
+        # Persisted with the draft (step1_ai_output) for report_taxonomy_prefilter.py
+        result["taxonomy_prefilter"] = prefilter
         return result
 
     @staticmethod
-    def _validate_identity_suggestions(result: Dict[str, Any], taxonomy: Dict[str, Any]) -> None:
+    def _validate_identity_suggestions(result: Dict[str, Any], taxonomy: TaxonomySnapshot) -> None:
         """
-        Drop any category/oficio/material suggestion whose "value" doesn't match
-        a real taxonomy id, so the frontend never receives an out-of-DB option.
+        Map every category/oficio/material suggestion to a real taxonomy entry so
+        the frontend never receives an out-of-DB option. The LLM's "value" is
+        matched by id, then slug/name, then fuzzily against its "label" (e.g. a
+        misspelled or unaccented name); suggestions with no match are dropped.
         """
         identity = result.get("identity_suggestions")
         if not isinstance(identity, dict):
             return
 
-        categories_by_id = {
-            c["id"]: c["name"] for c in taxonomy["categories"] if not c.get("parent_id")
-        }
-        crafts_by_id = {c["id"]: c["name"] for c in taxonomy["crafts"]}
-        materials_by_id = {m["id"]: m["name"] for m in taxonomy["materials"]}
+        def _resolve(kind: str, suggestion: Dict[str, Any], predicate=None):
+            match = taxonomy.resolve(
+                kind, suggestion.get("value"), suggestion.get("label"), predicate=predicate
+            )
+            if match is None:
+                return None
+            if match.matched_by != "id":
+                logger.info(
+                    f"Mapped {kind} suggestion {suggestion.get('value')!r}/{suggestion.get('label')!r} "
+                    f"to {match.name!r} ({match.matched_by}, score={match.score})"
+                )
+            suggestion["value"] = match.id
+            suggestion["label"] = match.name
+            return suggestion
 
         category = identity.get("category")
         if isinstance(category, dict):
-            if category.get("value") in categories_by_id:
-                category["label"] = categories_by_id[category["value"]]
-            else:
+            if _resolve("categories", category, predicate=lambda c: not c.get("parent_id")) is None:
                 logger.warning(f"Discarding out-of-taxonomy category suggestion: {category}")
                 identity["category"] = None
 
         oficio = identity.get("oficio")
         if isinstance(oficio, dict):
-            if oficio.get("value") in crafts_by_id:
-                oficio["label"] = crafts_by_id[oficio["value"]]
-            else:
+            if _resolve("crafts", oficio) is None:
                 logger.warning(f"Discarding out-of-taxonomy oficio suggestion: {oficio}")
                 identity["oficio"] = None
 
         materials = identity.get("materials")
         if isinstance(materials, list):
             valid_materials = []
+            seen_ids = set()
             for m in materials:
-                if isinstance(m, dict) and m.get("value") in materials_by_id:
-                    m["label"] = materials_by_id[m["value"]]
+                if isinstance(m, dict) and _resolve("materials", m) is not None and m["value"] not in seen_ids:
+                    seen_ids.add(m["value"])
                     valid_materials.append(m)
             identity["materials"] = valid_materials
 
@@ -581,6 +647,73 @@ Incluye recomendaciones concretas y mejores prácticas basadas en tu experiencia
 
         return parse_json_response(raw)
 
+    @staticmethod
+    async def _search_filters(classification: Dict[str, Any]) -> Optional[ProductSearchFilters]:
+        """
+        Build product search filters from the classification (prices in COP
+        pesos, catalog prices in centavos). The oficio is resolved against the
+        taxonomy; an unknown one is dropped rather than matching nothing.
+        """
+        def pesos(value: Any) -> Optional[int]:
+            try:
+                return int(float(value)) * 100 if value not in (None, "", "null") else None
+            except (TypeError, ValueError):
+                return None
+
+        craft_ids = []
+        oficio = classification.get('oficio')
+        if oficio and oficio != "null":
+            try:
+                match = (await taxonomy_service.get_snapshot()).resolve("crafts", oficio)
+                if match:
+                    craft_ids.append(match.id)
+            except Exception as e:
+                logger.warning(f"Could not resolve oficio '{oficio}': {str(e)}")
+
+        region = classification.get('region')
+        filters = ProductSearchFilters(
+            price_min=pesos(classification.get('price_min')),
+            price_max=pesos(classification.get('price_max')),
+            craft_ids=craft_ids,
+            region=region if region and region != "null" else None,
+        )
+        if filters == ProductSearchFilters():
+            return None
+        logger.info(f"Product search filters: {filters}")
+        return filters
+
+    @staticmethod
+    def _format_recommendations(results: list) -> str:
+        """Format semantic search results as context for the recommendation prompt."""
+        lines = ["Productos encontrados (ordenados por relevancia):"]
+        for i, r in enumerate(results, 1):
+            lines.append(f"\n{i}. {r.product_name} (relevancia: {r.similarity:.2f})")
+            if r.short_description:
+                lines.append(f"   Descripción: {r.short_description}")
+            if r.price:
+                lines.append(f"   Precio: ${r.price / 100:,.0f} {r.currency or 'COP'}")
+            if r.craft_name:
+                lines.append(f"   Oficio: {r.craft_name}")
+            if r.materials:
+                lines.append(f"   Materiales: {r.materials}")
+            if r.store_name:
+                lines.append(f"   Tienda: {r.store_name}")
+            lines.append(f"   URL: https://telar.co/product/{r.product_id}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_related(related: list) -> str:
+        """Format related products (dicts from product_recommendation_service)."""
+        lines = ["Productos similares (más como este):"]
+        for r in related:
+            line = f"- {r['name']}"
+            if r["price"]:
+                line += f" — ${r['price'] / 100:,.0f} {r['currency'] or 'COP'}"
+            if r["store_name"]:
+                line += f" ({r['store_name']})"
+            lines.append(f"{line}\n  URL: https://telar.co/product/{r['id']}")
+        return "\n".join(lines)
+
     def _extract_recommendations(self, answer: str) -> list:
         """
         Extract actionable recommendations from the answer.
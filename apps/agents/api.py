@@ -554,10 +554,8 @@ async def upload_knowledge_document(
 
         document_id = await rag_service.process_document(document)
 
-        # Get chunk count from the processed document (estimate from text length)
-        from agents.helpers import chunk_text
-        from src.api.config import settings as app_settings
-        chunks = chunk_text(text_content, app_settings.chunk_size, app_settings.chunk_overlap)
+        # Get chunk count from the processed document (same chunker, deterministic)
+        chunks = rag_service.chunker.split(text_content)
 
         return KnowledgeUploadResponse(
             status="processed",
@@ -8,20 +8,23 @@ training materials instead of product search).
 Endpoints:
   GET  /artisan-support/whatsapp/webhook  — Meta challenge-response verification
   POST /artisan-support/whatsapp/webhook  — Receive incoming messages and status updates
+  GET  /artisan-support/whatsapp/queue    — Message queue depth, wait times, counters, suppressed duplicates and outbound sends
 
-The POST handler returns 200 OK immediately and processes the message
-as a background asyncio task so Meta doesn't time out the webhook.
+The POST handler returns 200 OK immediately and hands the messages to the
+bot's MessageDispatcher (per-phone order, bounded concurrency and backlog)
+so Meta doesn't time out the webhook.
 """
 
 from __future__ import annotations
 
-import asyncio
 import logging
 
 from fastapi import APIRouter, HTTPException, Query, Request, status
 from fastapi.responses import JSONResponse, PlainTextResponse
 
-from agents.services.artisan_support.tutor_bot_service import process_message
+from agents.services.artisan_support.tutor_bot_service import message_dispatcher
+from agents.services.artisan_support.whatsapp_client import artisan_whatsapp_client
+from agents.services.whatsapp.message_dedup import MessageDeduplicator
 from agents.services.whatsapp.webhook_handler import WebhookHandler
 from src.api.config import settings
 
@@ -36,6 +39,10 @@ _webhook_handler = WebhookHandler(
 )
 
 
+# Message ids already received (Meta retries deliveries)
+_deduplicator = MessageDeduplicator("artisan-support")
+
+
 # ============================================================
 # GET /webhook — Meta challenge-response for webhook setup
 # ============================================================
@@ -71,8 +78,9 @@ async def receive_webhook(request: Request):
     """
     Receive and acknowledge incoming WhatsApp events from Meta.
 
-    Returns 200 OK immediately. Message processing runs as a background
-    asyncio task to prevent Meta from retrying due to slow responses.
+    Returns 200 OK immediately. Messages are queued on the dispatcher
+    (processed in order per phone) to prevent Meta from retrying due to
+    slow responses.
     """
     body = await request.body()
     signature = request.headers.get("X-Hub-Signature-256")
@@ -86,13 +94,28 @@ async def receive_webhook(request: Request):
         logger.error("Webhook parse error: %s", exc)
         return JSONResponse(content={"status": "error", "message": str(exc)})
 
-    messages = _webhook_handler.extract_messages(payload)
+    # Repeats of earlier deliveries are dropped before any work starts
+    messages = await _deduplicator.fresh(_webhook_handler.extract_messages(payload))
 
     if not messages:
-        # Status updates (delivered/read), unsupported types — acknowledge and ignore
+        # Status updates (delivered/read), unsupported types, repeats — acknowledge and ignore
         return JSONResponse(content={"status": "ok"})
 
     for msg in messages:
-        asyncio.create_task(process_message(msg))
+        message_dispatcher.submit(msg)
 
     return JSONResponse(content={"status": "ok"})
+
+
+# ============================================================
+# GET /queue — Dispatcher, dedup and outbound metrics
+# ============================================================
+
+@router.get("/queue")
+async def queue_stats():
+    """Queued and running messages, queue wait percentiles, shed/failed counters, suppressed duplicates and outbound sends."""
+    return {
+        **message_dispatcher.stats(),
+        "dedup": _deduplicator.stats(),
+        "outbound": artisan_whatsapp_client.outbound_stats(),
+    }
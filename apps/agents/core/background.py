@@ -0,0 +1,54 @@
+"""
+Fire-and-forget background work that must not be lost.
+
+asyncio only keeps weak references to tasks, so a bare create_task() can be
+garbage-collected mid-flight and its exception is never logged. Work spawned
+here is referenced until it finishes, failures are logged, and the app
+lifespan drains whatever is still pending before closing the DB pools.
+"""
+
+import asyncio
+import logging
+from typing import Any, Coroutine, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """Registry of in-flight background tasks."""
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: Optional[str] = None) -> asyncio.Task:
+        """Schedule coro on the running loop and keep it referenced until done."""
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            logger.warning(f"Background task {task.get_name()} was cancelled")
+        elif task.exception() is not None:
+            logger.error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Wait for pending tasks (e.g. on shutdown); cancel what is left after timeout."""
+        if not self._tasks:
+            return
+        logger.info(f"Waiting for {len(self._tasks)} background task(s)")
+        done, not_done = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(f"Cancelled {len(not_done)} background task(s) still running after {timeout}s")
+
+
+# Global registry
+background_tasks = BackgroundTasks()
@@ -0,0 +1,226 @@
+"""
+Token-accurate, sentence-aware text chunker for the RAG knowledge base.
+
+The document is tokenized once and its sentence, paragraph and markdown
+heading boundaries are located in a single regex pass. Chunks are then cut
+on those precomputed boundaries using token counts, so every chunk fits the
+embedding model's budget and the overlap never re-scans the text.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Boundary strengths: higher wins when choosing where to cut.
+_SENTENCE = 1
+_PARAGRAPH = 2
+
+# One pass over the document finds every candidate boundary:
+#   heading   — markdown ATX heading at line start (hard boundary)
+#   paragraph — blank line(s) or the start of a list item
+#   sentence  — terminal punctuation (plus closing quotes/brackets) and whitespace
+_BOUNDARY_RE = re.compile(
+    r"(?P<heading>^[ \t]{0,3}#{1,6}[ \t]+\S)"
+    r"|(?P<paragraph>\n[ \t]*\n\s*|\n(?=[ \t]*(?:[-*+•]|\d+[.)])[ \t]))"
+    r"|(?P<sentence>[.!?…][\"'”’)\]]*\s+)",
+    re.MULTILINE,
+)
+
+# Fallback tokenizer when tiktoken is not installed: words and punctuation.
+_FALLBACK_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@dataclass
+class Chunk:
+    text: str
+    token_count: int
+    start_char: int
+    end_char: int
+    heading: Optional[str] = None   # nearest markdown heading above the chunk
+
+
+@dataclass
+class _Tokenized:
+    """A document tokenized once, with precomputed boundary token indices."""
+    text: str
+    token_starts: List[int]                       # char offset of each token
+    hard: List[int] = field(default_factory=list)  # token indices of headings
+    soft: List[int] = field(default_factory=list)  # token indices of sentence/paragraph cuts
+    soft_strength: List[int] = field(default_factory=list)
+    heading_tokens: List[int] = field(default_factory=list)
+    heading_texts: List[str] = field(default_factory=list)
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.token_starts)
+
+    def char_at(self, token_index: int) -> int:
+        if token_index >= len(self.token_starts):
+            return len(self.text)
+        return self.token_starts[token_index]
+
+
+class TokenChunker:
+    """
+    Split text into chunks sized by token count with token overlap.
+
+    Cut preference inside the window [start + min_tokens, start + max_tokens]:
+    the last paragraph boundary, else the last sentence boundary, else a hard
+    cut at max_tokens. Markdown headings always start a new chunk.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 350,
+        overlap_tokens: int = 60,
+        min_tokens: Optional[int] = None,
+        encoding_name: str = "cl100k_base",
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if overlap_tokens < 0 or overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be in [0, max_tokens)")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens if min_tokens is not None else max_tokens // 2
+        self._encoding = self._load_encoding(encoding_name)
+
+    @staticmethod
+    def _load_encoding(encoding_name: str):
+        try:
+            import tiktoken
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as exc:
+            logger.warning(
+                f"tiktoken unavailable ({exc}); chunk sizes will use an approximate word tokenizer"
+            )
+            return None
+
+    # ------------------------------------------------------------------
+    # Tokenization + boundary detection (one pass each)
+    # ------------------------------------------------------------------
+
+    def _token_starts(self, text: str) -> List[int]:
+        if self._encoding is None:
+            return [m.start() for m in _FALLBACK_TOKEN_RE.finditer(text)]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        _, offsets = self._encoding.decode_with_offsets(tokens)
+        return offsets
+
+    def _tokenize(self, text: str) -> _Tokenized:
+        doc = _Tokenized(text=text, token_starts=self._token_starts(text))
+        starts = doc.token_starts
+
+        for m in _BOUNDARY_RE.finditer(text):
+            kind = m.lastgroup
+            # Boundary falls on the token containing the cut point (BPE tokens
+            # usually carry their leading whitespace, e.g. " Next").
+            cut_char = m.start() if kind == "heading" else m.end()
+            if cut_char >= len(text):
+                continue
+            token_index = max(bisect.bisect_right(starts, cut_char) - 1, 0)
+
+            if kind == "heading":
+                line_end = text.find("\n", m.start())
+                heading = text[m.start():line_end if line_end != -1 else len(text)].strip()
+                if token_index > 0 and (not doc.hard or doc.hard[-1] != token_index):
+                    doc.hard.append(token_index)
+                doc.heading_tokens.append(token_index)
+                doc.heading_texts.append(heading)
+                continue
+
+            if token_index == 0:
+                continue
+            strength = _PARAGRAPH if kind == "paragraph" else _SENTENCE
+            if doc.soft and doc.soft[-1] == token_index:
+                doc.soft_strength[-1] = max(doc.soft_strength[-1], strength)
+            else:
+                doc.soft.append(token_index)
+                doc.soft_strength.append(strength)
+
+        return doc
+
+    # ------------------------------------------------------------------
+    # Chunk emission
+    # ------------------------------------------------------------------
+
+    def _best_cut(self, doc: _Tokenized, lo: int, hi: int) -> int:
+        """Pick the strongest (then latest) soft boundary in (lo, hi], or hi."""
+        left = bisect.bisect_right(doc.soft, lo)
+        right = bisect.bisect_right(doc.soft, hi)
+        best, best_strength = hi, 0
+        for i in range(right - 1, left - 1, -1):
+            strength = doc.soft_strength[i]
+            if strength > best_strength:
+                best, best_strength = doc.soft[i], strength
+                if strength == _PARAGRAPH:
+                    break
+        return best
+
+    def _overlap_start(self, doc: _Tokenized, start: int, end: int) -> int:
+        """Start the next chunk on the first sentence boundary inside the overlap window."""
+        if self.overlap_tokens == 0:
+            return end
+        target = max(end - self.overlap_tokens, start + 1)
+        i = bisect.bisect_left(doc.soft, target)
+        if i < len(doc.soft) and doc.soft[i] < end:
+            return doc.soft[i]
+        return target
+
+    def _heading_for(self, doc: _Tokenized, token_index: int) -> Optional[str]:
+        i = bisect.bisect_right(doc.heading_tokens, token_index) - 1
+        return doc.heading_texts[i] if i >= 0 else None
+
+    def chunk(self, text: str) -> List[Chunk]:
+        """Split text into token-bounded chunks."""
+        if not text or not text.strip():
+            return []
+
+        doc = self._tokenize(text)
+        sections = [0, *doc.hard, doc.n_tokens]
+        chunks: List[Chunk] = []
+
+        for section_start, section_end in zip(sections, sections[1:]):
+            start = section_start
+            while start < section_end:
+                if section_end - start <= self.max_tokens:
+                    end = section_end
+                else:
+                    end = self._best_cut(
+                        doc,
+                        start + self.min_tokens,
+                        start + self.max_tokens,
+                    )
+
+                start_char, end_char = doc.char_at(start), doc.char_at(end)
+                piece = text[start_char:end_char].strip()
+                if piece:
+                    chunks.append(Chunk(
+                        text=piece,
+                        token_count=end - start,
+                        start_char=start_char,
+                        end_char=end_char,
+                        heading=self._heading_for(doc, start),
+                    ))
+
+                if end >= section_end:
+                    break
+                start = self._overlap_start(doc, start, end)
+
+        return chunks
+
+    def split(self, text: str) -> List[str]:
+        """Drop-in replacement for helpers.chunk_text: return chunk texts only."""
+        return [c.text for c in self.chunk(text)]
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            return len(_FALLBACK_TOKEN_RE.findall(text))
+        return len(self._encoding.encode(text, disallowed_special=()))
@@ -6,7 +6,8 @@ Avoids redundant API calls for repeated or similar queries.
 import hashlib
 import os
 import logging
-from typing import Callable, Awaitable, List
+import time
+from typing import Callable, Awaitable, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -14,24 +15,31 @@ logger = logging.getLogger(__name__)
 class EmbeddingCache:
     """
     Simple LRU-style in-memory cache for embedding vectors.
-    Keyed by SHA-256 of the input text, so identical texts always hit cache.
+    Keyed by SHA-256 of the input text (and model, when given), so identical
+    texts always hit cache.
+    Entries older than ttl_seconds (if given) count as misses.
     Thread-safe for asyncio workloads (single-threaded event loop).
     """
 
-    def __init__(self, maxsize: int = 1000):
+    def __init__(self, maxsize: int = 1000, ttl_seconds: Optional[float] = None):
         self._cache: dict[str, List[float]] = {}
+        self._stored_at: dict[str, float] = {}
         self._order: list[str] = []  # tracks insertion order for LRU eviction
         self._maxsize = maxsize
+        self._ttl = ttl_seconds
         self._hits = 0
         self._misses = 0
 
-    def _key(self, text: str) -> str:
+    def _key(self, text: str, model: str = "") -> str:
+        if model:
+            text = f"{model}\0{text}"
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
     async def get_or_generate(
         self,
         text: str,
         generate_fn: Callable[[str], Awaitable[List[float]]],
+        model: str = "",
     ) -> List[float]:
         """
         Return cached embedding for text, or call generate_fn and cache the result.
@@ -39,11 +47,58 @@ class EmbeddingCache:
         Args:
             text: Input text to embed
             generate_fn: Async callable that takes text and returns embedding vector
+            model: Model of generate_fn; vectors of different models never mix
 
         Returns:
             Embedding vector (list of floats)
         """
-        key = self._key(text)
+        key = self._key(text, model)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # Cache miss — generate and store
+        embedding = await generate_fn(text)
+        self._store(key, embedding)
+        return embedding
+
+    async def get_or_generate_many(
+        self,
+        texts: List[str],
+        generate_many_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        model: str = "",
+    ) -> List[List[float]]:
+        """
+        Batch variant of get_or_generate: one generate_many_fn call for all
+        distinct texts that miss the cache. Vectors are returned in input order.
+        """
+        keys = [self._key(t, model) for t in texts]
+        vectors: dict[str, List[float]] = {}
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            cached = self._lookup(key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                missing[key] = text
+
+        if missing:
+            generated = await generate_many_fn(list(missing.values()))
+            if len(generated) != len(missing):
+                raise ValueError(f"{len(generated)} vectors for {len(missing)} texts")
+            for key, embedding in zip(missing, generated):
+                self._store(key, embedding)
+                vectors[key] = embedding
+
+        return [vectors[key] for key in keys]
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        if key in self._cache and self._ttl is not None and time.monotonic() - self._stored_at[key] > self._ttl:
+            self._order.remove(key)
+            del self._cache[key]
+            del self._stored_at[key]
 
         if key in self._cache:
             self._hits += 1
@@ -53,16 +108,20 @@ class EmbeddingCache:
             logger.debug(f"Embedding cache HIT (hits={self._hits}, misses={self._misses})")
             return self._cache[key]
 
-        # Cache miss — generate and store
         self._misses += 1
-        embedding = await generate_fn(text)
+        return None
 
+    def _store(self, key: str, embedding: List[float]) -> None:
+        if key in self._cache:
+            return
         if len(self._cache) >= self._maxsize:
             # Evict least recently used
             oldest_key = self._order.pop(0)
             del self._cache[oldest_key]
+            del self._stored_at[oldest_key]
 
         self._cache[key] = embedding
+        self._stored_at[key] = time.monotonic()
         self._order.append(key)
 
         logger.debug(
@@ -70,7 +129,6 @@ class EmbeddingCache:
             f"(size={len(self._cache)}/{self._maxsize}, "
             f"hits={self._hits}, misses={self._misses})"
         )
-        return embedding
 
     @property
     def stats(self) -> dict:
@@ -79,6 +137,7 @@ class EmbeddingCache:
         return {
             "size": len(self._cache),
             "maxsize": self._maxsize,
+            "ttl_seconds": self._ttl,
             "hits": self._hits,
             "misses": self._misses,
             "hit_rate": round(hit_rate, 3),
@@ -86,6 +145,7 @@ class EmbeddingCache:
 
     def clear(self) -> None:
         self._cache.clear()
+        self._stored_at.clear()
         self._order.clear()
         self._hits = 0
         self._misses = 0
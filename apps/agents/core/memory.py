@@ -6,7 +6,7 @@ Manages conversational, profile, strategy, and knowledge memories.
 from openai import AsyncOpenAI
 from src.api.config import settings
 from src.database.supabase_client import db
-from src.services.embedding_service import embedding_service
+from src.services.embedding_version_service import embedding_version_service
 from agents.core.state import MemoryEntry, ArtisanProfile, MemorySearchResult
 from agents.core.embedding_cache import embedding_cache
 from typing import List, Dict, Any, Optional
@@ -67,7 +67,10 @@ class MemoryService:
                 )
             
             # Generate embedding for the content (cached)
-            embedding = await embedding_cache.get_or_generate(content, embedding_service.generate_embedding)
+            embedder = await embedding_version_service.live_embedder("knowledge")
+            embedding = await embedding_cache.get_or_generate(
+                content, embedder.generate_embedding, model=embedder.model
+            )
             
             # Create memory entry
             memory_entry = MemoryEntry(
@@ -124,7 +127,10 @@ class MemoryService:
         """
         try:
             # Generate query embedding (cached)
-            query_embedding = await embedding_cache.get_or_generate(query, embedding_service.generate_embedding)
+            embedder = await embedding_version_service.live_embedder("knowledge")
+            query_embedding = await embedding_cache.get_or_generate(
+                query, embedder.generate_embedding, model=embedder.model
+            )
             
             # Search memories
             results = await db.search_memories(
@@ -200,7 +206,10 @@ class MemoryService:
         """
         try:
             # Generate embedding for profile summary (cached)
-            embedding = await embedding_cache.get_or_generate(profile_summary, embedding_service.generate_embedding)
+            embedder = await embedding_version_service.live_embedder("knowledge")
+            embedding = await embedding_cache.get_or_generate(
+                profile_summary, embedder.generate_embedding, model=embedder.model
+            )
             
             # Upsert profile
             result = await db.save_artisan_profile(
@@ -3,6 +3,7 @@ Standalone FastAPI application for the Agents Service.
 Can be run independently or integrated into a larger application.
 """
 
+import asyncio
 import sys
 import os
 from pathlib import Path
@@ -22,13 +23,11 @@ if backend_path not in sys.path:
 # Import after path setup
 from agents.api import router as agents_router
 from agents.search_api import router as search_router
-from agents.joyitas_search_api import router as joyitas_search_router
 from agents.whatsapp_api import router as whatsapp_router
 from agents.artisan_support_api import router as artisan_support_router
 from agents.tracing import init_langsmith
 from src.api.config import settings
 from src.database.pg_client import get_pool, close_pool
-from src.database.joyitas_pg_client import get_joyitas_pool, close_joyitas_pool
 
 # Configure logging
 logging.basicConfig(
@@ -74,6 +73,12 @@ async def lifespan(app: FastAPI):
             "ARTISAN_WHATSAPP_PHONE_NUMBER_ID missing)"
         )
 
+    # Graph API connection pools of both bots (keep-alive across messages)
+    from agents.services.whatsapp.whatsapp_client import whatsapp_client
+    from agents.services.artisan_support.whatsapp_client import artisan_whatsapp_client
+    await whatsapp_client.start()
+    await artisan_whatsapp_client.start()
+
     # Check Tavily API for pricing agent
     if settings.tavily_api_key:
         logger.info("🌐 Tavily Web Search: Enabled (Pricing Agent)")
@@ -101,20 +106,78 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("CATALOG_DB_URL not set - semantic search will be unavailable")
 
-    # Warm up joyitas DB connection pool (stage test DB — graceful on failure)
-    try:
-        await get_joyitas_pool()
-        logger.info("Joyitas DB pool ready")
-    except Exception as exc:
-        logger.warning(f"Joyitas DB pool could not be created at startup: {exc}")
+    # Load the taxonomy snapshot (one concurrent fetch) and subscribe to changes
+    if settings.catalog_db_url or settings.agents_db_url:
+        try:
+            from agents.services.taxonomy_service import taxonomy_service
+            await taxonomy_service.start()
+            logger.info("Taxonomy snapshot ready")
+        except Exception as exc:
+            logger.warning(f"Taxonomy could not be loaded at startup (will load on first use): {exc}")
+
+    # Live embedding model per vector table (blue/green embedding versions)
+    if settings.catalog_db_url or settings.agents_db_url:
+        from src.services.embedding_version_service import embedding_version_service
+        await embedding_version_service.start()
+
+    # Resume a product indexing job interrupted by a crash or restart, start
+    # re-embedding edited products as their changes are queued, and schedule
+    # the nightly related-products rebuild
+    if settings.catalog_db_url:
+        from agents.core.background import background_tasks
+        from agents.services.semantic_search_service import semantic_search_service
+        background_tasks.spawn(
+            semantic_search_service.resume_interrupted_indexing(), name="resume-product-indexing"
+        )
+        await semantic_search_service.start()
+        from src.services.product_recommendation_service import product_recommendation_service
+        product_recommendation_service.start()
+
+    # Load the facet counts (regions, crafts, categories, materials, prices) and keep them fresh
+    if settings.catalog_db_url:
+        try:
+            from agents.services.facet_service import facet_service
+            await facet_service.start()
+            logger.info("Facet snapshot ready")
+        except Exception as exc:
+            logger.warning(f"Facets could not be loaded at startup (will load on first use): {exc}")
+
+    # Calibrated hnsw.ef_search per search quality (fast / balanced / exact)
+    if settings.catalog_db_url:
+        try:
+            from src.services.vector_tuning_service import vector_tuning_service
+            await vector_tuning_service.load()
+        except Exception as exc:
+            logger.warning(f"Vector search calibrations not loaded, using HNSW_EF_SEARCH defaults: {exc}")
 
+    # Pools of the other SEARCH_CATALOGS open on their first request
     logger.info("Agents Service Ready")
 
     yield
 
     # Shutdown
+    # Finish queued WhatsApp messages (up to WHATSAPP_DRAIN_SECONDS) while the pools are open
+    from agents.services.whatsapp.whatsapp_bot_service import message_dispatcher as whatsapp_dispatcher
+    from agents.services.artisan_support.tutor_bot_service import message_dispatcher as artisan_dispatcher
+    await asyncio.gather(whatsapp_dispatcher.stop(), artisan_dispatcher.stop())
+    from agents.services.whatsapp.whatsapp_client import whatsapp_client
+    from agents.services.artisan_support.whatsapp_client import artisan_whatsapp_client
+    # Flushes each client's outbound queue, then closes its pool
+    await asyncio.gather(whatsapp_client.stop(), artisan_whatsapp_client.stop())
+    # Let deferred writes (e.g. onboarding persistence) finish before the pools close
+    from agents.core.background import background_tasks
+    await background_tasks.drain()
+    from agents.services.taxonomy_service import taxonomy_service
+    await taxonomy_service.stop()
+    from agents.services.semantic_search_service import semantic_search_service
+    await semantic_search_service.stop()
+    from src.services.product_recommendation_service import product_recommendation_service
+    product_recommendation_service.stop()
+    from agents.services.facet_service import facet_service
+    await facet_service.stop()
+    from src.services.embedding_version_service import embedding_version_service
+    await embedding_version_service.stop()
     await close_pool()
-    await close_joyitas_pool()
     try:
         from src.database.supabase_client import db as agents_db
         await agents_db.close()
@@ -178,8 +241,8 @@ app.add_middleware(
 
 # Include routers
 app.include_router(agents_router, prefix="/api")
-app.include_router(search_router, prefix="/api")
-app.include_router(joyitas_search_router, prefix="/api")
+app.include_router(search_router, prefix="/api/search")
+app.include_router(search_router, prefix="/api/{catalog}-search")
 app.include_router(whatsapp_router, prefix="/api")
 app.include_router(artisan_support_router, prefix="/api")
 
@@ -220,6 +283,7 @@ async def root():
             "save_embedding": "/api/search/embeddings/save",
             "index_products": "/api/search/index/products",
             "index_status": "/api/search/index/products/status",
+            "catalog_search": "/api/{catalog}-search/products",
         },
         "documentation": {
             "swagger": "/docs",
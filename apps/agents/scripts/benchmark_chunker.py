@@ -0,0 +1,131 @@
+"""
+Benchmark the token-aware chunker against the legacy character chunker.
+
+Reports chunking throughput and the spread of chunk sizes (in embedding-model
+tokens) for both implementations over the local knowledge base.
+
+Usage:
+    cd apps/agents
+    python scripts/benchmark_chunker.py
+    python scripts/benchmark_chunker.py --repeat 200 --max-tokens 350 --overlap-tokens 60
+    python scripts/benchmark_chunker.py --dir knowledge_base/capacitaciones --output chunker.json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is in path
+project_root = Path(__file__).parent.parent.parent  # apps/
+sys.path.insert(0, str(project_root))
+
+from agents.core.chunker import TokenChunker
+from agents.helpers import chunk_text
+
+_FRONTMATTER_RE = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+
+
+def load_corpus(directory: Path, repeat: int) -> list[str]:
+    """Load .md/.txt files (frontmatter stripped) and replicate them `repeat` times."""
+    docs = []
+    for path in sorted(list(directory.rglob("*.md")) + list(directory.rglob("*.txt"))):
+        if path.name.lower() == "readme.md":
+            continue
+        content = _FRONTMATTER_RE.sub("", path.read_text(encoding="utf-8")).strip()
+        if content:
+            docs.append(content)
+    # Replicating each document builds longer inputs, which is what stresses
+    # the chunkers (the shipped examples are short).
+    return ["\n\n".join([d] * repeat) for d in docs]
+
+
+def size_stats(token_counts: list[int], max_tokens: int) -> dict:
+    if not token_counts:
+        return {"chunks": 0}
+    mean = statistics.fmean(token_counts)
+    stdev = statistics.pstdev(token_counts)
+    return {
+        "chunks": len(token_counts),
+        "mean_tokens": round(mean, 1),
+        "stdev_tokens": round(stdev, 1),
+        "cv": round(stdev / mean, 3) if mean else 0.0,
+        "min_tokens": min(token_counts),
+        "max_tokens": max(token_counts),
+        "over_budget": sum(1 for n in token_counts if n > max_tokens),
+    }
+
+
+def run(name: str, split, docs: list[str], counter: TokenChunker, max_tokens: int, rounds: int) -> dict:
+    total_bytes = sum(len(d.encode("utf-8")) for d in docs)
+
+    chunks: list[str] = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        chunks = [c for d in docs for c in split(d)]
+    elapsed = (time.perf_counter() - start) / rounds
+
+    return {
+        "name": name,
+        "seconds_per_pass": round(elapsed, 4),
+        "mb_per_second": round(total_bytes / 1e6 / elapsed, 2) if elapsed else None,
+        "docs_per_second": round(len(docs) / elapsed, 1) if elapsed else None,
+        **size_stats([counter.count_tokens(c) for c in chunks], max_tokens),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    directory = Path(args.dir) if args.dir else Path(__file__).parent.parent / "knowledge_base"
+    docs = load_corpus(directory, args.repeat)
+    if not docs:
+        print(f"No documents found in {directory}")
+        sys.exit(1)
+
+    chunker = TokenChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+
+    results = {
+        "corpus": {
+            "directory": str(directory),
+            "documents": len(docs),
+            "bytes": sum(len(d.encode("utf-8")) for d in docs),
+            "tokens": sum(chunker.count_tokens(d) for d in docs),
+        },
+        "config": {
+            "legacy_chunk_size_chars": args.chunk_size,
+            "legacy_chunk_overlap_chars": args.chunk_overlap,
+            "max_tokens": args.max_tokens,
+            "overlap_tokens": args.overlap_tokens,
+            "tokenizer": "tiktoken" if chunker._encoding is not None else "approximate",
+        },
+        "results": [
+            run(
+                "legacy_chars",
+                lambda d: chunk_text(d, args.chunk_size, args.chunk_overlap),
+                docs, chunker, args.max_tokens, args.rounds,
+            ),
+            run("token_chunker", chunker.split, docs, chunker, args.max_tokens, args.rounds),
+        ],
+    }
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RAG chunkers")
+    parser.add_argument("--dir", help="Directory with .md/.txt documents (defaults to knowledge_base/)")
+    parser.add_argument("--repeat", type=int, default=50, help="Times each document is concatenated")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes over the corpus")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Legacy chunk size (characters)")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Legacy overlap (characters)")
+    parser.add_argument("--max-tokens", type=int, default=350, help="Token chunker budget")
+    parser.add_argument("--overlap-tokens", type=int, default=60, help="Token chunker overlap")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+
+    main(args)
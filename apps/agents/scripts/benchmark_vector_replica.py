@@ -0,0 +1,162 @@
+"""
+Product search latency with and without the local vector replica.
+
+Samples stored product vectors as queries (no OpenAI calls) and times the
+same unfiltered searches two ways:
+
+    postgres  _search_product_rows: HNSW scan + enrichment in the catalog DB
+    replica   _replica_product_rows: brute force over the local mmap replica,
+              enrichment of the final ids in the catalog DB
+
+Reports p50/p95/p99/mean latency per mode and the overlap of their result
+ids (the replica is exact, so the overlap is the HNSW recall at this
+quality) as JSON. The replica is built or caught up under
+VECTOR_REPLICA_DIR (default: a temporary directory) before timing.
+
+Usage:
+    cd apps/agents
+    python scripts/benchmark_vector_replica.py
+    python scripts/benchmark_vector_replica.py --queries 500 --top-k 20 --quality fast
+    python scripts/benchmark_vector_replica.py --concurrency 8 --output replica.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure project root is in path
+project_root = Path(__file__).parent.parent.parent  # apps/
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+if not os.getenv("VECTOR_REPLICA_DIR"):
+    os.environ["VECTOR_REPLICA_DIR"] = tempfile.mkdtemp(prefix="vector-replica-")
+
+_SAMPLE_SQL = "SELECT embedding::text AS embedding FROM shop.product_embeddings ORDER BY random() LIMIT $1"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return round(ordered[rank - 1], 3)
+
+
+async def timed_searches(pool, search, queries: List[List[float]], concurrency: int) -> Dict[str, Any]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    results: List[List[str]] = [[] for _ in queries]
+
+    async def run(i: int, vector: List[float]) -> None:
+        async with slots, pool.acquire() as conn:
+            started = time.perf_counter()
+            rows = await search(conn, vector)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[i] = [str(r["product_id"]) for r, *_ in rows or []]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i, v) for i, v in enumerate(queries)))
+    elapsed = time.perf_counter() - started
+    return {
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        },
+        "searches_per_second": round(len(queries) / elapsed, 1) if elapsed else None,
+        "results": results,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    from agents.services.semantic_search_service import (
+        _replica_product_rows,
+        _search_product_rows,
+        semantic_search_service as service,
+    )
+    from src.database.pg_client import close_pool, get_pool
+    from src.services.embedding_version_service import embedding_version_service
+    from src.services.vector_tuning_service import vector_tuning_service
+
+    await embedding_version_service.load()
+    await vector_tuning_service.load()
+    replica = service._replica
+    if replica is None:
+        sys.exit("The main catalog has no vector replica (VECTOR_REPLICA_DIR / CATALOG_DB_URL)")
+
+    started = time.perf_counter()
+    await replica.sync(force_rebuild=args.rebuild)
+    sync_seconds = round(time.perf_counter() - started, 1)
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        queries = [json.loads(r["embedding"]) for r in await conn.fetch(_SAMPLE_SQL, args.queries)]
+    if not queries:
+        sys.exit("No product embeddings to sample")
+
+    ef_search = vector_tuning_service.ef_search("products", args.quality)
+
+    async def postgres(conn, vector):
+        return await _search_product_rows(conn, vector, args.top_k, args.min_similarity, ef_search)
+
+    async def local(conn, vector):
+        return await _replica_product_rows(conn, replica, vector, args.top_k, args.min_similarity)
+
+    # Warm-up: page cache for the mmap, plans and pool connections
+    await timed_searches(pool, postgres, queries[:10], args.concurrency)
+    await timed_searches(pool, local, queries[:10], args.concurrency)
+
+    modes = {
+        "postgres": await timed_searches(pool, postgres, queries, args.concurrency),
+        "replica": await timed_searches(pool, local, queries, args.concurrency),
+    }
+    overlaps = [
+        len(set(p) & set(r)) / len(r)
+        for p, r in zip(modes["postgres"]["results"], modes["replica"]["results"])
+        if r
+    ]
+    await close_pool()
+
+    report = {
+        "settings": {
+            "queries": len(queries),
+            "top_k": args.top_k,
+            "min_similarity": args.min_similarity,
+            "quality": args.quality,
+            "ef_search": ef_search,
+            "concurrency": args.concurrency,
+        },
+        "replica": {**replica.stats(), "sync_seconds": sync_seconds},
+        "results": {mode: {k: v for k, v in m.items() if k != "results"} for mode, m in modes.items()},
+        "overlap_at_k": round(sum(overlaps) / len(overlaps), 4) if overlaps else None,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark product search with and without the vector replica")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--min-similarity", type=float, default=0.0)
+    parser.add_argument("--quality", choices=["fast", "balanced", "exact"], default="balanced")
+    parser.add_argument("--concurrency", type=int, default=1, help="Searches in flight at once")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the replica instead of catching it up")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
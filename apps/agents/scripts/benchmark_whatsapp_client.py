@@ -0,0 +1,268 @@
+"""
+WhatsApp client latency per message: a connection per request vs the pooled client.
+
+Starts a local mock of the Graph API (messages and media endpoints, HTTPS
+with a throwaway self-signed certificate from the openssl CLI unless
+--no-tls) and runs the bot's outgoing traffic through WhatsAppClient
+twice:
+
+    fresh   a new httpx.AsyncClient, so a new TCP + TLS connection, per
+            request (the client before the connection pool)
+    pooled  the client's long-lived pool (keep-alive connections)
+
+Per message, as the sales bot sends it:
+
+    text    "processing" indicator + reply                   (2 POSTs)
+    voice   "listening" note, media URL + audio download,
+            indicator + reply                                (3 POSTs, 2 GETs)
+
+--rtt-ms adds a simulated network round trip per request and per handshake
+round trip (1 for TCP, +2 for TLS) on the mock server, since loopback has
+none; the default approximates a client in Colombia to graph.facebook.com.
+Reports p50/p95/mean per message and the latency saved per message, as JSON.
+
+Usage:
+    cd apps/agents
+    python scripts/benchmark_whatsapp_client.py
+    python scripts/benchmark_whatsapp_client.py --messages 200 --rtt-ms 0 --no-tls
+    python scripts/benchmark_whatsapp_client.py --concurrency 8 --output whatsapp_client.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure project root is in path
+project_root = Path(__file__).parent.parent.parent  # apps/
+sys.path.insert(0, str(project_root))
+
+_PHONE_NUMBER_ID = "100000000000000"
+_AUDIO_BYTES = 48_000   # ~15 s opus voice note
+
+
+# ============================================================
+# Mock Graph API (HTTP/1.1 with keep-alive)
+# ============================================================
+
+class MockGraphAPI:
+    """Minimal Graph API: POST /{id}/messages, GET /{media_id}, GET /media/{media_id}."""
+
+    def __init__(self, rtt_ms: float, tls: bool) -> None:
+        self.rtt = rtt_ms / 1000
+        self.tls = tls
+        self.connections = 0
+        self.requests = 0
+        self.base_url = ""
+        self.cert_file: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        context = None
+        if self.tls:
+            workdir = tempfile.mkdtemp(prefix="graph-mock-")
+            self.cert_file = os.path.join(workdir, "cert.pem")
+            key_file = os.path.join(workdir, "key.pem")
+            subprocess.run(
+                [
+                    "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+                    "-keyout", key_file, "-out", self.cert_file,
+                ],
+                check=True,
+                capture_output=True,
+            )
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(self.cert_file, key_file)
+        self._server = await asyncio.start_server(self._handle, "localhost", 0, ssl=context)
+        port = self._server.sockets[0].getsockname()[1]
+        self.base_url = f"{'https' if self.tls else 'http'}://localhost:{port}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        # TCP handshake, plus TLS 1.2 full handshake, before the first request
+        await asyncio.sleep(self.rtt * (3 if self.tls else 1))
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+                self.requests += 1
+                await asyncio.sleep(self.rtt)
+
+                content_type, body = self._route(method, path)
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str) -> tuple:
+        if method == "POST" and path.endswith("/messages"):
+            return "application/json", json.dumps({"messages": [{"id": f"wamid.{self.requests}"}]}).encode()
+        if path.startswith("/media/"):
+            return "audio/ogg", b"\0" * _AUDIO_BYTES
+        return "application/json", json.dumps({"url": f"{self.base_url}/media{path}"}).encode()
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return round(ordered[rank - 1], 2)
+
+
+async def send_message(client, phone: str, voice: bool) -> None:
+    if voice:
+        await client.send_text_message(phone, "🎤 _Escuchando tu mensaje de voz..._")
+        if await client.download_audio("media-1") is None:
+            raise RuntimeError("audio download failed")
+    await client.send_processing_indicator(phone)
+    if await client.send_text_message(phone, "Respuesta del bot") is None:
+        raise RuntimeError("send failed")
+
+
+async def run_mode(client, messages: int, concurrency: int, voice: bool) -> Dict[str, Any]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            await send_message(client, f"57300{i:07d}", voice)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - started
+    return {
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "mean": round(sum(latencies) / len(latencies), 2),
+        },
+        "messages_per_second": round(messages / elapsed, 1),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = MockGraphAPI(args.rtt_ms, not args.no_tls)
+    await server.start()
+
+    # The client reads its settings at import time
+    os.environ.update({
+        "WHATSAPP_API_URL": server.base_url,
+        "WHATSAPP_ACCESS_TOKEN": "benchmark",
+        "WHATSAPP_PHONE_NUMBER_ID": _PHONE_NUMBER_ID,
+    })
+    if server.cert_file:
+        os.environ["SSL_CERT_FILE"] = server.cert_file   # trusted by httpx (trust_env)
+
+    import httpx
+    from agents.services.whatsapp.whatsapp_client import WhatsAppClient
+
+    class FreshConnectionClient(WhatsAppClient):
+        """A new httpx.AsyncClient per request, closed after its response."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self._opened: List[httpx.AsyncClient] = []
+
+        @property
+        def _http(self) -> httpx.AsyncClient:
+            client = httpx.AsyncClient(timeout=10.0)
+            self._opened.append(client)
+            return client
+
+        async def close_opened(self) -> None:
+            opened, self._opened = self._opened, []
+            await asyncio.gather(*(c.aclose() for c in opened))
+
+    report: Dict[str, Any] = {
+        "settings": {
+            "messages": args.messages,
+            "concurrency": args.concurrency,
+            "rtt_ms": args.rtt_ms,
+            "tls": not args.no_tls,
+        },
+        "results": {},
+    }
+    for scenario in ("text", "voice"):
+        voice = scenario == "voice"
+        fresh = FreshConnectionClient()
+        pooled = WhatsAppClient()
+        await pooled.start()
+
+        # Warm-up: imports, certificate loading, the pool's first connections
+        await send_message(pooled, "573000000000", voice)
+        await send_message(fresh, "573000000000", voice)
+        await fresh.close_opened()
+
+        connections = server.connections
+        fresh_result = await run_mode(fresh, args.messages, args.concurrency, voice)
+        fresh_result["connections"] = server.connections - connections
+        await fresh.close_opened()
+
+        connections = server.connections
+        pooled_result = await run_mode(pooled, args.messages, args.concurrency, voice)
+        pooled_result["connections"] = server.connections - connections
+        await pooled.stop()
+
+        report["results"][scenario] = {
+            "fresh": fresh_result,
+            "pooled": pooled_result,
+            "saved_ms_per_message": {
+                k: round(fresh_result["latency_ms"][k] - pooled_result["latency_ms"][k], 2)
+                for k in ("p50", "mean")
+            },
+        }
+
+    await server.stop()
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pooled WhatsApp client against a local mock Graph API")
+    parser.add_argument("--messages", type=int, default=100, help="Messages per scenario and mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="Messages in flight at once")
+    parser.add_argument("--rtt-ms", type=float, default=30.0, help="Simulated network round trip on the mock server")
+    parser.add_argument("--no-tls", action="store_true", help="Plain HTTP (no TLS handshakes)")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
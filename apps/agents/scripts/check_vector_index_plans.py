@@ -0,0 +1,210 @@
+"""
+Check that knowledge and memory queries are planned on their intended indexes.
+
+Runs EXPLAIN (FORMAT JSON) on the exact SQL AgentsDbClient sends (same query
+builders, same transaction-local hnsw.ef_search / plan_cache_mode) and
+verifies each plan scans the index created by migrate_vector_indexes.sql.
+
+On small tables the planner correctly prefers a sequential scan; use
+--force-index (enable_seqscan = off) to verify the indexes are *usable*,
+i.e. that the query predicates imply the partial index predicates.
+
+Exit code is 1 when any query misses its expected index.
+
+Usage:
+    cd apps/agents
+    python scripts/check_vector_index_plans.py
+    python scripts/check_vector_index_plans.py --force-index
+    python scripts/check_vector_index_plans.py --analyze --ef-search 100 --output plans.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure project root is in path
+project_root = Path(__file__).parent.parent.parent  # apps/
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+_MEMORY_TYPES = ("conversational", "profile", "strategy")
+
+
+def _plan_nodes(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def _random_unit_vector(dimensions: int, seed: int) -> List[float]:
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector]
+
+
+async def explain(conn, sql: str, args: List[Any], ef_search: Optional[int], args_ns) -> Dict[str, Any]:
+    from src.database.supabase_client import _VECTOR_SESSION_SQL
+
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if args_ns.analyze else "FORMAT JSON"
+    async with conn.transaction():
+        if ef_search is not None:
+            await conn.execute(_VECTOR_SESSION_SQL, str(ef_search))
+        if args_ns.force_index:
+            await conn.execute("SET LOCAL enable_seqscan = off")
+        raw = await conn.fetchval(f"EXPLAIN ({options}) {sql}", *args)
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return plan[0]
+
+
+async def check(
+    conn,
+    name: str,
+    sql: str,
+    args: List[Any],
+    expected: List[str],
+    ef_search: Optional[int],
+    args_ns,
+) -> Dict[str, Any]:
+    plan = await explain(conn, sql, args, ef_search, args_ns)
+    nodes = _plan_nodes(plan["Plan"])
+    used = sorted({n["Index Name"] for n in nodes if n.get("Index Name")})
+    seq_scans = sorted({n.get("Relation Name") for n in nodes if n["Node Type"] == "Seq Scan"})
+    missing = [i for i in expected if i not in used]
+    result = {
+        "query": name,
+        "status": "ok" if not missing else "miss",
+        "expected_indexes": expected,
+        "used_indexes": used,
+        "seq_scans": seq_scans,
+        "total_cost": plan["Plan"].get("Total Cost"),
+    }
+    if args_ns.analyze:
+        result["execution_ms"] = plan.get("Execution Time")
+    if args_ns.verbose:
+        result["plan"] = plan["Plan"]
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    from src.api.config import settings
+    from src.database.supabase_client import (
+        _knowledge_search_query,
+        _memory_search_query,
+        _session_memories_query,
+        db,
+    )
+
+    ef_search = args.ef_search or settings.hnsw_ef_search
+    vector = _random_unit_vector(settings.embedding_dimensions, args.seed)
+    pool = await db._get_pool()
+    results = []
+
+    try:
+        async with pool.acquire() as conn:
+            categories = await conn.fetch(
+                """
+                SELECT e.knowledge_category AS category,
+                       agents.knowledge_category_index_name(e.knowledge_category) AS index_name,
+                       to_regclass('agents.' || agents.knowledge_category_index_name(e.knowledge_category))
+                           IS NOT NULL AS indexed
+                FROM agents.agent_knowledge_embeddings e
+                WHERE (e.memory_type = 'knowledge' OR e.memory_type IS NULL)
+                  AND e.document_id IS NOT NULL
+                GROUP BY e.knowledge_category
+                ORDER BY e.knowledge_category
+                """
+            )
+            session_id = await conn.fetchval(
+                "SELECT session_id FROM agents.agent_knowledge_embeddings "
+                "WHERE memory_type = 'conversational' AND session_id IS NOT NULL LIMIT 1"
+            ) or "plan-check"
+
+            # Knowledge (RAG)
+            sql, qargs, candidates = _knowledge_search_query(vector, args.top_k)
+            results.append(await check(
+                conn, "knowledge", sql, qargs, ["idx_embeddings_knowledge_hnsw"],
+                max(ef_search, candidates), args,
+            ))
+            sql, qargs, candidates = _knowledge_search_query(
+                vector, args.top_k, query_text="precio devolución envío", hybrid=True
+            )
+            results.append(await check(
+                conn, "knowledge_hybrid", sql, qargs,
+                ["idx_embeddings_knowledge_hnsw", "idx_embeddings_knowledge_fts"],
+                max(ef_search, candidates), args,
+            ))
+            for row in categories:
+                sql, qargs, candidates = _knowledge_search_query(vector, args.top_k, row["category"])
+                # Categories below the sync threshold have no index of their own:
+                # an exact scan of the category is the intended plan there.
+                expected = [row["index_name"]] if row["indexed"] else []
+                results.append(await check(
+                    conn, f"knowledge[category={row['category']}]", sql, qargs, expected,
+                    max(ef_search, candidates), args,
+                ))
+
+            # Memories
+            sql, qargs = _memory_search_query(vector, args.top_k)
+            results.append(await check(
+                conn, "memory", sql, qargs, ["idx_embeddings_vector"],
+                max(ef_search, args.top_k), args,
+            ))
+            for memory_type in _MEMORY_TYPES:
+                sql, qargs = _memory_search_query(vector, args.top_k, filter_memory_type=memory_type)
+                results.append(await check(
+                    conn, f"memory[memory_type={memory_type}]", sql, qargs,
+                    [f"idx_embeddings_memory_{memory_type}_hnsw"],
+                    max(ef_search, args.top_k), args,
+                ))
+
+            # Session memories (b-tree)
+            sql, qargs = _session_memories_query(session_id, limit=args.top_k)
+            results.append(await check(
+                conn, "session_memories", sql, qargs,
+                ["idx_embeddings_session_conversational"], None, args,
+            ))
+            sql, qargs = _session_memories_query(
+                session_id, artisan_id="00000000-0000-0000-0000-000000000000", limit=args.top_k
+            )
+            results.append(await check(
+                conn, "session_memories[artisan]", sql, qargs,
+                ["idx_embeddings_session_conversational"], None, args,
+            ))
+    finally:
+        await db.close()
+
+    misses = [r["query"] for r in results if r["status"] != "ok"]
+    report = {
+        "ef_search": ef_search,
+        "force_index": args.force_index,
+        "checks": results,
+        "misses": misses,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+    sys.exit(1 if misses else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify vector/memory query plans use their indexes")
+    parser.add_argument("--top-k", type=int, default=5, help="LIMIT used for the checked queries")
+    parser.add_argument("--ef-search", type=int, help="hnsw.ef_search (defaults to HNSW_EF_SEARCH)")
+    parser.add_argument("--force-index", action="store_true", help="SET LOCAL enable_seqscan = off")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (executes the queries)")
+    parser.add_argument("--verbose", action="store_true", help="Include the full plan trees")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the random query vector")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
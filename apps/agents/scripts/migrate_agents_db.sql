@@ -264,6 +264,33 @@ AS $$
     LIMIT match_count;
 $$;
 
+-- ============================================================
+-- 8. embedding_versions (blue/green re-index of agent_knowledge_embeddings)
+-- Kept by src/services/embedding_version_service.py; the first
+-- agents startup registers the current model as version 1.
+-- ============================================================
+CREATE TABLE IF NOT EXISTS agents.embedding_versions (
+    target          TEXT NOT NULL,
+    version         INTEGER NOT NULL,
+    model           TEXT NOT NULL,
+    dimensions      INTEGER NOT NULL,
+    table_name      TEXT NOT NULL,
+    status          TEXT NOT NULL
+                    CHECK (status IN ('building','ready','rejected','failed','live','retired','dropped')),
+    rows            BIGINT,
+    ann_recall      REAL,
+    agreement       REAL,
+    error           TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    live_at         TIMESTAMPTZ,
+    retired_at      TIMESTAMPTZ,
+    dropped_at      TIMESTAMPTZ,
+    PRIMARY KEY (target, version)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_versions_live
+    ON agents.embedding_versions (target) WHERE status = 'live';
+
 -- ============================================================
 -- Done
 -- ============================================================
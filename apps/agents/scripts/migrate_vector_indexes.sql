@@ -0,0 +1,171 @@
+-- ============================================================
+-- Vector Index Migration — Agents Schema
+-- Replaces the single IVFFlat index on agents.agent_knowledge_embeddings
+-- with partial HNSW indexes scoped to the filters the queries use
+-- (knowledge chunks, each memory_type, large knowledge categories),
+-- plus a composite b-tree for session memory lookups.
+--
+-- The predicates below must stay in sync with the WHERE clauses
+-- built in src/database/supabase_client.py, otherwise the planner
+-- cannot prove the partial index applies.
+--
+-- Usage (with SSH tunnel on port 5433):
+--   psql "postgresql://postgres:<password>@localhost:5433/getinmotion" -f migrate_vector_indexes.sql
+--
+-- Verify the plans afterwards:
+--   python scripts/check_vector_index_plans.py
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- ============================================================
+-- 1. Knowledge chunks (RAG) — unfiltered knowledge search
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_embeddings_knowledge_hnsw
+    ON agents.agent_knowledge_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE (memory_type = 'knowledge' OR memory_type IS NULL)
+      AND document_id IS NOT NULL
+      AND embedding IS NOT NULL;
+
+-- Full-text side of hybrid knowledge search (RAG_HYBRID_SEARCH)
+CREATE INDEX IF NOT EXISTS idx_embeddings_knowledge_fts
+    ON agents.agent_knowledge_embeddings
+    USING gin (to_tsvector('spanish', chunk_text))
+    WHERE (memory_type = 'knowledge' OR memory_type IS NULL)
+      AND document_id IS NOT NULL
+      AND embedding IS NOT NULL;
+
+-- ============================================================
+-- 2. Memories — one partial index per memory_type
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_embeddings_memory_conversational_hnsw
+    ON agents.agent_knowledge_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE memory_type = 'conversational' AND embedding IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_memory_profile_hnsw
+    ON agents.agent_knowledge_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE memory_type = 'profile' AND embedding IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_memory_strategy_hnsw
+    ON agents.agent_knowledge_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE memory_type = 'strategy' AND embedding IS NOT NULL;
+
+-- ============================================================
+-- 3. Global fallback (searches without a memory_type filter)
+--    IVFFlat with lists = 100 built on a near-empty table has
+--    poor recall; HNSW needs no training data.
+-- ============================================================
+DROP INDEX IF EXISTS agents.idx_embeddings_vector;
+CREATE INDEX IF NOT EXISTS idx_embeddings_vector
+    ON agents.agent_knowledge_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE embedding IS NOT NULL;
+
+-- ============================================================
+-- 4. Session memories — get_session_memories()
+--    WHERE session_id = ? [AND artisan_id = ?]
+--      AND memory_type = 'conversational'
+--    ORDER BY created_at DESC LIMIT ?
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_embeddings_session_conversational
+    ON agents.agent_knowledge_embeddings (session_id, created_at DESC)
+    INCLUDE (artisan_id)
+    WHERE memory_type = 'conversational';
+
+-- ============================================================
+-- 5. Per-category knowledge indexes (managed)
+--    A category-filtered search on the shared knowledge index
+--    post-filters the ef_search candidates and can return fewer
+--    than match_count rows. Large categories get their own partial
+--    index; small ones are cheaper to scan exactly.
+-- ============================================================
+CREATE OR REPLACE FUNCTION agents.knowledge_category_index_name(category TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT 'idx_embeddings_knowledge_'
+        || left(regexp_replace(lower(category), '[^a-z0-9]+', '_', 'g'), 32)
+        || '_' || left(md5(category), 6)
+        || '_hnsw';
+$$;
+
+CREATE OR REPLACE FUNCTION agents.sync_knowledge_category_indexes(min_rows INTEGER DEFAULT 1000)
+RETURNS TABLE (category TEXT, index_name TEXT, action TEXT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    -- Create indexes for categories that reached min_rows
+    FOR r IN
+        SELECT e.knowledge_category AS cat, COUNT(*) AS n
+        FROM agents.agent_knowledge_embeddings e
+        WHERE (e.memory_type = 'knowledge' OR e.memory_type IS NULL)
+          AND e.document_id IS NOT NULL
+          AND e.embedding IS NOT NULL
+        GROUP BY e.knowledge_category
+        HAVING COUNT(*) >= min_rows
+    LOOP
+        category := r.cat;
+        index_name := agents.knowledge_category_index_name(r.cat);
+        IF to_regclass('agents.' || index_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE INDEX %I ON agents.agent_knowledge_embeddings '
+                'USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64) '
+                'WHERE knowledge_category = %L '
+                'AND (memory_type = %L OR memory_type IS NULL) '
+                'AND document_id IS NOT NULL AND embedding IS NOT NULL',
+                index_name, r.cat, 'knowledge'
+            );
+            action := 'created';
+        ELSE
+            action := 'kept';
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+
+    -- Drop managed indexes whose category fell below min_rows or disappeared
+    FOR r IN
+        SELECT i.indexname
+        FROM pg_indexes i
+        WHERE i.schemaname = 'agents'
+          AND i.tablename = 'agent_knowledge_embeddings'
+          AND i.indexname LIKE 'idx\_embeddings\_knowledge\_%\_hnsw'
+          AND i.indexname <> 'idx_embeddings_knowledge_hnsw'
+          AND i.indexname NOT IN (
+              SELECT agents.knowledge_category_index_name(e.knowledge_category)
+              FROM agents.agent_knowledge_embeddings e
+              WHERE (e.memory_type = 'knowledge' OR e.memory_type IS NULL)
+                AND e.document_id IS NOT NULL
+                AND e.embedding IS NOT NULL
+              GROUP BY e.knowledge_category
+              HAVING COUNT(*) >= min_rows
+          )
+    LOOP
+        EXECUTE format('DROP INDEX agents.%I', r.indexname);
+        category := NULL;
+        index_name := r.indexname;
+        action := 'dropped';
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
+
+SELECT * FROM agents.sync_knowledge_category_indexes();
+
+ANALYZE agents.agent_knowledge_embeddings;
+
+-- ============================================================
+-- Done
+-- ============================================================
+-- Re-run after large knowledge uploads to add/drop category indexes:
+--   SELECT * FROM agents.sync_knowledge_category_indexes(1000);
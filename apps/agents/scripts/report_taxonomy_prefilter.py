@@ -0,0 +1,149 @@
+"""
+Report prompt tokens saved by the taxonomy prefilter and its effect on
+suggestion acceptance in product creation.
+
+Reads agents.product_drafts: step 1 stores the AI identity suggestions plus
+`taxonomy_prefilter` (prompt token counts, candidate list sizes) in
+step1_ai_output, and step 2 stores what the artisan confirmed. Drafts are
+grouped by whether the prompt was prefiltered; drafts created before the
+prefilter existed, or with TAXONOMY_PREFILTER_TOP_K=0, form the "full" group.
+
+A suggestion counts as accepted when the confirmed value is the suggested id.
+
+Usage:
+    cd apps/agents
+    python scripts/report_taxonomy_prefilter.py
+    python scripts/report_taxonomy_prefilter.py --since 2026-10-01 --output prefilter.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ensure project root is in path
+project_root = Path(__file__).parent.parent.parent  # apps/
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+_DRAFTS_SQL = """
+SELECT product_draft_id::text,
+       accumulated_snapshot->'step1_ai_output'->'identity_suggestions' AS suggested,
+       accumulated_snapshot->'step1_ai_output'->'taxonomy_prefilter'   AS prefilter,
+       accumulated_snapshot->'step2'->'confirmed_identity'             AS confirmed
+FROM agents.product_drafts
+WHERE accumulated_snapshot ? 'step1_ai_output'
+  AND created_at >= $1
+"""
+
+
+def _json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _value(field: Any) -> Optional[str]:
+    return field.get("value") if isinstance(field, dict) else None
+
+
+def _values(items: Any) -> set:
+    return {m.get("value") for m in items or [] if isinstance(m, dict) and m.get("value")}
+
+
+def _rate(hits: int, total: int) -> Optional[float]:
+    return round(hits / total, 4) if total else None
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(statistics.fmean(values), 1) if values else None
+
+
+def summarize(drafts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    confirmed = [d for d in drafts if d["confirmed"]]
+    prompt_tokens = [d["prefilter"]["prompt_tokens"] for d in drafts if d["prefilter"]]
+    full_tokens = [d["prefilter"]["full_prompt_tokens"] for d in drafts if d["prefilter"]]
+
+    acceptance: Dict[str, Any] = {}
+    for key in ("category", "oficio"):
+        suggested = [d for d in confirmed if _value(d["suggested"].get(key))]
+        accepted = sum(
+            1 for d in suggested if _value(d["suggested"].get(key)) == _value(d["confirmed"].get(key))
+        )
+        acceptance[key] = {"suggested": len(suggested), "accepted": accepted, "rate": _rate(accepted, len(suggested))}
+
+    # Materials: share of suggested materials kept, share of confirmed ones that were suggested
+    suggested_total = kept = confirmed_total = 0
+    for d in confirmed:
+        suggested_ids = _values(d["suggested"].get("materials"))
+        confirmed_ids = _values(d["confirmed"].get("materials"))
+        suggested_total += len(suggested_ids)
+        confirmed_total += len(confirmed_ids)
+        kept += len(suggested_ids & confirmed_ids)
+    acceptance["materials"] = {
+        "suggested": suggested_total,
+        "accepted": kept,
+        "precision": _rate(kept, suggested_total),
+        "recall": _rate(kept, confirmed_total),
+    }
+
+    return {
+        "drafts": len(drafts),
+        "confirmed_step2": len(confirmed),
+        "prompt_tokens_mean": _mean(prompt_tokens),
+        "full_prompt_tokens_mean": _mean(full_tokens),
+        "prompt_tokens_saved_mean": _mean([f - p for f, p in zip(full_tokens, prompt_tokens)]),
+        "prompt_tokens_saved_pct": (
+            round(100 * (1 - sum(prompt_tokens) / sum(full_tokens)), 1) if sum(full_tokens) else None
+        ),
+        "acceptance": acceptance,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    from src.database.supabase_client import db
+
+    since = (
+        datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc)
+        if args.since
+        else datetime.now(timezone.utc) - timedelta(days=args.days)
+    )
+    pool = await db._get_pool()
+    try:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(_DRAFTS_SQL, since)
+    finally:
+        await db.close()
+
+    groups: Dict[str, List[Dict[str, Any]]] = {"prefiltered": [], "full": []}
+    for row in rows:
+        prefilter = _json(row["prefilter"]) or None
+        draft = {
+            "suggested": _json(row["suggested"]) or {},
+            "prefilter": prefilter,
+            "confirmed": _json(row["confirmed"]) or {},
+        }
+        groups["prefiltered" if prefilter and prefilter.get("enabled") else "full"].append(draft)
+
+    report = {
+        "since": since.isoformat(),
+        "groups": {name: summarize(drafts) for name, drafts in groups.items()},
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Taxonomy prefilter token savings and suggestion acceptance")
+    parser.add_argument("--since", help="Only drafts created on/after this date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=30, help="Look-back window when --since is not given")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -1,28 +1,72 @@
 """
 Semantic Search & Embedding API router.
 
-Prefix: /api/search
+Mounted once per catalog: /api/search for the main catalog and
+/api/{catalog}-search for every catalog registered in SEARCH_CATALOGS.
+Related-products and facet endpoints exist for the main catalog only.
 
 Endpoints
 ---------
 POST /embeddings/generate         Generate a vector from plain text (called by NestJS on product save)
 POST /embeddings/save             Generate + persist a product embedding in one call
 POST /products                    Semantic search over published products
-POST /stores                      Semantic search over stores (reserved - returns 501 until implemented)
+POST /products/page               One page of a product search; next_cursor continues it without re-embedding
+POST /products/batch              Several product searches in one call (one embeddings call)
+POST /stores                      Semantic search over stores (store vectors from product embeddings)
+GET  /products/{id}/related       "More like this": diverse neighbours of a product's stored vector
+GET  /facets                      Product counts per region, craft, category, material and price bucket
+POST /facets                      Faceted drill-down under filters, optionally over a semantic search
+POST /index/related               Rebuild the precomputed related-products lists (also runs nightly)
 POST /index/products              Trigger batch indexing job for all (or selected) products
 GET  /index/products/status       Status of the last batch indexing job
+GET  /index/products/queue        Incremental re-embedding queue depth, lag and counters
+GET  /cache/stats                 Product search result / query-vector / cursor cache statistics
+GET  /tuning                      HNSW calibration status and ef_search per search quality
+POST /tuning/calibrate            Measure recall/latency (ef_search sweep, shadow index builds) and recalibrate
+GET  /embeddings/versions         Live and past embedding versions (model, dimensions, validation) per target
+POST /embeddings/versions/build   Re-embed a target into a shadow table with a new model and validate it
+POST /embeddings/versions/{target}/{version}/swap  Make a built (or retired) version live in one transaction
+POST /embeddings/versions/{target}/gc              Drop rejected builds and retired versions beyond the retention
 """
 
 import asyncio
-from typing import Any, Optional
+import time
+from typing import Any, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
 
-from agents.services.semantic_search_service import semantic_search_service
+from agents.services.facet_service import facet_service
+from agents.services.semantic_search_service import (
+    ProductSearchFilters,
+    ProductSearchQuery,
+    SemanticSearchService,
+    get_search_service,
+)
 from src.api.config import settings
+from src.database.pg_client import DEFAULT_CATALOG, get_catalog
+from src.services.embedding_version_service import embedding_version_service
+from src.services.product_recommendation_service import product_recommendation_service
+from src.services.vector_tuning_service import vector_tuning_service
+
+router = APIRouter(tags=["Semantic Search"])
 
-router = APIRouter(prefix="/search", tags=["Semantic Search"])
+
+def catalog_service(request: Request) -> SemanticSearchService:
+    """Search service of the catalog in the mount prefix (the main catalog under /api/search)."""
+    name = request.path_params.get("catalog", DEFAULT_CATALOG)
+    try:
+        return get_search_service(name)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown search catalog '{name}'")
+
+
+def main_catalog(service: SemanticSearchService = Depends(catalog_service)) -> None:
+    if service.catalog != DEFAULT_CATALOG:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Only available for the main catalog",
+        )
 
 
 # ============================================================
@@ -75,6 +119,18 @@ class ProductSearchRequest(BaseModel):
         le=1.0,
         description="Minimum cosine similarity (0-1). Lower = more results but less relevant.",
     )
+    price_min: Optional[int] = Field(default=None, ge=0, description="Minimum price in minor units (centavos)")
+    price_max: Optional[int] = Field(default=None, ge=0, description="Maximum price in minor units (centavos)")
+    in_stock: bool = Field(default=False, description="Only products with stock in an active variant")
+    craft_ids: list[str] = Field(default_factory=list, description="taxonomy.crafts ids (primary craft)")
+    category_ids: list[str] = Field(default_factory=list, description="taxonomy.categories ids, subcategories included")
+    material_ids: list[str] = Field(default_factory=list, description="taxonomy.materials ids (any of them)")
+    region: Optional[str] = Field(default=None, description="Store department or municipality")
+    store_ids: list[str] = Field(default_factory=list, description="shop.stores ids")
+    quality: Literal["fast", "balanced", "exact"] = Field(
+        default="balanced",
+        description="fast / balanced: calibrated hnsw.ef_search (see /tuning); exact: no index, full scan",
+    )
 
 
 class ProductSearchResult(BaseModel):
@@ -104,6 +160,135 @@ class ProductSearchResponse(BaseModel):
     results: list[ProductSearchResult]
 
 
+class ProductSearchPageRequest(ProductSearchRequest):
+    cursor: Optional[str] = Field(
+        default=None,
+        description=(
+            "next_cursor of the previous page. The query, filters, min_similarity and quality "
+            "of the first page are kept; top_k is the page size."
+        ),
+    )
+
+
+class ProductSearchPageResponse(ProductSearchResponse):
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass back as cursor for the next page; null on the last page",
+    )
+
+
+class BatchProductSearchRequest(BaseModel):
+    searches: list[ProductSearchRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=20,
+        description="Searches to run, each with its own limits and filters",
+    )
+
+
+class BatchProductSearchItem(ProductSearchResponse):
+    cached: bool = Field(description="Served from the search result cache")
+    search_ms: float = Field(description="Vector query + enrichment time for this search (0 when cached)")
+
+
+class BatchProductSearchResponse(BaseModel):
+    count: int
+    total_ms: float = Field(description="Wall time of the batch, including the shared embeddings call")
+    results: list[BatchProductSearchItem] = Field(description="One entry per search, in request order")
+
+
+class StoreSearchRequest(BaseModel):
+    query: str = Field(
+        ...,
+        min_length=1,
+        description="Natural-language search query",
+        example="artesanos de tejido wayuu",
+    )
+    top_k: int = Field(default=10, ge=1, le=50, description="Maximum stores to return")
+    min_similarity: float = Field(
+        default=0.3,
+        ge=0.0,
+        le=1.0,
+        description="Minimum cosine similarity (0-1) against the store vector (a centroid, so lower than for products).",
+    )
+    region: Optional[str] = Field(default=None, description="Store department or municipality")
+
+
+class StoreSearchResult(BaseModel):
+    store_id: str
+    store_name: str
+    slug: Optional[str]
+    similarity: float
+    product_count: int = Field(description="Searchable products the store vector was built from")
+    craft_name: Optional[str] = Field(None, description="Most common craft among the store's products")
+    department: Optional[str]
+    municipality: Optional[str]
+
+
+class StoreSearchResponse(BaseModel):
+    query: str
+    count: int
+    min_similarity_used: float
+    results: list[StoreSearchResult]
+
+
+class RelatedProductResult(BaseModel):
+    product_id: str
+    product_name: str
+    short_description: Optional[str]
+    similarity: float
+    store_id: Optional[str]
+    store_name: Optional[str]
+    craft_name: Optional[str]
+    category_name: Optional[str]
+    price: Optional[int] = Field(None, description="Minimum variant price in minor units (e.g. centavos for COP)")
+    currency: Optional[str]
+    stock: int = 0
+    images: list[dict] = Field(default_factory=list)
+
+
+class RelatedProductsResponse(BaseModel):
+    product_id: str
+    count: int
+    results: list[RelatedProductResult]
+
+
+class FacetsRequest(BaseModel):
+    query: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        description="Optional semantic query: counts then cover its top matches only",
+    )
+    min_similarity: float = Field(default=0.45, ge=0.0, le=1.0)
+    price_min: Optional[int] = Field(default=None, ge=0, description="Minimum price in minor units (centavos)")
+    price_max: Optional[int] = Field(default=None, ge=0, description="Maximum price in minor units (centavos)")
+    in_stock: bool = False
+    craft_ids: list[str] = Field(default_factory=list)
+    category_ids: list[str] = Field(default_factory=list)
+    material_ids: list[str] = Field(default_factory=list)
+    region: Optional[str] = None
+    store_ids: list[str] = Field(default_factory=list)
+
+
+class FacetValueResult(BaseModel):
+    key: str = Field(description="Value to filter by (id, folded region or price bucket)")
+    label: str
+    count: int
+    parent_id: Optional[str] = Field(None, description="Categories: parent category id")
+    price_min: Optional[int] = Field(None, description="Price buckets: inclusive bounds in minor units")
+    price_max: Optional[int] = None
+
+
+class FacetsResponse(BaseModel):
+    query: Optional[str]
+    total: int = Field(description="Products matching every filter")
+    regions: list[FacetValueResult]
+    crafts: list[FacetValueResult]
+    categories: list[FacetValueResult]
+    materials: list[FacetValueResult]
+    prices: list[FacetValueResult]
+
+
 class IndexProductsRequest(BaseModel):
     product_ids: Optional[list[str]] = Field(
         default=None,
@@ -121,6 +306,38 @@ class IndexProductsResponse(BaseModel):
     force_reindex: bool
 
 
+class HnswBuildParams(BaseModel):
+    m: int = Field(..., ge=2, le=100)
+    ef_construction: int = Field(..., ge=4, le=1000)
+
+
+class CalibrateRequest(BaseModel):
+    target: Literal["products", "knowledge"] = Field(
+        default="products",
+        description="products: shop.product_embeddings; knowledge: agents.agent_knowledge_embeddings",
+    )
+    sample_size: int = Field(default=100, ge=10, le=1000, description="Stored vectors sampled as queries")
+    top_k: int = Field(default=10, ge=1, le=100, description="k of the measured recall@k")
+    build_params: list[HnswBuildParams] = Field(
+        default_factory=list,
+        max_length=4,
+        description="HNSW build parameters to compare on shadow indexes over a copy of the vectors",
+    )
+
+
+class BuildEmbeddingVersionRequest(BaseModel):
+    target: Literal["products", "knowledge"] = Field(
+        default="products",
+        description="products: shop.product_embeddings; knowledge: agents.agent_knowledge_embeddings (RAG and memories)",
+    )
+    model: Optional[str] = Field(default=None, description="Embedding model (default EMBEDDING_MODEL)")
+    dimensions: Optional[int] = Field(
+        default=None, ge=1, le=2000, description="Vector size (default EMBEDDING_DIMENSIONS)"
+    )
+    sample_size: int = Field(default=100, ge=10, le=1000, description="Vectors sampled to validate the build")
+    top_k: int = Field(default=10, ge=1, le=100, description="k of the validation recall and agreement")
+
+
 # ============================================================
 # EMBEDDING ENDPOINTS
 # ============================================================
@@ -136,9 +353,12 @@ class IndexProductsResponse(BaseModel):
         "The caller is responsible for persisting the returned vector."
     ),
 )
-async def generate_embedding(request: GenerateEmbeddingRequest) -> GenerateEmbeddingResponse:
+async def generate_embedding(
+    request: GenerateEmbeddingRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> GenerateEmbeddingResponse:
     try:
-        vector = await semantic_search_service.generate_embedding(request.text)
+        vector = await service.generate_embedding(request.text)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     except Exception as exc:
@@ -150,7 +370,7 @@ async def generate_embedding(request: GenerateEmbeddingRequest) -> GenerateEmbed
     return GenerateEmbeddingResponse(
         embedding=vector,
         dimensions=len(vector),
-        model=settings.embedding_model,
+        model=service.embedding_model,
         text_preview=request.text[:120],
     )
 
@@ -166,13 +386,16 @@ async def generate_embedding(request: GenerateEmbeddingRequest) -> GenerateEmbed
         "Use this so NestJS does not need to handle the UPSERT itself."
     ),
 )
-async def save_product_embedding(request: SaveProductEmbeddingRequest) -> SaveProductEmbeddingResponse:
+async def save_product_embedding(
+    request: SaveProductEmbeddingRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> SaveProductEmbeddingResponse:
     try:
-        vector = await semantic_search_service.generate_embedding(request.text)
-        await semantic_search_service.upsert_product_embedding(
+        vector = await service.generate_embedding(request.text)
+        await service.upsert_product_embedding(
             product_id=request.product_id,
             text=request.text,
-            model=settings.embedding_model,
+            model=service.embedding_model,
             vector=vector,
         )
     except ValueError as exc:
@@ -186,7 +409,7 @@ async def save_product_embedding(request: SaveProductEmbeddingRequest) -> SavePr
     return SaveProductEmbeddingResponse(
         product_id=request.product_id,
         dimensions=len(vector),
-        model=settings.embedding_model,
+        model=service.embedding_model,
         text_preview=request.text[:120],
     )
 
@@ -203,16 +426,21 @@ async def save_product_embedding(request: SaveProductEmbeddingRequest) -> SavePr
     description=(
         "Encodes the query and returns the most similar published products "
         "ordered by descending cosine similarity. "
-        "Use the returned metadata fields (craft_name, style, materials, etc.) "
-        "for optional deterministic filters in the frontend."
+        "Optional price, stock, craft, category, region and store filters are "
+        "applied inside the vector query, so top_k counts matching products only."
     ),
 )
-async def search_products(request: ProductSearchRequest) -> ProductSearchResponse:
+async def search_products(
+    request: ProductSearchRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> ProductSearchResponse:
     try:
-        results = await semantic_search_service.search_products(
+        results = await service.search_products(
             query=request.query,
             top_k=request.top_k,
             min_similarity=request.min_similarity,
+            filters=_search_filters(request),
+            quality=request.quality,
         )
     except Exception as exc:
         raise HTTPException(
@@ -221,47 +449,256 @@ async def search_products(request: ProductSearchRequest) -> ProductSearchRespons
         )
 
     return ProductSearchResponse(
+        query=request.query,
+        count=len(results),
+        min_similarity_used=request.min_similarity,
+        results=[_product_result(r) for r in results],
+    )
+
+
+@router.post(
+    "/products/page",
+    response_model=ProductSearchPageResponse,
+    status_code=status.HTTP_200_OK,
+    summary="One page of a semantic product search",
+    description=(
+        "Keyset pagination over /products: the first call (no cursor) returns top_k results "
+        "and a next_cursor while more may follow. Later calls pass the cursor back and continue "
+        "after the last result returned, reusing the first page's query vector (no re-embedding). "
+        "Cursors expire after SEARCH_CURSOR_TTL_SECONDS idle or when the embedding model changes (400)."
+    ),
+)
+async def search_products_page(
+    request: ProductSearchPageRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> ProductSearchPageResponse:
+    try:
+        page = await service.search_products_page(
+            query=request.query,
+            page_size=request.top_k,
+            min_similarity=request.min_similarity,
+            filters=_search_filters(request),
+            quality=request.quality,
+            cursor=request.cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Search failed: {exc}",
+        )
+
+    return ProductSearchPageResponse(
+        query=request.query,
+        count=len(page.results),
+        min_similarity_used=request.min_similarity,
+        results=[_product_result(r) for r in page.results],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.post(
+    "/products/batch",
+    response_model=BatchProductSearchResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Several semantic product searches in one call",
+    description=(
+        "Runs up to 20 product searches (carousels, rails, saved-search digests) at once. "
+        "Queries not already cached are embedded in a single embeddings call and the vector "
+        "queries run concurrently on pooled connections. Results come back in request order "
+        "with per-search timing."
+    ),
+)
+async def search_products_batch(
+    request: BatchProductSearchRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> BatchProductSearchResponse:
+    started = time.perf_counter()
+    try:
+        items = await service.search_products_batch([
+            ProductSearchQuery(
+                query=s.query,
+                top_k=s.top_k,
+                min_similarity=s.min_similarity,
+                filters=_search_filters(s),
+                quality=s.quality,
+            )
+            for s in request.searches
+        ])
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch search failed: {exc}",
+        )
+
+    return BatchProductSearchResponse(
+        count=len(items),
+        total_ms=round((time.perf_counter() - started) * 1000, 1),
+        results=[
+            BatchProductSearchItem(
+                query=s.query,
+                count=len(item.results),
+                min_similarity_used=s.min_similarity,
+                cached=item.cached,
+                search_ms=item.search_ms,
+                results=[_product_result(r) for r in item.results],
+            )
+            for s, item in zip(request.searches, items)
+        ],
+    )
+
+
+@router.post(
+    "/stores",
+    response_model=StoreSearchResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Semantic search over stores/artisans",
+    description=(
+        "Encodes the query and returns the stores whose vector is most similar, "
+        "with their searchable product counts. A store vector is the weighted "
+        "centroid of its published products' embeddings, blended with its profile "
+        "(name + story) embedding; shop.store_embeddings is refreshed incrementally "
+        "as products and stores change."
+    ),
+)
+async def search_stores(
+    request: StoreSearchRequest,
+    service: SemanticSearchService = Depends(catalog_service),
+) -> StoreSearchResponse:
+    try:
+        results = await service.search_stores(
+            query=request.query,
+            top_k=request.top_k,
+            min_similarity=request.min_similarity,
+            region=request.region,
+        )
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Store search failed: {exc}",
+        )
+
+    return StoreSearchResponse(
         query=request.query,
         count=len(results),
         min_similarity_used=request.min_similarity,
         results=[
-            ProductSearchResult(
-                product_id=r.product_id,
-                product_name=r.product_name,
-                short_description=r.short_description,
-                history=r.history,
+            StoreSearchResult(
+                store_id=r.store_id,
+                store_name=r.store_name,
+                slug=r.slug,
                 similarity=r.similarity,
+                product_count=r.product_count,
                 craft_name=r.craft_name,
-                piece_type=r.piece_type,
-                style=r.style,
-                process_type=r.process_type,
-                materials=r.materials,
-                store_name=r.store_name,
-                store_id=r.store_id,
-                category_name=r.category_name,
-                price=r.price,
-                currency=r.currency,
-                stock=r.stock,
-                images=r.images,
+                department=r.department,
+                municipality=r.municipality,
             )
             for r in results
         ],
     )
 
 
+@router.get(
+    "/products/{product_id}/related",
+    response_model=RelatedProductsResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="Products related to a product (more like this)",
+    description=(
+        "Nearest published products to the product's stored embedding (no embedding call), "
+        "re-ranked for store and craft diversity. Served from the nightly precomputed "
+        "neighbour lists; computed live for products without one or when price_band "
+        "leaves fewer than limit. price_band=0.5 keeps prices within +/-50% of the product."
+    ),
+)
+async def related_products(
+    product_id: str,
+    limit: int = Query(default=5, ge=1, le=50),
+    price_band: Optional[float] = Query(default=None, gt=0.0, le=10.0),
+) -> RelatedProductsResponse:
+    try:
+        related = await product_recommendation_service.get_related_products(
+            product_id, limit=limit, price_band=price_band
+        )
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Related products failed: {exc}",
+        )
+
+    return RelatedProductsResponse(
+        product_id=product_id,
+        count=len(related),
+        results=[
+            RelatedProductResult(
+                product_id=r["id"],
+                product_name=r["name"],
+                short_description=r["description"] or None,
+                similarity=r["similarity"],
+                store_id=r["store_id"],
+                store_name=r["store_name"],
+                craft_name=r["craft_name"],
+                category_name=r["category_name"],
+                price=r["price"],
+                currency=r["currency"],
+                stock=r["stock"],
+                images=r["images"],
+            )
+            for r in related
+        ],
+    )
+
+
+# ============================================================
+# FACET ENDPOINTS
+# ============================================================
+
+@router.get(
+    "/facets",
+    response_model=FacetsResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="Published product counts per region, craft, category, material and price bucket",
+    description="Served from the in-memory facet snapshot (refreshed every FACET_REFRESH_SECONDS).",
+)
+async def get_facets() -> FacetsResponse:
+    return await facets(FacetsRequest())
+
+
 @router.post(
-    "/stores",
-    status_code=status.HTTP_501_NOT_IMPLEMENTED,
-    summary="Semantic search over stores/artisans (coming soon)",
+    "/facets",
+    response_model=FacetsResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="Faceted drill-down, optionally over a semantic search",
     description=(
-        "Reserved endpoint for store/artisan semantic search. "
-        "Will be implemented once shop.store_embeddings is populated."
+        "Counts products per facet value under the given filters; each facet ignores its "
+        "own filter so the other values stay selectable, and total honours all of them. "
+        "With a query, only its top semantic matches are counted."
     ),
 )
-async def search_stores() -> dict[str, Any]:
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Store semantic search is not yet implemented. Check back soon.",
+async def facets(request: FacetsRequest) -> FacetsResponse:
+    try:
+        if request.query:
+            counts = await facet_service.counts_for_query(
+                request.query, _search_filters(request), request.min_similarity
+            )
+        else:
+            counts = await facet_service.counts(_search_filters(request))
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Facets unavailable: {exc}",
+        )
+
+    return FacetsResponse(
+        query=request.query,
+        total=counts.total,
+        **{
+            facet: [FacetValueResult(**vars(v)) for v in values]
+            for facet, values in counts.facets.items()
+        },
     )
 
 
@@ -275,9 +712,10 @@ async def search_stores() -> dict[str, Any]:
     status_code=status.HTTP_202_ACCEPTED,
     summary="Trigger batch embedding indexing for products",
     description=(
-        "Reads product semantic text from the DB, generates embeddings in batches of 20, "
-        "and upserts them into shop.product_embeddings. "
-        "Runs in the background - poll /index/products/status for progress. "
+        "Streams product semantic text from the DB, generates embeddings in batches "
+        "(INDEX_BATCH_SIZE) while earlier batches are written to shop.product_embeddings, "
+        "and checkpoints progress so an interrupted job resumes where it stopped. "
+        "Runs in the background - poll /index/products/status for progress, throughput and ETA. "
         "By default skips already-indexed products (same version). "
         "Pass force_reindex=true to regenerate all."
     ),
@@ -285,15 +723,16 @@ async def search_stores() -> dict[str, Any]:
 async def index_products(
     request: IndexProductsRequest,
     background_tasks: BackgroundTasks,
+    service: SemanticSearchService = Depends(catalog_service),
 ) -> IndexProductsResponse:
-    if semantic_search_service.get_indexing_status()["running"]:
+    if service.get_indexing_status()["running"]:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="An indexing job is already running. Poll /index/products/status for progress.",
         )
 
     background_tasks.add_task(
-        semantic_search_service.index_products,
+        service.index_products,
         product_ids=request.product_ids,
         force_reindex=request.force_reindex,
     )
@@ -310,8 +749,237 @@ async def index_products(
     status_code=status.HTTP_200_OK,
     summary="Get status of the last product indexing job",
 )
-async def get_indexing_status() -> dict[str, Any]:
-    return semantic_search_service.get_indexing_status()
+async def get_indexing_status(service: SemanticSearchService = Depends(catalog_service)) -> dict[str, Any]:
+    return service.get_indexing_status()
+
+
+@router.get(
+    "/index/products/queue",
+    status_code=status.HTTP_200_OK,
+    summary="Incremental re-embedding queue status",
+    description=(
+        "Products enqueued by catalog edits (shop.product_embedding_queue): pending "
+        "depth, age of the oldest entry, edit-to-embedding lag and how many queued "
+        "products were re-embedded vs unchanged. Also the pending store vector "
+        "refreshes (shop.store_embedding_queue)."
+    ),
+)
+async def get_embedding_queue_status(service: SemanticSearchService = Depends(catalog_service)) -> dict[str, Any]:
+    try:
+        return await service.queue_status()
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Queue status unavailable: {exc}",
+        )
+
+
+@router.post(
+    "/index/related",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(main_catalog)],
+    summary="Rebuild the precomputed related-products lists",
+    description=(
+        "Recomputes shop.product_neighbors (RELATED_PRODUCTS_TOP_N per product) in the "
+        "background; the same job runs nightly at RELATED_PRODUCTS_REFRESH_HOUR (UTC)."
+    ),
+)
+async def index_related_products(background_tasks: BackgroundTasks) -> dict[str, Any]:
+    background_tasks.add_task(product_recommendation_service.precompute_neighbors)
+    return {"message": "Related products rebuild started in the background", **product_recommendation_service.refresh_status()}
+
+
+@router.get(
+    "/cache/stats",
+    status_code=status.HTTP_200_OK,
+    summary="Product search cache statistics",
+)
+async def get_cache_stats(service: SemanticSearchService = Depends(catalog_service)) -> dict[str, Any]:
+    return service.cache_stats()
+
+
+# ============================================================
+# TUNING ENDPOINTS
+# ============================================================
+
+@router.get(
+    "/tuning",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="HNSW calibration status and ef_search per search quality",
+)
+async def get_tuning_status() -> dict[str, Any]:
+    return vector_tuning_service.status()
+
+
+@router.post(
+    "/tuning/calibrate",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(main_catalog)],
+    summary="Recalibrate the search qualities of a vector index",
+    description=(
+        "Samples stored vectors as queries, computes their exact top-k (index scans off), "
+        "sweeps hnsw.ef_search over the live index and, for each build_params entry, builds "
+        "a shadow HNSW index on a copy of the vectors. The fast / balanced qualities then use "
+        "the smallest ef_search reaching VECTOR_RECALL_FAST / VECTOR_RECALL_BALANCED. "
+        "Runs in the background - poll /tuning for the report."
+    ),
+)
+async def calibrate_vector_index(
+    request: CalibrateRequest,
+    background_tasks: BackgroundTasks,
+) -> dict[str, Any]:
+    if vector_tuning_service.status()["running"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A calibration is already running. Poll /tuning for progress.",
+        )
+
+    background_tasks.add_task(
+        vector_tuning_service.calibrate,
+        request.target,
+        sample_size=request.sample_size,
+        top_k=request.top_k,
+        build_params=[(p.m, p.ef_construction) for p in request.build_params],
+    )
+    return {"message": f"Calibration of '{request.target}' started in the background"}
+
+
+# ============================================================
+# EMBEDDING VERSION ENDPOINTS
+# ============================================================
+
+def _version_conflict() -> None:
+    if embedding_version_service.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"'{embedding_version_service.running}' is already running. Poll /embeddings/versions.",
+        )
+
+
+@router.get(
+    "/embeddings/versions",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="Embedding versions per target",
+)
+async def get_embedding_versions() -> dict[str, Any]:
+    return await embedding_version_service.status()
+
+
+@router.post(
+    "/embeddings/versions/build",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(main_catalog)],
+    summary="Build a new embedding version in a shadow table",
+    description=(
+        "Copies the live rows into <table>_v<n>, re-embeds them with the given model and "
+        "dimensions (products: the live dimensions only), recreates the live indexes on it and validates it: recall@k of its HNSW "
+        "index and top-k agreement with the live version. Search keeps serving the live "
+        "version. Runs in the background - poll /embeddings/versions, then swap a ready version."
+    ),
+)
+async def build_embedding_version(
+    request: BuildEmbeddingVersionRequest,
+    background_tasks: BackgroundTasks,
+) -> dict[str, Any]:
+    _version_conflict()
+    live = embedding_version_service.live(request.target)
+    dimensions = request.dimensions or settings.embedding_dimensions
+    if request.target == "products" and live is not None and dimensions != live.dimensions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Product vectors must keep {live.dimensions} dimensions (store and taxonomy vectors are fixed-size)",
+        )
+    background_tasks.add_task(
+        embedding_version_service.build,
+        request.target,
+        model=request.model,
+        dimensions=request.dimensions,
+        sample_size=request.sample_size,
+        top_k=request.top_k,
+    )
+    return {"message": f"Embedding version build of '{request.target}' started in the background"}
+
+
+@router.post(
+    "/embeddings/versions/{target}/{version}/swap",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(main_catalog)],
+    summary="Make an embedding version live",
+    description=(
+        "Applies the edits made since the build, then renames the tables (with their indexes, "
+        "triggers and foreign keys) and updates the registry in one transaction. Works for "
+        "ready builds and for retired versions (rollback); rejected builds need force=true. "
+        "Refused while other tables' foreign keys or views reference the live table."
+    ),
+)
+async def swap_embedding_version(
+    target: Literal["products", "knowledge"],
+    version: int,
+    background_tasks: BackgroundTasks,
+    force: bool = Query(default=False, description="Also swap in a build that failed validation"),
+) -> dict[str, Any]:
+    _version_conflict()
+    background_tasks.add_task(embedding_version_service.swap, target, version, force=force)
+    return {"message": f"Swap of '{target}' to v{version} started in the background"}
+
+
+@router.post(
+    "/embeddings/versions/{target}/gc",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(main_catalog)],
+    summary="Drop old embedding versions",
+)
+async def gc_embedding_versions(
+    target: Literal["products", "knowledge"],
+    keep: Optional[int] = Query(default=None, ge=0, description="Retired versions kept (default EMBEDDING_VERSIONS_RETAINED)"),
+) -> dict[str, Any]:
+    _version_conflict()
+    try:
+        dropped = await embedding_version_service.gc(target, keep=keep)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return {"target": target, "dropped_versions": dropped}
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _search_filters(request: ProductSearchRequest | FacetsRequest) -> ProductSearchFilters:
+    return ProductSearchFilters(
+        price_min=request.price_min,
+        price_max=request.price_max,
+        in_stock=request.in_stock,
+        craft_ids=request.craft_ids,
+        category_ids=request.category_ids,
+        material_ids=request.material_ids,
+        region=request.region,
+        store_ids=request.store_ids,
+    )
+
+
+def _product_result(r) -> ProductSearchResult:
+    return ProductSearchResult(
+        product_id=r.product_id,
+        product_name=r.product_name,
+        short_description=r.short_description,
+        history=r.history,
+        similarity=r.similarity,
+        craft_name=r.craft_name,
+        piece_type=r.piece_type,
+        style=r.style,
+        process_type=r.process_type,
+        materials=r.materials,
+        store_name=r.store_name,
+        store_id=r.store_id,
+        category_name=r.category_name,
+        price=r.price,
+        currency=r.currency,
+        stock=r.stock,
+        images=r.images,
+    )
 
 
 # ============================================================
@@ -323,12 +991,13 @@ async def get_indexing_status() -> dict[str, Any]:
     status_code=status.HTTP_200_OK,
     summary="Health check for the search service",
 )
-async def health() -> dict[str, Any]:
+async def health(service: SemanticSearchService = Depends(catalog_service)) -> dict[str, Any]:
     from src.api.config import settings as cfg
 
     return {
         "status": "ok",
-        "catalog_db_configured": bool(cfg.catalog_db_url),
+        "catalog": service.catalog,
+        "catalog_db_configured": bool(get_catalog(service.catalog).dsn),
         "embedding_model": cfg.embedding_model,
         "embedding_dimensions": cfg.embedding_dimensions,
     }
@@ -1,3 +1,12 @@
+from agents.services.facet_service import FacetService, facet_service
 from agents.services.semantic_search_service import SemanticSearchService, semantic_search_service
+from agents.services.taxonomy_service import TaxonomyService, taxonomy_service
 
-__all__ = ["SemanticSearchService", "semantic_search_service"]
+__all__ = [
+    "FacetService",
+    "facet_service",
+    "SemanticSearchService",
+    "semantic_search_service",
+    "TaxonomyService",
+    "taxonomy_service",
+]
@@ -20,6 +20,7 @@ from agents.services.artisan_support.conversation_service import (
     persist_turn,
 )
 from agents.services.artisan_support.whatsapp_client import artisan_whatsapp_client
+from agents.services.whatsapp.message_dispatcher import MessageDispatcher
 from agents.services.whatsapp.transcription_service import transcription_service
 from agents.services.whatsapp.webhook_handler import IncomingMessage
 from agents.tools.vector_search import rag_service
@@ -29,6 +30,7 @@ logger = logging.getLogger(__name__)
 _KNOWLEDGE_CATEGORY = "capacitaciones"
 _GREETINGS = {"hola", "hello", "hi", "buenos dias", "buenas tardes", "buenas noches", "ayuda", "help"}
 _MAX_GREETING_LEN = 25
+_BUSY_MESSAGE = "⏳ Estoy respondiendo muchas preguntas en este momento. Por favor escríbeme de nuevo en un par de minutos 🙏"
 
 _WELCOME_MESSAGE = (
     "👋 *¡Hola! Soy el Copiloto de Capacitaciones de Telar*\n\n"
@@ -57,7 +59,7 @@ async def process_message(msg: IncomingMessage) -> None:
         # ── Step 1: Handle audio messages ────────────────────────────
         if msg.message_type == "audio":
             logger.info("Processing voice message from %s...", phone[:10])
-            await artisan_whatsapp_client.send_text_message(phone, "🎤 _Escuchando tu mensaje de voz..._")
+            await artisan_whatsapp_client.send_text_message(phone, "🎤 _Escuchando tu mensaje de voz..._", droppable=True)
 
             audio_bytes = await artisan_whatsapp_client.download_audio(msg.audio_id)
             if not audio_bytes:
@@ -169,3 +171,11 @@ def _get_conversation_history(phone: str) -> list[dict]:
         elif line.startswith("BOT: "):
             history.append({"role": "assistant", "content": line[len("BOT: "):]})
     return history
+
+
+async def _send_busy_reply(phone: str) -> None:
+    await artisan_whatsapp_client.send_text_message(phone, _BUSY_MESSAGE)
+
+
+# Webhook messages: one at a time per phone, WHATSAPP_MAX_CONCURRENCY at once
+message_dispatcher = MessageDispatcher("artisan-support", process_message, _send_busy_reply)
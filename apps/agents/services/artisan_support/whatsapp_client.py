@@ -3,21 +3,23 @@ Async WhatsApp Business API client for the Artisan Support (Copiloto) bot.
 
 Same Meta Graph API wrapper as services/whatsapp/whatsapp_client.py, but reads
 the ARTISAN_WHATSAPP_* settings so it talks to a different phone number/WABA.
+Has its own pooled HTTP client (start/stop in the app lifespan) and its own
+OutboundSender, since the rate limit is per phone number.
 """
 
 from __future__ import annotations
 
-import asyncio
 import logging
 from typing import Optional
 
 import httpx
 
+from agents.services.whatsapp.outbound_sender import OutboundSender
+from agents.services.whatsapp.whatsapp_client import pooled_http_client
 from src.api.config import settings
 
 logger = logging.getLogger(__name__)
 
-_RETRY_ATTEMPTS = 3
 _TIMEOUT_SEND = 10.0
 _TIMEOUT_DOWNLOAD = 30.0
 
@@ -30,10 +32,35 @@ class ArtisanWhatsAppClient:
         self._phone_number_id = settings.artisan_whatsapp_phone_number_id
         self._api_url = settings.artisan_whatsapp_api_url
         self._messages_url = f"{self._api_url}/{self._phone_number_id}/messages"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sender = OutboundSender("artisan-support", self._post_message)
 
         if not self._access_token or not self._phone_number_id:
             logger.warning("Artisan WhatsApp credentials not fully configured — messages will not be sent")
 
+    # ------------------------------------------------------------------
+    # Lifecycle (pooled HTTP client)
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Open the connection pool (app startup)."""
+        if self._client is None or self._client.is_closed:
+            self._client = pooled_http_client()
+
+    async def stop(self) -> None:
+        """Flush queued messages, then close the connection pool (app shutdown)."""
+        await self._sender.stop()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        # Also opened on first use, for scripts that skip the app lifespan
+        if self._client is None or self._client.is_closed:
+            self._client = pooled_http_client()
+        return self._client
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
@@ -43,6 +70,7 @@ class ArtisanWhatsAppClient:
         phone: str,
         text: str,
         message_id: Optional[str] = None,
+        droppable: bool = False,
     ) -> Optional[str]:
         """
         Send a text message to a phone number.
@@ -51,6 +79,8 @@ class ArtisanWhatsAppClient:
             phone: Recipient in E.164 format (e.g. +573001234567).
             text:  Message body (max 4096 chars — truncated if longer).
             message_id: Optional ID of the message to reply to.
+            droppable: A transient notice the outbound queue may drop under
+                pressure (sent after replies, skipped when stale).
 
         Returns:
             WhatsApp message ID on success, None on failure.
@@ -70,23 +100,30 @@ class ArtisanWhatsAppClient:
             payload["context"] = {"message_id": message_id}
 
         logger.info("Sending text message to %s...", phone[:10])
-        response = await self._post(self._messages_url, payload)
+        response = await self._sender.send(phone, payload, droppable=droppable)
 
         if response and "messages" in response:
             wa_id = response["messages"][0]["id"]
             logger.info("Message sent — WhatsApp ID: %s", wa_id)
             return wa_id
 
+        if droppable:
+            logger.info("Notice to %s... dropped by the outbound queue or not sent", phone[:10])
+            return None
         logger.error("Failed to send text message to %s...", phone[:10])
         return None
 
     async def send_processing_indicator(self, phone: str) -> None:
         """Send a brief 'processing' message (best-effort, errors are non-fatal)."""
         try:
-            await self.send_text_message(phone, "⏳ _Buscando en el material de las capacitaciones..._")
+            await self.send_text_message(phone, "⏳ _Buscando en el material de las capacitaciones..._", droppable=True)
         except Exception as exc:
             logger.debug("Processing indicator failed (non-critical): %s", exc)
 
+    def outbound_stats(self) -> dict:
+        """Outbound queue metrics (rate limit, backlog, drops, backoff)."""
+        return self._sender.stats()
+
     async def download_audio(self, audio_id: str) -> Optional[bytes]:
         """
         Download an audio file from WhatsApp (2-step process).
@@ -104,8 +141,7 @@ class ArtisanWhatsAppClient:
         headers = {"Authorization": f"Bearer {self._access_token}"}
 
         try:
-            async with httpx.AsyncClient(timeout=_TIMEOUT_SEND) as client:
-                resp = await client.get(media_url, headers=headers)
+            resp = await self._http.get(media_url, headers=headers)
 
             if resp.status_code != 200:
                 logger.error("Failed to get media URL: %d — %s", resp.status_code, resp.text[:200])
@@ -122,8 +158,7 @@ class ArtisanWhatsAppClient:
 
         # Step 2: download audio bytes
         try:
-            async with httpx.AsyncClient(timeout=_TIMEOUT_DOWNLOAD) as client:
-                resp = await client.get(download_url, headers=headers)
+            resp = await self._http.get(download_url, headers=headers, timeout=_TIMEOUT_DOWNLOAD)
 
             if resp.status_code == 200:
                 audio_bytes = resp.content
@@ -138,51 +173,16 @@ class ArtisanWhatsAppClient:
             return None
 
     # ------------------------------------------------------------------
-    # Internal HTTP with retry
+    # Internal HTTP
     # ------------------------------------------------------------------
 
-    async def _post(self, url: str, data: dict) -> Optional[dict]:
-        """POST with up to _RETRY_ATTEMPTS attempts and exponential backoff."""
+    async def _post_message(self, data: dict) -> httpx.Response:
+        """One POST to the messages endpoint; the outbound sender paces, retries and backs off."""
         headers = {
             "Authorization": f"Bearer {self._access_token}",
             "Content-Type": "application/json",
         }
-
-        for attempt in range(_RETRY_ATTEMPTS):
-            try:
-                async with httpx.AsyncClient(timeout=_TIMEOUT_SEND) as client:
-                    resp = await client.post(url, headers=headers, json=data)
-
-                if resp.status_code == 429:
-                    retry_after = int(resp.headers.get("Retry-After", 60))
-                    logger.warning("Rate limited — retrying after %ds", retry_after)
-                    await asyncio.sleep(retry_after)
-                    continue
-
-                if resp.status_code in (200, 201):
-                    return resp.json()
-
-                error_msg = resp.json().get("error", {}).get("message", resp.text) if resp.content else "empty response"
-                logger.error("API error %d: %s", resp.status_code, error_msg)
-
-                # Don't retry on 4xx (except 429 handled above)
-                if 400 <= resp.status_code < 500:
-                    return None
-
-                # Retry on 5xx
-                if attempt < _RETRY_ATTEMPTS - 1:
-                    wait = 2 ** attempt
-                    logger.info("Retrying in %ds (attempt %d/%d)...", wait, attempt + 1, _RETRY_ATTEMPTS)
-                    await asyncio.sleep(wait)
-
-            except httpx.RequestError as exc:
-                logger.error("HTTP request error: %s", exc)
-                if attempt < _RETRY_ATTEMPTS - 1:
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    return None
-
-        return None
+        return await self._http.post(self._messages_url, headers=headers, json=data)
 
 
 # Module-level singleton
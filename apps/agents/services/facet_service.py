@@ -0,0 +1,397 @@
+"""
+Facet Service.
+
+In-process facet counts over the searchable products
+(shop.product_search_cards) for the marketplace filters and the WhatsApp bot:
+region (store department), craft, category, material and price bucket.
+
+Responsibilities:
+  - Load one compact row of facet keys per searchable product in a single
+    query
+  - Count products per facet value in memory, restricted to filters and/or a
+    candidate product set (drill-down on semantic search results). Each facet
+    is counted with every filter except its own, so selecting one craft still
+    shows how many products the other crafts have
+  - Stay fresh: every FACET_REFRESH_SECONDS a one-row fingerprint of the
+    search cards (count, last refresh) decides whether to reload; a full
+    reload also runs after _MAX_SNAPSHOT_AGE_SECONDS to pick up store region
+    edits, which do not touch the cards
+
+Database backend: CATALOG_DB_URL pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from agents.services.semantic_search_service import (
+    ProductSearchFilters,
+    _fold_region,
+    semantic_search_service,
+)
+from src.api.config import settings
+from src.database.pg_client import get_pool
+from src.utils.enhanced_logger import create_enhanced_logger
+
+logger = create_enhanced_logger(__name__)
+
+FACETS = ("regions", "crafts", "categories", "materials", "prices")
+
+# Reload even when the cards look unchanged (store_contacts edits)
+_MAX_SNAPSHOT_AGE_SECONDS = 900
+
+# Candidates taken from a semantic search before counting its facets
+_DRILL_DOWN_TOP_K = 200
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+_FACET_ROWS_SQL = """
+SELECT
+    c.product_id::text                  AS product_id,
+    c.store_id::text                    AS store_id,
+    NULLIF(TRIM(sct.department), '')    AS department,
+    NULLIF(TRIM(sct.municipality), '')  AS municipality,
+    c.primary_craft_id::text            AS craft_id,
+    c.craft_name,
+    c.category_id::text                 AS category_id,
+    c.category_name,
+    cat.parent_id::text                 AS parent_category_id,
+    parent.name                         AS parent_category_name,
+    c.price,
+    c.stock,
+    COALESCE(mat.ids, '{}')             AS material_ids,
+    COALESCE(mat.names, '{}')           AS material_names
+FROM shop.product_search_cards c
+LEFT JOIN shop.store_contacts sct ON sct.store_id = c.store_id
+LEFT JOIN taxonomy.categories cat ON cat.id = c.category_id
+LEFT JOIN taxonomy.categories parent ON parent.id = cat.parent_id
+LEFT JOIN LATERAL (
+    SELECT ARRAY_AGG(tm.id::text ORDER BY tm.name) AS ids,
+           ARRAY_AGG(tm.name ORDER BY tm.name)     AS names
+    FROM shop.product_materials_link pml
+    JOIN taxonomy.materials tm ON tm.id = pml.material_id
+    WHERE pml.product_id = c.product_id
+) mat ON true
+"""
+
+_FINGERPRINT_SQL = """
+SELECT count(*) AS cards, max(refreshed_at) AS refreshed_at
+FROM shop.product_search_cards
+"""
+
+
+def _price_buckets() -> list[tuple[str, int, int | None]]:
+    """(key, min, max exclusive) from the FACET_PRICE_BUCKETS edges."""
+    edges = sorted({int(e) for e in settings.facet_price_buckets.split(",") if e.strip()})
+    bounds = [0, *edges]
+    buckets = [(f"{lo}-{hi}", lo, hi) for lo, hi in zip(bounds, edges)]
+    buckets.append((f"{bounds[-1]}+", bounds[-1], None))
+    return buckets
+
+
+# ---------------------------------------------------------------------------
+# Data classes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FacetValue:
+    key: str
+    label: str
+    count: int
+    parent_id: str | None = None        # categories: parent category id
+    price_min: int | None = None        # prices: inclusive bounds in minor units
+    price_max: int | None = None
+
+
+@dataclass
+class FacetCounts:
+    total: int
+    facets: dict[str, list[FacetValue]]
+
+    def labels(self, facet: str) -> list[str]:
+        return [v.label for v in self.facets[facet]]
+
+
+@dataclass
+class _FacetRow:
+    product_id: str
+    store_id: str | None
+    department: str | None
+    regions: frozenset[str]             # folded department and municipality
+    craft_id: str | None
+    craft_name: str | None
+    category_id: str | None
+    category_name: str | None
+    parent_category_id: str | None
+    parent_category_name: str | None
+    price: int | None
+    stock: int
+    material_ids: tuple[str, ...]
+    material_names: tuple[str, ...]
+
+    @classmethod
+    def from_record(cls, r: Any) -> "_FacetRow":
+        return cls(
+            product_id=r["product_id"],
+            store_id=r["store_id"],
+            department=r["department"],
+            regions=frozenset(_fold_region(v) for v in (r["department"], r["municipality"]) if v),
+            craft_id=r["craft_id"],
+            craft_name=r["craft_name"],
+            category_id=r["category_id"],
+            category_name=r["category_name"],
+            parent_category_id=r["parent_category_id"],
+            parent_category_name=r["parent_category_name"],
+            price=int(r["price"]) if r["price"] is not None else None,
+            stock=int(r["stock"]),
+            material_ids=tuple(r["material_ids"]),
+            material_names=tuple(r["material_names"]),
+        )
+
+
+@dataclass
+class FacetSnapshot:
+    """Facet keys of every searchable product at load time."""
+
+    loaded_at: float
+    fingerprint: tuple
+    rows: list[_FacetRow]
+    buckets: list[tuple[str, int, int | None]] = field(default_factory=_price_buckets)
+
+    def counts(
+        self,
+        filters: ProductSearchFilters | None = None,
+        product_ids: Iterable[str] | None = None,
+    ) -> FacetCounts:
+        """
+        Products per facet value among rows matching filters (and within
+        product_ids when given). A facet ignores its own filter; total
+        honours all of them.
+        """
+        filters = filters or ProductSearchFilters()
+        ids = set(product_ids) if product_ids is not None else None
+        tests = self._tests(filters)
+
+        counters: dict[str, Counter] = {f: Counter() for f in FACETS}
+        labels: dict[str, dict[str, FacetValue]] = {f: {} for f in FACETS}
+        total = 0
+        for row in self.rows:
+            if ids is not None and row.product_id not in ids:
+                continue
+            if filters.store_ids and row.store_id not in filters.store_ids:
+                continue
+            if filters.in_stock and row.stock <= 0:
+                continue
+            misses = [f for f, test in tests if not test(row)]
+            if len(misses) > 1:
+                continue
+            if not misses:
+                total += 1
+            for facet in FACETS:
+                if misses and misses != [facet]:
+                    continue
+                for value in self._values(facet, row):
+                    counters[facet][value.key] += 1
+                    labels[facet].setdefault(value.key, value)
+
+        facets = {}
+        for facet in FACETS:
+            values = [
+                FacetValue(**{**vars(labels[facet][key]), "count": count})
+                for key, count in counters[facet].items()
+            ]
+            if facet == "prices":
+                order = {key: i for i, (key, _, _) in enumerate(self.buckets)}
+                values.sort(key=lambda v: order[v.key])
+            else:
+                values.sort(key=lambda v: (-v.count, v.label))
+            facets[facet] = values
+        return FacetCounts(total=total, facets=facets)
+
+    @staticmethod
+    def _tests(filters: ProductSearchFilters) -> list[tuple[str, Any]]:
+        tests = []
+        if filters.region:
+            region = _fold_region(filters.region)
+            tests.append(("regions", lambda r: region in r.regions))
+        if filters.craft_ids:
+            crafts = set(filters.craft_ids)
+            tests.append(("crafts", lambda r: r.craft_id in crafts))
+        if filters.category_ids:
+            categories = set(filters.category_ids)
+            tests.append((
+                "categories",
+                lambda r: r.category_id in categories or r.parent_category_id in categories,
+            ))
+        if filters.material_ids:
+            materials = set(filters.material_ids)
+            tests.append(("materials", lambda r: not materials.isdisjoint(r.material_ids)))
+        if filters.price_min is not None or filters.price_max is not None:
+            lo, hi = filters.price_min, filters.price_max
+            tests.append((
+                "prices",
+                lambda r: r.price is not None
+                and (lo is None or r.price >= lo)
+                and (hi is None or r.price <= hi),
+            ))
+        return tests
+
+    def _values(self, facet: str, row: _FacetRow) -> list[FacetValue]:
+        if facet == "regions":
+            if not row.department:
+                return []
+            return [FacetValue(_fold_region(row.department), row.department, 0)]
+        if facet == "crafts":
+            return [FacetValue(row.craft_id, row.craft_name, 0)] if row.craft_id and row.craft_name else []
+        if facet == "categories":
+            values = []
+            if row.category_id and row.category_name:
+                values.append(FacetValue(row.category_id, row.category_name, 0, parent_id=row.parent_category_id))
+            if row.parent_category_id and row.parent_category_name:
+                values.append(FacetValue(row.parent_category_id, row.parent_category_name, 0))
+            return values
+        if facet == "materials":
+            return [FacetValue(i, n, 0) for i, n in zip(row.material_ids, row.material_names)]
+        if row.price is None:
+            return []
+        for key, lo, hi in self.buckets:
+            if hi is None or row.price < hi:
+                return [FacetValue(key, key, 0, price_min=lo, price_max=hi - 1 if hi is not None else None)]
+        return []
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+class FacetService:
+    """Keeps a FacetSnapshot loaded and fresh."""
+
+    def __init__(self) -> None:
+        self._snapshot: FacetSnapshot | None = None
+        self._load_lock = asyncio.Lock()
+        self._poll_task: asyncio.Task | None = None
+        self._reloads = 0
+        self._checks = 0
+
+    # ------------------------------------------------------------------
+    # Public: lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Load the facet rows and start the refresh loop (app startup)."""
+        if self._poll_task is None or self._poll_task.done():
+            # Started first so a failed initial load is retried on the next tick
+            self._poll_task = asyncio.create_task(self._poll())
+        await self.refresh()
+
+    async def stop(self) -> None:
+        if self._poll_task is not None and not self._poll_task.done():
+            self._poll_task.cancel()
+
+    # ------------------------------------------------------------------
+    # Public: access
+    # ------------------------------------------------------------------
+
+    async def get_snapshot(self) -> FacetSnapshot:
+        """Return the current snapshot; only the very first call waits on the database."""
+        if self._snapshot is None:
+            async with self._load_lock:
+                if self._snapshot is None:
+                    await self._reload_locked()
+        return self._snapshot
+
+    async def refresh(self) -> FacetSnapshot:
+        """Reload now."""
+        async with self._load_lock:
+            await self._reload_locked()
+        return self._snapshot
+
+    async def counts(self, filters: ProductSearchFilters | None = None) -> FacetCounts:
+        snapshot = await self.get_snapshot()
+        return snapshot.counts(filters)
+
+    async def counts_for_query(
+        self,
+        query: str,
+        filters: ProductSearchFilters | None = None,
+        min_similarity: float = 0.45,
+    ) -> FacetCounts:
+        """
+        Facet counts over the top semantic matches of query. The search only
+        applies the non-facet filters (stores, stock), so each facet can still
+        be counted without its own selection.
+        """
+        filters = filters or ProductSearchFilters()
+        results = await semantic_search_service.search_products(
+            query=query,
+            top_k=_DRILL_DOWN_TOP_K,
+            min_similarity=min_similarity,
+            filters=ProductSearchFilters(store_ids=filters.store_ids, in_stock=filters.in_stock),
+        )
+        snapshot = await self.get_snapshot()
+        return snapshot.counts(filters, product_ids=[r.product_id for r in results])
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "products": len(snapshot.rows) if snapshot else 0,
+            "reloads": self._reloads,
+            "checks": self._checks,
+            "refresh_seconds": settings.facet_refresh_seconds,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    async def _load(self) -> FacetSnapshot:
+        pool = await get_pool()
+        start = time.perf_counter()
+        async with pool.acquire() as conn:
+            fingerprint = await conn.fetchrow(_FINGERPRINT_SQL)
+            rows = await conn.fetch(_FACET_ROWS_SQL)
+        snapshot = FacetSnapshot(
+            loaded_at=time.monotonic(),
+            fingerprint=tuple(fingerprint),
+            rows=[_FacetRow.from_record(r) for r in rows],
+        )
+        logger.info(f"Facets loaded in {(time.perf_counter() - start) * 1000:.0f}ms: {len(rows)} products")
+        return snapshot
+
+    async def _reload_locked(self) -> None:
+        self._snapshot = await self._load()
+        self._reloads += 1
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(settings.facet_refresh_seconds)
+            try:
+                await self._refresh_if_changed()
+            except Exception as exc:
+                # Keep serving the previous snapshot; the next tick retries
+                logger.warning(f"Facet refresh failed: {exc}")
+
+    async def _refresh_if_changed(self) -> None:
+        self._checks += 1
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < _MAX_SNAPSHOT_AGE_SECONDS:
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                fingerprint = await conn.fetchrow(_FINGERPRINT_SQL)
+            if tuple(fingerprint) == snapshot.fingerprint:
+                return
+        await self.refresh()
+
+
+# ---------------------------------------------------------------------------
+# Module-level singleton
+# ---------------------------------------------------------------------------
+facet_service = FacetService()
@@ -4,22 +4,39 @@ Semantic Search Service.
 Responsibilities:
   - Generate embeddings from plain text (delegates to EmbeddingService)
   - Persist embeddings to shop.product_embeddings / shop.store_embeddings
-  - Execute cosine-similarity searches against those tables
+    (store vectors are centroids of their products' embeddings)
+  - Execute cosine-similarity searches against those tables (ANN top-k on the
+    HNSW index, then a search-card lookup of only the matching products)
   - Batch-index all products (or a subset) from shop.products_core
 
-Database backend: asyncpg pool pointing at CATALOG_DB_URL (Lightsail PostgreSQL).
+Database backend: one asyncpg pool per registered catalog (CATALOG_DB_URL
+plus the entries of SEARCH_CATALOGS); get_search_service(name) returns the
+service of a catalog. Only the main catalog runs the re-embedding worker.
 """
 
 from __future__ import annotations
 
 import asyncio
+import base64
+import hashlib
 import json
+import math
+import secrets
 import time
-from dataclasses import dataclass, field
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from typing import Any
 
-from src.database.pg_client import get_pool
-from src.services.embedding_service import embedding_service
+import asyncpg
+
+from agents.core.embedding_cache import EmbeddingCache
+from agents.services.vector_replica_service import VectorReplica
+from src.api.config import settings
+from src.database.pg_client import DEFAULT_CATALOG, get_catalog, get_pool
+from src.services.embedding_service import EmbeddingService, embedding_service
+from src.services.embedding_version_service import embedding_version_service
+from src.services.vector_tuning_service import SearchQuality, vector_tuning_service
 from src.utils.enhanced_logger import create_enhanced_logger
 
 logger = create_enhanced_logger(__name__)
@@ -82,79 +99,619 @@ _PRODUCT_SEMANTIC_TEXT_BY_ID_SQL = _PRODUCT_SEMANTIC_TEXT_SQL + "  AND pc.id = $
 _PRODUCT_SEMANTIC_TEXT_BULK_SQL = _PRODUCT_SEMANTIC_TEXT_SQL + "  AND pc.id = ANY($1::uuid[])"
 
 # ---------------------------------------------------------------------------
-# SQL: vector search
+# SQL: streaming indexer
+#
+# Candidates are read through a server-side cursor in product_id order, so
+# the checkpoint (last written product_id) is a keyset position. Each batch
+# is COPYed into a session temp table and upserted from there, in the same
+# transaction that advances the job checkpoint.
+# ---------------------------------------------------------------------------
+
+_INDEX_STAGE_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS _product_embeddings_stage (
+    product_id    UUID,
+    embedding     REAL[],
+    model         TEXT,
+    semantic_text TEXT,
+    content_hash  TEXT,
+    version       INTEGER
+) ON COMMIT DELETE ROWS
+"""
+
+_INDEX_UPSERT_SQL = """
+INSERT INTO shop.product_embeddings
+    (product_id, embedding, model, semantic_text, content_hash, version, generated_at)
+SELECT product_id, embedding::vector, model, semantic_text, content_hash, version, now()
+FROM _product_embeddings_stage
+ON CONFLICT (product_id) DO UPDATE SET
+    embedding     = EXCLUDED.embedding,
+    model         = EXCLUDED.model,
+    semantic_text = EXCLUDED.semantic_text,
+    content_hash  = EXCLUDED.content_hash,
+    version       = EXCLUDED.version,
+    generated_at  = now()
+"""
+
+# Latest unfinished job with the same parameters (its process died)
+_INDEX_JOB_RESUME_SQL = """
+SELECT id, last_product_id, indexed, failed
+FROM shop.product_indexing_jobs
+WHERE status = 'running'
+  AND force_reindex = $1
+  AND embedding_version = $2
+  AND product_ids IS NOT DISTINCT FROM $3::uuid[]
+ORDER BY started_at DESC
+LIMIT 1
+"""
+
+_INDEX_JOB_SUPERSEDE_SQL = """
+UPDATE shop.product_indexing_jobs
+SET status = 'superseded', finished_at = now()
+WHERE status = 'running' AND id IS DISTINCT FROM $1
+"""
+
+_INDEX_JOB_CREATE_SQL = """
+INSERT INTO shop.product_indexing_jobs (force_reindex, embedding_version, product_ids)
+VALUES ($1, $2, $3::uuid[])
+RETURNING id
+"""
+
+_INDEX_JOB_CHECKPOINT_SQL = """
+UPDATE shop.product_indexing_jobs
+SET last_product_id = $2, indexed = indexed + $3, failed = failed + $4, updated_at = now()
+WHERE id = $1
+"""
+
+_INDEX_JOB_FINISH_SQL = """
+UPDATE shop.product_indexing_jobs
+SET status = $2, total = $3, error = $4, updated_at = now(), finished_at = now()
+WHERE id = $1
+"""
+
+
+# ---------------------------------------------------------------------------
+# SQL: change queue (migration AddProductEmbeddingChangeQueue)
+#
+# Triggers enqueue products whose semantic-text sources changed and NOTIFY
+# _QUEUE_CHANNEL. The worker claims a batch in one short statement (stamps
+# claimed_at and counts the attempt; migration AddProductEmbeddingQueueClaims),
+# re-embeds only the products whose rebuilt text no longer matches
+# content_hash with no transaction open, then writes the vectors and deletes
+# the rows whose enqueued_at is still the claimed one. An edit landing during
+# the embed never waits on a lock: it bumps enqueued_at, so the product stays
+# queued and is claimed again once the claim is released.
 # ---------------------------------------------------------------------------
-_PRODUCT_SEARCH_SQL = """
+
+_QUEUE_CHANNEL = "product_embedding_queue"
+_QUEUE_DEBOUNCE_SECONDS = 1.0    # coalesce bursts of edits into one batch
+_QUEUE_MAX_ATTEMPTS = 5          # left in the queue (with last_error) after this
+_QUEUE_CLAIM_SECONDS = 300       # a claim older than this (crashed worker) is taken over
+
+_QUEUE_CLAIM_SQL = """
+WITH claimable AS (
+    SELECT product_id
+    FROM shop.product_embedding_queue
+    WHERE attempts < $2
+      AND (claimed_at IS NULL OR claimed_at < now() - make_interval(secs => $3))
+    ORDER BY enqueued_at
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE shop.product_embedding_queue q
+SET claimed_at = now(), attempts = q.attempts + 1
+FROM claimable c
+WHERE q.product_id = c.product_id
+RETURNING q.product_id, q.enqueued_at
+"""
+
+# Only rows not re-enqueued since the claim; the rest are released for the next batch
+_QUEUE_DONE_SQL = """
+DELETE FROM shop.product_embedding_queue q
+USING unnest($1::uuid[], $2::timestamptz[]) AS c(product_id, enqueued_at)
+WHERE q.product_id = c.product_id AND q.enqueued_at = c.enqueued_at
+"""
+
+_QUEUE_RELEASE_SQL = """
+UPDATE shop.product_embedding_queue
+SET claimed_at = NULL
+WHERE product_id = ANY($1::uuid[])
+"""
+
+_QUEUE_FAILED_SQL = """
+UPDATE shop.product_embedding_queue
+SET claimed_at = NULL, last_error = $2
+WHERE product_id = ANY($1::uuid[])
+"""
+
+_QUEUE_DEPTH_SQL = """
+SELECT COUNT(*) FILTER (WHERE attempts < $1)                      AS pending,
+       COUNT(*) FILTER (WHERE attempts >= $1)                     AS failed,
+       EXTRACT(EPOCH FROM now() - MIN(enqueued_at) FILTER (WHERE attempts < $1)) AS oldest_seconds
+FROM shop.product_embedding_queue
+"""
+
+
+# ---------------------------------------------------------------------------
+# SQL: store embeddings (migration AddStoreEmbeddingCentroids)
+#
+# A store vector is the weighted centroid of the embeddings of its searchable
+# products (out-of-stock products weigh _STORE_OUT_OF_STOCK_WEIGHT), computed
+# in SQL from vectors already stored, blended with the embedding of the store
+# profile when STORE_PROFILE_WEIGHT > 0. Triggers on the search cards,
+# product embeddings and shop.stores enqueue the affected stores in
+# shop.store_embedding_queue, drained after the product queue with the same
+# claim / embed / conditional delete steps as the product queue (migration
+# AddStoreEmbeddingQueueClaims).
+# ---------------------------------------------------------------------------
+
+_STORE_QUEUE_CHANNEL = "store_embedding_queue"
+_STORE_OUT_OF_STOCK_WEIGHT = 0.5
+
+_STORE_QUEUE_CLAIM_SQL = """
+WITH claimable AS (
+    SELECT store_id
+    FROM shop.store_embedding_queue
+    WHERE attempts < $2
+      AND (claimed_at IS NULL OR claimed_at < now() - make_interval(secs => $3))
+    ORDER BY enqueued_at
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE shop.store_embedding_queue q
+SET claimed_at = now(), attempts = q.attempts + 1
+FROM claimable c
+WHERE q.store_id = c.store_id
+RETURNING q.store_id, q.enqueued_at
+"""
+
+_STORE_QUEUE_DONE_SQL = """
+DELETE FROM shop.store_embedding_queue q
+USING unnest($1::uuid[], $2::timestamptz[]) AS c(store_id, enqueued_at)
+WHERE q.store_id = c.store_id AND q.enqueued_at = c.enqueued_at
+"""
+
+_STORE_QUEUE_RELEASE_SQL = """
+UPDATE shop.store_embedding_queue
+SET claimed_at = NULL
+WHERE store_id = ANY($1::uuid[])
+"""
+
+_STORE_QUEUE_FAILED_SQL = """
+UPDATE shop.store_embedding_queue
+SET claimed_at = NULL, last_error = $2
+WHERE store_id = ANY($1::uuid[])
+"""
+
+_STORE_QUEUE_DEPTH_SQL = """
+SELECT COUNT(*) FILTER (WHERE attempts < $1)  AS pending,
+       COUNT(*) FILTER (WHERE attempts >= $1) AS failed
+FROM shop.store_embedding_queue
+"""
+
+# $1 store ids, $2 weight of out-of-stock products. One row per live store;
+# centroid is NULL for a store without embedded searchable products.
+_STORE_CENTROID_SQL = """
+WITH products AS (
+    SELECT c.store_id,
+           c.craft_name,
+           pe.embedding::real[] AS v,
+           CASE WHEN c.stock > 0 THEN 1.0 ELSE $2::float8 END AS w
+    FROM shop.product_search_cards c
+    JOIN shop.product_embeddings pe ON pe.product_id = c.product_id
+    WHERE c.store_id = ANY($1::uuid[])
+),
+centroids AS (
+    SELECT store_id, ARRAY_AGG(x ORDER BY i) AS centroid
+    FROM (
+        SELECT p.store_id, d.i, SUM(p.w * d.x) / SUM(p.w) AS x
+        FROM products p, UNNEST(p.v) WITH ORDINALITY AS d(x, i)
+        GROUP BY p.store_id, d.i
+    ) dims
+    GROUP BY store_id
+)
 SELECT
-    pc.id                                                    AS product_id,
-    pc.name                                                  AS product_name,
-    pc.short_description,
-    pc.history,
-    pe.semantic_text,
-    pe.model,
-    pe.generated_at,
-    1 - (pe.embedding <=> $1::vector)                        AS similarity,
-    tc.name                                                  AS craft_name,
-    pai.piece_type::TEXT                                     AS piece_type,
-    pai.style::TEXT                                          AS style,
-    pai.process_type::TEXT                                   AS process_type,
-    COALESCE(mat.materials_list, '')                         AS materials,
-    sc.name                                                  AS store_name,
-    sc.id                                                    AS store_id,
-    cat.name                                                 AS category_name,
-    pv.min_price                                             AS price,
-    pv.currency,
-    COALESCE(pv.total_stock, 0)                              AS stock,
-    COALESCE(media.images, '[]'::jsonb)                      AS images
+    s.id                                           AS store_id,
+    CONCAT_WS(' | ', s.name, NULLIF(s.story, '')) AS profile_text,
+    se.content_hash,
+    se.profile_embedding,
+    ce.centroid,
+    (SELECT COUNT(*) FROM products p WHERE p.store_id = s.id) AS product_count,
+    (SELECT p.craft_name FROM products p
+     WHERE p.store_id = s.id AND p.craft_name IS NOT NULL
+     GROUP BY p.craft_name
+     ORDER BY COUNT(*) DESC, p.craft_name
+     LIMIT 1)                                      AS craft_name
+FROM shop.stores s
+LEFT JOIN centroids ce ON ce.store_id = s.id
+LEFT JOIN shop.store_embeddings se ON se.store_id = s.id
+WHERE s.id = ANY($1::uuid[])
+  AND s.deleted_at IS NULL
+"""
+
+_STORE_EMBEDDING_UPSERT_SQL = """
+INSERT INTO shop.store_embeddings
+    (store_id, embedding, model, semantic_text, version, generated_at,
+     product_count, craft_name, profile_embedding, content_hash)
+VALUES ($1, $2::vector, $3, $4, $5, now(), $6, $7, $8::vector, $9)
+ON CONFLICT (store_id) DO UPDATE SET
+    embedding         = EXCLUDED.embedding,
+    model             = EXCLUDED.model,
+    semantic_text     = EXCLUDED.semantic_text,
+    version           = EXCLUDED.version,
+    generated_at      = now(),
+    product_count     = EXCLUDED.product_count,
+    craft_name        = EXCLUDED.craft_name,
+    profile_embedding = EXCLUDED.profile_embedding,
+    content_hash      = EXCLUDED.content_hash
+"""
+
+_STORE_EMBEDDING_DELETE_SQL = "DELETE FROM shop.store_embeddings WHERE store_id = ANY($1::uuid[])"
+
+
+def _unit(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def _store_vector(
+    centroid: list[float],
+    profile: list[float] | None,
+    profile_weight: float,
+) -> list[float]:
+    """Product centroid blended with the profile embedding (both unit length)."""
+    centroid = _unit(centroid)
+    if profile is None or profile_weight <= 0:
+        return centroid
+    weight = min(profile_weight, 1.0)
+    return [(1 - weight) * c + weight * p for c, p in zip(centroid, _unit(profile))]
+
+
+def _content_hash(text: str) -> str:
+    """Same value as md5(text) in Postgres (product_embeddings.content_hash)."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def _embedding_text(row: Any) -> str:
+    return row["full_semantic_text"] or row["product_name"]
+
+
+def _indexing_candidates_query(
+    product_ids: list[str] | None,
+    force_reindex: bool,
+    version: int,
+    after: Any = None,
+) -> tuple[str, list[Any]]:
+    """
+    Products to (re-)embed after the checkpoint, in product_id order. Unless
+    forced, a product is skipped when its stored embedding has the current
+    version and the hash of the text it would be embedded from now.
+    """
+    inner = _PRODUCT_SEMANTIC_TEXT_SQL
+    args: list[Any] = []
+    if product_ids:
+        args.append(product_ids)
+        inner += f"  AND pc.id = ANY(${len(args)}::uuid[])\n"
+    if after is not None:
+        args.append(after)
+        inner += f"  AND pc.id > ${len(args)}\n"
+    sql = f"SELECT t.* FROM ({inner}) t\n"
+    if not force_reindex:
+        args.append(version)
+        sql += (
+            "WHERE NOT EXISTS (SELECT 1 FROM shop.product_embeddings pe "
+            f"WHERE pe.product_id = t.product_id AND pe.version = ${len(args)} "
+            "AND pe.content_hash = md5(COALESCE(NULLIF(t.full_semantic_text, ''), t.product_name)))\n"
+        )
+    return sql + "ORDER BY t.product_id\n", args
+
+# ---------------------------------------------------------------------------
+# SQL: vector search (two phases)
+#
+# Phase 1 is ORDER BY distance LIMIT over product_embeddings, the shape
+# pgvector answers from the HNSW index, with the publication status and the
+# structured filters (ProductSearchFilters) in the same query. With pgvector
+# >= 0.8 iterative index scans keep walking the graph until LIMIT rows pass
+# the filters, so the top-k is exact after filtering; selective filters
+# (one store, a rare craft) are planned as an exact scan of the matching
+# products instead. The similarity threshold is applied afterwards on the
+# results (a threshold in WHERE forces an exact scan of every embedding).
+#
+# Both phases read shop.product_search_cards, one row per searchable product
+# with the variant, media and material aggregates precomputed and kept
+# current by triggers (migration CreateProductSearchCards). Phase 1 joins it
+# for the publication status and filters; phase 2 enriches only the
+# surviving product ids by primary key.
+# ---------------------------------------------------------------------------
+
+# Transaction-local: HNSW returns at most ef_search rows per scan.
+_ANN_SESSION_SQL = "SELECT set_config('hnsw.ef_search', $1, true)"
+
+# relaxed_order: results may be slightly out of distance order (re-sorted in
+# Python) in exchange for better recall than strict_order.
+_ANN_ITERATIVE_SESSION_SQL = (
+    "SELECT set_config('hnsw.ef_search', $1, true),"
+    " set_config('hnsw.iterative_scan', 'relaxed_order', true)"
+)
+
+# quality="exact": no index, a sequential scan ranks every matching row.
+# ef_search is still set so the statement takes the same parameter.
+_EXACT_SESSION_SQL = (
+    "SELECT set_config('hnsw.ef_search', $1, true),"
+    " set_config('enable_indexscan', 'off', true)"
+)
+
+_PGVECTOR_VERSION_SQL = "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+
+# Accent/case folding for region names without the unaccent extension
+_REGION_FOLD = "translate(lower({column}), 'áéíóúüñ', 'aeiouun')"
+
+# $1 candidate product ids. Cards exist only for searchable products.
+_PRODUCT_ENRICH_SQL = """
+SELECT
+    product_id, product_name, short_description, history,
+    semantic_text, model, generated_at,
+    craft_name, piece_type, style, process_type, materials,
+    store_name, store_id, category_name,
+    price, currency, stock, images
+FROM shop.product_search_cards
+WHERE product_id = ANY($1::uuid[])
+"""
+
+# Without iterative scans (pgvector < 0.8) HNSW yields at most ef_search
+# rows before the filters run, so candidates are over-fetched per requested
+# result and grown x4 while the page is still short and every candidate
+# passed the threshold. Cursor pages (a keyset the index walks past) grow up
+# to the cap before falling back to an exact scan.
+_ANN_CANDIDATE_FACTOR = 4
+_ANN_MAX_CANDIDATES = 1000   # pgvector's hnsw.ef_search upper bound
+
+
+# Local replica (unfiltered searches): candidates per requested result, grown
+# x4 while enrichment drops unsearchable products
+_REPLICA_CANDIDATE_FACTOR = 2
+_REPLICA_MAX_CANDIDATES = 1000
+
+# Per catalog: pgvector >= 0.8, detected on the first search of each database
+_iterative_scan: dict[str, bool] = {}
+
+# Batch searches in flight at once; leaves pool connections for other requests
+_BATCH_SEARCH_CONCURRENCY = 4
+
+
+@dataclass
+class ProductSearchFilters:
+    """Structured filters applied inside the vector query."""
+
+    price_min: int | None = None            # minor units, against the lowest active variant price
+    price_max: int | None = None
+    in_stock: bool = False                  # at least one active variant with stock
+    craft_ids: list[str] = field(default_factory=list)
+    category_ids: list[str] = field(default_factory=list)    # subcategories included
+    material_ids: list[str] = field(default_factory=list)    # any of them
+    region: str | None = None               # store department or municipality
+    store_ids: list[str] = field(default_factory=list)
+
+
+def _fold_region(region: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", region.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _product_ann_query(
+    query_vector: list[float],
+    limit: int,
+    filters: ProductSearchFilters | None = None,
+    after: tuple[float, str] | None = None,
+) -> tuple[str, list[Any]]:
+    """
+    Phase 1 SQL and args: nearest published products matching filters,
+    ranked after the (distance, product_id) keyset when given.
+    """
+    filters = filters or ProductSearchFilters()
+    args: list[Any] = [query_vector, limit]
+    where = []
+
+    def arg(value: Any) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if after is not None:
+        # The last product is excluded by id as well: its distance went
+        # through a float round trip in the cursor
+        distance, product_id = arg(after[0]), arg(after[1])
+        where.append(
+            f"(pe.embedding <=> $1::vector, pe.product_id) > ({distance}::float8, {product_id}::uuid)"
+            f" AND pe.product_id <> {product_id}::uuid"
+        )
+
+    if filters.store_ids:
+        where.append(f"c.store_id = ANY({arg(filters.store_ids)}::uuid[])")
+    if filters.category_ids:
+        ids = arg(filters.category_ids)
+        where.append(
+            f"c.category_id IN (SELECT id FROM taxonomy.categories "
+            f"WHERE id = ANY({ids}::uuid[]) OR parent_id = ANY({ids}::uuid[]))"
+        )
+    if filters.craft_ids:
+        where.append(f"c.primary_craft_id = ANY({arg(filters.craft_ids)}::uuid[])")
+    if filters.material_ids:
+        where.append(
+            "EXISTS (SELECT 1 FROM shop.product_materials_link pml WHERE pml.product_id = c.product_id "
+            f"AND pml.material_id = ANY({arg(filters.material_ids)}::uuid[]))"
+        )
+    if filters.region:
+        region = arg(_fold_region(filters.region))
+        where.append(
+            "EXISTS (SELECT 1 FROM shop.store_contacts sct WHERE sct.store_id = c.store_id "
+            f"AND ({_REGION_FOLD.format(column='sct.department')} = {region} "
+            f"OR {_REGION_FOLD.format(column='sct.municipality')} = {region}))"
+        )
+    if filters.price_min is not None:
+        where.append(f"c.price >= {arg(filters.price_min)}")
+    if filters.price_max is not None:
+        where.append(f"c.price <= {arg(filters.price_max)}")
+    if filters.in_stock:
+        where.append("c.stock > 0")
+
+    sql = f"""
+SELECT pe.product_id,
+       pe.embedding <=> $1::vector AS distance
 FROM shop.product_embeddings pe
-JOIN shop.products_core pc
-    ON pe.product_id = pc.id
-LEFT JOIN shop.stores sc
-    ON pc.store_id = sc.id
-LEFT JOIN shop.product_artisanal_identity pai
-    ON pc.id = pai.product_id
-LEFT JOIN taxonomy.crafts tc
-    ON pai.primary_craft_id = tc.id
-LEFT JOIN taxonomy.categories cat
-    ON pc.category_id = cat.id
-LEFT JOIN (
-    SELECT pml.product_id,
-           STRING_AGG(tm.name, ', ' ORDER BY tm.name) AS materials_list
-    FROM shop.product_materials_link pml
-    JOIN taxonomy.materials tm ON pml.material_id = tm.id
-    GROUP BY pml.product_id
-) mat ON pc.id = mat.product_id
-LEFT JOIN (
-    SELECT
-        product_id,
-        MIN(base_price_minor) AS min_price,
-        SUM(stock_quantity)   AS total_stock,
-        MAX(currency)         AS currency
-    FROM shop.product_variants
-    WHERE deleted_at IS NULL AND is_active = true
-    GROUP BY product_id
-) pv ON pc.id = pv.product_id
-LEFT JOIN (
-    SELECT
-        product_id,
-        JSONB_AGG(
-            JSONB_BUILD_OBJECT(
-                'url', media_url,
-                'type', media_type,
-                'is_primary', is_primary,
-                'display_order', display_order
-            )
-            ORDER BY is_primary DESC, display_order ASC
-        ) AS images
-    FROM shop.product_media
-    GROUP BY product_id
-) media ON pc.id = media.product_id
-WHERE pc.deleted_at IS NULL
-  AND pc.status IN ('published', 'approved', 'approved_with_edits')
-  AND 1 - (pe.embedding <=> $1::vector) >= $2
+JOIN shop.product_search_cards c
+    ON c.product_id = pe.product_id{"" if not where else chr(10) + "WHERE " + (chr(10) + "  AND ").join(where)}
 ORDER BY pe.embedding <=> $1::vector
-LIMIT $3
+LIMIT $2
+"""
+    return sql, args
+
+
+async def _iterative_scan_available(conn, catalog: str = DEFAULT_CATALOG) -> bool:
+    if catalog not in _iterative_scan:
+        version = await conn.fetchval(_PGVECTOR_VERSION_SQL) or "0"
+        major, minor = (int(p) for p in (version.split(".") + ["0"])[:2])
+        _iterative_scan[catalog] = (major, minor) >= (0, 8)
+        if not _iterative_scan[catalog]:
+            logger.warning(
+                f"pgvector {version} in catalog '{catalog}' has no iterative index scans; "
+                "filtered product searches over-fetch candidates instead"
+            )
+    return _iterative_scan[catalog]
+
+
+async def _search_product_rows(
+    conn,
+    query_vector: list[float],
+    top_k: int,
+    min_similarity: float,
+    ef_search: int | None,
+    filters: ProductSearchFilters | None = None,
+    catalog: str = DEFAULT_CATALOG,
+    after: tuple[float, str] | None = None,
+    exhaustive: bool = False,
+) -> list[tuple[Any, float, float]]:
+    """
+    Two-phase product search on one connection: (enriched row, similarity,
+    distance) triples ordered by descending similarity (ties by product id),
+    at most top_k. ef_search None searches exactly, without the HNSW index.
+    after, a (distance, product_id) keyset, continues a ranking past its
+    last row. exhaustive: fewer than top_k results means there are no more
+    (an index scan that may have stopped early is repeated exactly).
+    """
+    exact = ef_search is None
+    iterative = not exact and await _iterative_scan_available(conn, catalog)
+    # Filters and the keyset drop rows the index already yielded, so a short
+    # index scan does not mean the ranking ran out
+    filtered = after is not None or (filters is not None and filters != ProductSearchFilters())
+
+    if exact:
+        # Filters are applied before the LIMIT, so one pass is complete
+        candidates = top_k
+        ef_search = 0
+        session_sql = _EXACT_SESSION_SQL
+    elif iterative:
+        # The scan itself continues until top_k rows pass the filters, or
+        # until hnsw.max_scan_tuples
+        candidates = top_k
+        session_sql = _ANN_ITERATIVE_SESSION_SQL
+    else:
+        candidates = min(max(top_k * _ANN_CANDIDATE_FACTOR, top_k), _ANN_MAX_CANDIDATES)
+        session_sql = _ANN_SESSION_SQL
+
+    while True:
+        sql, args = _product_ann_query(query_vector, candidates, filters, after)
+        async with conn.transaction():
+            await conn.execute(session_sql, str(max(ef_search, candidates)))
+            nearest = await conn.fetch(sql, *args)
+
+        # relaxed_order may interleave rows, so the threshold is checked per row
+        distance_by_id: dict[Any, float] = {}
+        for r in nearest:
+            distance = float(r["distance"])
+            if 1 - distance >= min_similarity:
+                distance_by_id[r["product_id"]] = distance
+
+        rows = await conn.fetch(_PRODUCT_ENRICH_SQL, list(distance_by_id)) if distance_by_id else []
+
+        if len(rows) >= top_k or exact or len(distance_by_id) < len(nearest):
+            break   # a full page, an exact ranking, or the rest is below the threshold
+        if not iterative and candidates < _ANN_MAX_CANDIDATES and (len(nearest) == candidates or (exhaustive and filtered)):
+            candidates = min(candidates * _ANN_CANDIDATE_FACTOR, _ANN_MAX_CANDIDATES)
+            continue
+        if not exhaustive or not filtered:
+            break   # unfiltered, a short scan means fewer embeddings than asked for
+        # ef_search or hnsw.max_scan_tuples may have cut the scan short: only
+        # an exact scan tells a truncated page from the end of the results
+        exact, candidates, ef_search, session_sql = True, top_k, 0, _EXACT_SESSION_SQL
+
+    ranked = sorted(rows, key=lambda r: (distance_by_id[r["product_id"]], str(r["product_id"])))[:top_k]
+    return [(r, 1 - distance_by_id[r["product_id"]], distance_by_id[r["product_id"]]) for r in ranked]
+
+
+async def _replica_product_rows(
+    conn,
+    replica: VectorReplica,
+    query_vector: list[float],
+    top_k: int,
+    min_similarity: float,
+    after: tuple[float, str] | None = None,
+) -> list[tuple[Any, float, float]] | None:
+    """
+    Unfiltered product search with candidates from the local replica (exact
+    brute force); Postgres only enriches the candidate ids. Same triples as
+    _search_product_rows, the distance on the replica's own scale (the
+    keyset it takes back). None when the replica is not available, so the
+    caller searches Postgres.
+    """
+    candidates = min(max(top_k * _REPLICA_CANDIDATE_FACTOR, top_k), _REPLICA_MAX_CANDIDATES)
+    while True:
+        nearest = await replica.nearest(query_vector, candidates, min_similarity, after)
+        if nearest is None:
+            return None
+        similarity_by_id = dict(nearest)
+        rows = await conn.fetch(_PRODUCT_ENRICH_SQL, list(similarity_by_id)) if similarity_by_id else []
+        if len(rows) >= top_k or len(nearest) < candidates or candidates >= _REPLICA_MAX_CANDIDATES:
+            break
+        candidates = min(candidates * 4, _REPLICA_MAX_CANDIDATES)
+
+    ranked = sorted(rows, key=lambda r: (-similarity_by_id[str(r["product_id"])], str(r["product_id"])))[:top_k]
+    return [
+        (r, similarity_by_id[str(r["product_id"])], 1 - similarity_by_id[str(r["product_id"])]) for r in ranked
+    ]
+
+
+def _store_ann_query(
+    query_vector: list[float],
+    limit: int,
+    region: str | None = None,
+) -> tuple[str, list[Any]]:
+    """Nearest stores with their product counts: one query on the store HNSW index."""
+    args: list[Any] = [query_vector, limit]
+    region_sql = ""
+    if region:
+        args.append(_fold_region(region))
+        region_sql = (
+            f"\n  AND ({_REGION_FOLD.format(column='sct.department')} = $3"
+            f" OR {_REGION_FOLD.format(column='sct.municipality')} = $3)"
+        )
+    sql = f"""
+SELECT se.store_id,
+       se.embedding <=> $1::vector AS distance,
+       se.product_count,
+       se.craft_name,
+       s.name AS store_name,
+       s.slug,
+       sct.department,
+       sct.municipality
+FROM shop.store_embeddings se
+JOIN shop.stores s ON s.id = se.store_id
+LEFT JOIN shop.store_contacts sct ON sct.store_id = se.store_id
+WHERE se.product_count > 0
+  AND s.deleted_at IS NULL{region_sql}
+ORDER BY se.embedding <=> $1::vector
+LIMIT $2
 """
+    return sql, args
+
 
 # ---------------------------------------------------------------------------
 # Dataclasses
@@ -184,6 +741,69 @@ class ProductSearchResult:
     images: list[dict]       # list of {url, type, is_primary, display_order}
 
 
+@dataclass
+class ProductSearchQuery:
+    """One search of a batch (search_products_batch)."""
+
+    query: str
+    top_k: int = 10
+    min_similarity: float = 0.45
+    filters: ProductSearchFilters | None = None
+    quality: SearchQuality = "balanced"
+
+
+@dataclass
+class ProductSearchPage:
+    """One page of search_products_page."""
+
+    results: list[ProductSearchResult]
+    next_cursor: str | None  # None on the last page
+
+
+@dataclass
+class BatchSearchItem:
+    results: list[ProductSearchResult]
+    cached: bool             # served from the result cache
+    search_ms: float         # vector query + enrichment time (0 when cached)
+
+
+def _to_search_result(r: Any, similarity: float) -> ProductSearchResult:
+    return ProductSearchResult(
+        product_id=str(r["product_id"]),
+        product_name=r["product_name"],
+        short_description=r["short_description"],
+        history=r["history"],
+        similarity=round(similarity, 4),
+        craft_name=r["craft_name"],
+        piece_type=r["piece_type"],
+        style=r["style"],
+        process_type=r["process_type"],
+        materials=r["materials"],
+        store_name=r["store_name"],
+        store_id=str(r["store_id"]) if r["store_id"] else None,
+        category_name=r["category_name"],
+        semantic_text=r["semantic_text"],
+        model=r["model"],
+        generated_at=r["generated_at"],
+        price=int(r["price"]) if r["price"] is not None else None,
+        currency=r["currency"],
+        stock=int(r["stock"]),
+        images=json.loads(r["images"]) if isinstance(r["images"], str) else (list(r["images"]) if r["images"] else []),
+    )
+
+
+@dataclass
+class StoreSearchResult:
+    store_id: str
+    store_name: str
+    slug: str | None
+    similarity: float
+    product_count: int       # searchable products in the store vector
+    craft_name: str | None   # most common craft among those products
+    department: str | None
+    municipality: str | None
+
+
 @dataclass
 class IndexingStatus:
     running: bool = False
@@ -193,6 +813,24 @@ class IndexingStatus:
     started_at: float | None = None
     finished_at: float | None = None
     errors: list[str] = field(default_factory=list)
+    job_id: str | None = None
+    resumed_from: str | None = None   # checkpoint product_id of a resumed job
+    resumed_done: int = 0             # products processed before this run
+    in_flight: int = 0                # embedding batches not yet written
+
+    @property
+    def throughput_per_second(self) -> float | None:
+        elapsed = self.elapsed_seconds
+        if not elapsed:
+            return None
+        return round((self.indexed + self.failed - self.resumed_done) / elapsed, 2)
+
+    @property
+    def eta_seconds(self) -> float | None:
+        rate = self.throughput_per_second
+        if not self.running or not rate:
+            return None
+        return round(max(self.total - self.indexed - self.failed, 0) / rate, 1)
 
     @property
     def elapsed_seconds(self) -> float | None:
@@ -208,6 +846,11 @@ class IndexingStatus:
             "indexed": self.indexed,
             "failed": self.failed,
             "elapsed_seconds": self.elapsed_seconds,
+            "throughput_per_second": self.throughput_per_second,
+            "eta_seconds": self.eta_seconds,
+            "in_flight_batches": self.in_flight,
+            "job_id": self.job_id,
+            "resumed_from": self.resumed_from,
             "started_at": self.started_at,
             "finished_at": self.finished_at,
             "errors": self.errors[-20:],  # last 20 errors only
@@ -218,6 +861,188 @@ class IndexingStatus:
 # Service
 # ---------------------------------------------------------------------------
 
+# ---------------------------------------------------------------------------
+# Search caches
+# ---------------------------------------------------------------------------
+
+def _normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query).lower().split())
+
+
+class _SearchResultCache:
+    """
+    LRU + TTL cache of search result pages, keyed by (normalized query,
+    filters, top_k, min_similarity, cache version). The cache version starts
+    with the catalog's namespace, so catalogs share one cache without
+    colliding; invalidate(namespace) drops one catalog's pages, e.g. after
+    its embeddings were written.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self._entries: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl_seconds
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def key(
+        query: str,
+        filters: ProductSearchFilters | None,
+        top_k: int,
+        min_similarity: float,
+        version: str,
+    ) -> tuple:
+        canonical = None
+        if filters is not None and filters != ProductSearchFilters():
+            canonical = json.dumps(
+                {k: sorted(v) if isinstance(v, list) else v for k, v in asdict(filters).items()},
+                sort_keys=True,
+            )
+        return (_normalize_query(query), canonical, top_k, round(min_similarity, 4), version)
+
+    def get(self, key: tuple) -> list | None:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return list(entry[1])
+
+    def put(self, key: tuple, results: list) -> None:
+        if self._maxsize <= 0 or self._ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic(), list(results))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str | None = None) -> None:
+        stale = [
+            k for k in self._entries
+            if namespace is None or k[-1].startswith(f"{namespace}:")
+        ]
+        if stale:
+            self._invalidations += 1
+        for k in stale:
+            del self._entries[k]
+
+    @property
+    def stats(self) -> dict:
+        total = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+            "ttl_seconds": self._ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / total, 3) if total else 0.0,
+            "invalidations": self._invalidations,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Search cursors (keyset pagination)
+# ---------------------------------------------------------------------------
+
+# Pages of results fetched per vector query of a cursor; the pages in between
+# are sliced from memory
+_CURSOR_WINDOW_PAGES = 5
+
+
+@dataclass
+class _CursorState:
+    """What a cursor continues: the first page's query vector and limits."""
+
+    query_vector: list[float]            # not re-embedded for later pages
+    filters: ProductSearchFilters | None
+    min_similarity: float
+    quality: SearchQuality
+    version: str                         # cache version when opened; a new model expires it
+    # Results ranked after some keyset, with the raw distance of their vector
+    # query row (the keyset of the next page)
+    window: list[tuple[ProductSearchResult, float]] = field(default_factory=list)
+    complete: bool = False               # nothing ranks after the window
+
+
+class _SearchCursors:
+    """
+    LRU + idle-TTL store of cursor states by random handle.
+
+    A cursor token is the handle plus the (distance, product_id) keyset of
+    the last result returned, so a retried page returns the same results
+    and older tokens of one search stay valid.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self._entries: OrderedDict[str, tuple[float, _CursorState]] = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl_seconds
+        self._opened = 0
+        self._expired = 0
+
+    def open(self, state: _CursorState) -> str:
+        handle = secrets.token_urlsafe(12)
+        self._entries[handle] = (time.monotonic(), state)
+        self._opened += 1
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> _CursorState | None:
+        entry = self._entries.get(handle)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            if entry is not None:
+                del self._entries[handle]
+            self._expired += 1
+            return None
+        self._entries[handle] = (time.monotonic(), entry[1])
+        self._entries.move_to_end(handle)
+        return entry[1]
+
+    @staticmethod
+    def token(handle: str, distance: float, product_id: str) -> str:
+        raw = json.dumps([handle, distance, product_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def parse(token: str) -> tuple[str, tuple[float, str]]:
+        try:
+            handle, distance, product_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return str(handle), (float(distance), str(product_id))
+        except Exception:
+            raise ValueError("Malformed search cursor")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+            "ttl_seconds": self._ttl,
+            "opened": self._opened,
+            "expired": self._expired,
+        }
+
+
+# Process-wide caches shared by the search services of every catalog
+_query_vectors = EmbeddingCache(
+    maxsize=settings.search_cache_size,
+    ttl_seconds=settings.query_embedding_cache_ttl_seconds,
+)
+_results = _SearchResultCache(
+    maxsize=settings.search_cache_size,
+    ttl_seconds=settings.search_cache_ttl_seconds,
+)
+_cursors = _SearchCursors(
+    maxsize=settings.search_cache_size,
+    ttl_seconds=settings.search_cursor_ttl_seconds,
+)
+
+
 class SemanticSearchService:
     """
     Core service for embedding generation, vector search and batch indexing.
@@ -225,15 +1050,129 @@ class SemanticSearchService:
     All heavy I/O (DB reads/writes, OpenAI calls) is async.
     """
 
-    # Batch size when calling OpenAI embeddings API in parallel
-    _EMBED_BATCH_SIZE = 20
-
-    # Current embedding schema version; bump this to trigger re-indexing
+    # Current embedding schema version; bump this to trigger re-indexing in place.
+    # A new model goes through a blue/green build instead (embedding_version_service).
     _EMBEDDING_VERSION = 1
 
-    def __init__(self) -> None:
+    def __init__(self, catalog: str = DEFAULT_CATALOG) -> None:
+        self._catalog = get_catalog(catalog)
+        self._embedding_version = self._catalog.embedding_version or self._EMBEDDING_VERSION
         self._indexing_status = IndexingStatus()
         self._indexing_lock = asyncio.Lock()
+        # Shared by every catalog; result keys carry the catalog namespace
+        self._query_vectors = _query_vectors
+        self._results = _results
+        self._cursors = _cursors
+        self._replica = (
+            VectorReplica(self._catalog, lambda: self._replica_signature)
+            if self._catalog.vector_replica and settings.vector_replica_dir
+            else None
+        )
+        self._listener: asyncpg.Connection | None = None
+        self._debounce_handle: asyncio.TimerHandle | None = None
+        self._drain_task: asyncio.Task | None = None
+        self._drain_requested = False
+        self._poll_task: asyncio.Task | None = None
+        self._queue_stats = {
+            "dequeued": 0,
+            "reembedded": 0,
+            "unchanged": 0,
+            "stores_refreshed": 0,
+            "failed_batches": 0,
+            "last_lag_seconds": None,
+            "max_lag_seconds": None,
+            "last_drain_at": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Public: lifecycle (incremental re-embedding worker)
+    # ------------------------------------------------------------------
+
+    @property
+    def catalog(self) -> str:
+        return self._catalog.name
+
+    async def start(self) -> None:
+        """Subscribe to catalog edit notifications and drain the queue (app startup)."""
+        if self._replica is not None:
+            self._replica.start()
+        if not self._catalog.background_worker:
+            return
+        await self._listen()
+        self._schedule_drain()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_queue())
+
+    async def stop(self) -> None:
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+        for task in (self._poll_task, self._drain_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
+        self._listener = None
+        if self._replica is not None:
+            await self._replica.stop()
+
+    @property
+    def _embedder(self) -> EmbeddingService:
+        """Embeddings in the space of the live product vectors (see embedding_version_service)."""
+        if self._catalog.name == DEFAULT_CATALOG:
+            return embedding_version_service.embedder("products")
+        return embedding_service
+
+    @property
+    def embedding_model(self) -> str:
+        return self._embedder.model
+
+    @property
+    def _replica_signature(self) -> str:
+        """Vectors the local replica must hold to serve searches."""
+        live = embedding_version_service.live("products") if self._catalog.name == DEFAULT_CATALOG else None
+        return (
+            f"{self._embedder.model}:{self._embedder.dimensions}:v{self._embedding_version}"
+            f":e{live.version if live else 0}"
+        )
+
+    def _replica_serves(self, filters: ProductSearchFilters | None) -> bool:
+        return self._replica is not None and (filters is None or filters == ProductSearchFilters())
+
+    def _replica_changed(self) -> None:
+        if self._replica is not None:
+            self._replica.schedule_sync()
+
+    async def _product_rows(
+        self,
+        conn,
+        query_vector: list[float],
+        top_k: int,
+        min_similarity: float,
+        filters: ProductSearchFilters | None,
+        quality: SearchQuality,
+        after: tuple[float, str] | None = None,
+        exhaustive: bool = False,
+    ) -> list[tuple[Any, float, float]]:
+        """Ranked (row, similarity, distance) triples from the replica when it serves the search, else Postgres."""
+        if self._replica_serves(filters):
+            rows = await _replica_product_rows(conn, self._replica, query_vector, top_k, min_similarity, after)
+            if rows is not None:
+                return rows
+        return await _search_product_rows(
+            conn,
+            query_vector,
+            top_k,
+            min_similarity,
+            vector_tuning_service.ef_search("products", quality),
+            filters,
+            self._catalog.name,
+            after,
+            exhaustive,
+        )
+
+    @property
+    def _cache_version(self) -> str:
+        return f"{self._catalog.namespace}:{self._embedder.model}:v{self._embedding_version}"
 
     # ------------------------------------------------------------------
     # Public: single embedding generation
@@ -241,7 +1180,7 @@ class SemanticSearchService:
 
     async def generate_embedding(self, text: str) -> list[float]:
         """Generate a single embedding vector from arbitrary text."""
-        return await embedding_service.generate_embedding(text)
+        return await self._embedder.generate_embedding(text)
 
     # ------------------------------------------------------------------
     # Public: upsert a single product embedding (called by NestJS flow)
@@ -260,17 +1199,18 @@ class SemanticSearchService:
         NestJS calls /embeddings/generate to get the vector, then calls
         this via /index/products/single to save it without re-generating.
         """
-        pool = await get_pool()
+        pool = await get_pool(self._catalog.name)
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 INSERT INTO shop.product_embeddings
-                    (product_id, embedding, model, semantic_text, version, generated_at)
-                VALUES ($1, $2::vector, $3, $4, $5, now())
+                    (product_id, embedding, model, semantic_text, content_hash, version, generated_at)
+                VALUES ($1, $2::vector, $3, $4, $5, $6, now())
                 ON CONFLICT (product_id) DO UPDATE SET
                     embedding     = EXCLUDED.embedding,
                     model         = EXCLUDED.model,
                     semantic_text = EXCLUDED.semantic_text,
+                    content_hash  = EXCLUDED.content_hash,
                     version       = EXCLUDED.version,
                     generated_at  = now()
                 """,
@@ -278,8 +1218,11 @@ class SemanticSearchService:
                 vector,
                 model,
                 text,
-                self._EMBEDDING_VERSION,
+                _content_hash(text),
+                self._embedding_version,
             )
+        self._results.invalidate(self._catalog.namespace)
+        self._replica_changed()
 
     # ------------------------------------------------------------------
     # Public: semantic search
@@ -290,6 +1233,8 @@ class SemanticSearchService:
         query: str,
         top_k: int = 10,
         min_similarity: float = 0.45,
+        filters: ProductSearchFilters | None = None,
+        quality: SearchQuality = "balanced",
     ) -> list[ProductSearchResult]:
         """
         Search published products by semantic similarity.
@@ -298,46 +1243,211 @@ class SemanticSearchService:
             query:          Natural-language search query from the user.
             top_k:          Maximum number of results to return.
             min_similarity: Minimum cosine similarity threshold (0-1).
+            filters:        Price/stock/craft/category/region/store filters,
+                            applied before the top_k cut.
+            quality:        "fast" / "balanced" use the calibrated
+                            hnsw.ef_search presets, "exact" skips the index.
+                            Unfiltered searches served by the local vector
+                            replica are exact at every quality.
 
         Returns:
             List of ProductSearchResult ordered by descending similarity.
+            Served from the result cache when the same normalized query,
+            filters and limits were searched within SEARCH_CACHE_TTL_SECONDS.
         """
-        query_vector = await embedding_service.generate_embedding(query)
+        cache_key = self._results.key(query, filters, top_k, min_similarity, f"{self._cache_version}:{quality}")
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            return cached
 
-        pool = await get_pool()
+        normalized = _normalize_query(query)
+        query_vector = await self._query_vectors.get_or_generate(
+            normalized, self._embedder.generate_embedding, model=self._embedder.model
+        )
+
+        pool = await get_pool(self._catalog.name)
         async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                _PRODUCT_SEARCH_SQL,
-                query_vector,
-                min_similarity,
-                top_k,
+            rows = await self._product_rows(conn, query_vector, top_k, min_similarity, filters, quality)
+
+        results = [_to_search_result(r, similarity) for r, similarity, _ in rows]
+        self._results.put(cache_key, results)
+        return results
+
+    async def search_products_page(
+        self,
+        query: str,
+        page_size: int = 10,
+        min_similarity: float = 0.45,
+        filters: ProductSearchFilters | None = None,
+        quality: SearchQuality = "balanced",
+        cursor: str | None = None,
+    ) -> ProductSearchPage:
+        """
+        search_products one page at a time, with keyset pagination.
+
+        The first call (no cursor) embeds the query and returns next_cursor
+        when more results may follow. Passing it back continues the ranking
+        after the last result returned, with the first page's query vector,
+        filters, threshold and quality (those arguments are ignored then):
+        no embeddings call, and one vector query every _CURSOR_WINDOW_PAGES
+        pages, each starting at the keyset rather than at the top.
+
+        Raises:
+            ValueError: malformed cursor, or expired (SEARCH_CURSOR_TTL_SECONDS
+                        idle, or the embedding model changed); search again
+                        without a cursor.
+        """
+        if cursor is None:
+            query_vector = await self._query_vectors.get_or_generate(
+                _normalize_query(query), self._embedder.generate_embedding, model=self._embedder.model
             )
+            state = _CursorState(query_vector, filters, min_similarity, quality, self._cache_version)
+            handle, after = None, None
+        else:
+            handle, after = self._cursors.parse(cursor)
+            state = self._cursors.get(handle)
+            if state is None or state.version != self._cache_version:
+                raise ValueError("Search cursor expired; search again without a cursor")
 
-        return [
-            ProductSearchResult(
-                product_id=str(r["product_id"]),
-                product_name=r["product_name"],
-                short_description=r["short_description"],
-                history=r["history"],
-                similarity=round(float(r["similarity"]), 4),
-                craft_name=r["craft_name"],
-                piece_type=r["piece_type"],
-                style=r["style"],
-                process_type=r["process_type"],
-                materials=r["materials"],
+        window = state.window
+        start = 0 if after is None else next(
+            (i + 1 for i, (r, _) in enumerate(window) if r.product_id == after[1]), None
+        )
+        if start is None or (len(window) - start < page_size and not state.complete):
+            size = page_size * _CURSOR_WINDOW_PAGES
+            pool = await get_pool(self._catalog.name)
+            async with pool.acquire() as conn:
+                # exhaustive: a short window must mean the ranking ended, not that an
+                # index scan stopped early, or the cursor would end too soon
+                rows = await self._product_rows(
+                    conn, state.query_vector, size, state.min_similarity, state.filters, state.quality, after,
+                    exhaustive=True,
+                )
+            window = [(_to_search_result(r, similarity), distance) for r, similarity, distance in rows]
+            state.window, state.complete, start = window, len(window) < size, 0
+
+        page = window[start:start + page_size]
+        if len(page) < page_size or (state.complete and start + page_size == len(window)):
+            return ProductSearchPage(results=[r for r, _ in page], next_cursor=None)
+        if handle is None:
+            handle = self._cursors.open(state)
+        last, distance = page[-1]
+        return ProductSearchPage(
+            results=[r for r, _ in page],
+            next_cursor=self._cursors.token(handle, distance, last.product_id),
+        )
+
+    async def search_products_batch(self, searches: list[ProductSearchQuery]) -> list[BatchSearchItem]:
+        """
+        Run several product searches at once, results in input order.
+
+        Queries missing from the result and query-vector caches are embedded
+        in a single embeddings call; the vector queries then run concurrently
+        on pooled connections (at most _BATCH_SEARCH_CONCURRENCY at a time).
+        """
+        version = self._cache_version
+        items: list[BatchSearchItem | None] = [None] * len(searches)
+        # Identical searches (same cache key) run once
+        pending: dict[tuple, list[int]] = {}
+        for i, s in enumerate(searches):
+            key = self._results.key(s.query, s.filters, s.top_k, s.min_similarity, f"{version}:{s.quality}")
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = self._results.get(key)
+            if cached is not None:
+                items[i] = BatchSearchItem(results=cached, cached=True, search_ms=0.0)
+            else:
+                pending[key] = [i]
+        if not pending:
+            return items
+
+        vectors = await self._query_vectors.get_or_generate_many(
+            [key[0] for key in pending],    # the normalized query
+            self._embedder.generate_embeddings,
+            model=self._embedder.model,
+        )
+
+        pool = await get_pool(self._catalog.name)
+        slots = asyncio.Semaphore(_BATCH_SEARCH_CONCURRENCY)
+
+        async def run(key: tuple, indices: list[int], query_vector: list[float]) -> None:
+            s = searches[indices[0]]
+            async with slots, pool.acquire() as conn:
+                started = time.perf_counter()
+                rows = await self._product_rows(conn, query_vector, s.top_k, s.min_similarity, s.filters, s.quality)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            results = [_to_search_result(r, similarity) for r, similarity, _ in rows]
+            self._results.put(key, results)
+            for i in indices:
+                items[i] = BatchSearchItem(results=list(results), cached=False, search_ms=round(elapsed_ms, 1))
+
+        await asyncio.gather(*(
+            run(key, indices, vec) for (key, indices), vec in zip(pending.items(), vectors)
+        ))
+        return items
+
+    async def search_stores(
+        self,
+        query: str,
+        top_k: int = 10,
+        min_similarity: float = 0.3,
+        region: str | None = None,
+    ) -> list[StoreSearchResult]:
+        """
+        Search stores by similarity of the query to their store vectors.
+
+        Args:
+            query:          Natural-language search query from the user.
+            top_k:          Maximum number of stores to return.
+            min_similarity: Minimum cosine similarity threshold (0-1). Store
+                            vectors are centroids, so scores run lower than
+                            for single products.
+            region:         Store department or municipality.
+
+        Returns:
+            List of StoreSearchResult ordered by descending similarity.
+        """
+        query_vector = await self._query_vectors.get_or_generate(
+            _normalize_query(query), self._embedder.generate_embedding, model=self._embedder.model
+        )
+
+        pool = await get_pool(self._catalog.name)
+        async with pool.acquire() as conn:
+            if await _iterative_scan_available(conn, self._catalog.name):
+                limit, session_sql = top_k, _ANN_ITERATIVE_SESSION_SQL
+            else:
+                # The region filter runs after at most ef_search index rows
+                limit = top_k if not region else min(top_k * _ANN_CANDIDATE_FACTOR, _ANN_MAX_CANDIDATES)
+                session_sql = _ANN_SESSION_SQL
+            sql, args = _store_ann_query(query_vector, limit, region)
+            async with conn.transaction():
+                await conn.execute(session_sql, str(max(settings.hnsw_ef_search, limit)))
+                rows = await conn.fetch(sql, *args)
+
+        results = [
+            StoreSearchResult(
+                store_id=str(r["store_id"]),
                 store_name=r["store_name"],
-                store_id=str(r["store_id"]) if r["store_id"] else None,
-                category_name=r["category_name"],
-                semantic_text=r["semantic_text"],
-                model=r["model"],
-                generated_at=r["generated_at"],
-                price=int(r["price"]) if r["price"] is not None else None,
-                currency=r["currency"],
-                stock=int(r["stock"]),
-                images=json.loads(r["images"]) if isinstance(r["images"], str) else (list(r["images"]) if r["images"] else []),
+                slug=r["slug"],
+                similarity=round(1 - float(r["distance"]), 4),
+                product_count=r["product_count"],
+                craft_name=r["craft_name"],
+                department=r["department"],
+                municipality=r["municipality"],
             )
             for r in rows
         ]
+        results = [r for r in results if r.similarity >= min_similarity]
+        return sorted(results, key=lambda r: -r.similarity)[:top_k]
+
+    def cache_stats(self) -> dict:
+        return {
+            "results": self._results.stats,
+            "query_vectors": self._query_vectors.stats,
+            "cursors": self._cursors.stats,
+            "vector_replica": self._replica.stats() if self._replica is not None else None,
+        }
 
     # ------------------------------------------------------------------
     # Public: batch indexing
@@ -352,7 +1462,10 @@ class SemanticSearchService:
         Background task: generate and persist embeddings for products.
 
         If product_ids is None, indexes all products.
-        If force_reindex is False, skips products already at current version.
+        If force_reindex is False, skips products whose embedding is at the
+        current version and was built from their current semantic text.
+        A job with the same parameters that died mid-run is resumed from its
+        checkpoint; other unfinished jobs are marked superseded.
         """
         async with self._indexing_lock:
             if self._indexing_status.running:
@@ -363,12 +1476,20 @@ class SemanticSearchService:
                 running=True, started_at=time.time()
             )
 
+        status = "failed"
+        error = None
         try:
             await self._run_indexing(product_ids, force_reindex)
+            status = "completed"
+            self._replica_changed()
         except Exception as exc:
             logger.error(f"Indexing job failed: {exc}", exc_info=True)
             self._indexing_status.errors.append(str(exc))
+            error = str(exc)
         finally:
+            # Cancelled (e.g. shutdown): the job stays 'running' and resumes later
+            if self._indexing_status.job_id and (status == "completed" or error is not None):
+                await self._finish_job(status, error)
             self._indexing_status.running = False
             self._indexing_status.finished_at = time.time()
             logger.info(
@@ -377,87 +1498,389 @@ class SemanticSearchService:
                 f"{self._indexing_status.elapsed_seconds}s"
             )
 
+    async def resume_interrupted_indexing(self) -> None:
+        """Resume the latest job left 'running' by a previous process, if any."""
+        pool = await get_pool(self._catalog.name)
+        async with pool.acquire() as conn:
+            job = await conn.fetchrow(
+                "SELECT force_reindex, product_ids FROM shop.product_indexing_jobs "
+                "WHERE status = 'running' AND embedding_version = $1 "
+                "ORDER BY started_at DESC LIMIT 1",
+                self._embedding_version,
+            )
+        if job is None:
+            return
+        logger.info("Resuming interrupted product indexing job")
+        await self.index_products(
+            product_ids=[str(i) for i in job["product_ids"]] if job["product_ids"] else None,
+            force_reindex=job["force_reindex"],
+        )
+
+    async def _start_job(self, conn, product_ids: list[str] | None, force_reindex: bool) -> Any:
+        """Create or resume the checkpointed job; return the resume position."""
+        status = self._indexing_status
+        job = await conn.fetchrow(
+            _INDEX_JOB_RESUME_SQL, force_reindex, self._embedding_version, product_ids
+        )
+        if job is not None:
+            status.job_id = str(job["id"])
+            status.indexed = job["indexed"]
+            status.failed = job["failed"]
+            status.resumed_done = job["indexed"] + job["failed"]
+            if job["last_product_id"] is not None:
+                status.resumed_from = str(job["last_product_id"])
+            logger.info(f"Resuming indexing job {status.job_id} after {status.resumed_from}")
+        else:
+            status.job_id = str(
+                await conn.fetchval(
+                    _INDEX_JOB_CREATE_SQL, force_reindex, self._embedding_version, product_ids
+                )
+            )
+        await conn.execute(_INDEX_JOB_SUPERSEDE_SQL, status.job_id)
+        return job["last_product_id"] if job is not None else None
+
+    async def _finish_job(self, status: str, error: str | None) -> None:
+        try:
+            pool = await get_pool(self._catalog.name)
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    _INDEX_JOB_FINISH_SQL,
+                    self._indexing_status.job_id,
+                    status,
+                    self._indexing_status.total,
+                    error,
+                )
+        except Exception as exc:
+            logger.warning(f"Could not record indexing job result: {exc}")
+
     async def _run_indexing(
         self,
         product_ids: list[str] | None,
         force_reindex: bool,
     ) -> None:
-        pool = await get_pool()
+        """
+        Three-stage pipeline: a reader streams candidates through a
+        server-side cursor, embedding batches run concurrently (at most
+        INDEX_PIPELINE_DEPTH in flight) and a single writer stores them in
+        candidate order, advancing the checkpoint with each batch.
+        """
+        status = self._indexing_status
+        pool = await get_pool(self._catalog.name)
+        batch_size = max(settings.index_batch_size, 1)
+        depth = max(settings.index_pipeline_depth, 1)
 
-        # Fetch rows to index
         async with pool.acquire() as conn:
-            if product_ids:
-                rows = await conn.fetch(
-                    _PRODUCT_SEMANTIC_TEXT_BULK_SQL, product_ids
-                )
-            else:
-                rows = await conn.fetch(_PRODUCT_SEMANTIC_TEXT_SQL)
-
-            # If not forcing reindex, skip products already at current version
-            if not force_reindex:
-                already_indexed = await conn.fetch(
-                    """
-                    SELECT product_id FROM shop.product_embeddings
-                    WHERE version = $1
-                    """,
-                    self._EMBEDDING_VERSION,
-                )
-                skip_ids = {str(r["product_id"]) for r in already_indexed}
-                rows = [r for r in rows if str(r["product_id"]) not in skip_ids]
-
-        self._indexing_status.total = len(rows)
-        logger.info(f"Indexing {len(rows)} products")
+            after = await self._start_job(conn, product_ids, force_reindex)
+            sql, args = _indexing_candidates_query(
+                product_ids, force_reindex, self._embedding_version, after
+            )
+            remaining = await conn.fetchval(f"SELECT COUNT(*) FROM ({sql}) candidates", *args)
+        status.total = status.indexed + status.failed + remaining
+        logger.info(f"Indexing {remaining} products (job {status.job_id})")
 
-        if not rows:
+        if not remaining:
             return
 
-        # Process in batches to respect OpenAI rate limits
-        for batch_start in range(0, len(rows), self._EMBED_BATCH_SIZE):
-            batch = rows[batch_start : batch_start + self._EMBED_BATCH_SIZE]
-            texts = [r["full_semantic_text"] or r["product_name"] for r in batch]
+        slots = asyncio.Semaphore(depth)
+        pending: asyncio.Queue = asyncio.Queue()
+
+        async def embed(batch: list) -> list[list[float]]:
+            texts = [_embedding_text(r) for r in batch]
+            vectors = await self._embedder.generate_embeddings(texts)
+            if len(vectors) != len(batch):
+                raise ValueError(f"{len(vectors)} vectors for {len(batch)} texts")
+            return vectors
 
+        async def read() -> None:
             try:
-                vectors = await embedding_service.generate_embeddings(texts)
-            except Exception as exc:
-                logger.error(f"OpenAI batch failed at offset {batch_start}: {exc}")
-                self._indexing_status.failed += len(batch)
-                self._indexing_status.errors.append(
-                    f"batch@{batch_start}: {exc}"
-                )
-                continue
+                async with pool.acquire() as conn:
+                    async with conn.transaction(readonly=True):
+                        batch: list = []
+                        async for row in conn.cursor(sql, *args, prefetch=batch_size * 2):
+                            batch.append(row)
+                            if len(batch) == batch_size:
+                                await slots.acquire()
+                                status.in_flight += 1
+                                await pending.put((batch, asyncio.create_task(embed(batch))))
+                                batch = []
+                        if batch:
+                            await slots.acquire()
+                            status.in_flight += 1
+                            await pending.put((batch, asyncio.create_task(embed(batch))))
+            finally:
+                await pending.put(None)
+
+        async def write() -> None:
+            async with pool.acquire() as conn:
+                await conn.execute(_INDEX_STAGE_SQL)
+                while (item := await pending.get()) is not None:
+                    batch, task = item
+                    try:
+                        try:
+                            vectors = await task
+                        except Exception as exc:
+                            # Skipped; a later incremental run picks them up again
+                            logger.error(f"Embedding batch failed after {batch[0]['product_id']}: {exc}")
+                            status.errors.append(f"batch@{batch[0]['product_id']}: {exc}")
+                            vectors = None
 
-            # Bulk upsert this batch
-            records = [
+                        async with conn.transaction():
+                            if vectors is not None:
+                                await self._write_batch(conn, batch, vectors)
+                            await conn.execute(
+                                _INDEX_JOB_CHECKPOINT_SQL,
+                                status.job_id,
+                                batch[-1]["product_id"],
+                                len(batch) if vectors is not None else 0,
+                                0 if vectors is not None else len(batch),
+                            )
+                    finally:
+                        status.in_flight -= 1
+                        slots.release()
+
+                    if vectors is not None:
+                        status.indexed += len(batch)
+                        self._results.invalidate(self._catalog.namespace)
+                    else:
+                        status.failed += len(batch)
+                    logger.info(
+                        f"Indexed {status.indexed}/{status.total} "
+                        f"({status.throughput_per_second}/s, eta {status.eta_seconds}s)"
+                    )
+
+        reader = asyncio.create_task(read())
+        try:
+            await write()
+            await reader
+        finally:
+            if not reader.done():
+                reader.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+
+    async def _write_batch(self, conn, rows: list, vectors: list[list[float]]) -> None:
+        """COPY one embedded batch into the stage table and upsert it (inside a transaction)."""
+        await conn.copy_records_to_table(
+            "_product_embeddings_stage",
+            records=[
                 (
-                    str(row["product_id"]),
+                    r["product_id"],
                     vec,
-                    "text-embedding-3-small",
-                    text,
-                    self._EMBEDDING_VERSION,
+                    self._embedder.model,
+                    _embedding_text(r),
+                    _content_hash(_embedding_text(r)),
+                    self._embedding_version,
                 )
-                for row, vec, text in zip(batch, vectors, texts)
-            ]
+                for r, vec in zip(rows, vectors)
+            ],
+        )
+        await conn.execute(_INDEX_UPSERT_SQL)
 
-            async with pool.acquire() as conn:
-                await conn.executemany(
-                    """
-                    INSERT INTO shop.product_embeddings
-                        (product_id, embedding, model, semantic_text, version, generated_at)
-                    VALUES ($1, $2::vector, $3, $4, $5, now())
-                    ON CONFLICT (product_id) DO UPDATE SET
-                        embedding     = EXCLUDED.embedding,
-                        model         = EXCLUDED.model,
-                        semantic_text = EXCLUDED.semantic_text,
-                        version       = EXCLUDED.version,
-                        generated_at  = now()
-                    """,
-                    records,
-                )
+    # ------------------------------------------------------------------
+    # Public: incremental re-embedding
+    # ------------------------------------------------------------------
 
-            self._indexing_status.indexed += len(batch)
-            logger.info(
-                f"Indexed {self._indexing_status.indexed}/{self._indexing_status.total}"
-            )
+    async def process_embedding_queue(self) -> int:
+        """
+        Drain shop.product_embedding_queue in batches; return how many
+        products were re-embedded. Queued products whose semantic text still
+        matches their stored hash are dequeued without an OpenAI call.
+        """
+        pool = await get_pool(self._catalog.name)
+        stats = self._queue_stats
+        reembedded = 0
+        async with pool.acquire() as conn:
+            await conn.execute(_INDEX_STAGE_SQL)
+            while True:
+                ids: list = []
+                try:
+                    # 1. Claim (committed on its own: no lock outlives this statement)
+                    queued = await conn.fetch(
+                        _QUEUE_CLAIM_SQL,
+                        max(settings.index_batch_size, 1),
+                        _QUEUE_MAX_ATTEMPTS,
+                        float(_QUEUE_CLAIM_SECONDS),
+                    )
+                    if not queued:
+                        break
+                    ids = [r["product_id"] for r in queued]
+                    sql, args = _indexing_candidates_query(ids, False, self._embedding_version)
+                    rows = await conn.fetch(sql, *args)
+                    # 2. Embed with no transaction open
+                    vectors: list[list[float]] = []
+                    if rows:
+                        vectors = await self._embedder.generate_embeddings([_embedding_text(r) for r in rows])
+                        if len(vectors) != len(rows):
+                            raise ValueError(f"{len(vectors)} vectors for {len(rows)} texts")
+                    # 3. Write and dequeue what was not edited meanwhile
+                    async with conn.transaction():
+                        if rows:
+                            await self._write_batch(conn, rows, vectors)
+                        await conn.execute(_QUEUE_DONE_SQL, ids, [r["enqueued_at"] for r in queued])
+                        await conn.execute(_QUEUE_RELEASE_SQL, ids)
+                except Exception as exc:
+                    logger.error(f"Embedding queue batch failed: {exc}")
+                    stats["failed_batches"] += 1
+                    if ids:
+                        await conn.execute(_QUEUE_FAILED_SQL, ids, str(exc)[:500])
+                    break    # retried on the next notification or poll
+
+                lag = time.time() - min(r["enqueued_at"] for r in queued).timestamp()
+                stats["dequeued"] += len(ids)
+                stats["reembedded"] += len(rows)
+                stats["unchanged"] += len(ids) - len(rows)
+                stats["last_lag_seconds"] = round(lag, 1)
+                stats["max_lag_seconds"] = max(stats["max_lag_seconds"] or 0.0, round(lag, 1))
+                reembedded += len(rows)
+                if rows:
+                    self._results.invalidate(self._catalog.namespace)
+                    self._replica_changed()
+                    logger.info(
+                        f"Re-embedded {len(rows)} edited products "
+                        f"({len(ids) - len(rows)} unchanged, lag {lag:.1f}s)"
+                    )
+        stats["last_drain_at"] = time.time()
+        return reembedded
+
+    async def process_store_queue(self) -> int:
+        """
+        Recompute the vectors of the stores in shop.store_embedding_queue;
+        return how many were refreshed. Centroids come from stored product
+        embeddings; only a changed store profile costs an embeddings call.
+        Stores left without searchable products lose their row.
+        """
+        pool = await get_pool(self._catalog.name)
+        profile_weight = settings.store_profile_weight
+        refreshed = 0
+        async with pool.acquire() as conn:
+            while True:
+                ids: list = []
+                try:
+                    # 1. Claim (committed on its own), 2. read centroids and embed
+                    # changed profiles with no transaction open
+                    queued = await conn.fetch(
+                        _STORE_QUEUE_CLAIM_SQL,
+                        max(settings.index_batch_size, 1),
+                        _QUEUE_MAX_ATTEMPTS,
+                        float(_QUEUE_CLAIM_SECONDS),
+                    )
+                    if not queued:
+                        break
+                    ids = [r["store_id"] for r in queued]
+                    rows = [
+                        r for r in await conn.fetch(_STORE_CENTROID_SQL, ids, _STORE_OUT_OF_STOCK_WEIGHT)
+                        if r["centroid"] is not None
+                    ]
+
+                    profiles = {r["store_id"]: r["profile_embedding"] for r in rows}
+                    if profile_weight > 0:
+                        stale = [
+                            r for r in rows
+                            if r["profile_embedding"] is None
+                            or r["content_hash"] != _content_hash(r["profile_text"])
+                        ]
+                        if stale:
+                            vectors = await self._embedder.generate_embeddings(
+                                [r["profile_text"] for r in stale]
+                            )
+                            profiles.update(zip((r["store_id"] for r in stale), vectors))
+
+                    # 3. Write and dequeue the stores not re-enqueued meanwhile
+                    async with conn.transaction():
+                        await conn.executemany(
+                            _STORE_EMBEDDING_UPSERT_SQL,
+                            [
+                                (
+                                    r["store_id"],
+                                    _store_vector(list(r["centroid"]), profiles[r["store_id"]], profile_weight),
+                                    self._embedder.model,
+                                    r["profile_text"],
+                                    self._embedding_version,
+                                    r["product_count"],
+                                    r["craft_name"],
+                                    profiles[r["store_id"]],
+                                    _content_hash(r["profile_text"]) if profiles[r["store_id"]] is not None else None,
+                                )
+                                for r in rows
+                            ],
+                        )
+                        kept = {r["store_id"] for r in rows}
+                        await conn.execute(_STORE_EMBEDDING_DELETE_SQL, [i for i in ids if i not in kept])
+                        await conn.execute(_STORE_QUEUE_DONE_SQL, ids, [r["enqueued_at"] for r in queued])
+                        await conn.execute(_STORE_QUEUE_RELEASE_SQL, ids)
+                except Exception as exc:
+                    logger.error(f"Store embedding queue batch failed: {exc}")
+                    self._queue_stats["failed_batches"] += 1
+                    if ids:
+                        await conn.execute(_STORE_QUEUE_FAILED_SQL, ids, str(exc)[:500])
+                    break
+
+                refreshed += len(rows)
+                self._queue_stats["stores_refreshed"] += len(rows)
+                logger.info(f"Refreshed {len(rows)} store vectors ({len(ids) - len(rows)} removed)")
+        return refreshed
+
+    async def queue_status(self) -> dict:
+        pool = await get_pool(self._catalog.name)
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(_QUEUE_DEPTH_SQL, _QUEUE_MAX_ATTEMPTS)
+            stores = await conn.fetchrow(_STORE_QUEUE_DEPTH_SQL, _QUEUE_MAX_ATTEMPTS)
+        return {
+            "pending": row["pending"],
+            "failed": row["failed"],
+            "oldest_pending_seconds": round(float(row["oldest_seconds"]), 1) if row["oldest_seconds"] is not None else None,
+            "stores_pending": stores["pending"],
+            "stores_failed": stores["failed"],
+            "listening": self._listener is not None and not self._listener.is_closed(),
+            **self._queue_stats,
+        }
+
+    def _schedule_drain(self) -> None:
+        # Single flight: notifications arriving mid-drain trigger one more pass
+        self._drain_requested = True
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._background_drain())
+
+    async def _background_drain(self) -> None:
+        while self._drain_requested:
+            self._drain_requested = False
+            try:
+                await self.process_embedding_queue()
+                # Re-embedded products enqueued their stores
+                await self.process_store_queue()
+            except Exception as exc:
+                # e.g. queue table not migrated yet; the poll retries
+                logger.warning(f"Embedding queue drain failed: {exc}")
+                return
+
+    async def _poll_queue(self) -> None:
+        """Fallback for missed notifications; also re-subscribes a lost listener."""
+        while True:
+            await asyncio.sleep(settings.embedding_queue_poll_seconds)
+            if self._listener is None or self._listener.is_closed():
+                await self._listen()
+            self._schedule_drain()
+
+    async def _listen(self) -> None:
+        if not self._catalog.dsn:
+            return
+        try:
+            self._listener = await asyncpg.connect(dsn=self._catalog.dsn)
+            await self._listener.add_listener(_QUEUE_CHANNEL, self._on_notify)
+            await self._listener.add_listener(_STORE_QUEUE_CHANNEL, self._on_notify)
+            logger.info(f"Semantic search: listening on '{_QUEUE_CHANNEL}' and '{_STORE_QUEUE_CHANNEL}'")
+        except Exception as exc:
+            self._listener = None
+            logger.warning(f"Semantic search: LISTEN unavailable, polling the embedding queue: {exc}")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+        self._debounce_handle = asyncio.get_running_loop().call_later(
+            _QUEUE_DEBOUNCE_SECONDS, self._schedule_drain
+        )
 
     # ------------------------------------------------------------------
     # Public: indexing status
@@ -468,7 +1891,18 @@ class SemanticSearchService:
 
 
 # ---------------------------------------------------------------------------
-# Singleton
+# Registry
 # ---------------------------------------------------------------------------
 
-semantic_search_service = SemanticSearchService()
+_services: dict[str, SemanticSearchService] = {}
+
+
+def get_search_service(catalog: str = DEFAULT_CATALOG) -> SemanticSearchService:
+    """Search service of a registered catalog (KeyError if unknown), created on first use."""
+    if catalog not in _services:
+        _services[catalog] = SemanticSearchService(catalog)
+    return _services[catalog]
+
+
+semantic_search_service = get_search_service(DEFAULT_CATALOG)
+
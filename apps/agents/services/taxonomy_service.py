@@ -0,0 +1,702 @@
+"""
+Taxonomy Service.
+
+In-process, indexed copy of the catalog taxonomy (categories, crafts,
+materials, techniques) shared by the product creation flow and the
+WhatsApp bot.
+
+Responsibilities:
+  - Load all taxonomy tables with one concurrent fetch (at startup)
+  - O(1) lookups by id, slug and accent-insensitive normalized name
+  - Trigram fuzzy matching (pg_trgm-style similarity) to map free-text LLM
+    output to canonical taxonomy entries
+  - Stay fresh: TTL with stale-while-revalidate, plus LISTEN taxonomy_changed
+    (triggers from the AddTaxonomyChangeNotifications migration) for
+    immediate refresh; the crafts in use come from product data, which does
+    not notify, so they are re-read on their own shorter TTL
+  - Candidate retrieval for LLM prompts: crafts, materials and techniques are
+    embedded once into taxonomy.taxonomy_embeddings (re-embedded only when
+    their text changes) and a product text retrieves the top-K of each kind
+
+Database backend: CATALOG_DB_URL pool (falls back to AGENTS_DB_URL, which
+points at the same database in every environment).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field, replace
+
+import asyncpg
+
+from src.api.config import settings
+from src.services.embedding_service import embedding_service
+from src.utils.enhanced_logger import create_enhanced_logger
+
+logger = create_enhanced_logger(__name__)
+
+KINDS = ("categories", "crafts", "materials", "techniques")
+
+# Kinds with vectors in taxonomy.taxonomy_embeddings. Top-level categories are
+# a handful of rows and always go to the LLM in full.
+EMBEDDED_KINDS = ("crafts", "materials", "techniques")
+
+_NOTIFY_CHANNEL = "taxonomy_changed"
+
+# Notifications arrive once per statement; bursts (seed scripts, admin bulk
+# edits) are coalesced into a single reload.
+_NOTIFY_DEBOUNCE_SECONDS = 1.0
+
+# LISTEN connection retries (DB down at startup, restart, failover) from the
+# refresh paths, at most this often
+_LISTEN_RETRY_SECONDS = 60.0
+
+# Crafts in use follow product publishing, not taxonomy edits
+_CRAFTS_IN_USE_TTL_SECONDS = 60.0
+
+_DEFAULT_MIN_SIMILARITY = 0.3  # pg_trgm's default similarity_threshold
+
+_EMBEDDING_BATCH_SIZE = 256
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+_CATEGORIES_SQL = """
+SELECT id::text, name, slug, parent_id::text
+FROM taxonomy.categories
+WHERE is_active = true
+ORDER BY parent_id NULLS FIRST, display_order
+"""
+
+_CRAFTS_SQL = """
+SELECT id::text, name, category_id::text
+FROM taxonomy.crafts
+WHERE status = 'approved' AND is_active = true
+ORDER BY name
+"""
+
+_MATERIALS_SQL = """
+SELECT id::text, name
+FROM taxonomy.materials
+WHERE status = 'approved'
+ORDER BY name
+"""
+
+_TECHNIQUES_SQL = """
+SELECT id::text, name, craft_id::text
+FROM taxonomy.techniques
+WHERE status = 'approved'
+ORDER BY name
+"""
+
+# Crafts that currently have at least one published product (WhatsApp ask_materials)
+_CRAFTS_IN_USE_SQL = """
+SELECT DISTINCT pai.primary_craft_id::text AS craft_id
+FROM shop.product_artisanal_identity pai
+JOIN shop.products_core pc ON pc.id = pai.product_id
+WHERE pc.deleted_at IS NULL
+  AND pai.primary_craft_id IS NOT NULL
+  AND pc.status IN ('published', 'approved', 'approved_with_edits')
+"""
+
+# ---------------------------------------------------------------------------
+# SQL: taxonomy embeddings
+# The vector parameter is sent as text and cast, so the same SQL works on the
+# catalog pool (pgvector codec registered) and the agents pool (no codec).
+# ---------------------------------------------------------------------------
+_EMBEDDING_HASHES_SQL = """
+SELECT kind, taxonomy_id::text AS id, content_hash
+FROM taxonomy.taxonomy_embeddings
+"""
+
+_UPSERT_EMBEDDING_SQL = """
+INSERT INTO taxonomy.taxonomy_embeddings
+    (kind, taxonomy_id, embedding, model, semantic_text, content_hash, generated_at)
+VALUES ($1, $2::uuid, $3::text::vector, $4, $5, $6, now())
+ON CONFLICT (kind, taxonomy_id) DO UPDATE SET
+    embedding     = EXCLUDED.embedding,
+    model         = EXCLUDED.model,
+    semantic_text = EXCLUDED.semantic_text,
+    content_hash  = EXCLUDED.content_hash,
+    generated_at  = now()
+"""
+
+_DELETE_STALE_EMBEDDINGS_SQL = """
+DELETE FROM taxonomy.taxonomy_embeddings
+WHERE kind = $1 AND taxonomy_id <> ALL($2::uuid[])
+"""
+
+_EMBEDDING_COUNTS_SQL = """
+SELECT kind, COUNT(*) AS n
+FROM taxonomy.taxonomy_embeddings
+GROUP BY kind
+"""
+
+# Exact top-K per kind: a few thousand rows, ranked in one scan.
+_NEAREST_SQL = """
+SELECT kind, id
+FROM (
+    SELECT kind,
+           taxonomy_id::text AS id,
+           ROW_NUMBER() OVER (
+               PARTITION BY kind ORDER BY embedding <=> $1::text::vector
+           ) AS rank
+    FROM taxonomy.taxonomy_embeddings
+    WHERE kind = ANY($2::text[])
+) ranked
+WHERE rank <= $3
+ORDER BY kind, rank
+"""
+
+
+def _vec_to_pg(embedding: list[float]) -> str:
+    return "[" + ",".join(str(v) for v in embedding) + "]"
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation: 'Cerámica  Fina' -> 'ceramica fina'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM_RE.sub(" ", ascii_text).strip()
+
+
+def slugify(text: str) -> str:
+    return normalize(text).replace(" ", "-")
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """pg_trgm trigrams: each word padded with two leading and one trailing space."""
+    grams: set[str] = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """pg_trgm similarity(): shared trigrams over the union."""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+# ---------------------------------------------------------------------------
+# Data classes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TaxonomyMatch:
+    kind: str
+    item: dict
+    score: float        # 1.0 for id/slug/name hits, trigram similarity otherwise
+    matched_by: str     # "id" | "slug" | "name" | "fuzzy"
+
+    @property
+    def id(self) -> str:
+        return self.item["id"]
+
+    @property
+    def name(self) -> str:
+        return self.item["name"]
+
+
+@dataclass
+class _KindIndex:
+    items: list[dict] = field(default_factory=list)
+    by_id: dict[str, dict] = field(default_factory=dict)
+    by_slug: dict[str, dict] = field(default_factory=dict)
+    by_name: dict[str, dict] = field(default_factory=dict)
+    grams: dict[str, frozenset[str]] = field(default_factory=dict)       # id -> trigrams
+    postings: dict[str, set[str]] = field(default_factory=dict)          # trigram -> ids
+
+    @classmethod
+    def build(cls, items: list[dict]) -> "_KindIndex":
+        index = cls(items=items)
+        for item in items:
+            item_id = item["id"]
+            index.by_id[item_id] = item
+            # Only categories carry a slug column; the rest get a derived one
+            index.by_slug.setdefault(item.get("slug") or slugify(item["name"]), item)
+            index.by_name.setdefault(normalize(item["name"]), item)
+            grams = trigrams(item["name"])
+            index.grams[item_id] = grams
+            for gram in grams:
+                index.postings.setdefault(gram, set()).add(item_id)
+        return index
+
+
+@dataclass
+class TaxonomySnapshot:
+    """Immutable, indexed view of the taxonomy at load time."""
+
+    loaded_at: float
+    indexes: dict[str, _KindIndex]
+    crafts_in_use: list[str]    # craft ids with published products
+    crafts_in_use_at: float = 0.0   # monotonic; re-read every _CRAFTS_IN_USE_TTL_SECONDS
+
+    @property
+    def categories(self) -> list[dict]:
+        return self.indexes["categories"].items
+
+    @property
+    def top_level_categories(self) -> list[dict]:
+        return [c for c in self.categories if not c.get("parent_id")]
+
+    @property
+    def crafts(self) -> list[dict]:
+        return self.indexes["crafts"].items
+
+    @property
+    def materials(self) -> list[dict]:
+        return self.indexes["materials"].items
+
+    @property
+    def techniques(self) -> list[dict]:
+        return self.indexes["techniques"].items
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, kind: str, item_id: str) -> dict | None:
+        return self.indexes[kind].by_id.get(item_id)
+
+    def get_by_slug(self, kind: str, slug: str) -> dict | None:
+        return self.indexes[kind].by_slug.get(slug)
+
+    def get_by_name(self, kind: str, name: str) -> dict | None:
+        return self.indexes[kind].by_name.get(normalize(name))
+
+    def search(
+        self,
+        kind: str,
+        text: str,
+        limit: int = 5,
+        min_similarity: float = _DEFAULT_MIN_SIMILARITY,
+    ) -> list[TaxonomyMatch]:
+        """Fuzzy trigram search; only entries sharing a trigram with text are scored."""
+        index = self.indexes[kind]
+        query = trigrams(text)
+        candidates: set[str] = set()
+        for gram in query:
+            candidates |= index.postings.get(gram, set())
+        scored = []
+        for item_id in candidates:
+            score = similarity(query, index.grams[item_id])
+            if score >= min_similarity:
+                scored.append(TaxonomyMatch(kind, index.by_id[item_id], round(score, 4), "fuzzy"))
+        scored.sort(key=lambda m: (-m.score, m.name))
+        return scored[:limit]
+
+    def resolve(
+        self,
+        kind: str,
+        *values: str | None,
+        min_similarity: float = _DEFAULT_MIN_SIMILARITY,
+        predicate=None,
+    ) -> TaxonomyMatch | None:
+        """
+        Map free-form values (an id, a slug or a name, e.g. an LLM suggestion's
+        value and label) to a canonical entry: exact id, then slug, then
+        normalized name, then the best fuzzy match across all values.
+        `predicate` restricts acceptable entries (e.g. top-level categories).
+        """
+        accept = predicate or (lambda item: True)
+        index = self.indexes[kind]
+        texts = [str(v) for v in values if v]
+
+        for text in texts:
+            for matched_by, item in (
+                ("id", index.by_id.get(text)),
+                ("slug", index.by_slug.get(text.strip().lower())),
+                ("name", index.by_name.get(normalize(text))),
+            ):
+                if item is not None and accept(item):
+                    return TaxonomyMatch(kind, item, 1.0, matched_by)
+
+        best: TaxonomyMatch | None = None
+        for text in texts:
+            for match in self.search(kind, text, limit=10, min_similarity=min_similarity):
+                if accept(match.item) and (best is None or match.score > best.score):
+                    best = match
+                    break
+        return best
+
+    def craft_names_in_use(self) -> list[str]:
+        crafts = self.indexes["crafts"].by_id
+        return sorted({crafts[i]["name"] for i in self.crafts_in_use if i in crafts})
+
+    def mentioned(self, kind: str, text: str) -> list[dict]:
+        """Entries whose normalized name appears as whole words in text."""
+        padded = f" {normalize(text)} "
+        return [item for name, item in self.indexes[kind].by_name.items() if f" {name} " in padded]
+
+    # ------------------------------------------------------------------
+    # Embedding text
+    # ------------------------------------------------------------------
+
+    def embedding_text(self, kind: str, item: dict) -> str:
+        """Text embedded for a taxonomy entry, with its parent for context."""
+        if kind == "crafts":
+            category = self.get("categories", item.get("category_id") or "")
+            suffix = f". Categoría: {category['name']}" if category else ""
+            return f"Oficio artesanal: {item['name']}{suffix}"
+        if kind == "techniques":
+            craft = self.get("crafts", item.get("craft_id") or "")
+            suffix = f". Oficio: {craft['name']}" if craft else ""
+            return f"Técnica artesanal: {item['name']}{suffix}"
+        return f"Material artesanal: {item['name']}"
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+class TaxonomyService:
+    """Keeps a TaxonomySnapshot loaded and fresh."""
+
+    def __init__(self, ttl_seconds: int | None = None) -> None:
+        self._ttl = ttl_seconds if ttl_seconds is not None else settings.taxonomy_cache_ttl_seconds
+        self._snapshot: TaxonomySnapshot | None = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_requested = False
+        self._listener: asyncpg.Connection | None = None
+        self._listen_attempted_at = float("-inf")
+        self._in_use_task: asyncio.Task | None = None
+        self._debounce_handle: asyncio.TimerHandle | None = None
+        self._reloads = 0
+        self._sync_task: asyncio.Task | None = None
+        self._sync_requested = False
+        self._embedded: dict[str, int] = {}     # kind -> rows in taxonomy_embeddings
+
+    # ------------------------------------------------------------------
+    # Public: lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Load the taxonomy and subscribe to change notifications (app startup)."""
+        await self.refresh()
+
+    async def stop(self) -> None:
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+        for task in (self._refresh_task, self._sync_task, self._in_use_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
+        self._listener = None
+
+    # ------------------------------------------------------------------
+    # Public: access
+    # ------------------------------------------------------------------
+
+    async def get_snapshot(self) -> TaxonomySnapshot:
+        """
+        Return the current snapshot. The first call loads synchronously; after
+        that an expired snapshot is still served while a reload runs in the
+        background, so callers never wait on the database.
+        """
+        if self._snapshot is None:
+            async with self._load_lock:
+                # Concurrent first callers share one load
+                if self._snapshot is None:
+                    await self._reload_locked()
+        elif self._ttl and time.monotonic() - self._snapshot.loaded_at > self._ttl:
+            self._schedule_refresh()
+        elif time.monotonic() - self._snapshot.crafts_in_use_at > _CRAFTS_IN_USE_TTL_SECONDS:
+            self._schedule_in_use_refresh()
+        return self._snapshot
+
+    async def refresh(self) -> TaxonomySnapshot:
+        """Reload now."""
+        async with self._load_lock:
+            await self._reload_locked()
+        await self._ensure_listener()
+        return self._snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "counts": {k: len(snapshot.indexes[k].items) for k in KINDS} if snapshot else {},
+            "crafts_in_use": len(snapshot.crafts_in_use) if snapshot else 0,
+            "reloads": self._reloads,
+            "listening": self._listener is not None and not self._listener.is_closed(),
+            "ttl_seconds": self._ttl,
+            "embedded": dict(self._embedded),
+            "prefilter_top_k": settings.taxonomy_prefilter_top_k,
+        }
+
+    # ------------------------------------------------------------------
+    # Public: candidate retrieval
+    # ------------------------------------------------------------------
+
+    async def candidates(
+        self,
+        snapshot: TaxonomySnapshot,
+        text: str,
+        top_k: int | None = None,
+        kinds: tuple[str, ...] = EMBEDDED_KINDS,
+    ) -> dict[str, list[dict]] | None:
+        """
+        Entries of each kind closest to text (e.g. a product's name, description
+        and history), for prompts that would otherwise list the whole taxonomy.
+
+        Entries whose name the text mentions verbatim are always included, so an
+        explicit "werregue" does not depend on embedding recall. A kind without
+        stored vectors is returned in full. Returns None when prefiltering is
+        disabled or unavailable; callers then fall back to the full lists.
+        """
+        top_k = settings.taxonomy_prefilter_top_k if top_k is None else top_k
+        if top_k <= 0 or not text.strip() or not any(self._embedded.get(k) for k in kinds):
+            return None
+
+        try:
+            vector = await embedding_service.generate_embedding(text)
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(_NEAREST_SQL, _vec_to_pg(vector), list(kinds), top_k)
+        except Exception as exc:
+            logger.warning(f"Taxonomy candidate retrieval failed, using full taxonomy: {exc}")
+            return None
+
+        nearest: dict[str, list[str]] = {kind: [] for kind in kinds}
+        for row in rows:
+            nearest[row["kind"]].append(row["id"])
+
+        result: dict[str, list[dict]] = {}
+        for kind in kinds:
+            if not self._embedded.get(kind):
+                result[kind] = list(snapshot.indexes[kind].items)
+                continue
+            items = snapshot.mentioned(kind, text)
+            seen = {item["id"] for item in items}
+            for item_id in nearest[kind]:
+                item = snapshot.get(kind, item_id)
+                # Rows for entries removed since the last sync are skipped
+                if item is not None and item_id not in seen:
+                    seen.add(item_id)
+                    items.append(item)
+            result[kind] = items
+        return result
+
+    async def sync_embeddings(self) -> dict[str, int]:
+        """
+        Embed new or changed crafts/materials/techniques and drop rows for
+        entries no longer in the taxonomy. Unchanged entries (same text and
+        model) are not re-embedded. Returns the number of rows embedded per kind.
+        """
+        snapshot = await self.get_snapshot()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            stored = {(r["kind"], r["id"]): r["content_hash"] for r in await conn.fetch(_EMBEDDING_HASHES_SQL)}
+
+        pending: list[tuple[str, str, str, str]] = []   # kind, id, text, hash
+        for kind in EMBEDDED_KINDS:
+            for item in snapshot.indexes[kind].items:
+                text = snapshot.embedding_text(kind, item)
+                content_hash = hashlib.md5(
+                    f"{embedding_service.model}:{embedding_service.dimensions}:{text}".encode()
+                ).hexdigest()
+                if stored.get((kind, item["id"])) != content_hash:
+                    pending.append((kind, item["id"], text, content_hash))
+
+        embedded = {kind: 0 for kind in EMBEDDED_KINDS}
+        for start in range(0, len(pending), _EMBEDDING_BATCH_SIZE):
+            batch = pending[start:start + _EMBEDDING_BATCH_SIZE]
+            vectors = await embedding_service.generate_embeddings([text for _, _, text, _ in batch])
+            async with pool.acquire() as conn:
+                await conn.executemany(
+                    _UPSERT_EMBEDDING_SQL,
+                    [
+                        (kind, item_id, _vec_to_pg(vector), embedding_service.model, text, content_hash)
+                        for (kind, item_id, text, content_hash), vector in zip(batch, vectors)
+                    ],
+                )
+            for kind, *_ in batch:
+                embedded[kind] += 1
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for kind in EMBEDDED_KINDS:
+                    await conn.execute(
+                        _DELETE_STALE_EMBEDDINGS_SQL, kind, list(snapshot.indexes[kind].by_id)
+                    )
+            self._embedded = {r["kind"]: r["n"] for r in await conn.fetch(_EMBEDDING_COUNTS_SQL)}
+
+        if pending:
+            logger.info(f"Taxonomy embeddings synced: {embedded}")
+        return embedded
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if settings.catalog_db_url:
+            from src.database.pg_client import get_pool
+            return await get_pool()
+        from src.database.supabase_client import db
+        return await db._get_pool()
+
+    async def _load(self) -> TaxonomySnapshot:
+        pool = await self._get_pool()
+        start = time.perf_counter()
+
+        async def fetch(sql: str) -> list[dict]:
+            async with pool.acquire() as conn:
+                return [dict(r) for r in await conn.fetch(sql)]
+
+        async def fetch_in_use() -> list[str]:
+            try:
+                return [r["craft_id"] for r in await fetch(_CRAFTS_IN_USE_SQL)]
+            except Exception as exc:
+                logger.warning(f"Taxonomy: could not load crafts in use: {exc}")
+                return []
+
+        categories, crafts, materials, techniques, in_use = await asyncio.gather(
+            fetch(_CATEGORIES_SQL),
+            fetch(_CRAFTS_SQL),
+            fetch(_MATERIALS_SQL),
+            fetch(_TECHNIQUES_SQL),
+            fetch_in_use(),
+        )
+        snapshot = TaxonomySnapshot(
+            loaded_at=time.monotonic(),
+            indexes={
+                "categories": _KindIndex.build(categories),
+                "crafts": _KindIndex.build(crafts),
+                "materials": _KindIndex.build(materials),
+                "techniques": _KindIndex.build(techniques),
+            },
+            crafts_in_use=in_use,
+            crafts_in_use_at=time.monotonic(),
+        )
+        logger.info(
+            f"Taxonomy loaded in {(time.perf_counter() - start) * 1000:.0f}ms: "
+            f"{len(categories)} categories, {len(crafts)} crafts, "
+            f"{len(materials)} materials, {len(techniques)} techniques"
+        )
+        return snapshot
+
+    async def _reload_locked(self) -> None:
+        self._snapshot = await self._load()
+        self._reloads += 1
+        if settings.taxonomy_prefilter_top_k > 0:
+            self._schedule_embedding_sync()
+
+    def _schedule_refresh(self) -> None:
+        # A change notified while a reload is already running may not be in
+        # that reload's results, so flag it and let the task loop once more.
+        self._refresh_requested = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        while self._refresh_requested:
+            self._refresh_requested = False
+            try:
+                await self.refresh()
+            except Exception as exc:
+                # Keep serving the previous snapshot; the next access retries
+                logger.error(f"Taxonomy refresh failed: {exc}")
+                return
+
+    def _schedule_embedding_sync(self) -> None:
+        # Same single-flight pattern as _schedule_refresh: a reload landing
+        # mid-sync gets one more pass against the new snapshot.
+        self._sync_requested = True
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._background_sync())
+
+    async def _background_sync(self) -> None:
+        while self._sync_requested:
+            self._sync_requested = False
+            try:
+                await self.sync_embeddings()
+            except Exception as exc:
+                # e.g. table not migrated yet: prompts keep the full taxonomy
+                logger.warning(f"Taxonomy embedding sync failed: {exc}")
+                return
+
+    def _schedule_in_use_refresh(self) -> None:
+        if self._in_use_task is None or self._in_use_task.done():
+            self._in_use_task = asyncio.create_task(self._refresh_crafts_in_use())
+
+    async def _refresh_crafts_in_use(self) -> None:
+        in_use: list[str] | None = None
+        try:
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                in_use = [r["craft_id"] for r in await conn.fetch(_CRAFTS_IN_USE_SQL)]
+        except Exception as exc:
+            logger.warning(f"Taxonomy: could not refresh crafts in use: {exc}")
+        # Swap into whatever snapshot is current (a full reload may have landed meanwhile);
+        # on failure keep the old list until the next TTL
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self._snapshot = replace(
+                snapshot,
+                crafts_in_use=snapshot.crafts_in_use if in_use is None else in_use,
+                crafts_in_use_at=time.monotonic(),
+            )
+        await self._ensure_listener()
+
+    async def _ensure_listener(self) -> None:
+        # Never connected (DB down at startup) or lost the LISTEN connection
+        # (DB restart, failover): resubscribe, at most every _LISTEN_RETRY_SECONDS
+        if self._listener is not None and not self._listener.is_closed():
+            return
+        if time.monotonic() - self._listen_attempted_at < _LISTEN_RETRY_SECONDS:
+            return
+        await self._listen()
+
+    async def _listen(self) -> None:
+        dsn = settings.catalog_db_url or settings.agents_db_url
+        if not dsn:
+            return
+        self._listen_attempted_at = time.monotonic()
+        self._listener = None
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn=dsn)
+            await conn.add_listener(_NOTIFY_CHANNEL, self._on_notify)
+            self._listener = conn
+            logger.info(f"Taxonomy: listening on '{_NOTIFY_CHANNEL}'")
+        except Exception as exc:
+            if conn is not None:
+                # Connected but add_listener failed: close it, or every retry leaks one
+                try:
+                    await conn.close()
+                except Exception:
+                    conn.terminate()
+            logger.warning(f"Taxonomy: LISTEN unavailable, relying on TTL refresh: {exc}")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        logger.info(f"Taxonomy change notified ({payload}), reloading")
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+        self._debounce_handle = asyncio.get_running_loop().call_later(
+            _NOTIFY_DEBOUNCE_SECONDS, self._schedule_refresh
+        )
+
+
+# ---------------------------------------------------------------------------
+# Module-level singleton
+# ---------------------------------------------------------------------------
+taxonomy_service = TaxonomyService()
@@ -0,0 +1,422 @@
+"""
+Local vector replica for product search.
+
+An optional read replica of shop.product_embeddings on local disk, shared by
+every uvicorn worker on the host through mmap:
+
+    <VECTOR_REPLICA_DIR>/<catalog namespace>/
+        manifest.json        generation, signature, capacity, rows, change-feed position
+        vectors-<gen>.npy    float32 [capacity, dimensions], unit-normalized rows
+        ids-<gen>.npy        product ids (S36), b"" in free slots
+        lock                 flock: one writer at a time across processes
+
+Candidate generation is exact brute force, one matrix-vector product over
+the mapping (NumPy/BLAS, off the event loop), so the only Postgres
+round-trip of a search is the enrichment of the final product ids.
+Filtered searches keep running in Postgres.
+
+Writes:
+  - rebuild: stream every embedding into a new generation and publish it by
+    replacing manifest.json. Runs when there is no replica yet, when the
+    signature (model, dimensions, embedding version) changed and when the
+    spare capacity runs out.
+  - sync: read the rows written since the change-feed position
+    (product_embeddings.generated_at) and overwrite their slots in place or
+    append them to the spare capacity. Other workers see the rows at once
+    through the shared mapping and the new row count on their next manifest
+    check.
+
+Products removed from the catalog keep their slot until the next rebuild;
+enrichment only returns searchable products, so they never surface.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from src.api.config import settings
+from src.database.pg_client import CatalogConfig, get_pool
+from src.utils.enhanced_logger import create_enhanced_logger
+
+logger = create_enhanced_logger(__name__)
+
+# Spare slots for products created between rebuilds
+_CAPACITY_FACTOR = 1.25
+_CAPACITY_MIN_SPARE = 1024
+# Rows per change-feed read and per rebuild write
+_SYNC_BATCH_SIZE = 2000
+# The feed re-reads this much history before the start of the previous read,
+# so rows committed late with an earlier generated_at are not skipped
+# (rewriting a row is idempotent); a quiet catalog re-reads nothing once the
+# window has passed
+_FEED_OVERLAP_SECONDS = 300
+# How often a search re-checks manifest.json for a new generation or row count
+_MANIFEST_CHECK_SECONDS = 1.0
+
+# Keyset pages: each batch continues after the last (generated_at, product_id) read
+_FEED_SQL = """
+SELECT product_id::text AS product_id, embedding, generated_at
+FROM shop.product_embeddings
+WHERE (generated_at, product_id) > ($1, $2::uuid)
+ORDER BY generated_at, product_id
+LIMIT $3
+"""
+
+_FEED_START_ID = "00000000-0000-0000-0000-000000000000"
+
+_NOW_SQL = "SELECT now()"
+
+_SNAPSHOT_SQL = "SELECT COUNT(*) AS rows, now() AS read_at FROM shop.product_embeddings"
+
+_ALL_SQL = "SELECT product_id::text AS product_id, embedding FROM shop.product_embeddings"
+
+
+def _unit(vector: Any) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+def _parse_vector(value: Any) -> Any:
+    # Pools without the pgvector codec return the '[1,2,...]' text form
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _write_rows(vectors: np.ndarray, ids: np.ndarray, rows: int, batch: list) -> int:
+    """Append batch after the first rows slots (skipping other dimensions); returns the new row count."""
+    for r in batch:
+        vector = _unit(_parse_vector(r["embedding"]))
+        if len(vector) != vectors.shape[1]:
+            continue
+        vectors[rows] = vector
+        ids[rows] = r["product_id"].encode()
+        rows += 1
+    return rows
+
+
+def _slot_map(ids: np.ndarray, start: int, rows: int) -> dict[str, int]:
+    return {ids[i].decode(): i for i in range(start, rows)}
+
+
+@dataclass
+class _Mapping:
+    generation: int
+    signature: str
+    rows: int
+    vectors: np.ndarray
+    ids: np.ndarray
+
+
+class VectorReplica:
+    """mmap-shared product vectors of one catalog: brute-force candidates in-process."""
+
+    def __init__(self, catalog: CatalogConfig, signature: Callable[[], str]) -> None:
+        self._catalog = catalog
+        self._signature = signature
+        self._dir = Path(settings.vector_replica_dir) / catalog.namespace
+        self._mapping: _Mapping | None = None
+        self._manifest_mtime: float | None = None
+        self._checked_at = 0.0
+        # Writer side: product id -> slot of the current generation, covering
+        # its first _slots_rows rows (other workers append to the same generation)
+        self._slots: dict[str, int] = {}
+        self._slots_generation: int | None = None
+        self._slots_rows = 0
+        self._sync_task: asyncio.Task | None = None
+        self._sync_requested = False
+        self._poll_task: asyncio.Task | None = None
+        self._stats = {
+            "searches": 0,
+            "rebuilds": 0,
+            "synced_rows": 0,
+            "last_sync_at": None,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Build or catch up the replica now and every VECTOR_REPLICA_SYNC_SECONDS."""
+        self.schedule_sync()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        for task in (self._poll_task, self._sync_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+    def schedule_sync(self) -> None:
+        # Single flight: writes arriving mid-sync trigger one more pass
+        self._sync_requested = True
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._background_sync())
+
+    async def _background_sync(self) -> None:
+        while self._sync_requested:
+            self._sync_requested = False
+            try:
+                await self.sync()
+            except Exception as exc:
+                self._stats["last_error"] = str(exc)
+                logger.warning(f"Vector replica sync failed: {exc}")
+                return
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(max(settings.vector_replica_sync_seconds, 1))
+            self.schedule_sync()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def nearest(
+        self,
+        query_vector: list[float],
+        limit: int,
+        min_similarity: float,
+        after: tuple[float, str] | None = None,
+    ) -> list[tuple[str, float]] | None:
+        """
+        Top limit (product id, cosine similarity) pairs at or above
+        min_similarity, best first (ties by product id). after, a
+        (cosine distance, product id) keyset, skips every pair ranked up
+        to and including it. None when no replica with the current
+        signature is mapped (the caller searches Postgres instead).
+        """
+        mapping = self._current()
+        if mapping is None or mapping.signature != self._signature():
+            return None
+        self._stats["searches"] += 1
+        return await asyncio.to_thread(self._scan, mapping, query_vector, limit, min_similarity, after)
+
+    @staticmethod
+    def _scan(
+        mapping: _Mapping,
+        query_vector: list[float],
+        limit: int,
+        min_similarity: float,
+        after: tuple[float, str] | None = None,
+    ) -> list[tuple[str, float]]:
+        rows = mapping.rows
+        if rows == 0 or limit <= 0:
+            return []
+        scores = mapping.vectors[:rows] @ _unit(query_vector)
+        if after is not None:
+            similarity, product_id = 1 - after[0], after[1].encode()
+            ids = mapping.ids[:rows]
+            ranked_after = (scores < similarity) | ((scores == similarity) & (ids > product_id))
+            scores[~ranked_after | (ids == product_id)] = -np.inf
+        k = min(limit, rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((mapping.ids[top], -scores[top]))]
+        return [
+            (mapping.ids[i].decode(), float(scores[i]))
+            for i in top
+            if scores[i] >= min_similarity and mapping.ids[i]
+        ]
+
+    def _current(self) -> _Mapping | None:
+        now = time.monotonic()
+        if now - self._checked_at < _MANIFEST_CHECK_SECONDS:
+            return self._mapping
+        self._checked_at = now
+        try:
+            mtime = (self._dir / "manifest.json").stat().st_mtime
+        except FileNotFoundError:
+            self._mapping = None
+            return None
+        if mtime != self._manifest_mtime:
+            try:
+                self._map(self._read_manifest())
+                self._manifest_mtime = mtime
+            except Exception as exc:
+                # Mid-publish or a missing generation; retried on the next check
+                logger.warning(f"Vector replica not mapped: {exc}")
+        return self._mapping
+
+    def _map(self, manifest: dict) -> None:
+        generation = manifest["generation"]
+        if self._mapping is not None and self._mapping.generation == generation:
+            self._mapping.rows = manifest["rows"]
+            self._mapping.signature = manifest["signature"]
+            return
+        self._mapping = _Mapping(
+            generation=generation,
+            signature=manifest["signature"],
+            rows=manifest["rows"],
+            vectors=np.load(self._dir / f"vectors-{generation}.npy", mmap_mode="r"),
+            ids=np.load(self._dir / f"ids-{generation}.npy", mmap_mode="r"),
+        )
+
+    def _read_manifest(self) -> dict:
+        return json.loads((self._dir / "manifest.json").read_text())
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp = self._dir / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self._dir / "manifest.json")
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    async def sync(self, force_rebuild: bool = False) -> None:
+        """Apply the change feed (or rebuild); skipped while another process writes."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open(self._dir / "lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                manifest = self._read_manifest() if (self._dir / "manifest.json").exists() else None
+                if force_rebuild or manifest is None or manifest["signature"] != self._signature():
+                    await self.rebuild()
+                elif not await self._apply_feed(manifest):
+                    await self.rebuild()
+                self._stats["last_sync_at"] = time.time()
+                self._stats["last_error"] = None
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    async def rebuild(self) -> None:
+        """Write every stored embedding into a new generation and publish it (caller holds the lock)."""
+        signature = self._signature()
+        started = time.perf_counter()
+        previous = self._read_manifest() if (self._dir / "manifest.json").exists() else None
+        generation = (previous["generation"] + 1) if previous else 1
+
+        pool = await get_pool(self._catalog.name)
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True, isolation="repeatable_read"):
+                snapshot = await conn.fetchrow(_SNAPSHOT_SQL)
+                capacity = int(snapshot["rows"] * _CAPACITY_FACTOR) + _CAPACITY_MIN_SPARE
+                vectors = ids = None
+                rows = 0
+                cursor = await conn.cursor(_ALL_SQL)
+                # Parsing, normalizing and writing run off the event loop, one batch at a time
+                while batch := await cursor.fetch(_SYNC_BATCH_SIZE):
+                    if vectors is None:
+                        dimensions = len(_parse_vector(batch[0]["embedding"]))
+                        vectors, ids = await asyncio.to_thread(self._open_generation, generation, capacity, dimensions)
+                    rows = await asyncio.to_thread(_write_rows, vectors, ids, rows, batch)
+
+        if vectors is None:
+            logger.info("Vector replica: no product embeddings yet")
+            return
+        await asyncio.to_thread(vectors.flush)
+        await asyncio.to_thread(ids.flush)
+        self._write_manifest({
+            "generation": generation,
+            "signature": signature,
+            "dimensions": int(vectors.shape[1]),
+            "capacity": capacity,
+            "rows": rows,
+            "feed_after": snapshot["read_at"].timestamp() - _FEED_OVERLAP_SECONDS,
+            "built_at": time.time(),
+        })
+        # Workers still mapping the old files keep them until they remap (unlinked inodes stay valid)
+        for old in self._dir.glob("*.npy"):
+            if not old.name.endswith(f"-{generation}.npy"):
+                old.unlink(missing_ok=True)
+        self._stats["rebuilds"] += 1
+        logger.info(
+            f"Vector replica generation {generation}: {rows} products "
+            f"in {time.perf_counter() - started:.1f}s ({self._dir})"
+        )
+
+    def _open_generation(self, generation: int, capacity: int, dimensions: int) -> tuple[np.ndarray, np.ndarray]:
+        vectors = np.lib.format.open_memmap(
+            self._dir / f"vectors-{generation}.npy", mode="w+", dtype=np.float32, shape=(capacity, dimensions),
+        )
+        ids = np.lib.format.open_memmap(
+            self._dir / f"ids-{generation}.npy", mode="w+", dtype="S36", shape=(capacity,),
+        )
+        return vectors, ids
+
+    async def _apply_feed(self, manifest: dict) -> bool:
+        """Write the rows changed since the feed position in place; False when a rebuild is needed."""
+        generation = manifest["generation"]
+        vectors = np.load(self._dir / f"vectors-{generation}.npy", mmap_mode="r+")
+        ids = np.load(self._dir / f"ids-{generation}.npy", mmap_mode="r+")
+        rows = manifest["rows"]
+        # Decoding a slot map is one Python call per row: off the event loop
+        if self._slots_generation != generation or self._slots_rows > rows:
+            self._slots = await asyncio.to_thread(_slot_map, ids, 0, rows)
+            self._slots_generation = generation
+        else:
+            # Rows appended by other workers since this map was last brought up to date
+            self._slots.update(await asyncio.to_thread(_slot_map, ids, self._slots_rows, rows))
+        self._slots_rows = rows
+
+        after = (datetime.fromtimestamp(manifest["feed_after"], tz=timezone.utc), _FEED_START_ID)
+        synced = 0
+        pool = await get_pool(self._catalog.name)
+        async with pool.acquire() as conn:
+            read_started = await conn.fetchval(_NOW_SQL)
+            while True:
+                batch = await conn.fetch(_FEED_SQL, *after, _SYNC_BATCH_SIZE)
+                if not batch:
+                    break
+                rows = await asyncio.to_thread(self._apply_batch, vectors, ids, rows, batch)
+                if rows is None:
+                    return False
+                self._slots_rows = rows
+                synced += len(batch)
+                after = (batch[-1]["generated_at"], batch[-1]["product_id"])
+                if len(batch) < _SYNC_BATCH_SIZE:
+                    break
+
+        if synced:
+            await asyncio.to_thread(vectors.flush)
+            await asyncio.to_thread(ids.flush)
+        feed_after = max(manifest["feed_after"], read_started.timestamp() - _FEED_OVERLAP_SECONDS)
+        if rows != manifest["rows"] or feed_after != manifest["feed_after"]:
+            self._write_manifest({**manifest, "rows": rows, "feed_after": feed_after})
+        self._stats["synced_rows"] += synced
+        return True
+
+    def _apply_batch(self, vectors: np.ndarray, ids: np.ndarray, rows: int, batch: list) -> int | None:
+        """Overwrite or append one feed batch (in a worker thread); the new row count, None when a rebuild is needed."""
+        for r in batch:
+            vector = _unit(_parse_vector(r["embedding"]))
+            if len(vector) != vectors.shape[1]:
+                return None
+            slot = self._slots.get(r["product_id"])
+            if slot is None:
+                if rows == vectors.shape[0]:
+                    return None
+                slot = rows
+                ids[slot] = r["product_id"].encode()
+                self._slots[r["product_id"]] = slot
+                rows += 1
+            vectors[slot] = vector
+        return rows
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        mapping = self._current()
+        return {
+            "path": str(self._dir),
+            "generation": mapping.generation if mapping else None,
+            "rows": mapping.rows if mapping else 0,
+            "current": mapping is not None and mapping.signature == self._signature(),
+            **self._stats,
+        }
@@ -1,7 +1,9 @@
 """
 In-memory per-user conversation history for the WhatsApp bot.
 
-Keeps the last 5 turns per phone number with a 30-minute idle TTL.
+Keeps the last 5 turns per phone number with a 30-minute idle TTL, plus
+the cursor of the last product search ("ver más"), which expires with the
+same TTL.
 This is intentionally simple (no persistence) — the process restart
 clears all history, which is acceptable for a stateless container.
 """
@@ -27,6 +29,8 @@ class ConversationMemory:
         self._ttl = timedelta(minutes=ttl_minutes)
         self._history: dict[str, deque] = defaultdict(lambda: deque(maxlen=self._max_turns))
         self._last_activity: dict[str, datetime] = {}
+        # phone -> (cursor, results already shown, set at)
+        self._search_cursors: dict[str, tuple[str, int, datetime]] = {}
 
     def add(self, phone: str, role: str, content: str) -> None:
         """Append a turn to the conversation history for *phone*."""
@@ -43,8 +47,7 @@ class ConversationMemory:
         """
         last = self._last_activity.get(phone)
         if last and datetime.now() - last > self._ttl:
-            self._history.pop(phone, None)
-            self._last_activity.pop(phone, None)
+            self.clear(phone)
             logger.debug("Cleared stale memory for %s...", phone[:10])
             return ""
 
@@ -57,10 +60,33 @@ class ConversationMemory:
             lines.append(f"{turn['role'].upper()}: {turn['content']}")
         return "\n".join(lines)
 
+    def set_search_cursor(self, phone: str, cursor: Optional[str], shown: int = 0) -> None:
+        """Remember the next page of *phone*'s last product search (None: no more pages)."""
+        now = datetime.now()
+        # Users who never come back would otherwise keep their cursor forever
+        for stale in [p for p, (_, _, at) in self._search_cursors.items() if now - at > self._ttl]:
+            del self._search_cursors[stale]
+        if cursor:
+            self._search_cursors[phone] = (cursor, shown, now)
+        else:
+            self._search_cursors.pop(phone, None)
+
+    def get_search_cursor(self, phone: str) -> Optional[tuple[str, int]]:
+        """(cursor, results already shown) of *phone*'s last product search, if more pages follow."""
+        entry = self._search_cursors.get(phone)
+        if entry is None:
+            return None
+        cursor, shown, at = entry
+        if datetime.now() - at > self._ttl:
+            del self._search_cursors[phone]
+            return None
+        return cursor, shown
+
     def clear(self, phone: str) -> None:
         """Explicitly clear history for a phone number."""
         self._history.pop(phone, None)
         self._last_activity.pop(phone, None)
+        self._search_cursors.pop(phone, None)
 
 
 # Module-level singleton
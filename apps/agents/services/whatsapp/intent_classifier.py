@@ -5,6 +5,7 @@ Uses GPT-4o-mini to classify the intent and extract metadata in a single call:
   - intent_type: what the user wants
   - empathetic_intro: a short warm sentence acknowledging the user's goal
   - price_min / price_max: optional price range in COP pesos
+  - region: optional Colombian department or city the user wants products from
 """
 
 from __future__ import annotations
@@ -30,7 +31,8 @@ Analiza el mensaje del usuario (y el contexto previo si lo hay) y responde ÚNIC
   "intent_type": string,
   "empathetic_intro": string,
   "price_min": number | null,
-  "price_max": number | null
+  "price_max": number | null,
+  "region": string | null
 }
 
 ═══ INTENT_TYPE — elige UNO: ═══
@@ -78,6 +80,11 @@ En español, el PUNTO (.) es separador de miles, NO decimal.
 - "no mayor a 50.000" → price_max=50000
 - Sin precio mencionado → null
 
+═══ REGION ═══
+Departamento o ciudad de Colombia de donde el usuario quiere los productos, con su nombre oficial
+("de Boyacá" → "Boyacá", "artesanías de la Guajira" → "La Guajira", "hechos en Pasto" → "Pasto").
+Sin región mencionada → null
+
 Responde SOLO con el JSON. Sin texto adicional.
 """
 
@@ -88,6 +95,7 @@ class IntentResult:
     empathetic_intro: str          # 2-3 warm sentences, empty for greetings
     price_min: Optional[int]       # COP pesos
     price_max: Optional[int]       # COP pesos
+    region: Optional[str] = None   # department or municipality name
 
 
 class IntentClassifier:
@@ -124,13 +132,15 @@ class IntentClassifier:
                 empathetic_intro=result.get("empathetic_intro", ""),
                 price_min=_to_int(result.get("price_min")),
                 price_max=_to_int(result.get("price_max")),
+                region=(result.get("region") or "").strip() or None,
             )
             logger.info(
-                "Intent: type=%s intro='%s' price=[%s, %s]",
+                "Intent: type=%s intro='%s' price=[%s, %s] region=%s",
                 intent.intent_type,
                 intent.empathetic_intro[:40] if intent.empathetic_intro else "",
                 intent.price_min,
                 intent.price_max,
+                intent.region,
             )
             return intent
 
@@ -0,0 +1,135 @@
+"""
+Webhook idempotency: drop WhatsApp messages that were already received.
+
+Meta retries a webhook until it sees our 200 and a payload may repeat
+messages of an earlier delivery, so every message id is remembered for
+WHATSAPP_DEDUP_TTL_SECONDS and repeats are dropped before the dispatcher
+queues any work for them.
+
+  - In memory: an insertion-ordered dict; with one TTL, insertion order is
+    expiry order, so expired ids are popped from the front in O(1) each.
+  - WHATSAPP_DEDUP_PATH (optional): a SQLite file shared by the workers of
+    one host, checked after the in-memory store. A store error lets the
+    message through rather than losing it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from agents.services.whatsapp.webhook_handler import IncomingMessage
+from src.api.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_IDS = 200_000           # in-memory bound, oldest dropped first
+_PURGE_INTERVAL = 60.0       # seconds between deletes of expired shared rows
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS seen_messages (
+    key         TEXT PRIMARY KEY,
+    expires_at  REAL NOT NULL
+)
+"""
+_CLAIM_SQL = "INSERT OR IGNORE INTO seen_messages (key, expires_at) VALUES (?, ?)"
+_PURGE_SQL = "DELETE FROM seen_messages WHERE expires_at < ?"
+
+
+class MessageDeduplicator:
+    """Time-bounded set of received message ids, per bot."""
+
+    def __init__(self, name: str, ttl_seconds: Optional[float] = None, path: Optional[str] = None) -> None:
+        self._name = name
+        self._ttl = settings.whatsapp_dedup_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._path = settings.whatsapp_dedup_path if path is None else path
+        self._expiry: OrderedDict[str, float] = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        self._stats = {"received": 0, "duplicates": 0, "shared_duplicates": 0, "shared_errors": 0}
+
+    async def fresh(self, messages: list[IncomingMessage]) -> list[IncomingMessage]:
+        """messages minus the ones already received (in this payload or within the TTL)."""
+        now = time.monotonic()
+        self._expire(now)
+        new: list[IncomingMessage] = []
+        for msg in messages:
+            self._stats["received"] += 1
+            if not msg.message_id:
+                new.append(msg)
+                continue
+            if msg.message_id in self._expiry:
+                self._stats["duplicates"] += 1
+                logger.info("%s: dropped repeated message %s", self._name, msg.message_id)
+                continue
+            self._expiry[msg.message_id] = now + self._ttl
+            new.append(msg)
+        while len(self._expiry) > _MAX_IDS:
+            self._expiry.popitem(last=False)
+
+        if self._path and new:
+            claimed = await asyncio.to_thread(self._claim_shared, [m.message_id for m in new if m.message_id])
+            if claimed is not None:
+                repeats = [m for m in new if m.message_id and m.message_id not in claimed]
+                for msg in repeats:
+                    logger.info("%s: dropped message %s received by another worker", self._name, msg.message_id)
+                self._stats["duplicates"] += len(repeats)
+                self._stats["shared_duplicates"] += len(repeats)
+                new = [m for m in new if not m.message_id or m.message_id in claimed]
+        return new
+
+    def stats(self) -> dict:
+        return {
+            "ttl_seconds": self._ttl,
+            "tracked_ids": len(self._expiry),
+            "shared_store": self._path or None,
+            **self._stats,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _expire(self, now: float) -> None:
+        while self._expiry:
+            _, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._expiry.popitem(last=False)
+
+    def _claim_shared(self, message_ids: list[str]) -> Optional[set[str]]:
+        """Ids first seen by this call across the workers; None when the store failed."""
+        now = time.time()
+        try:
+            with self._lock:
+                if self._conn is None:
+                    Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+                    self._conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                    self._conn.execute(_SCHEMA_SQL)
+                if now - self._purged_at > _PURGE_INTERVAL:
+                    self._conn.execute(_PURGE_SQL, (now,))
+                    self._purged_at = now
+                claimed = set()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for message_id in message_ids:
+                        cursor = self._conn.execute(_CLAIM_SQL, (f"{self._name}:{message_id}", now + self._ttl))
+                        if cursor.rowcount:
+                            claimed.add(message_id)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return claimed
+        except Exception as exc:
+            self._stats["shared_errors"] += 1
+            logger.warning("%s: shared dedup store %s unavailable: %s", self._name, self._path, exc)
+            return None
@@ -0,0 +1,183 @@
+"""
+Ordered, bounded processing of incoming WhatsApp messages.
+
+The webhook routers hand every message to a MessageDispatcher instead of
+starting a task per message:
+
+  - Messages of one phone run one at a time, in arrival order, so a quick
+    follow-up never races the previous turn in the conversation memory.
+  - At most WHATSAPP_MAX_CONCURRENCY pipelines (LLM calls, searches,
+    transcriptions) run at once across all phones.
+  - At most WHATSAPP_MAX_BACKLOG messages wait; past that (or past
+    _MAX_PER_PHONE for one phone) a message is shed with a short "busy"
+    reply instead of queueing without bound.
+  - stop() stops accepting, lets queued and running messages finish for up
+    to WHATSAPP_DRAIN_SECONDS, then cancels the rest.
+
+stats() reports queue depth, active pipelines and recent wait times.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from agents.services.whatsapp.webhook_handler import IncomingMessage
+from src.api.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_PER_PHONE = 10          # queued messages of one phone before shedding
+_BUSY_REPLY_INTERVAL = 60.0  # seconds between "busy" replies to one phone
+_WAIT_SAMPLES = 500          # recent queue waits kept for the percentiles
+
+
+@dataclass
+class _Queued:
+    msg: IncomingMessage
+    enqueued_at: float
+
+
+class MessageDispatcher:
+    """Per-phone FIFO queues drained under a global concurrency cap."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[IncomingMessage], Awaitable[None]],
+        busy_reply: Callable[[str], Awaitable[None]],
+        max_concurrency: Optional[int] = None,
+        max_backlog: Optional[int] = None,
+    ) -> None:
+        self._name = name
+        self._handler = handler
+        self._busy_reply = busy_reply
+        self._max_concurrency = max(max_concurrency or settings.whatsapp_max_concurrency, 1)
+        self._max_backlog = max(max_backlog or settings.whatsapp_max_backlog, 1)
+        self._slots: Optional[asyncio.Semaphore] = None   # created on the running loop
+        self._queues: dict[str, deque[_Queued]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._replies: set[asyncio.Task] = set()
+        self._busy_replied_at: dict[str, float] = {}
+        self._queued = 0
+        self._active = 0
+        self._closing = False
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._stats = {"accepted": 0, "processed": 0, "failed": 0, "shed": 0, "max_depth": 0}
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+
+    def submit(self, msg: IncomingMessage) -> bool:
+        """
+        Queue msg behind the earlier messages of its phone. Returns False
+        when the message was shed (backlog full or shutting down); the phone
+        then gets a "busy" reply, at most once per _BUSY_REPLY_INTERVAL.
+        """
+        phone = msg.phone_number
+        queue = self._queues.get(phone)
+        if self._closing or self._queued >= self._max_backlog or (queue and len(queue) >= _MAX_PER_PHONE):
+            self._shed(phone)
+            return False
+
+        if queue is None:
+            queue = self._queues[phone] = deque()
+        queue.append(_Queued(msg, time.monotonic()))
+        self._queued += 1
+        self._stats["accepted"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], self._queued)
+        if phone not in self._workers:
+            self._workers[phone] = asyncio.create_task(self._drain_phone(phone), name=f"{self._name}-{phone[-4:]}")
+        return True
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting messages and wait for the queued ones (app shutdown)."""
+        self._closing = True
+        timeout = settings.whatsapp_drain_seconds if timeout is None else timeout
+        pending = set(self._workers.values()) | self._replies
+        if not pending:
+            return
+        logger.info("%s dispatcher: draining %d queued message(s), %d running", self._name, self._queued, self._active)
+        done, not_done = await asyncio.wait(pending, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(
+                "%s dispatcher: cancelled %d task(s) still running after %ss (%d message(s) dropped)",
+                self._name, len(not_done), timeout, self._queued,
+            )
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(int(p / 100 * len(waits)), len(waits) - 1)], 3)
+
+        return {
+            "queued": self._queued,
+            "active": self._active,
+            "phones": len(self._queues),
+            "max_concurrency": self._max_concurrency,
+            "max_backlog": self._max_backlog,
+            "accepting": not self._closing,
+            **self._stats,
+            "wait_seconds": {"p50": pct(50), "p95": pct(95), "max": round(waits[-1], 3) if waits else None},
+        }
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    async def _drain_phone(self, phone: str) -> None:
+        """One worker per phone with queued messages: strictly one message at a time."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrency)
+        queue = self._queues[phone]
+        try:
+            while queue:
+                async with self._slots:
+                    item = queue.popleft()
+                    self._queued -= 1
+                    self._active += 1
+                    self._waits.append(time.monotonic() - item.enqueued_at)
+                    try:
+                        await self._handler(item.msg)
+                        self._stats["processed"] += 1
+                    except Exception as exc:
+                        # Pipelines reply their own errors; this is the last resort
+                        self._stats["failed"] += 1
+                        logger.error("%s dispatcher: message %s failed: %s", self._name, item.msg.message_id, exc)
+                    finally:
+                        self._active -= 1
+        finally:
+            self._queued -= len(queue)
+            del self._queues[phone]
+            del self._workers[phone]
+
+    def _shed(self, phone: str) -> None:
+        self._stats["shed"] += 1
+        now = time.monotonic()
+        if now - self._busy_replied_at.get(phone, float("-inf")) < _BUSY_REPLY_INTERVAL:
+            return
+        if len(self._busy_replied_at) > self._max_backlog:
+            self._busy_replied_at = {
+                p: t for p, t in self._busy_replied_at.items() if now - t < _BUSY_REPLY_INTERVAL
+            }
+        self._busy_replied_at[phone] = now
+        logger.warning("%s dispatcher: shedding a message from %s... (%d queued)", self._name, phone[:10], self._queued)
+        task = asyncio.create_task(self._send_busy(phone))
+        self._replies.add(task)
+        task.add_done_callback(self._replies.discard)
+
+    async def _send_busy(self, phone: str) -> None:
+        try:
+            await self._busy_reply(phone)
+        except Exception as exc:
+            logger.error("%s dispatcher: busy reply to %s... failed: %s", self._name, phone[:10], exc)
@@ -0,0 +1,334 @@
+"""
+Rate-limited outbound message queue for one WhatsApp phone number.
+
+Every text a bot sends goes through its client's OutboundSender instead of
+posting (and sleeping on 429s) inside the user's processing task:
+
+  - A token bucket at WHATSAPP_SEND_RATE messages/s, the throughput tier of
+    the sending phone number.
+  - Replies go ahead of droppable messages ("processing" and "listening"
+    indicators). An indicator is dropped when a later message to the same
+    recipient is already queued, after waiting _INDICATOR_MAX_WAIT seconds,
+    or on arrival while the API is backing off or the queue is deep.
+  - Per recipient: one message in flight at a time, in order, and after a
+    burst of _RECIPIENT_BURST one every WHATSAPP_RECIPIENT_INTERVAL_SECONDS
+    (a GCRA per phone); a pair rate limit error (131056) retries it later.
+  - One backoff for everyone: a 429 pauses the whole queue for Retry-After
+    (or an exponential delay) and the message is retried first; 5xx and
+    network errors retry that message with backoff, other 4xx fail.
+
+The recipients with queued messages are scanned on each dispatch; there are
+at most a few per pipeline the message dispatcher runs at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from src.api.config import settings
+
+logger = logging.getLogger(__name__)
+
+_RETRY_ATTEMPTS = 3           # per message, for 5xx and network errors
+_MAX_BACKOFF_SECONDS = 60.0   # global pause after repeated 429s without Retry-After
+_INDICATOR_MAX_WAIT = 5.0     # seconds an indicator may wait before it is pointless
+_INDICATOR_DROP_DEPTH = 50    # queued messages above which new indicators are dropped
+_RECIPIENT_BURST = 3          # messages one recipient may get back to back before pacing
+_PAIR_RATE_LIMIT_CODE = 131056
+_WAIT_SAMPLES = 500
+
+
+@dataclass
+class _Outgoing:
+    payload: dict
+    droppable: bool
+    enqueued_at: float
+    future: asyncio.Future
+    attempts: int = 0
+
+
+class OutboundSender:
+    """Shared token bucket, priority queue and backoff for one phone number's sends."""
+
+    def __init__(
+        self,
+        name: str,
+        transport: Callable[[dict], Awaitable[httpx.Response]],
+        rate: Optional[float] = None,
+        recipient_interval: Optional[float] = None,
+    ) -> None:
+        self._name = name
+        self._transport = transport
+        self._rate = max(rate or settings.whatsapp_send_rate, 0.1)
+        self._burst = max(self._rate, 1.0)
+        self._tokens = self._burst
+        self._refilled_at = time.monotonic()
+        self._recipient_interval = (
+            settings.whatsapp_recipient_interval_seconds if recipient_interval is None else recipient_interval
+        )
+        self._queues: dict[str, deque[_Outgoing]] = {}
+        self._queued = 0
+        self._sending: set[str] = set()
+        self._next_at: dict[str, float] = {}       # per-recipient GCRA theoretical arrival time
+        self._slack = self._recipient_interval * (_RECIPIENT_BURST - 1)
+        self._deliveries: dict[asyncio.Task, _Outgoing] = {}
+        self._paused_until = 0.0
+        self._backoff_streak = 0
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._stats = {
+            "sent": 0,
+            "failed": 0,
+            "dropped_indicators": 0,
+            "rate_limited": 0,
+            "retries": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+
+    async def send(self, phone: str, payload: dict, droppable: bool = False) -> Optional[dict]:
+        """
+        Queue payload for phone and wait for the Graph API response (None
+        when it failed, was not sent before stop() or, for droppable
+        messages, was dropped).
+
+        Raises:
+            RuntimeError: stop() gave up on it mid-send (it may or may not
+                          have been delivered).
+        """
+        if self._closing:
+            logger.warning("%s outbound: shutting down, message to %s... not sent", self._name, phone[:10])
+            return None
+        if droppable and (self._paused(time.monotonic()) or self._queued >= _INDICATOR_DROP_DEPTH):
+            self._stats["dropped_indicators"] += 1
+            return None
+
+        item = _Outgoing(payload, droppable, time.monotonic(), asyncio.get_running_loop().create_future())
+        self._queues.setdefault(phone, deque()).append(item)
+        self._queued += 1
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run(), name=f"{self._name}-outbound")
+        self._wakeup.set()
+        return await item.future
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Send what is queued for up to timeout seconds, then give up on the
+        rest (app shutdown). The sender can be used again afterwards.
+        """
+        self._closing = True
+        self._wakeup.set()
+        abandoned: list[asyncio.Task] = []
+        if self._loop_task is not None and not self._loop_task.done():
+            done, _ = await asyncio.wait({self._loop_task}, timeout=timeout)
+            if not done:
+                self._loop_task.cancel()
+                abandoned.append(self._loop_task)
+                logger.warning(
+                    "%s outbound: %d queued and %d in-flight message(s) not sent at shutdown",
+                    self._name, self._queued, len(self._deliveries),
+                )
+        for task, item in list(self._deliveries.items()):
+            if not item.future.done():
+                item.future.set_exception(RuntimeError(f"{self._name} outbound sender stopped mid-send"))
+            task.cancel()
+            abandoned.append(task)
+        await asyncio.gather(*abandoned, return_exceptions=True)
+        for queue in self._queues.values():
+            for item in queue:
+                if not item.future.done():
+                    item.future.set_result(None)
+        self._queues.clear()
+        self._queued = 0
+        self._loop_task = None
+        self._closing = False
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(int(p / 100 * len(waits)), len(waits) - 1)], 3)
+
+        return {
+            "queued": self._queued,
+            "queued_indicators": sum(i.droppable for q in self._queues.values() for i in q),
+            "recipients": len(self._queues),
+            "in_flight": len(self._sending),
+            "rate_per_second": self._rate,
+            "tokens": round(min(self._burst, self._tokens + max(now - self._refilled_at, 0.0) * self._rate), 1),
+            "paused_for_seconds": round(max(self._paused_until - now, 0.0), 1),
+            **self._stats,
+            "wait_seconds": {"p50": pct(50), "p95": pct(95), "max": round(waits[-1], 3) if waits else None},
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatch loop
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._dispatch()
+            if self._closing and not self._queued and not self._sending:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> Optional[float]:
+        """Start every send allowed now; seconds until the next one may be (None: wait for a wakeup)."""
+        now = time.monotonic()
+        if self._paused(now):
+            return self._paused_until - now
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+        while True:
+            phone, wait = self._pick(now)
+            if phone is None:
+                return wait
+            if self._tokens < 1:
+                return (1 - self._tokens) / self._rate
+            self._tokens -= 1
+            item = self._queues[phone].popleft()
+            if not self._queues[phone]:
+                del self._queues[phone]
+            self._queued -= 1
+            self._sending.add(phone)
+            task = asyncio.create_task(self._deliver(phone, item))
+            self._deliveries[task] = item
+            task.add_done_callback(lambda t: self._deliveries.pop(t, None))
+
+    def _pick(self, now: float) -> tuple[Optional[str], Optional[float]]:
+        """Recipient whose next message goes first: replies before indicators, then oldest."""
+        best: Optional[str] = None
+        best_key: Optional[tuple] = None
+        wait: Optional[float] = None
+        for phone in list(self._queues):
+            queue = self._queues[phone]
+            while queue and (
+                queue[0].future.done()
+                or (queue[0].droppable and (len(queue) > 1 or now - queue[0].enqueued_at > _INDICATOR_MAX_WAIT))
+            ):
+                self._drop(queue.popleft())
+            if not queue:
+                del self._queues[phone]
+                continue
+            if phone in self._sending:
+                continue
+            ready_at = self._next_at.get(phone, 0.0) - self._slack
+            if ready_at > now:
+                wait = min(wait, ready_at - now) if wait is not None else ready_at - now
+                continue
+            key = (queue[0].droppable, queue[0].enqueued_at)
+            if best_key is None or key < best_key:
+                best, best_key = phone, key
+        return best, wait
+
+    async def _deliver(self, phone: str, item: _Outgoing) -> None:
+        if item.attempts == 0:
+            self._waits.append(time.monotonic() - item.enqueued_at)
+        item.attempts += 1
+        requeue_after: Optional[float] = None
+        try:
+            resp = await self._transport(item.payload)
+            if resp.status_code == 429:
+                self._stats["rate_limited"] += 1
+                self._pause(resp.headers.get("Retry-After"))
+                item.attempts -= 1      # not the message's fault
+                requeue_after = 0.0
+            elif resp.status_code in (200, 201):
+                self._backoff_streak = 0
+                self._stats["sent"] += 1
+                self._resolve(item, resp.json())
+            else:
+                error = resp.json().get("error", {}) if resp.content else {}
+                logger.error(
+                    "%s outbound: API error %d: %s",
+                    self._name, resp.status_code, error.get("message", resp.text or "empty response"),
+                )
+                if resp.status_code >= 500 or error.get("code") == _PAIR_RATE_LIMIT_CODE:
+                    requeue_after = self._retry_delay(item)
+                else:
+                    self._fail(item)
+        except httpx.RequestError as exc:
+            logger.error("%s outbound: HTTP request error: %s", self._name, exc)
+            requeue_after = self._retry_delay(item)
+        except Exception as exc:
+            logger.error("%s outbound: send to %s... failed: %s", self._name, phone[:10], exc)
+            self._fail(item)
+        finally:
+            self._sending.discard(phone)
+            now = time.monotonic()
+            if requeue_after is not None and not item.future.done():
+                # First in line again for this recipient
+                self._queues.setdefault(phone, deque()).appendleft(item)
+                self._queued += 1
+                if requeue_after:
+                    self._next_at[phone] = now + self._slack + requeue_after
+            else:
+                self._next_at[phone] = max(self._next_at.get(phone, now), now) + self._recipient_interval
+            if len(self._next_at) > 1000:
+                self._next_at = {p: t for p, t in self._next_at.items() if t > now}
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _paused(self, now: float) -> bool:
+        return now < self._paused_until
+
+    def _pause(self, retry_after: Optional[str]) -> None:
+        # The sends in flight when the limit hits all get a 429: one step of
+        # backoff per pause, not per response
+        if not self._paused(time.monotonic()):
+            self._backoff_streak += 1
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(2.0 ** (self._backoff_streak - 1), _MAX_BACKOFF_SECONDS)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        # Empty bucket refilling from the end of the pause: sending resumes at
+        # the configured rate, not with a burst accrued while paused
+        self._tokens = 0.0
+        self._refilled_at = self._paused_until
+        logger.warning("%s outbound: rate limited — all sends paused for %.0fs", self._name, delay)
+
+    def _retry_delay(self, item: _Outgoing) -> Optional[float]:
+        if item.attempts >= _RETRY_ATTEMPTS:
+            self._fail(item)
+            return None
+        self._stats["retries"] += 1
+        wait = 2 ** (item.attempts - 1)
+        logger.info("%s outbound: retrying in %ds (attempt %d/%d)...", self._name, wait, item.attempts, _RETRY_ATTEMPTS)
+        return float(wait)
+
+    def _resolve(self, item: _Outgoing, result: Optional[dict]) -> None:
+        if not item.future.done():
+            item.future.set_result(result)
+
+    def _fail(self, item: _Outgoing) -> None:
+        self._stats["failed"] += 1
+        self._resolve(item, None)
+
+    def _drop(self, item: _Outgoing) -> None:
+        if not item.future.done():
+            self._stats["dropped_indicators"] += 1
+        self._resolve(item, None)
+        self._queued -= 1
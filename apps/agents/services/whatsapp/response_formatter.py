@@ -87,8 +87,19 @@ def format_no_results(query: str = "") -> str:
 # Product listing
 # ─────────────────────────────────────────────
 
-def format_products(results: list[ProductSearchResult], query: str, empathetic_intro: str = "") -> str:
-    """Format product results into a WhatsApp message with optional empathetic intro."""
+def format_products(
+    results: list[ProductSearchResult],
+    query: str,
+    empathetic_intro: str = "",
+    start: int = 1,
+    more: bool = False,
+) -> str:
+    """
+    Format product results into a WhatsApp message with optional empathetic intro.
+
+    start numbers a later page after the previous ones; more invites the user
+    to ask for the next page.
+    """
     parts = []
 
     if empathetic_intro:
@@ -97,7 +108,7 @@ def format_products(results: list[ProductSearchResult], query: str, empathetic_i
     parts.append(f"🔍 *Encontré {len(results)} producto{'s' if len(results) != 1 else ''}:*")
     parts.append("")
 
-    for i, r in enumerate(results, 1):
+    for i, r in enumerate(results, start):
         emoji = get_emoji(r.craft_name, r.category_name)
         name = r.product_name or "Producto artesanal"
         block = [f"{emoji} *{i}. {name}*"]
@@ -125,7 +136,10 @@ def format_products(results: list[ProductSearchResult], query: str, empathetic_i
         block.append(f"🔗 {_PRODUCT_BASE_URL}{r.product_id}")
         parts.append("\n".join(block))
 
-    parts.append("✨ _¿Necesitas más opciones o quieres filtrar por precio? Pregúntame_ 😊")
+    if more:
+        parts.append("✨ _Escribe *ver más* para ver más opciones, o pregúntame para filtrar por precio_ 😊")
+    else:
+        parts.append("✨ _¿Necesitas más opciones o quieres filtrar por precio? Pregúntame_ 😊")
     return "\n\n".join(parts)
 
 
@@ -2,18 +2,21 @@
 WhatsApp bot orchestration service.
 
 Ties together: webhook parsing, audio transcription, intent classification,
-semantic product search, price filtering, response formatting, and reply sending.
+semantic product search (with price/region filters), response formatting, and reply sending.
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import unicodedata
 from typing import Optional
 
-from agents.services.semantic_search_service import semantic_search_service
+from agents.services.facet_service import facet_service
+from agents.services.semantic_search_service import ProductSearchFilters, semantic_search_service
 from agents.services.whatsapp.conversation_memory import conversation_memory
 from agents.services.whatsapp.intent_classifier import intent_classifier
+from agents.services.whatsapp.message_dispatcher import MessageDispatcher
 from agents.services.whatsapp.response_formatter import (
     format_materials,
     format_no_results,
@@ -34,9 +37,13 @@ logger = logging.getLogger(__name__)
 
 _GREETINGS = {"hola", "hello", "hi", "buenos dias", "buenas tardes", "buenas noches", "ayuda", "help"}
 _MAX_GREETING_LEN = 25
-_SEARCH_TOP_K = 10
+# Next page of the last product search (accents and punctuation ignored)
+_MORE_RESULTS = {"mas", "ver mas", "quiero ver mas", "muestrame mas", "mas opciones", "mas resultados", "mas productos", "siguiente", "otros"}
 _SEARCH_MIN_SIMILARITY = 0.4
 _MAX_RESULTS = 5
+_STORE_MIN_SIMILARITY = 0.3
+_MAX_STORES = 10
+_BUSY_MESSAGE = "⏳ Estoy atendiendo muchos mensajes en este momento. Por favor escríbeme de nuevo en un par de minutos 🙏"
 
 
 async def process_message(msg: IncomingMessage) -> None:
@@ -46,13 +53,13 @@ async def process_message(msg: IncomingMessage) -> None:
     Pipeline:
       1. Audio → transcribe (or error and abort)
       2. Send "processing" indicator (fire-and-forget)
-      3. Greeting check → welcome message
-      4. Classify intent (+ empathetic intro + price filters)
+      3. Greeting check → welcome message; "ver más" → next page of the last search
+      4. Classify intent (+ empathetic intro + price/region filters)
       5. Route by intent:
-         - ask_regions   → query DB for unique store locations
-         - ask_materials → query DB for unique craft types
-         - ask_stores    → derive unique stores from semantic search
-         - search_products → semantic search + price filter + format
+         - ask_regions   → store regions with published products (facet snapshot)
+         - ask_materials → crafts with published products (facet snapshot)
+         - ask_stores    → store semantic search (store vectors)
+         - search_products → filtered semantic search + format
       6. Send response + update conversation memory
     """
     phone = msg.phone_number
@@ -61,7 +68,7 @@ async def process_message(msg: IncomingMessage) -> None:
         # ── Step 1: Handle audio messages ────────────────────────────
         if msg.message_type == "audio":
             logger.info("Processing voice message from %s...", phone[:10])
-            await whatsapp_client.send_text_message(phone, "🎤 _Escuchando tu mensaje de voz..._")
+            await whatsapp_client.send_text_message(phone, "🎤 _Escuchando tu mensaje de voz..._", droppable=True)
 
             audio_bytes = await whatsapp_client.download_audio(msg.audio_id)
             if not audio_bytes:
@@ -110,6 +117,14 @@ async def process_message(msg: IncomingMessage) -> None:
             conversation_memory.add(phone, "bot", "Welcome message sent")
             return
 
+        last_search = conversation_memory.get_search_cursor(phone)
+        if last_search and _is_more_request(query):
+            reply = await _handle_more_results(phone, *last_search)
+            await whatsapp_client.send_text_message(phone, reply)
+            conversation_memory.add(phone, "user", query)
+            conversation_memory.add(phone, "bot", reply[:200])
+            return
+
         # ── Step 4: Intent classification ────────────────────────────
         context = conversation_memory.get_context(phone)
         intent = await intent_classifier.classify(query, context)
@@ -126,14 +141,14 @@ async def process_message(msg: IncomingMessage) -> None:
             reply = await _handle_ask_materials(intent.empathetic_intro)
 
         elif intent.intent_type == "ask_stores":
-            reply = await _handle_ask_stores(query, intent.empathetic_intro)
+            reply = await _handle_ask_stores(query, intent.empathetic_intro, intent.region)
 
         elif intent.intent_type == "ask_knowledge":
             reply = await _handle_ask_knowledge(query, intent.empathetic_intro, context)
 
         else:
             # Default: semantic product search
-            reply = await _handle_product_search(query, intent)
+            reply = await _handle_product_search(phone, query, intent)
 
         # ── Step 6: Send + update memory ─────────────────────────────
         await whatsapp_client.send_text_message(phone, reply)
@@ -156,25 +171,11 @@ async def process_message(msg: IncomingMessage) -> None:
 # ─────────────────────────────────────────────
 
 async def _handle_ask_regions(intro: str) -> str:
-    """Return a deduplicated list of artisan regions queried directly from the DB."""
+    """Return the artisan regions that have published products (from the facet snapshot)."""
     try:
-        from src.database.pg_client import get_pool
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT DISTINCT sa.region
-                FROM shop.artisan_shops sa
-                JOIN shop.products_core pc ON pc.store_id = sa.id
-                WHERE pc.deleted_at IS NULL
-                  AND pc.status IN ('published', 'approved', 'approved_with_edits')
-                  AND sa.region IS NOT NULL
-                  AND sa.region != ''
-                ORDER BY sa.region
-                """
-            )
-        regions = [r["region"] for r in rows]
-        logger.info("ask_regions: found %d regions from DB", len(regions))
+        counts = await facet_service.counts()
+        regions = sorted(counts.labels("regions"))
+        logger.info("ask_regions: found %d regions", len(regions))
         return format_regions(regions, intro)
     except Exception as exc:
         logger.error("ask_regions failed: %s", exc)
@@ -184,53 +185,40 @@ async def _handle_ask_regions(intro: str) -> str:
 
 
 async def _handle_ask_materials(intro: str) -> str:
-    """Return a list of unique craft types from the taxonomy."""
+    """Return the craft types that have published products (from the facet snapshot)."""
     try:
-        from src.database.pg_client import get_pool
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT DISTINCT tc.name
-                FROM taxonomy.crafts tc
-                JOIN shop.product_artisanal_identity pai ON pai.primary_craft_id = tc.id
-                JOIN shop.products_core pc ON pc.id = pai.product_id
-                WHERE pc.deleted_at IS NULL AND tc.name IS NOT NULL
-                  AND pc.status IN ('published', 'approved', 'approved_with_edits')
-                ORDER BY tc.name
-                """
-            )
-        materials = [r["name"] for r in rows]
+        counts = await facet_service.counts()
+        materials = counts.labels("crafts")
         logger.info("ask_materials: found %d craft types", len(materials))
         return format_materials(materials, intro)
     except Exception as exc:
-        logger.error("ask_materials DB query failed: %s", exc)
+        logger.error("ask_materials facet lookup failed: %s", exc)
         return (
             (f"{intro}\n\n") if intro else ""
         ) + "😅 No pude obtener los materiales en este momento. Puedes buscar directamente, por ejemplo: _\"productos de madera\"_ o _\"artesanías en cerámica\"_."
 
 
-async def _handle_ask_stores(query: str, intro: str) -> str:
-    """Derive unique stores from a broad semantic search."""
+async def _handle_ask_stores(query: str, intro: str, region: Optional[str] = None) -> str:
+    """Store semantic search (optionally within a region)."""
     try:
-        results = await semantic_search_service.search_products(
-            query=query, top_k=30, min_similarity=0.3
+        results = await semantic_search_service.search_stores(
+            query=query,
+            top_k=_MAX_STORES,
+            min_similarity=_STORE_MIN_SIMILARITY,
+            region=region,
         )
 
-        seen: dict[str, dict] = {}
-        for r in results:
-            if r.store_id and r.store_id not in seen:
-                seen[r.store_id] = {
-                    "name": r.store_name or "Tienda",
-                    "craft_name": r.craft_name,
-                    "location": _extract_location(r.store_name),
-                    "product_count": 0,
-                }
-            if r.store_id and r.store_id in seen:
-                seen[r.store_id]["product_count"] += 1
-
-        stores = list(seen.values())[:10]
-        logger.info("ask_stores: found %d unique stores", len(stores))
+        stores = [
+            {
+                "name": r.store_name or "Tienda",
+                "craft_name": r.craft_name,
+                "location": ", ".join(p for p in (r.municipality, r.department) if p)
+                or _extract_location(r.store_name),
+                "product_count": r.product_count,
+            }
+            for r in results
+        ]
+        logger.info("ask_stores: found %d stores", len(stores))
 
         if not stores:
             return "😅 No encontré tiendas en este momento. Prueba buscando un tipo de producto específico."
@@ -241,27 +229,41 @@ async def _handle_ask_stores(query: str, intro: str) -> str:
         return "😅 No pude obtener la lista de tiendas. Prueba buscando un producto específico."
 
 
-async def _handle_product_search(query: str, intent) -> str:
-    """Semantic search + price filter + format."""
-    results = await semantic_search_service.search_products(
+async def _handle_product_search(phone: str, query: str, intent) -> str:
+    """Semantic search with the intent's price/region filters + format; keeps the cursor for "ver más"."""
+    page = await semantic_search_service.search_products_page(
         query=query,
-        top_k=_SEARCH_TOP_K,
+        page_size=_MAX_RESULTS,
         min_similarity=_SEARCH_MIN_SIMILARITY,
+        filters=_search_filters(intent),
+    )
+    results = page.results
+    logger.info(
+        "Semantic search: %d results for '%s...' (price [%s, %s], region %s)",
+        len(results), query[:50], intent.price_min, intent.price_max, intent.region,
     )
-    logger.info("Semantic search: %d results for '%s...'", len(results), query[:50])
+    conversation_memory.set_search_cursor(phone, page.next_cursor, len(results))
 
-    if intent.price_min is not None or intent.price_max is not None:
-        results = _apply_price_filter(results, intent.price_min, intent.price_max)
-        logger.info(
-            "After price filter [%s, %s]: %d results",
-            intent.price_min, intent.price_max, len(results),
+    if results:
+        return format_products(
+            results, query, empathetic_intro=intent.empathetic_intro, more=page.next_cursor is not None
         )
+    return format_no_results(query)
 
-    results = results[:_MAX_RESULTS]
 
-    if results:
-        return format_products(results, query, empathetic_intro=intent.empathetic_intro)
-    return format_no_results(query)
+async def _handle_more_results(phone: str, cursor: str, shown: int) -> str:
+    """Next page of the last product search: same query vector and filters, no new embedding."""
+    try:
+        page = await semantic_search_service.search_products_page(query="", page_size=_MAX_RESULTS, cursor=cursor)
+    except ValueError:
+        conversation_memory.set_search_cursor(phone, None)
+        return "⌛ Esa búsqueda ya expiró. Cuéntame de nuevo qué estás buscando y te muestro más opciones."
+    logger.info("Next page: %d results after %d for %s...", len(page.results), shown, phone[:10])
+    conversation_memory.set_search_cursor(phone, page.next_cursor, shown + len(page.results))
+
+    if page.results:
+        return format_products(page.results, "", start=shown + 1, more=page.next_cursor is not None)
+    return "🙌 Ya te mostré todos los productos que encontré. ¿Quieres buscar algo diferente?"
 
 
 async def _handle_ask_knowledge(query: str, intro: str, context: str = "") -> str:
@@ -327,6 +329,12 @@ def _is_greeting(text: str) -> bool:
     return any(g in lower for g in _GREETINGS)
 
 
+def _is_more_request(text: str) -> bool:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in folded).split()) in _MORE_RESULTS
+
+
 def _extract_location(store_name: Optional[str]) -> str:
     """
     Some store names include location in parens: "Vision rustica (FLORENCIA, CAQUETÁ)".
@@ -339,25 +347,25 @@ def _extract_location(store_name: Optional[str]) -> str:
     return ""
 
 
-def _apply_price_filter(results, price_min_cop, price_max_cop):
+def _search_filters(intent) -> Optional[ProductSearchFilters]:
     """
-    Filter results by price range.
+    Build search filters from the classified intent.
 
-    Prices in ProductSearchResult are in minor units (centavos).
+    Prices in the catalog are in minor units (centavos).
     User-provided prices are in COP pesos, so multiply by 100.
     """
-    min_minor = price_min_cop * 100 if price_min_cop is not None else None
-    max_minor = price_max_cop * 100 if price_max_cop is not None else None
+    if intent.price_min is None and intent.price_max is None and not intent.region:
+        return None
+    return ProductSearchFilters(
+        price_min=intent.price_min * 100 if intent.price_min is not None else None,
+        price_max=intent.price_max * 100 if intent.price_max is not None else None,
+        region=intent.region,
+    )
+
 
-    filtered = []
-    for r in results:
-        if r.price is None:
-            continue
-        if min_minor is not None and r.price < min_minor:
-            continue
-        if max_minor is not None and r.price > max_minor:
-            continue
-        filtered.append(r)
-    return filtered
+async def _send_busy_reply(phone: str) -> None:
+    await whatsapp_client.send_text_message(phone, _BUSY_MESSAGE)
 
 
+# Webhook messages: one at a time per phone, WHATSAPP_MAX_CONCURRENCY at once
+message_dispatcher = MessageDispatcher("whatsapp", process_message, _send_busy_reply)
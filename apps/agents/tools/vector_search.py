@@ -5,10 +5,11 @@ RAG (Retrieval Augmented Generation) service for knowledge-based agents.
 from openai import AsyncOpenAI
 from src.api.config import settings
 from src.database.supabase_client import db
-from src.services.embedding_service import embedding_service
+from src.services.embedding_service import EmbeddingService
+from src.services.embedding_version_service import embedding_version_service
 from agents.core.state import KnowledgeDocument, KnowledgeSearchResult
 from agents.core.embedding_cache import embedding_cache
-from agents.helpers import chunk_text
+from agents.core.chunker import TokenChunker
 from src.utils.enhanced_logger import create_enhanced_logger
 from typing import List, Dict, Any, Optional
 from uuid import UUID
@@ -17,6 +18,11 @@ import time
 logger = create_enhanced_logger(__name__)
 
 
+async def _knowledge_embedder() -> EmbeddingService:
+    """Embeddings in the space of the live knowledge vectors."""
+    return await embedding_version_service.live_embedder("knowledge")
+
+
 class RAGService:
     """Service for RAG operations: document processing and retrieval."""
     
@@ -24,6 +30,10 @@ class RAGService:
         """Initialize RAG service."""
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = settings.openai_model
+        self.chunker = TokenChunker(
+            max_tokens=settings.chunk_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+        )
     
     async def process_document(
         self,
@@ -49,17 +59,14 @@ class RAGService:
                 status='processing'
             )
             
-            # Chunk the document
-            chunks = chunk_text(
-                document.content,
-                chunk_size=settings.chunk_size,
-                chunk_overlap=settings.chunk_overlap
-            )
+            # Chunk the document by token count (headings are hard boundaries)
+            chunks = self.chunker.chunk(document.content)
             
             logger.info(f"Document chunked into {len(chunks)} pieces")
             
             # Generate embeddings for all chunks
-            embeddings = await embedding_service.generate_embeddings(chunks)
+            embedder = await _knowledge_embedder()
+            embeddings = await embedder.generate_embeddings([c.text for c in chunks])
             
             # Prepare embedding records
             embedding_records = []
@@ -67,10 +74,13 @@ class RAGService:
                 embedding_records.append({
                     "document_id": str(document_id),
                     "chunk_index": idx,
-                    "chunk_text": chunk,
+                    "chunk_text": chunk.text,
                     "knowledge_category": document.knowledge_category,
                     "embedding": embedding,
-                    "metadata": {}
+                    "metadata": {
+                        "token_count": chunk.token_count,
+                        "heading": chunk.heading,
+                    }
                 })
             
             # Save embeddings in batch
@@ -100,7 +110,9 @@ class RAGService:
         self,
         query: str,
         category: Optional[str] = None,
-        top_k: int = None
+        top_k: int = None,
+        hybrid: Optional[bool] = None,
+        quality: Optional[str] = None
     ) -> List[KnowledgeSearchResult]:
         """
         Search the knowledge base for relevant information.
@@ -109,6 +121,8 @@ class RAGService:
             query: Search query
             category: Optional category filter (legal, faq, general)
             top_k: Number of results to return (defaults to config value)
+            hybrid: Fuse vector and full-text rankings (defaults to config value)
+            quality: fast / balanced / exact vector search (defaults to balanced)
             
         Returns:
             List of KnowledgeSearchResult objects
@@ -116,15 +130,23 @@ class RAGService:
         try:
             if top_k is None:
                 top_k = settings.rag_top_k
+            if hybrid is None:
+                hybrid = settings.rag_hybrid_search
             
             # Generate query embedding (cached)
-            query_embedding = await embedding_cache.get_or_generate(query, embedding_service.generate_embedding)
+            embedder = await _knowledge_embedder()
+            query_embedding = await embedding_cache.get_or_generate(
+                query, embedder.generate_embedding, model=embedder.model
+            )
             
             # Search database
             results = await db.search_knowledge(
                 query_embedding=query_embedding,
                 match_count=top_k,
-                category=category
+                category=category,
+                query_text=query,
+                hybrid=hybrid,
+                quality=quality
             )
             
             # Convert to KnowledgeSearchResult objects
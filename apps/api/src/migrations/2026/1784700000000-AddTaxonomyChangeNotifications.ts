@@ -0,0 +1,46 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Emits NOTIFY taxonomy_changed (payload: table name) whenever categories,
+ * crafts, materials or techniques change, so in-process taxonomy caches
+ * (agents TaxonomyService) can refresh immediately instead of waiting for
+ * their TTL.
+ */
+const TABLES = ['categories', 'crafts', 'materials', 'techniques'];
+
+export class AddTaxonomyChangeNotifications1784700000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION taxonomy.notify_taxonomy_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      BEGIN
+        PERFORM pg_notify('taxonomy_changed', TG_TABLE_NAME);
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    for (const table of TABLES) {
+      await queryRunner.query(`
+        CREATE TRIGGER notify_${table}_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON taxonomy.${table}
+        FOR EACH STATEMENT EXECUTE FUNCTION taxonomy.notify_taxonomy_changed()
+      `);
+    }
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    for (const table of TABLES) {
+      await queryRunner.query(
+        `DROP TRIGGER IF EXISTS notify_${table}_changed ON taxonomy.${table}`,
+      );
+    }
+    await queryRunner.query(
+      `DROP FUNCTION IF EXISTS taxonomy.notify_taxonomy_changed()`,
+    );
+  }
+}
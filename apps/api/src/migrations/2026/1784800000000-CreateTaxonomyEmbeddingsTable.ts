@@ -0,0 +1,38 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Vectors for crafts, materials and techniques, maintained by the agents
+ * TaxonomyService. Product creation embeds the product text and sends only
+ * the nearest entries of each kind to the LLM instead of the full taxonomy.
+ *
+ * One table for the three kinds (taxonomy_id is polymorphic, hence no FK):
+ * stale rows are removed by the service when it syncs against the taxonomy.
+ */
+export class CreateTaxonomyEmbeddingsTable1784800000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`CREATE EXTENSION IF NOT EXISTS vector`);
+
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS taxonomy.taxonomy_embeddings (
+        kind          TEXT         NOT NULL
+                                   CHECK (kind IN ('crafts', 'materials', 'techniques')),
+        taxonomy_id   UUID         NOT NULL,
+        embedding     vector(1536) NOT NULL,
+        model         TEXT         NOT NULL DEFAULT 'text-embedding-3-small',
+        semantic_text TEXT         NOT NULL,
+        content_hash  TEXT         NOT NULL,
+        generated_at  TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        PRIMARY KEY (kind, taxonomy_id)
+      )
+    `);
+
+    // Top-K per kind is an exact scan: a few thousand rows at most, and
+    // partitioned ranking cannot use an ANN index anyway.
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TABLE IF EXISTS taxonomy.taxonomy_embeddings`);
+  }
+}
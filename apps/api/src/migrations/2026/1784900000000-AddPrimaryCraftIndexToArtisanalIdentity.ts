@@ -0,0 +1,24 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Product search filters by craft inside the vector query (agents
+ * SemanticSearchService); selective craft filters are answered from this
+ * index instead of walking the HNSW graph.
+ */
+export class AddPrimaryCraftIndexToArtisanalIdentity1784900000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE INDEX IF NOT EXISTS idx_product_artisanal_identity_primary_craft_id
+        ON shop.product_artisanal_identity (primary_craft_id)
+        WHERE primary_craft_id IS NOT NULL;
+    `);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      DROP INDEX IF EXISTS shop.idx_product_artisanal_identity_primary_craft_id;
+    `);
+  }
+}
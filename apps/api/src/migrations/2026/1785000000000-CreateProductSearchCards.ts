@@ -0,0 +1,284 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Denormalized search card per searchable product (published/approved, not
+ * deleted): everything the agents product search returns, so enriching the
+ * ANN candidates is a primary-key lookup instead of aggregating variants,
+ * media and materials per query. The scalar filter columns (store, category,
+ * craft, price, stock) are also read by the ANN query itself.
+ *
+ * Kept current by row-level triggers calling
+ * shop.refresh_product_search_cards(product ids): a product without a
+ * searchable products_core row has no card. Renames of stores, crafts,
+ * categories and materials refresh the products that reference them.
+ */
+const PRODUCT_TABLES = [
+  'products_core',
+  'product_variants',
+  'product_media',
+  'product_materials_link',
+  'product_artisanal_identity',
+];
+
+const NAME_TABLES = [
+  ['shop', 'stores'],
+  ['taxonomy', 'crafts'],
+  ['taxonomy', 'categories'],
+  ['taxonomy', 'materials'],
+];
+
+export class CreateProductSearchCards1785000000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.product_search_cards (
+        product_id        UUID         PRIMARY KEY
+                                       REFERENCES shop.products_core(id) ON DELETE CASCADE,
+        store_id          UUID,
+        category_id       UUID,
+        primary_craft_id  UUID,
+        product_name      TEXT         NOT NULL,
+        short_description TEXT,
+        history           TEXT,
+        craft_name        TEXT,
+        piece_type        TEXT,
+        style             TEXT,
+        process_type      TEXT,
+        materials         TEXT         NOT NULL DEFAULT '',
+        store_name        TEXT,
+        category_name     TEXT,
+        price             BIGINT,
+        currency          TEXT,
+        stock             BIGINT       NOT NULL DEFAULT 0,
+        images            JSONB        NOT NULL DEFAULT '[]'::jsonb,
+        semantic_text     TEXT,
+        model             TEXT,
+        generated_at      TIMESTAMPTZ,
+        refreshed_at      TIMESTAMPTZ  NOT NULL DEFAULT now()
+      )
+    `);
+    await queryRunner.query(
+      `CREATE INDEX IF NOT EXISTS idx_product_search_cards_store_id ON shop.product_search_cards (store_id)`,
+    );
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.refresh_product_search_cards(ids UUID[])
+      RETURNS void
+      LANGUAGE sql
+      AS $$
+        DELETE FROM shop.product_search_cards c
+        WHERE c.product_id = ANY(ids)
+          AND NOT EXISTS (
+            SELECT 1 FROM shop.products_core pc
+            WHERE pc.id = c.product_id
+              AND pc.deleted_at IS NULL
+              AND pc.status IN ('published', 'approved', 'approved_with_edits')
+          );
+
+        INSERT INTO shop.product_search_cards AS c (
+          product_id, store_id, category_id, primary_craft_id,
+          product_name, short_description, history,
+          craft_name, piece_type, style, process_type, materials,
+          store_name, category_name, price, currency, stock, images,
+          semantic_text, model, generated_at, refreshed_at
+        )
+        SELECT
+          pc.id,
+          pc.store_id,
+          pc.category_id,
+          pai.primary_craft_id,
+          pc.name,
+          pc.short_description,
+          pc.history,
+          tc.name,
+          pai.piece_type::TEXT,
+          pai.style::TEXT,
+          pai.process_type::TEXT,
+          COALESCE(mat.materials_list, ''),
+          sc.name,
+          cat.name,
+          pv.min_price,
+          pv.currency,
+          COALESCE(pv.total_stock, 0),
+          COALESCE(media.images, '[]'::jsonb),
+          pe.semantic_text,
+          pe.model,
+          pe.generated_at,
+          now()
+        FROM shop.products_core pc
+        LEFT JOIN shop.product_embeddings pe ON pe.product_id = pc.id
+        LEFT JOIN shop.stores sc ON pc.store_id = sc.id
+        LEFT JOIN shop.product_artisanal_identity pai ON pc.id = pai.product_id
+        LEFT JOIN taxonomy.crafts tc ON pai.primary_craft_id = tc.id
+        LEFT JOIN taxonomy.categories cat ON pc.category_id = cat.id
+        LEFT JOIN LATERAL (
+          SELECT STRING_AGG(tm.name, ', ' ORDER BY tm.name) AS materials_list
+          FROM shop.product_materials_link pml
+          JOIN taxonomy.materials tm ON pml.material_id = tm.id
+          WHERE pml.product_id = pc.id
+        ) mat ON true
+        LEFT JOIN LATERAL (
+          SELECT
+            MIN(base_price_minor) AS min_price,
+            SUM(stock_quantity)   AS total_stock,
+            MAX(currency)         AS currency
+          FROM shop.product_variants
+          WHERE product_id = pc.id AND deleted_at IS NULL AND is_active = true
+        ) pv ON true
+        LEFT JOIN LATERAL (
+          SELECT JSONB_AGG(
+                   JSONB_BUILD_OBJECT(
+                     'url', media_url,
+                     'type', media_type,
+                     'is_primary', is_primary,
+                     'display_order', display_order
+                   )
+                   ORDER BY is_primary DESC, display_order ASC
+                 ) AS images
+          FROM shop.product_media
+          WHERE product_id = pc.id
+        ) media ON true
+        WHERE pc.id = ANY(ids)
+          AND pc.deleted_at IS NULL
+          AND pc.status IN ('published', 'approved', 'approved_with_edits')
+        ON CONFLICT (product_id) DO UPDATE SET
+          store_id          = EXCLUDED.store_id,
+          category_id       = EXCLUDED.category_id,
+          primary_craft_id  = EXCLUDED.primary_craft_id,
+          product_name      = EXCLUDED.product_name,
+          short_description = EXCLUDED.short_description,
+          history           = EXCLUDED.history,
+          craft_name        = EXCLUDED.craft_name,
+          piece_type        = EXCLUDED.piece_type,
+          style             = EXCLUDED.style,
+          process_type      = EXCLUDED.process_type,
+          materials         = EXCLUDED.materials,
+          store_name        = EXCLUDED.store_name,
+          category_name     = EXCLUDED.category_name,
+          price             = EXCLUDED.price,
+          currency          = EXCLUDED.currency,
+          stock             = EXCLUDED.stock,
+          images            = EXCLUDED.images,
+          semantic_text     = EXCLUDED.semantic_text,
+          model             = EXCLUDED.model,
+          generated_at      = EXCLUDED.generated_at,
+          refreshed_at      = EXCLUDED.refreshed_at;
+      $$
+    `);
+
+    // Product-owned rows: refresh the card(s) of the old and new product id
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.product_search_card_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      DECLARE
+        new_id UUID;
+        old_id UUID;
+      BEGIN
+        IF TG_TABLE_NAME = 'products_core' THEN
+          IF TG_OP <> 'DELETE' THEN new_id := NEW.id; END IF;
+          IF TG_OP <> 'INSERT' THEN old_id := OLD.id; END IF;
+        ELSE
+          IF TG_OP <> 'DELETE' THEN new_id := NEW.product_id; END IF;
+          IF TG_OP <> 'INSERT' THEN old_id := OLD.product_id; END IF;
+        END IF;
+        PERFORM shop.refresh_product_search_cards(
+          ARRAY_REMOVE(ARRAY[new_id, NULLIF(old_id, new_id)], NULL)
+        );
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    // Embedding upserts only touch the embedding metadata of an existing card
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.product_search_card_embedding_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      BEGIN
+        UPDATE shop.product_search_cards
+        SET semantic_text = NEW.semantic_text,
+            model         = NEW.model,
+            generated_at  = NEW.generated_at,
+            refreshed_at  = now()
+        WHERE product_id = NEW.product_id;
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    // Renamed store/craft/category/material: refresh every product using it
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.product_search_card_name_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      DECLARE
+        ids UUID[];
+      BEGIN
+        IF TG_TABLE_NAME = 'stores' THEN
+          ids := ARRAY(SELECT product_id FROM shop.product_search_cards WHERE store_id = NEW.id);
+        ELSIF TG_TABLE_NAME = 'crafts' THEN
+          ids := ARRAY(SELECT product_id FROM shop.product_search_cards WHERE primary_craft_id = NEW.id);
+        ELSIF TG_TABLE_NAME = 'categories' THEN
+          ids := ARRAY(SELECT product_id FROM shop.product_search_cards WHERE category_id = NEW.id);
+        ELSE
+          ids := ARRAY(SELECT product_id FROM shop.product_materials_link WHERE material_id = NEW.id);
+        END IF;
+        PERFORM shop.refresh_product_search_cards(ids);
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    for (const table of PRODUCT_TABLES) {
+      await queryRunner.query(`
+        CREATE TRIGGER refresh_search_card_${table}
+        AFTER INSERT OR UPDATE OR DELETE ON shop.${table}
+        FOR EACH ROW EXECUTE FUNCTION shop.product_search_card_changed()
+      `);
+    }
+    await queryRunner.query(`
+      CREATE TRIGGER refresh_search_card_product_embeddings
+      AFTER INSERT OR UPDATE OF semantic_text, model, generated_at ON shop.product_embeddings
+      FOR EACH ROW EXECUTE FUNCTION shop.product_search_card_embedding_changed()
+    `);
+    for (const [schema, table] of NAME_TABLES) {
+      await queryRunner.query(`
+        CREATE TRIGGER refresh_search_card_${table}
+        AFTER UPDATE OF name ON ${schema}.${table}
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION shop.product_search_card_name_changed()
+      `);
+    }
+
+    // Backfill
+    await queryRunner.query(`
+      SELECT shop.refresh_product_search_cards(ARRAY(SELECT id FROM shop.products_core))
+    `);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    for (const [schema, table] of NAME_TABLES) {
+      await queryRunner.query(
+        `DROP TRIGGER IF EXISTS refresh_search_card_${table} ON ${schema}.${table}`,
+      );
+    }
+    await queryRunner.query(
+      `DROP TRIGGER IF EXISTS refresh_search_card_product_embeddings ON shop.product_embeddings`,
+    );
+    for (const table of PRODUCT_TABLES) {
+      await queryRunner.query(
+        `DROP TRIGGER IF EXISTS refresh_search_card_${table} ON shop.${table}`,
+      );
+    }
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.product_search_card_name_changed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.product_search_card_embedding_changed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.product_search_card_changed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.refresh_product_search_cards(UUID[])`);
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.product_search_cards`);
+  }
+}
@@ -0,0 +1,41 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Checkpoints of the agents product embedding indexer. Candidates are
+ * streamed in product_id order and last_product_id is advanced in the same
+ * transaction as each written batch, so a job that died while 'running' is
+ * resumed after its last committed product instead of starting over.
+ */
+export class CreateProductIndexingJobs1785100000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.product_indexing_jobs (
+        id                UUID         PRIMARY KEY DEFAULT gen_random_uuid(),
+        status            TEXT         NOT NULL DEFAULT 'running'
+                                       CHECK (status IN ('running', 'completed', 'failed', 'superseded')),
+        force_reindex     BOOLEAN      NOT NULL,
+        embedding_version INTEGER      NOT NULL,
+        product_ids       UUID[],
+        last_product_id   UUID,
+        total             INTEGER      NOT NULL DEFAULT 0,
+        indexed           INTEGER      NOT NULL DEFAULT 0,
+        failed            INTEGER      NOT NULL DEFAULT 0,
+        error             TEXT,
+        started_at        TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        updated_at        TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        finished_at       TIMESTAMPTZ
+      )
+    `);
+    await queryRunner.query(`
+      CREATE INDEX IF NOT EXISTS idx_product_indexing_jobs_running
+      ON shop.product_indexing_jobs (started_at DESC)
+      WHERE status = 'running'
+    `);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.product_indexing_jobs`);
+  }
+}
@@ -0,0 +1,151 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Incremental product re-embedding. Edits to anything that feeds a product's
+ * semantic text (name, descriptions, artisanal identity, materials, and
+ * renamed crafts/techniques/materials/curatorial categories) enqueue the
+ * product in shop.product_embedding_queue and NOTIFY
+ * product_embedding_queue. The agents worker compares md5 of the rebuilt
+ * text with product_embeddings.content_hash and only re-embeds products
+ * whose text actually changed.
+ */
+const PRODUCT_TABLES = [
+  // [table, product id column, watched columns (null = every change)]
+  ['products_core', 'id', 'name, short_description, history, deleted_at'],
+  ['product_artisanal_identity', 'product_id', null],
+  ['product_materials_link', 'product_id', null],
+];
+
+const TAXONOMY_TABLES = ['crafts', 'techniques', 'curatorial_categories', 'materials'];
+
+export class AddProductEmbeddingChangeQueue1785200000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(
+      `ALTER TABLE shop.product_embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT`,
+    );
+    // semantic_text is the text that was embedded
+    await queryRunner.query(
+      `UPDATE shop.product_embeddings SET content_hash = md5(semantic_text) WHERE content_hash IS NULL`,
+    );
+
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.product_embedding_queue (
+        product_id  UUID         PRIMARY KEY
+                                 REFERENCES shop.products_core(id) ON DELETE CASCADE,
+        enqueued_at TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        attempts    INTEGER      NOT NULL DEFAULT 0,
+        last_error  TEXT
+      )
+    `);
+    await queryRunner.query(
+      `CREATE INDEX IF NOT EXISTS idx_product_embedding_queue_enqueued_at ON shop.product_embedding_queue (enqueued_at)`,
+    );
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.enqueue_product_embeddings(ids UUID[])
+      RETURNS void
+      LANGUAGE plpgsql
+      AS $$
+      BEGIN
+        INSERT INTO shop.product_embedding_queue (product_id)
+        SELECT DISTINCT pc.id
+        FROM shop.products_core pc
+        WHERE pc.id = ANY(ids)
+        ON CONFLICT (product_id) DO UPDATE
+          SET enqueued_at = now(), attempts = 0, last_error = NULL;
+        IF FOUND THEN
+          PERFORM pg_notify('product_embedding_queue', '');
+        END IF;
+      END;
+      $$
+    `);
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.product_embedding_source_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      DECLARE
+        id_column TEXT := TG_ARGV[0];
+        new_id UUID;
+        old_id UUID;
+      BEGIN
+        IF TG_OP <> 'DELETE' THEN new_id := (to_jsonb(NEW) ->> id_column)::uuid; END IF;
+        IF TG_OP <> 'INSERT' THEN old_id := (to_jsonb(OLD) ->> id_column)::uuid; END IF;
+        PERFORM shop.enqueue_product_embeddings(
+          ARRAY_REMOVE(ARRAY[new_id, NULLIF(old_id, new_id)], NULL)
+        );
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.product_embedding_taxonomy_renamed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      BEGIN
+        IF TG_TABLE_NAME = 'materials' THEN
+          PERFORM shop.enqueue_product_embeddings(ARRAY(
+            SELECT product_id FROM shop.product_materials_link WHERE material_id = NEW.id
+          ));
+        ELSIF TG_TABLE_NAME = 'techniques' THEN
+          PERFORM shop.enqueue_product_embeddings(ARRAY(
+            SELECT product_id FROM shop.product_artisanal_identity
+            WHERE primary_technique_id = NEW.id OR secondary_technique_id = NEW.id
+          ));
+        ELSIF TG_TABLE_NAME = 'crafts' THEN
+          PERFORM shop.enqueue_product_embeddings(ARRAY(
+            SELECT product_id FROM shop.product_artisanal_identity WHERE primary_craft_id = NEW.id
+          ));
+        ELSE
+          PERFORM shop.enqueue_product_embeddings(ARRAY(
+            SELECT product_id FROM shop.product_artisanal_identity WHERE curatorial_category_id = NEW.id
+          ));
+        END IF;
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    for (const [table, idColumn, columns] of PRODUCT_TABLES) {
+      const events = columns
+        ? `INSERT OR UPDATE OF ${columns}`
+        : 'INSERT OR UPDATE OR DELETE';
+      await queryRunner.query(`
+        CREATE TRIGGER enqueue_embedding_${table}
+        AFTER ${events} ON shop.${table}
+        FOR EACH ROW EXECUTE FUNCTION shop.product_embedding_source_changed('${idColumn}')
+      `);
+    }
+    for (const table of TAXONOMY_TABLES) {
+      await queryRunner.query(`
+        CREATE TRIGGER enqueue_embedding_${table}
+        AFTER UPDATE OF name ON taxonomy.${table}
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION shop.product_embedding_taxonomy_renamed()
+      `);
+    }
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    for (const table of TAXONOMY_TABLES) {
+      await queryRunner.query(
+        `DROP TRIGGER IF EXISTS enqueue_embedding_${table} ON taxonomy.${table}`,
+      );
+    }
+    for (const [table] of PRODUCT_TABLES) {
+      await queryRunner.query(
+        `DROP TRIGGER IF EXISTS enqueue_embedding_${table} ON shop.${table}`,
+      );
+    }
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.product_embedding_taxonomy_renamed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.product_embedding_source_changed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.enqueue_product_embeddings(UUID[])`);
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.product_embedding_queue`);
+    await queryRunner.query(`ALTER TABLE shop.product_embeddings DROP COLUMN IF EXISTS content_hash`);
+  }
+}
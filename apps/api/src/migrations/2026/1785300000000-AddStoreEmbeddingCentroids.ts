@@ -0,0 +1,125 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Store semantic search. A store's vector in shop.store_embeddings is the
+ * weighted centroid of the embeddings of its searchable products (rows of
+ * shop.product_search_cards), optionally blended with an embedding of the
+ * store profile (name + story), so no product text is embedded twice.
+ *
+ * Changes to a store's cards, to its products' embeddings or to its profile
+ * enqueue the store in shop.store_embedding_queue and NOTIFY
+ * store_embedding_queue; the agents worker recomputes only those centroids.
+ */
+export class AddStoreEmbeddingCentroids1785300000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      ALTER TABLE shop.store_embeddings
+        ADD COLUMN IF NOT EXISTS product_count     INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS craft_name        TEXT,
+        ADD COLUMN IF NOT EXISTS profile_embedding vector(1536),
+        ADD COLUMN IF NOT EXISTS content_hash      TEXT
+    `);
+
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.store_embedding_queue (
+        store_id    UUID         PRIMARY KEY
+                                 REFERENCES shop.stores(id) ON DELETE CASCADE,
+        enqueued_at TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        attempts    INTEGER      NOT NULL DEFAULT 0,
+        last_error  TEXT
+      )
+    `);
+    await queryRunner.query(
+      `CREATE INDEX IF NOT EXISTS idx_store_embedding_queue_enqueued_at ON shop.store_embedding_queue (enqueued_at)`,
+    );
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.enqueue_store_embeddings(ids UUID[])
+      RETURNS void
+      LANGUAGE plpgsql
+      AS $$
+      BEGIN
+        INSERT INTO shop.store_embedding_queue (store_id)
+        SELECT DISTINCT s.id
+        FROM shop.stores s
+        WHERE s.id = ANY(ids)
+        ON CONFLICT (store_id) DO UPDATE
+          SET enqueued_at = now(), attempts = 0, last_error = NULL;
+        IF FOUND THEN
+          PERFORM pg_notify('store_embedding_queue', '');
+        END IF;
+      END;
+      $$
+    `);
+
+    await queryRunner.query(`
+      CREATE OR REPLACE FUNCTION shop.store_embedding_source_changed()
+      RETURNS trigger
+      LANGUAGE plpgsql
+      AS $$
+      DECLARE
+        new_id UUID;
+        old_id UUID;
+      BEGIN
+        IF TG_TABLE_NAME = 'product_embeddings' THEN
+          SELECT store_id INTO new_id FROM shop.product_search_cards WHERE product_id = NEW.product_id;
+        ELSIF TG_TABLE_NAME = 'stores' THEN
+          new_id := NEW.id;
+        ELSE
+          IF TG_OP <> 'DELETE' THEN new_id := NEW.store_id; END IF;
+          IF TG_OP <> 'INSERT' THEN old_id := OLD.store_id; END IF;
+        END IF;
+        PERFORM shop.enqueue_store_embeddings(
+          ARRAY_REMOVE(ARRAY[new_id, NULLIF(old_id, new_id)], NULL)
+        );
+        RETURN NULL;
+      END;
+      $$
+    `);
+
+    await queryRunner.query(`
+      CREATE TRIGGER enqueue_store_embedding_cards
+      AFTER INSERT OR UPDATE OF store_id, stock, primary_craft_id OR DELETE ON shop.product_search_cards
+      FOR EACH ROW EXECUTE FUNCTION shop.store_embedding_source_changed()
+    `);
+    await queryRunner.query(`
+      CREATE TRIGGER enqueue_store_embedding_product_embeddings
+      AFTER INSERT OR UPDATE OF embedding ON shop.product_embeddings
+      FOR EACH ROW EXECUTE FUNCTION shop.store_embedding_source_changed()
+    `);
+    await queryRunner.query(`
+      CREATE TRIGGER enqueue_store_embedding_stores
+      AFTER UPDATE OF name, story, deleted_at ON shop.stores
+      FOR EACH ROW EXECUTE FUNCTION shop.store_embedding_source_changed()
+    `);
+
+    // Backfill: every store with searchable products, plus stale rows
+    await queryRunner.query(`
+      SELECT shop.enqueue_store_embeddings(ARRAY(
+        SELECT DISTINCT store_id FROM shop.product_search_cards WHERE store_id IS NOT NULL
+        UNION
+        SELECT store_id FROM shop.store_embeddings
+      ))
+    `);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TRIGGER IF EXISTS enqueue_store_embedding_stores ON shop.stores`);
+    await queryRunner.query(
+      `DROP TRIGGER IF EXISTS enqueue_store_embedding_product_embeddings ON shop.product_embeddings`,
+    );
+    await queryRunner.query(`DROP TRIGGER IF EXISTS enqueue_store_embedding_cards ON shop.product_search_cards`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.store_embedding_source_changed()`);
+    await queryRunner.query(`DROP FUNCTION IF EXISTS shop.enqueue_store_embeddings(UUID[])`);
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.store_embedding_queue`);
+    await queryRunner.query(`
+      ALTER TABLE shop.store_embeddings
+        DROP COLUMN IF EXISTS content_hash,
+        DROP COLUMN IF EXISTS profile_embedding,
+        DROP COLUMN IF EXISTS craft_name,
+        DROP COLUMN IF EXISTS product_count
+    `);
+  }
+}
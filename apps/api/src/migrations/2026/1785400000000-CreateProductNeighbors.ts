@@ -0,0 +1,33 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Precomputed "more like this" lists. The agents recommendation service
+ * rebuilds the top-N neighbours of every searchable product nightly from the
+ * vectors in shop.product_embeddings (nearest neighbours re-ranked for store
+ * and craft diversity), so product pages read them by primary key.
+ */
+export class CreateProductNeighbors1785400000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.product_neighbors (
+        product_id   UUID         NOT NULL
+                                  REFERENCES shop.products_core(id) ON DELETE CASCADE,
+        rank         SMALLINT     NOT NULL,
+        neighbor_id  UUID         NOT NULL
+                                  REFERENCES shop.products_core(id) ON DELETE CASCADE,
+        similarity   REAL         NOT NULL,
+        computed_at  TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        PRIMARY KEY (product_id, rank)
+      )
+    `);
+    await queryRunner.query(
+      `CREATE INDEX IF NOT EXISTS idx_product_neighbors_neighbor_id ON shop.product_neighbors (neighbor_id)`,
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.product_neighbors`);
+  }
+}
@@ -0,0 +1,25 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * HNSW calibrations written by the agents vector tuning service: per target
+ * (products, knowledge) the recall/latency sweep over hnsw.ef_search, the
+ * shadow-index build comparisons and the ef_search chosen for each search
+ * quality (fast / balanced). Loaded by every agents process at startup.
+ */
+export class CreateVectorSearchCalibrations1785500000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.vector_search_calibrations (
+        target       TEXT         PRIMARY KEY,
+        report       JSONB        NOT NULL,
+        computed_at  TIMESTAMPTZ  NOT NULL DEFAULT now()
+      )
+    `);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.vector_search_calibrations`);
+  }
+}
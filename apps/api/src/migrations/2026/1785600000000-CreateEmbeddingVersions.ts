@@ -0,0 +1,44 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Blue/green embedding versions of shop.product_embeddings, kept by the
+ * agents embedding version service: the model and dimensions of every
+ * version, its table (live versions use the canonical name, others
+ * <table>_v<n>), its build validation and its lifecycle
+ * (building -> ready / rejected / failed -> live -> retired -> dropped).
+ * At most one version per target is live. The first agents startup
+ * registers the current model as version 1.
+ */
+export class CreateEmbeddingVersions1785600000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`
+      CREATE TABLE IF NOT EXISTS shop.embedding_versions (
+        target       TEXT         NOT NULL,
+        version      INTEGER      NOT NULL,
+        model        TEXT         NOT NULL,
+        dimensions   INTEGER      NOT NULL,
+        table_name   TEXT         NOT NULL,
+        status       TEXT         NOT NULL
+                                  CHECK (status IN ('building', 'ready', 'rejected', 'failed', 'live', 'retired', 'dropped')),
+        rows         BIGINT,
+        ann_recall   REAL,
+        agreement    REAL,
+        error        TEXT,
+        created_at   TIMESTAMPTZ  NOT NULL DEFAULT now(),
+        live_at      TIMESTAMPTZ,
+        retired_at   TIMESTAMPTZ,
+        dropped_at   TIMESTAMPTZ,
+        PRIMARY KEY (target, version)
+      )
+    `);
+    await queryRunner.query(
+      `CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_versions_live ON shop.embedding_versions (target) WHERE status = 'live'`,
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`DROP TABLE IF EXISTS shop.embedding_versions`);
+  }
+}
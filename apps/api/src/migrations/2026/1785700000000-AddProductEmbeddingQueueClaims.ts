@@ -0,0 +1,24 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Claims for shop.product_embedding_queue. The agents worker stamps
+ * claimed_at (and counts the attempt) in a short transaction, embeds with no
+ * transaction open, then deletes only the rows whose enqueued_at is still the
+ * one it claimed; product edits never wait on a row lock held across the
+ * OpenAI call. A claim older than the worker's lease is taken over.
+ */
+export class AddProductEmbeddingQueueClaims1785700000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(
+      `ALTER TABLE shop.product_embedding_queue ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ`,
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(
+      `ALTER TABLE shop.product_embedding_queue DROP COLUMN IF EXISTS claimed_at`,
+    );
+  }
+}
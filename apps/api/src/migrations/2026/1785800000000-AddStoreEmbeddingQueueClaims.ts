@@ -0,0 +1,24 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+/**
+ * Claims for shop.store_embedding_queue, as AddProductEmbeddingQueueClaims
+ * does for products: the agents worker stamps claimed_at, embeds changed
+ * store profiles with no transaction open, then deletes only the rows whose
+ * enqueued_at is still the one it claimed, so store and product writes never
+ * wait on the OpenAI call.
+ */
+export class AddStoreEmbeddingQueueClaims1785800000000
+  implements MigrationInterface
+{
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(
+      `ALTER TABLE shop.store_embedding_queue ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ`,
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(
+      `ALTER TABLE shop.store_embedding_queue DROP COLUMN IF EXISTS claimed_at`,
+    );
+  }
+}
@@ -24,6 +24,12 @@ class Settings(BaseSettings):
 
     # Catalog Database (Lightsail PostgreSQL - shop.* and taxonomy.* tables)
     catalog_db_url: str = os.getenv("CATALOG_DB_URL", "")
+    # Extra search catalogs: JSON {"name": {"dsn": ..., "max_size": 5, "idle_seconds": 300, ...}}
+    search_catalogs: str = os.getenv("SEARCH_CATALOGS", "")
+    # In-process taxonomy snapshot (also refreshed on NOTIFY taxonomy_changed)
+    taxonomy_cache_ttl_seconds: int = int(os.getenv("TAXONOMY_CACHE_TTL_SECONDS", "600"))
+    # Crafts/materials/techniques sent to the LLM per product (embedding prefilter; 0 = full taxonomy)
+    taxonomy_prefilter_top_k: int = int(os.getenv("TAXONOMY_PREFILTER_TOP_K", "20"))
     
     # API Security
     api_secret_key: str = os.getenv("API_SECRET_KEY", "")
@@ -45,8 +51,42 @@ class Settings(BaseSettings):
     max_retries: int = int(os.getenv("MAX_RETRIES", "3"))
     request_timeout: int = int(os.getenv("REQUEST_TIMEOUT", "60"))
     rag_top_k: int = int(os.getenv("RAG_TOP_K", "5"))
+    hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
+    # Target recall@k of the "fast" / "balanced" search qualities when calibrating ef_search
+    vector_recall_fast: float = float(os.getenv("VECTOR_RECALL_FAST", "0.9"))
+    vector_recall_balanced: float = float(os.getenv("VECTOR_RECALL_BALANCED", "0.98"))
+    # Blue/green embedding versions: min top-k overlap of a new model with the live one
+    # before it may go live, and retired versions kept for rollback
+    embedding_swap_min_agreement: float = float(os.getenv("EMBEDDING_SWAP_MIN_AGREEMENT", "0.3"))
+    embedding_versions_retained: int = int(os.getenv("EMBEDDING_VERSIONS_RETAINED", "1"))
+    # Product search caches: result pages (cleared on re-indexing) and query vectors
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", "500"))
+    search_cache_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    query_embedding_cache_ttl_seconds: int = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+    # Product search cursors ("ver más"): idle seconds before a cursor expires
+    search_cursor_ttl_seconds: int = int(os.getenv("SEARCH_CURSOR_TTL_SECONDS", "900"))
+    # Product indexer: texts per embeddings call, embedding batches in flight while writing
+    index_batch_size: int = int(os.getenv("INDEX_BATCH_SIZE", "100"))
+    index_pipeline_depth: int = int(os.getenv("INDEX_PIPELINE_DEPTH", "3"))
+    # Re-embedding queue fed by catalog triggers: drained on NOTIFY, polled as a fallback
+    embedding_queue_poll_seconds: int = int(os.getenv("EMBEDDING_QUEUE_POLL_SECONDS", "60"))
+    # Local mmap replica of the product vectors, shared by the workers of a host ("" = off)
+    vector_replica_dir: str = os.getenv("VECTOR_REPLICA_DIR", "")
+    vector_replica_sync_seconds: int = int(os.getenv("VECTOR_REPLICA_SYNC_SECONDS", "30"))
+    # Store vectors: share of the store profile (name + story) embedding vs the product centroid; 0 disables it
+    store_profile_weight: float = float(os.getenv("STORE_PROFILE_WEIGHT", "0.25"))
+    # Related products: neighbours kept per product, MMR store/craft diversity (0-1), nightly rebuild hour (UTC, -1 = off)
+    related_products_top_n: int = int(os.getenv("RELATED_PRODUCTS_TOP_N", "20"))
+    related_products_diversity: float = float(os.getenv("RELATED_PRODUCTS_DIVERSITY", "0.3"))
+    related_products_refresh_hour: int = int(os.getenv("RELATED_PRODUCTS_REFRESH_HOUR", "7"))
+    # Facet counts: in-memory snapshot re-checked every N seconds; price bucket edges in minor units
+    facet_refresh_seconds: int = int(os.getenv("FACET_REFRESH_SECONDS", "60"))
+    facet_price_buckets: str = os.getenv("FACET_PRICE_BUCKETS", "5000000,10000000,20000000,50000000")
+    rag_hybrid_search: bool = os.getenv("RAG_HYBRID_SEARCH", "false").lower() == "true"
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    chunk_tokens: int = int(os.getenv("CHUNK_TOKENS", "350"))
+    chunk_overlap_tokens: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "60"))
     max_batch_size: int = int(os.getenv("MAX_BATCH_SIZE", "100"))
     
     # Memory Configuration
@@ -69,6 +109,22 @@ class Settings(BaseSettings):
     artisan_whatsapp_webhook_secret: str = os.getenv("ARTISAN_WHATSAPP_WEBHOOK_SECRET", "")
     artisan_whatsapp_api_url: str = os.getenv("ARTISAN_WHATSAPP_API_URL", "https://graph.facebook.com/v21.0")
 
+    # WhatsApp message dispatch (per bot): pipelines running at once, queued
+    # messages before new ones get a "busy" reply, seconds to finish on shutdown
+    whatsapp_max_concurrency: int = int(os.getenv("WHATSAPP_MAX_CONCURRENCY", "16"))
+    whatsapp_max_backlog: int = int(os.getenv("WHATSAPP_MAX_BACKLOG", "200"))
+    whatsapp_drain_seconds: float = float(os.getenv("WHATSAPP_DRAIN_SECONDS", "20"))
+    # Webhook retries: message ids remembered this long; optional SQLite file
+    # shared by the workers of a host (empty: in-memory per process)
+    whatsapp_dedup_ttl_seconds: int = int(os.getenv("WHATSAPP_DEDUP_TTL_SECONDS", "86400"))
+    whatsapp_dedup_path: str = os.getenv("WHATSAPP_DEDUP_PATH", "")
+    # Graph API connection pools: HTTP/2 (needs the h2 package, httpx[http2])
+    whatsapp_http2: bool = os.getenv("WHATSAPP_HTTP2", "false").lower() == "true"
+    # Outbound sends per phone number: messages/s of its throughput tier (Cloud API
+    # default 80) and pacing per recipient after a short burst
+    whatsapp_send_rate: float = float(os.getenv("WHATSAPP_SEND_RATE", "80"))
+    whatsapp_recipient_interval_seconds: float = float(os.getenv("WHATSAPP_RECIPIENT_INTERVAL_SECONDS", "1"))
+
     class Config:
         env_file = ".env"
         case_sensitive = False
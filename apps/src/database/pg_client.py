@@ -1,17 +1,26 @@
 """
-Direct asyncpg connection pool for the catalog database (Lightsail PostgreSQL).
+Direct asyncpg connection pools for the catalog databases (Lightsail PostgreSQL).
 
-This client is used exclusively for:
+These clients are used exclusively for:
   - Reading shop.products_core + taxonomy joins to build semantic text
   - Writing/upserting embeddings into shop.product_embeddings and shop.store_embeddings
   - Executing vector similarity searches
 
+Catalogs are registered by name: DEFAULT_CATALOG is CATALOG_DB_URL, others
+come from SEARCH_CATALOGS (JSON object of name -> CatalogConfig fields).
+A catalog's pool is created on its first get_pool() call, and connections
+idle for idle_seconds are closed, so an unused catalog holds no connections.
+
 It is intentionally separate from the Supabase client, which handles
 agent memory, knowledge base, and conversation storage.
 """
 
 from __future__ import annotations
 
+import asyncio
+import json
+from dataclasses import dataclass, fields
+
 import asyncpg
 from asyncpg import Pool
 from src.api.config import settings
@@ -19,28 +28,92 @@ from src.utils.enhanced_logger import create_enhanced_logger
 
 logger = create_enhanced_logger(__name__)
 
-_pool: Pool | None = None
+DEFAULT_CATALOG = "catalog"
 
 
-async def get_pool() -> Pool:
-    """Return the singleton asyncpg connection pool, creating it if needed."""
-    global _pool
-    if _pool is None:
-        if not settings.catalog_db_url:
-            raise ValueError(
-                "CATALOG_DB_URL is not configured. "
-                "Set it to the PostgreSQL connection string for the catalog database."
-            )
-        _pool = await asyncpg.create_pool(
-            dsn=settings.catalog_db_url,
+@dataclass(frozen=True)
+class CatalogConfig:
+    """One searchable catalog database."""
+
+    name: str
+    dsn: str
+    min_size: int = 0
+    max_size: int = 5
+    idle_seconds: float = 300.0          # idle connections are closed after this
+    embedding_version: int | None = None  # None: the search service default
+    cache_namespace: str | None = None    # defaults to name
+    background_worker: bool = False       # re-embedding queue listener + indexing resume
+    vector_replica: bool = False          # local mmap replica for unfiltered searches (VECTOR_REPLICA_DIR)
+
+    @property
+    def namespace(self) -> str:
+        return self.cache_namespace or self.name
+
+
+def _load_catalogs() -> dict[str, CatalogConfig]:
+    catalogs = {
+        DEFAULT_CATALOG: CatalogConfig(
+            name=DEFAULT_CATALOG,
+            dsn=settings.catalog_db_url or "",
             min_size=2,
             max_size=10,
-            command_timeout=60,
-            # pgvector codec: register vector type as text so asyncpg handles it
-            init=_init_connection,
+            background_worker=True,
+            vector_replica=bool(settings.vector_replica_dir),
         )
-        logger.info("Catalog DB connection pool created")
-    return _pool
+    }
+    allowed = {f.name for f in fields(CatalogConfig)} - {"name"}
+    try:
+        extra = json.loads(settings.search_catalogs) if settings.search_catalogs else {}
+    except json.JSONDecodeError as exc:
+        logger.error(f"SEARCH_CATALOGS is not valid JSON, ignoring it: {exc}")
+        extra = {}
+    for name, options in extra.items():
+        if name == DEFAULT_CATALOG or not options.get("dsn"):
+            logger.error(f"SEARCH_CATALOGS entry '{name}' ignored (reserved name or no dsn)")
+            continue
+        catalogs[name] = CatalogConfig(
+            name=name, **{k: v for k, v in options.items() if k in allowed}
+        )
+    return catalogs
+
+
+catalogs: dict[str, CatalogConfig] = _load_catalogs()
+
+_pools: dict[str, Pool] = {}
+_pools_lock = asyncio.Lock()
+
+
+def get_catalog(name: str = DEFAULT_CATALOG) -> CatalogConfig:
+    """Registered catalog by name; KeyError for unknown names."""
+    return catalogs[name]
+
+
+async def get_pool(catalog: str = DEFAULT_CATALOG) -> Pool:
+    """Return the asyncpg connection pool of a catalog, creating it on first use."""
+    pool = _pools.get(catalog)
+    if pool is not None:
+        return pool
+    config = get_catalog(catalog)
+    if not config.dsn:
+        raise ValueError(
+            "CATALOG_DB_URL is not configured. "
+            "Set it to the PostgreSQL connection string for the catalog database."
+            if catalog == DEFAULT_CATALOG
+            else f"Catalog '{catalog}' has no dsn configured in SEARCH_CATALOGS."
+        )
+    async with _pools_lock:
+        if catalog not in _pools:
+            _pools[catalog] = await asyncpg.create_pool(
+                dsn=config.dsn,
+                min_size=config.min_size,
+                max_size=config.max_size,
+                max_inactive_connection_lifetime=config.idle_seconds,
+                command_timeout=60,
+                # pgvector codec: register vector type as text so asyncpg handles it
+                init=_init_connection,
+            )
+            logger.info(f"Catalog DB connection pool created ({catalog})")
+    return _pools[catalog]
 
 
 async def _init_connection(conn: asyncpg.Connection) -> None:
@@ -84,9 +157,7 @@ def _decode_vector(value: str) -> list[float]:
 
 
 async def close_pool() -> None:
-    """Gracefully close the connection pool (call on app shutdown)."""
-    global _pool
-    if _pool is not None:
-        await _pool.close()
-        _pool = None
-        logger.info("Catalog DB connection pool closed")
+    """Gracefully close every catalog connection pool (call on app shutdown)."""
+    for name in list(_pools):
+        await _pools.pop(name).close()
+        logger.info(f"Catalog DB connection pool closed ({name})")
@@ -10,7 +10,7 @@ Connection: configure AGENTS_DB_URL in the environment.
 import asyncpg
 import json
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from src.api.config import settings
@@ -23,6 +23,206 @@ def _vec_to_pg(embedding: List[float]) -> str:
     return "[" + ",".join(str(v) for v in embedding) + "]"
 
 
+def _decode_knowledge_rows(rows: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    """Convert knowledge search rows to dicts, decoding document_metadata JSON."""
+    result = []
+    for r in rows:
+        d = dict(r)
+        if isinstance(d.get("document_metadata"), str):
+            try:
+                d["document_metadata"] = json.loads(d["document_metadata"])
+            except Exception:
+                d["document_metadata"] = {}
+        result.append(d)
+    return result
+
+
+# Hybrid knowledge search: candidates per ranking and RRF damping constant.
+_HYBRID_CANDIDATE_FACTOR = 4
+_HYBRID_MIN_CANDIDATES = 20
+_RRF_K = 60
+
+# Scope of RAG chunks. Must match the partial index predicates in
+# agents/scripts/migrate_vector_indexes.sql or the planner cannot use them.
+_KNOWLEDGE_SCOPE = (
+    "(e.memory_type = 'knowledge' OR e.memory_type IS NULL)"
+    " AND e.document_id IS NOT NULL"
+    " AND e.embedding IS NOT NULL"
+)
+
+# Transaction-local settings for vector queries: the HNSW candidate list size,
+# and custom plans so partial index predicates (memory_type, category) are
+# matched against the actual parameter values instead of a generic plan.
+_VECTOR_SESSION_SQL = (
+    "SELECT set_config('hnsw.ef_search', $1, true),"
+    " set_config('plan_cache_mode', 'force_custom_plan', true)"
+)
+
+# quality="exact": rank every row in scope without the HNSW index
+_EXACT_VECTOR_SESSION_SQL = (
+    "SELECT set_config('enable_indexscan', 'off', true),"
+    " set_config('plan_cache_mode', 'force_custom_plan', true)"
+)
+
+_KNOWLEDGE_SEARCH_SQL = """
+    WITH nearest AS (
+        SELECT e.id, e.chunk_text, e.knowledge_category, e.document_id, e.chunk_index,
+               e.embedding <=> $1::vector AS distance
+        FROM agents.agent_knowledge_embeddings e
+        WHERE {where}
+        ORDER BY e.embedding <=> $1::vector
+        LIMIT $2
+    )
+    SELECT n.id::text, n.chunk_text, n.knowledge_category,
+           1 - n.distance AS similarity,
+           n.document_id::text,
+           n.chunk_index,
+           d.filename AS document_filename,
+           d.metadata AS document_metadata
+    FROM nearest n
+    JOIN agents.agent_knowledge_documents d ON d.id = n.document_id
+    ORDER BY n.distance
+"""
+
+# $1 query vector, $2 match_count, $3 candidates per ranking, $4 query text.
+# Lexical terms are OR-ed (plainto_tsquery ANDs them, which rarely matches a question).
+_HYBRID_KNOWLEDGE_SEARCH_SQL = f"""
+    WITH vec AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rnk
+        FROM (
+            SELECT e.id, e.embedding <=> $1::vector AS distance
+            FROM agents.agent_knowledge_embeddings e
+            WHERE {{where}}
+            ORDER BY e.embedding <=> $1::vector
+            LIMIT $3
+        ) v
+    ),
+    q AS (
+        SELECT NULLIF(REPLACE(plainto_tsquery('spanish', $4)::text, '&', '|'), '')::tsquery AS tsq
+    ),
+    lex AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY score DESC) AS rnk
+        FROM (
+            SELECT e.id, ts_rank_cd(to_tsvector('spanish', e.chunk_text), q.tsq) AS score
+            FROM agents.agent_knowledge_embeddings e, q
+            WHERE q.tsq IS NOT NULL
+              AND {{where}}
+              AND to_tsvector('spanish', e.chunk_text) @@ q.tsq
+            ORDER BY score DESC
+            LIMIT $3
+        ) l
+    ),
+    fused AS (
+        SELECT id, SUM(1.0 / ({_RRF_K} + rnk)) AS rrf_score
+        FROM (SELECT id, rnk FROM vec UNION ALL SELECT id, rnk FROM lex) ranked
+        GROUP BY id
+    )
+    SELECT e.id::text, e.chunk_text, e.knowledge_category,
+           1 - (e.embedding <=> $1::vector) AS similarity,
+           f.rrf_score,
+           e.document_id::text,
+           e.chunk_index,
+           d.filename AS document_filename,
+           d.metadata AS document_metadata
+    FROM fused f
+    JOIN agents.agent_knowledge_embeddings e ON e.id = f.id
+    JOIN agents.agent_knowledge_documents d ON d.id = e.document_id
+    ORDER BY f.rrf_score DESC
+    LIMIT $2
+"""
+
+_MEMORY_SEARCH_SQL = """
+    SELECT e.id, e.chunk_text, e.memory_type, e.agent_type, e.artisan_id,
+           e.session_id, e.summary, e.importance_score, e.knowledge_category,
+           1 - (e.embedding <=> $1::vector) AS similarity,
+           e.created_at
+    FROM agents.agent_knowledge_embeddings e
+    WHERE {where}
+    ORDER BY e.embedding <=> $1::vector
+    LIMIT $2
+"""
+
+_SESSION_MEMORIES_SQL = """
+    SELECT id, chunk_text, memory_type, agent_type, artisan_id,
+           session_id, summary, importance_score, knowledge_category, created_at
+    FROM agents.agent_knowledge_embeddings
+    WHERE {where}
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+
+# ------------------------------------------------------------------
+# Query builders
+#
+# Optional filters are appended as real predicates instead of
+# "($n IS NULL OR col = $n)", so each filter combination gets a plan
+# that can use the matching partial / composite index.
+# ------------------------------------------------------------------
+
+def _knowledge_search_query(
+    query_embedding: List[float],
+    match_count: int,
+    category: Optional[str] = None,
+    query_text: Optional[str] = None,
+    hybrid: bool = False,
+) -> Tuple[str, List[Any], int]:
+    """Return (sql, args, candidate_count) for a knowledge search."""
+    where = _KNOWLEDGE_SCOPE
+    if hybrid and query_text:
+        candidates = max(match_count * _HYBRID_CANDIDATE_FACTOR, _HYBRID_MIN_CANDIDATES)
+        args: List[Any] = [_vec_to_pg(query_embedding), match_count, candidates, query_text]
+        template = _HYBRID_KNOWLEDGE_SEARCH_SQL
+    else:
+        candidates = match_count
+        args = [_vec_to_pg(query_embedding), match_count]
+        template = _KNOWLEDGE_SEARCH_SQL
+    if category is not None:
+        args.append(category)
+        where += f" AND e.knowledge_category = ${len(args)}"
+    return template.format(where=where), args, candidates
+
+
+def _memory_search_query(
+    query_embedding: List[float],
+    match_count: int = 10,
+    filter_memory_type: Optional[str] = None,
+    filter_agent_type: Optional[str] = None,
+    filter_artisan_id: Optional[UUID] = None,
+    filter_session_id: Optional[str] = None,
+    min_importance: float = 0.0,
+) -> Tuple[str, List[Any]]:
+    """Return (sql, args) for a memory search (same result shape as agents.search_agent_memory)."""
+    args: List[Any] = [_vec_to_pg(query_embedding), match_count]
+    clauses = ["e.embedding IS NOT NULL"]
+    for column, value, cast in (
+        ("memory_type", filter_memory_type, ""),
+        ("agent_type", filter_agent_type, ""),
+        ("artisan_id", str(filter_artisan_id) if filter_artisan_id else None, "::uuid"),
+        ("session_id", filter_session_id, ""),
+    ):
+        if value is not None:
+            args.append(value)
+            clauses.append(f"e.{column} = ${len(args)}{cast}")
+    args.append(min_importance)
+    clauses.append(f"e.importance_score >= ${len(args)}")
+    return _MEMORY_SEARCH_SQL.format(where=" AND ".join(clauses)), args
+
+
+def _session_memories_query(
+    session_id: str,
+    artisan_id: Optional[UUID] = None,
+    limit: int = 10,
+) -> Tuple[str, List[Any]]:
+    """Return (sql, args) for recent conversational memories of a session."""
+    args: List[Any] = [session_id, limit]
+    clauses = ["session_id = $1", "memory_type = 'conversational'"]
+    if artisan_id:
+        args.append(str(artisan_id))
+        clauses.append(f"artisan_id = ${len(args)}::uuid")
+    return _SESSION_MEMORIES_SQL.format(where=" AND ".join(clauses)), args
+
+
 class AgentsDbClient:
     """
     Async database client for the 'agents' schema on Lightsail PostgreSQL.
@@ -56,6 +256,17 @@ class AgentsDbClient:
             await self._pool.close()
             self._pool = None
 
+    async def _fetch_vector_query(self, sql: str, args: List[Any], ef_search: Optional[int]) -> List[asyncpg.Record]:
+        """Run an ANN query with transaction-local hnsw.ef_search (None: exact scan) and custom plans."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if ef_search is None:
+                    await conn.execute(_EXACT_VECTOR_SESSION_SQL)
+                else:
+                    await conn.execute(_VECTOR_SESSION_SQL, str(ef_search))
+                return await conn.fetch(sql, *args)
+
     # ------------------------------------------------------------------
     # Memory entries  (agents.agent_knowledge_embeddings)
     # ------------------------------------------------------------------
@@ -103,25 +314,24 @@ class AgentsDbClient:
         filter_artisan_id: Optional[UUID] = None,
         filter_session_id: Optional[str] = None,
         min_importance: float = 0.0,
+        ef_search: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        """Semantic search over memory entries using agents.search_agent_memory()."""
-        pool = await self._get_pool()
-        sql = """
-            SELECT * FROM agents.search_agent_memory(
-                $1::vector, $2, $3, $4, $5::uuid, $6, $7
-            )
         """
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                sql,
-                _vec_to_pg(query_embedding),
-                match_count,
-                filter_memory_type,
-                filter_agent_type,
-                str(filter_artisan_id) if filter_artisan_id else None,
-                filter_session_id,
-                min_importance,
-            )
+        Semantic search over memory entries.
+
+        Same filters and result shape as agents.search_agent_memory(), built
+        inline so a memory_type filter can use its partial HNSW index.
+        """
+        sql, args = _memory_search_query(
+            query_embedding,
+            match_count,
+            filter_memory_type,
+            filter_agent_type,
+            filter_artisan_id,
+            filter_session_id,
+            min_importance,
+        )
+        rows = await self._fetch_vector_query(sql, args, max(ef_search or settings.hnsw_ef_search, match_count))
         return [dict(r) for r in rows]
 
     async def get_session_memories(
@@ -132,23 +342,9 @@ class AgentsDbClient:
     ) -> List[Dict[str, Any]]:
         """Fetch recent conversational memories for a session (no vector search)."""
         pool = await self._get_pool()
-        sql = """
-            SELECT id, chunk_text, memory_type, agent_type, artisan_id,
-                   session_id, summary, importance_score, knowledge_category, created_at
-            FROM agents.agent_knowledge_embeddings
-            WHERE session_id = $1
-              AND ($2::uuid IS NULL OR artisan_id = $2::uuid)
-              AND memory_type = 'conversational'
-            ORDER BY created_at DESC
-            LIMIT $3
-        """
+        sql, args = _session_memories_query(session_id, artisan_id, limit)
         async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                sql,
-                session_id,
-                str(artisan_id) if artisan_id else None,
-                limit,
-            )
+            rows = await conn.fetch(sql, *args)
         return [dict(r) for r in rows]
 
     # ------------------------------------------------------------------
@@ -365,42 +561,29 @@ class AgentsDbClient:
         query_embedding: List[float],
         match_count: int = 5,
         category: Optional[str] = None,
+        query_text: Optional[str] = None,
+        hybrid: bool = False,
+        ef_search: Optional[int] = None,
+        quality: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        """Semantic search over the knowledge base using agents.search_agent_knowledge()."""
-        pool = await self._get_pool()
-        sql = """
-            SELECT e.id::text, e.chunk_text, e.knowledge_category,
-                   1 - (e.embedding <=> $1::vector) AS similarity,
-                   e.document_id::text,
-                   e.chunk_index,
-                   d.filename AS document_filename,
-                   d.metadata AS document_metadata
-            FROM agents.agent_knowledge_embeddings e
-            JOIN agents.agent_knowledge_documents d ON d.id = e.document_id
-            WHERE ($2::text IS NULL OR e.knowledge_category = $2)
-              AND (e.memory_type = 'knowledge' OR e.memory_type IS NULL)
-              AND e.document_id IS NOT NULL
-              AND e.embedding IS NOT NULL
-            ORDER BY e.embedding <=> $1::vector
-            LIMIT $3
         """
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                sql,
-                _vec_to_pg(query_embedding),
-                category,
-                match_count,
-            )
-        result = []
-        for r in rows:
-            d = dict(r)
-            if isinstance(d.get("document_metadata"), str):
-                try:
-                    d["document_metadata"] = json.loads(d["document_metadata"])
-                except Exception:
-                    d["document_metadata"] = {}
-            result.append(d)
-        return result
+        Semantic search over the knowledge base.
+
+        With hybrid=True (and query_text), vector and Spanish full-text
+        rankings are fused with Reciprocal Rank Fusion; `similarity` is still
+        the cosine similarity so callers can keep their thresholds.
+        quality ("fast" / "balanced" / "exact") picks the calibrated
+        hnsw.ef_search; ef_search overrides it for this call.
+        """
+        from src.services.vector_tuning_service import vector_tuning_service
+
+        sql, args, candidates = _knowledge_search_query(
+            query_embedding, match_count, category, query_text, hybrid
+        )
+        if ef_search is None:
+            ef_search = vector_tuning_service.ef_search("knowledge", quality)
+        rows = await self._fetch_vector_query(sql, args, max(ef_search, candidates) if ef_search is not None else None)
+        return _decode_knowledge_rows(rows)
 
     async def list_knowledge_documents(
         self, category: Optional[str] = None
@@ -559,66 +742,6 @@ class AgentsDbClient:
             row = await conn.fetchrow(sql, str(product_draft_id))
         return dict(row) if row else None
 
-    # ------------------------------------------------------------------
-    # Taxonomy (categories, crafts, materials, techniques)
-    # ------------------------------------------------------------------
-
-    _taxonomy_cache: Optional[Dict[str, Any]] = None
-
-    async def get_taxonomy_options(self, force_refresh: bool = False) -> Dict[str, Any]:
-        """
-        Return the canonical taxonomy (categories, crafts, materials, techniques)
-        used to ground LLM suggestions during product creation.
-
-        Cached in-process since taxonomy changes infrequently. Pass
-        force_refresh=True to bypass the cache.
-        """
-        if self._taxonomy_cache is not None and not force_refresh:
-            return self._taxonomy_cache
-
-        pool = await self._get_pool()
-        async with pool.acquire() as conn:
-            categories = await conn.fetch(
-                """
-                SELECT id::text, name, slug, parent_id::text
-                FROM taxonomy.categories
-                WHERE is_active = true
-                ORDER BY parent_id NULLS FIRST, display_order
-                """
-            )
-            crafts = await conn.fetch(
-                """
-                SELECT id::text, name, category_id::text
-                FROM taxonomy.crafts
-                WHERE status = 'approved' AND is_active = true
-                ORDER BY name
-                """
-            )
-            materials = await conn.fetch(
-                """
-                SELECT id::text, name
-                FROM taxonomy.materials
-                WHERE status = 'approved'
-                ORDER BY name
-                """
-            )
-            techniques = await conn.fetch(
-                """
-                SELECT id::text, name, craft_id::text
-                FROM taxonomy.techniques
-                WHERE status = 'approved'
-                ORDER BY name
-                """
-            )
-
-        self._taxonomy_cache = {
-            "categories": [dict(r) for r in categories],
-            "crafts": [dict(r) for r in crafts],
-            "materials": [dict(r) for r in materials],
-            "techniques": [dict(r) for r in techniques],
-        }
-        return self._taxonomy_cache
-
 
 # ---------------------------------------------------------------------------
 # Singleton — drop-in replacement for the old `db = SupabaseClient.get_client()`
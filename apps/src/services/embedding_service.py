@@ -2,7 +2,7 @@
 Embedding service for generating vector embeddings using OpenAI.
 """
 
-from typing import List
+from typing import List, Optional
 import openai
 from src.api.config import settings
 
@@ -10,10 +10,15 @@ from src.api.config import settings
 class EmbeddingService:
     """Service for generating text embeddings."""
 
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, dimensions: Optional[int] = None):
+        """
+        Args:
+            model: Embedding model (default EMBEDDING_MODEL)
+            dimensions: Vector size (default EMBEDDING_DIMENSIONS)
+        """
         self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
-        self.model = settings.embedding_model
-        self.dimensions = settings.embedding_dimensions
+        self.model = model or settings.embedding_model
+        self.dimensions = dimensions or settings.embedding_dimensions
 
     async def generate_embedding(self, text: str) -> List[float]:
         """
@@ -0,0 +1,861 @@
+"""
+Embedding version service (blue/green re-index).
+
+Each vector table has numbered embedding versions. A version records the
+model and dimensions its vectors come from. Exactly one version per target
+is live; queries are embedded with that version's model, so stored and
+query vectors always share one space. There are two targets:
+
+  - products:  shop.product_embeddings (catalog pool)
+  - knowledge: agents.agent_knowledge_embeddings (agents pool), i.e. the
+               RAG chunks and the hierarchical agent memories stored with them
+
+A new version (new model, new dimensions, or the same model re-embedded)
+goes live in four steps while search keeps serving the live version:
+
+  1. Build: copy the live rows into a shadow table <table>_v<n>, re-embed
+     every text with the new model, then recreate the live table's indexes
+     (HNSW included) on it. Rows edited during the build are caught up from
+     the live table before and after the index build.
+  2. Validate: recall@k of the new HNSW index against an exact scan of the
+     new vectors, and agreement (top-k overlap) with the live version's
+     exact neighbours. Builds below VECTOR_RECALL_FAST or
+     EMBEDDING_SWAP_MIN_AGREEMENT are rejected and need force to go live.
+  3. Swap: one transaction blocks writers on the live table, applies the
+     last edits, renames live -> <table>_v<old> and shadow -> <table>
+     (indexes, triggers and foreign keys move with the name), and flips the
+     registry. Readers never see a mix of the two versions. Nothing is
+     embedded under the lock: if the last edits need new vectors the swap
+     is rolled back, caught up outside the lock and tried again. Tables
+     referenced by other tables' foreign keys or by views are not swapped
+     (those would stay bound to the renamed-away table).
+  4. GC: retired versions beyond EMBEDDING_VERSIONS_RETAINED are dropped.
+     Until then a retired version can be swapped back in (rollback), after
+     the same catch-up.
+
+The registry is <schema>.embedding_versions in the target's own database,
+so the swap and the registry update commit together. Other processes pick
+up a swap on their next registry poll (or, without the poll loop, on their
+next live_embedder() call after _POLL_SECONDS). What they wrote with the old
+model in between is repaired once every process has seen the swap: stale
+products are re-queued, knowledge rows written since the swap started are
+re-embedded.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.api.config import settings
+from src.services.embedding_service import EmbeddingService, embedding_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ("products", "knowledge")
+
+# How often every process re-reads the live versions (swaps made elsewhere)
+_POLL_SECONDS = 15
+# Rows re-embedded per embeddings call while building
+_BUILD_BATCH_SIZE = 256
+# After a swap, rows written with the old model by processes that had not
+# polled yet are re-embedded (products: re-queued) once every process has
+# seen the swap
+_REPAIR_DELAY_SECONDS = 2 * _POLL_SECONDS + 5
+# Swap transactions rolled back for edits needing new vectors before giving up
+_SWAP_ATTEMPTS = 3
+# Product vectors are compared with store_embeddings (centroids and profiles)
+# and share EMBEDDING_DIMENSIONS with the taxonomy vectors, all fixed-size
+# vector columns: a products version must keep the live dimensions
+_FIXED_DIMENSION_TARGETS = ("products",)
+
+_ANN_SESSION_SQL = "SELECT set_config('hnsw.ef_search', $1, true)"
+_EXACT_SESSION_SQL = "SELECT set_config('enable_indexscan', 'off', true)"
+_TRY_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('embedding_versions:' || $1))"
+_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('embedding_versions:' || $1))"
+
+
+@dataclass(frozen=True)
+class _Target:
+    name: str
+    table: str                   # live table; shadows are <table>_v<n>
+    key: str
+    text: str                    # column the vectors are embedded from
+    model_column: Optional[str]  # per-row model name, if the table has one
+    scope: str                   # predicate on alias e; must match partial index predicates
+
+    @property
+    def schema(self) -> str:
+        return self.table.split(".")[0]
+
+    @property
+    def registry(self) -> str:
+        return f"{self.schema}.embedding_versions"
+
+
+def _targets() -> Dict[str, _Target]:
+    from src.database.supabase_client import _KNOWLEDGE_SCOPE
+
+    return {
+        "products": _Target(
+            "products", "shop.product_embeddings", "product_id", "semantic_text", "model", "true"
+        ),
+        "knowledge": _Target(
+            "knowledge", "agents.agent_knowledge_embeddings", "id", "chunk_text", None, _KNOWLEDGE_SCOPE
+        ),
+    }
+
+
+@dataclass
+class EmbeddingVersion:
+    target: str
+    version: int
+    model: str
+    dimensions: int
+    table_name: str
+    status: str                  # building / ready / rejected / failed / live / retired / dropped
+    rows: Optional[int] = None
+    ann_recall: Optional[float] = None
+    agreement: Optional[float] = None
+    error: Optional[str] = None
+    created_at: Optional[float] = None
+    live_at: Optional[float] = None
+
+    @classmethod
+    def from_record(cls, r: Any) -> "EmbeddingVersion":
+        return cls(
+            target=r["target"],
+            version=r["version"],
+            model=r["model"],
+            dimensions=r["dimensions"],
+            table_name=r["table_name"],
+            status=r["status"],
+            rows=r["rows"],
+            ann_recall=r["ann_recall"],
+            agreement=r["agreement"],
+            error=r["error"],
+            created_at=r["created_at"].timestamp() if r["created_at"] else None,
+            live_at=r["live_at"].timestamp() if r["live_at"] else None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+# ---------------------------------------------------------------------------
+# SQL: registry
+# ---------------------------------------------------------------------------
+
+_VERSIONS_SQL = "SELECT * FROM {registry} WHERE target = $1 ORDER BY version DESC"
+
+_LIVE_SQL = "SELECT * FROM {registry} WHERE target = $1 AND status = 'live'"
+
+_VERSION_SQL = "SELECT * FROM {registry} WHERE target = $1 AND version = $2"
+
+_BOOTSTRAP_SQL = """
+INSERT INTO {registry} (target, version, model, dimensions, table_name, status, live_at)
+SELECT $1, 1, $2, $3, $4, 'live', now()
+WHERE NOT EXISTS (SELECT 1 FROM {registry} WHERE target = $1)
+"""
+
+_NEW_VERSION_SQL = """
+INSERT INTO {registry} (target, version, model, dimensions, table_name, status)
+SELECT $1, COALESCE(MAX(version), 0) + 1, $2, $3, $4 || '_v' || (COALESCE(MAX(version), 0) + 1), 'building'
+FROM {registry}
+WHERE target = $1
+RETURNING *
+"""
+
+# Builds left 'building' by a crashed process (only checked under the build lock)
+_ABANDONED_SQL = """
+UPDATE {registry} SET status = 'failed', error = 'abandoned'
+WHERE target = $1 AND status = 'building'
+"""
+
+_FINISH_BUILD_SQL = """
+UPDATE {registry}
+SET status = $3, rows = $4, ann_recall = $5, agreement = $6, error = $7
+WHERE target = $1 AND version = $2
+"""
+
+_RETIRE_LIVE_SQL = """
+UPDATE {registry} SET status = 'retired', table_name = $2, retired_at = now()
+WHERE target = $1 AND status = 'live'
+"""
+
+_GO_LIVE_SQL = """
+UPDATE {registry} SET status = 'live', table_name = $3, live_at = now(), retired_at = NULL
+WHERE target = $1 AND version = $2
+"""
+
+_DROPPED_SQL = "UPDATE {registry} SET status = 'dropped', dropped_at = now() WHERE target = $1 AND version = $2"
+
+# ---------------------------------------------------------------------------
+# SQL: catalog introspection (definitions are replayed on the shadow table)
+# ---------------------------------------------------------------------------
+
+_COLUMNS_SQL = """
+SELECT attname
+FROM pg_attribute
+WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+ORDER BY attnum
+"""
+
+_NOT_NULL_SQL = "SELECT attnotnull FROM pg_attribute WHERE attrelid = $1::regclass AND attname = 'embedding'"
+
+_INDEXES_SQL = """
+SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition, i.indisprimary AS is_primary
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE i.indrelid = $1::regclass
+ORDER BY c.relname
+"""
+
+_TRIGGERS_SQL = """
+SELECT tgname AS name, pg_get_triggerdef(oid) AS definition
+FROM pg_trigger
+WHERE tgrelid = $1::regclass AND NOT tgisinternal
+"""
+
+_FOREIGN_KEYS_SQL = """
+SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+FROM pg_constraint
+WHERE conrelid = $1::regclass AND contype = 'f'
+"""
+
+# Objects bound to the table's oid, which a rename would leave on the retired table
+_DEPENDENTS_SQL = """
+SELECT 'foreign key ' || conname || ' on ' || conrelid::regclass::text AS dependent
+FROM pg_constraint
+WHERE confrelid = $1::regclass AND contype = 'f' AND conrelid <> $1::regclass
+UNION
+SELECT 'view ' || r.ev_class::regclass::text
+FROM pg_depend d
+JOIN pg_rewrite r ON r.oid = d.objid
+WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = $1::regclass AND r.ev_class <> $1::regclass
+"""
+
+_INDEX_DEF_RE = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON (?:ONLY )?)(\S+)")
+
+# ---------------------------------------------------------------------------
+# SQL: products follow-up after a swap
+# ---------------------------------------------------------------------------
+
+# Stores vectors are centroids of product vectors: recompute them in the new space
+_REQUEUE_STORES_SQL = "SELECT shop.enqueue_store_embeddings(ARRAY(SELECT store_id FROM shop.store_embeddings))"
+
+# Dropping the hash makes the queue worker re-embed the row instead of skipping it
+_REQUEUE_STALE_PRODUCTS_SQL = """
+WITH stale AS (
+    UPDATE shop.product_embeddings SET content_hash = NULL
+    WHERE model IS DISTINCT FROM $1
+    RETURNING product_id
+)
+SELECT shop.enqueue_product_embeddings(ARRAY(SELECT product_id FROM stale))
+"""
+
+# ---------------------------------------------------------------------------
+# SQL: knowledge follow-up after a swap
+# ---------------------------------------------------------------------------
+
+# Knowledge rows record no model (and are never updated), so every row
+# written since the swap started is embedded again with the live model
+_KNOWLEDGE_WRITTEN_SINCE_SQL = """
+SELECT id::text AS key, chunk_text AS text
+FROM agents.agent_knowledge_embeddings
+WHERE created_at >= $1 AND id::text > $2 AND btrim(chunk_text) <> ''
+ORDER BY id::text
+LIMIT $3
+"""
+
+_KNOWLEDGE_REEMBED_SQL = """
+UPDATE agents.agent_knowledge_embeddings e SET embedding = v.embedding::vector
+FROM unnest($1::text[], $2::text[]) AS v(key, embedding)
+WHERE e.id::text = v.key
+"""
+
+
+class _SwapResidue(Exception):
+    """Rows edited since the last catch-up need new vectors; retry the swap after a sync."""
+
+
+class EmbeddingVersionService:
+    """Live embedding model per target, and the build / swap / GC of new versions."""
+
+    def __init__(self) -> None:
+        self._live: Dict[str, EmbeddingVersion] = {}
+        self._embedders: Dict[Tuple[str, int], EmbeddingService] = {}
+        self._lock = asyncio.Lock()
+        self._running: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._loaded_at = float("-inf")
+        self._repair_tasks: Dict[str, asyncio.Task] = {}
+
+    # ------------------------------------------------------------------
+    # Live versions
+    # ------------------------------------------------------------------
+
+    def live(self, target: str) -> Optional[EmbeddingVersion]:
+        """The live version of target, once loaded."""
+        return self._live.get(target)
+
+    def embedder(self, target: str) -> EmbeddingService:
+        """Embedding service with the model of target's live vectors (queries and writes)."""
+        live = self._live.get(target)
+        if live is None:
+            return embedding_service
+        return self._embedder(live.model, live.dimensions)
+
+    async def live_embedder(self, target: str) -> EmbeddingService:
+        """
+        embedder() that also works in processes without start() (the
+        admin-rag app, scripts): the live versions are read on first use and
+        again every _POLL_SECONDS, so writes never fall back to
+        EMBEDDING_MODEL after a swap.
+        """
+        polling = self._poll_task is not None and not self._poll_task.done()
+        if not polling and time.monotonic() - self._loaded_at > _POLL_SECONDS:
+            await self.load()
+        return self.embedder(target)
+
+    async def start(self) -> None:
+        """Load the live versions and follow swaps made by other processes (app startup)."""
+        await self.load()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        for task in (self._poll_task, *self._repair_tasks.values()):
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def load(self) -> None:
+        """Read the live version of every target; the first load registers the current model as v1."""
+        for target in TARGETS:
+            spec = _targets()[target]
+            try:
+                pool = await self._pool(target)
+                if pool is None:
+                    continue
+                async with pool.acquire() as conn:
+                    if target not in self._live:
+                        await conn.execute(
+                            _BOOTSTRAP_SQL.format(registry=spec.registry),
+                            target, settings.embedding_model, settings.embedding_dimensions, spec.table,
+                        )
+                    row = await conn.fetchrow(_LIVE_SQL.format(registry=spec.registry), target)
+            except Exception as exc:
+                logger.warning("Embedding versions of %s not loaded, using EMBEDDING_MODEL: %s", target, exc)
+                continue
+            if row is not None:
+                self._set_live(EmbeddingVersion.from_record(row))
+        self._loaded_at = time.monotonic()
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(_POLL_SECONDS)
+            try:
+                await self.load()
+            except Exception as exc:
+                logger.warning("Embedding versions poll failed: %s", exc)
+
+    def _set_live(self, version: EmbeddingVersion) -> None:
+        previous = self._live.get(version.target)
+        self._live[version.target] = version
+        if previous is None or previous.version == version.version:
+            return
+        logger.info(
+            "Embedding versions: %s now v%s (%s, %sd)",
+            version.target, version.version, version.model, version.dimensions,
+        )
+
+    def _embedder(self, model: str, dimensions: int) -> EmbeddingService:
+        if (model, dimensions) == (embedding_service.model, embedding_service.dimensions):
+            return embedding_service
+        key = (model, dimensions)
+        if key not in self._embedders:
+            self._embedders[key] = EmbeddingService(model=model, dimensions=dimensions)
+        return self._embedders[key]
+
+    @property
+    def running(self) -> Optional[str]:
+        """The build / swap / GC in progress in this process, if any."""
+        return self._running
+
+    async def status(self) -> Dict[str, Any]:
+        targets: Dict[str, Any] = {}
+        for target in TARGETS:
+            live = self._live.get(target)
+            targets[target] = {
+                "live": live.to_dict() if live else None,
+                "versions": [v.to_dict() for v in await self.versions(target)],
+            }
+        return {"running": self._running, "last_error": self._last_error, "targets": targets}
+
+    async def versions(self, target: str) -> List[EmbeddingVersion]:
+        spec = _targets()[target]
+        try:
+            pool = await self._pool(target)
+            if pool is None:
+                return []
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(_VERSIONS_SQL.format(registry=spec.registry), target)
+        except Exception as exc:
+            logger.warning("Embedding versions of %s unavailable: %s", target, exc)
+            return []
+        return [EmbeddingVersion.from_record(r) for r in rows]
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    async def build(
+        self,
+        target: str,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        sample_size: int = 100,
+        top_k: int = 10,
+    ) -> EmbeddingVersion:
+        """
+        Build and validate a new version of target in a shadow table. The
+        live version keeps serving; call swap() to make the new one live.
+        model / dimensions default to EMBEDDING_MODEL / EMBEDDING_DIMENSIONS.
+        """
+        spec = _targets()[target]
+        model = model or settings.embedding_model
+        dimensions = dimensions or settings.embedding_dimensions
+        embedder = self._embedder(model, dimensions)
+
+        async with self._exclusive(f"build {target}"):
+            pool = await self._required_pool(target)
+            async with pool.acquire() as conn:
+                if not await conn.fetchval(_TRY_LOCK_SQL, target):
+                    raise RuntimeError(f"An embedding version of '{target}' is being built or swapped elsewhere")
+                try:
+                    live = await conn.fetchrow(_LIVE_SQL.format(registry=spec.registry), target)
+                    if live is not None:
+                        _check_dimensions(target, live["dimensions"], dimensions)
+                    await conn.execute(_ABANDONED_SQL.format(registry=spec.registry), target)
+                    version = EmbeddingVersion.from_record(await conn.fetchrow(
+                        _NEW_VERSION_SQL.format(registry=spec.registry), target, model, dimensions, spec.table
+                    ))
+                    shadow = version.table_name
+                    logger.info("Embedding versions: building %s v%s in %s", target, version.version, shadow)
+                    try:
+                        await conn.execute(
+                            f"CREATE TABLE {shadow} (LIKE {spec.table} "
+                            "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING STORAGE)"
+                        )
+                        # Rows are copied first and embedded afterwards (resumable: embedding IS NULL)
+                        await conn.execute(
+                            f"ALTER TABLE {shadow} ALTER COLUMN embedding TYPE vector({int(dimensions)}), "
+                            "ALTER COLUMN embedding DROP NOT NULL"
+                        )
+                        await self._sync(conn, spec, shadow, embedder)
+                        await self._copy_indexes(conn, spec, shadow, version.version)
+                        await self._sync(conn, spec, shadow, embedder)
+                        await conn.execute(f"ANALYZE {shadow}")
+                        version.rows = await conn.fetchval(f"SELECT COUNT(*) FROM {shadow}")
+                        version.ann_recall, version.agreement = await self._validate(
+                            conn, spec, shadow, sample_size, top_k
+                        )
+                    except Exception as exc:
+                        await conn.execute(
+                            _FINISH_BUILD_SQL.format(registry=spec.registry),
+                            target, version.version, "failed", None, None, None, str(exc)[:500],
+                        )
+                        raise
+
+                    accepted = (
+                        version.ann_recall >= settings.vector_recall_fast
+                        and version.agreement >= settings.embedding_swap_min_agreement
+                    )
+                    version.status = "ready" if accepted else "rejected"
+                    await conn.execute(
+                        _FINISH_BUILD_SQL.format(registry=spec.registry),
+                        target, version.version, version.status, version.rows,
+                        version.ann_recall, version.agreement, None,
+                    )
+                finally:
+                    await conn.execute(_UNLOCK_SQL, target)
+
+        logger.info(
+            "Embedding versions: %s v%s %s (%s rows, recall %.3f, agreement %.3f)",
+            target, version.version, version.status, version.rows, version.ann_recall, version.agreement,
+        )
+        return version
+
+    async def _sync(self, conn, spec: _Target, table: str, embedder: EmbeddingService) -> int:
+        """
+        Bring table's rows in line with the live table and embed every row
+        without a vector (new, or text changed). Returns the rows embedded.
+        """
+        await self._catch_up(conn, spec, table)
+        return await self._embed_missing(conn, spec, table, embedder)
+
+    async def _catch_up(self, conn, spec: _Target, table: str) -> None:
+        """Copy inserts, deletes and edits from the live table; rows whose text changed lose their vector."""
+        skip = {"embedding", spec.model_column}
+        columns = [r["attname"] for r in await conn.fetch(_COLUMNS_SQL, spec.table) if r["attname"] not in skip]
+        cols = ", ".join(columns)
+        live_cols = ", ".join(f"l.{c}" for c in columns)
+        own_cols = ", ".join(f"s.{c}" for c in columns)
+        # New rows keep the live model name until they are embedded
+        inserted = columns + [spec.model_column] if spec.model_column else columns
+        insert_cols = ", ".join(inserted)
+        insert_live_cols = ", ".join(f"l.{c}" for c in inserted)
+        key, text = spec.key, spec.text
+
+        await conn.execute(
+            f"DELETE FROM {table} s WHERE NOT EXISTS (SELECT 1 FROM {spec.table} l WHERE l.{key} = s.{key})"
+        )
+        await conn.execute(
+            f"INSERT INTO {table} ({insert_cols}) SELECT {insert_live_cols} FROM {spec.table} l "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} s WHERE s.{key} = l.{key})"
+        )
+        # Metadata edits are copied as is; only a changed text needs a new vector
+        await conn.execute(
+            f"UPDATE {table} s SET ({cols}) = ROW({live_cols}), "
+            f"embedding = CASE WHEN l.{text} IS DISTINCT FROM s.{text} THEN NULL ELSE s.embedding END "
+            f"FROM {spec.table} l WHERE l.{key} = s.{key} AND ROW({live_cols}) IS DISTINCT FROM ROW({own_cols})"
+        )
+
+    async def _embed_missing(self, conn, spec: _Target, table: str, embedder: EmbeddingService) -> int:
+        """Embed the rows of table without a vector; returns how many."""
+        from src.database.supabase_client import _vec_to_pg
+
+        key, text = spec.key, spec.text
+
+        model_set = f", {spec.model_column} = $3" if spec.model_column else ""
+        write_sql = (
+            f"UPDATE {table} s SET embedding = v.embedding::vector{model_set} "
+            f"FROM unnest($1::text[], $2::text[]) AS v(key, embedding) WHERE s.{key}::text = v.key"
+        )
+        embedded = 0
+        while True:
+            rows = await conn.fetch(
+                f"SELECT {key}::text AS key, {text} AS text FROM {table} "
+                f"WHERE embedding IS NULL AND btrim(COALESCE({text}, '')) <> '' ORDER BY {key} LIMIT $1",
+                _BUILD_BATCH_SIZE,
+            )
+            if not rows:
+                return embedded
+            vectors = await embedder.generate_embeddings([r["text"] for r in rows])
+            if len(vectors) != len(rows):
+                raise ValueError(f"{len(vectors)} vectors for {len(rows)} texts")
+            args: List[Any] = [[r["key"] for r in rows], [_vec_to_pg(v) for v in vectors]]
+            if spec.model_column:
+                args.append(embedder.model)
+            await conn.execute(write_sql, *args)
+            embedded += len(rows)
+
+    async def _copy_indexes(self, conn, spec: _Target, table: str, version: int) -> None:
+        """Recreate the live table's indexes on table, named <index>_v<version>."""
+        for index in await conn.fetch(_INDEXES_SQL, spec.table):
+            name = f"{index['name']}_v{version}"
+            definition = _INDEX_DEF_RE.sub(lambda m: f"{m[1]}{name}{m[3]}{table}", index["definition"], count=1)
+            started = time.perf_counter()
+            await conn.execute(definition)
+            if index["is_primary"]:
+                await conn.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY USING INDEX {name}")
+            logger.info("Embedding versions: built %s in %.1fs", name, time.perf_counter() - started)
+
+    async def _validate(self, conn, spec: _Target, table: str, sample_size: int, top_k: int) -> Tuple[float, float]:
+        """(recall@k of table's HNSW index vs exact, top-k overlap with the live version)."""
+        from src.services.vector_tuning_service import _neighbours, vector_tuning_service
+
+        samples = await conn.fetch(
+            f"SELECT e.{spec.key}::text AS key, e.embedding::text AS new, l.embedding::text AS old "
+            f"FROM {table} e JOIN {spec.table} l ON l.{spec.key} = e.{spec.key} "
+            f"WHERE {spec.scope} AND l.embedding IS NOT NULL ORDER BY random() LIMIT $1",
+            sample_size,
+        )
+        if not samples:
+            raise RuntimeError(f"No vectors to validate in {table}")
+        # top_k + 1 rows, the sample dropped in Python (see vector_tuning_service._NEAREST_SQL)
+        nearest = (
+            "SELECT e.{key}::text AS key FROM {table} e WHERE {scope} "
+            "ORDER BY e.embedding <=> $1::text::vector LIMIT $2"
+        )
+        new_sql = nearest.format(key=spec.key, table=table, scope=spec.scope)
+        old_sql = nearest.format(key=spec.key, table=spec.table, scope=spec.scope)
+        ef_search = max(vector_tuning_service.ef_search(spec.name, "balanced") or top_k, top_k)
+
+        recalls: List[float] = []
+        agreements: List[float] = []
+        for s in samples:
+            async with conn.transaction():
+                await conn.execute(_EXACT_SESSION_SQL)
+                exact = _neighbours(await conn.fetch(new_sql, s["new"], top_k + 1), s["key"], top_k, "key")
+                old = _neighbours(await conn.fetch(old_sql, s["old"], top_k + 1), s["key"], top_k, "key")
+            async with conn.transaction():
+                await conn.execute(_ANN_SESSION_SQL, str(ef_search + 1))
+                found = _neighbours(await conn.fetch(new_sql, s["new"], top_k + 1), s["key"], top_k, "key")
+            if exact:
+                recalls.append(len(exact & found) / len(exact))
+                agreements.append(len(exact & old) / len(exact))
+        if not recalls:
+            return 1.0, 1.0
+        return round(sum(recalls) / len(recalls), 4), round(sum(agreements) / len(agreements), 4)
+
+    # ------------------------------------------------------------------
+    # Swap
+    # ------------------------------------------------------------------
+
+    async def swap(self, target: str, version: int, force: bool = False) -> EmbeddingVersion:
+        """
+        Make version the live version of target (a ready build, or a retired
+        version to roll back to). Rejected builds need force.
+        """
+        spec = _targets()[target]
+        async with self._exclusive(f"swap {target}"):
+            pool = await self._required_pool(target)
+            async with pool.acquire() as conn:
+                if not await conn.fetchval(_TRY_LOCK_SQL, target):
+                    raise RuntimeError(f"An embedding version of '{target}' is being built or swapped elsewhere")
+                try:
+                    candidate = await conn.fetchrow(_VERSION_SQL.format(registry=spec.registry), target, version)
+                    live = await conn.fetchrow(_LIVE_SQL.format(registry=spec.registry), target)
+                    if candidate is None:
+                        raise ValueError(f"{target} has no version {version}")
+                    candidate = EmbeddingVersion.from_record(candidate)
+                    allowed = ("ready", "retired", "rejected") if force else ("ready", "retired")
+                    if candidate.status not in allowed:
+                        raise ValueError(f"{target} v{version} is {candidate.status} and cannot go live")
+                    if live is None:
+                        raise RuntimeError(f"{target} has no live version")
+                    live = EmbeddingVersion.from_record(live)
+                    _check_dimensions(target, live.dimensions, candidate.dimensions)
+                    swap_started = await conn.fetchval("SELECT now()")
+
+                    embedder = self._embedder(candidate.model, candidate.dimensions)
+                    for attempt in range(1, _SWAP_ATTEMPTS + 1):
+                        # Every embedding call happens here, outside the lock; the
+                        # transaction only copies edits that need no new vector
+                        await self._sync(conn, spec, candidate.table_name, embedder)
+                        try:
+                            foreign_keys = await self._swap_tables(conn, spec, live, candidate)
+                            break
+                        except _SwapResidue:
+                            logger.info(
+                                "Embedding versions: %s edited during swap %d/%d, catching up",
+                                target, attempt, _SWAP_ATTEMPTS,
+                            )
+                    else:
+                        raise RuntimeError(f"{target} kept changing during the swap; try again")
+                finally:
+                    await conn.execute(_UNLOCK_SQL, target)
+
+                for fk in foreign_keys:
+                    await conn.execute(f"ALTER TABLE {spec.table} VALIDATE CONSTRAINT {fk}")
+                await conn.execute(f"ANALYZE {spec.table}")
+                if target == "products" and (candidate.model, candidate.dimensions) != (live.model, live.dimensions):
+                    await conn.execute(_REQUEUE_STORES_SQL)
+
+        candidate.status, candidate.table_name, candidate.live_at = "live", spec.table, time.time()
+        self._set_live(candidate)
+        if target == "products":
+            self._repair_tasks[target] = asyncio.create_task(self._requeue_stale_products(candidate.model))
+        elif (candidate.model, candidate.dimensions) != (live.model, live.dimensions):
+            self._repair_tasks[target] = asyncio.create_task(
+                self._reembed_recent_knowledge(swap_started, candidate.model, candidate.dimensions)
+            )
+        logger.info("Embedding versions: %s v%s is live (was v%s)", target, version, live.version)
+        return candidate
+
+    async def _swap_tables(
+        self,
+        conn,
+        spec: _Target,
+        live: EmbeddingVersion,
+        candidate: EmbeddingVersion,
+    ) -> List[str]:
+        """
+        Atomically exchange the live and candidate tables; returns the foreign
+        keys to validate. Raises _SwapResidue (rolled back) when the last
+        edits need new vectors.
+        """
+        base = spec.table.split(".")[1]
+        retired = f"{spec.table}_v{live.version}"
+        shadow = candidate.table_name
+        suffix = f"_v{candidate.version}"
+
+        async with conn.transaction():
+            # Writers wait from here on; readers keep using the live table until the renames
+            await conn.execute(f"LOCK TABLE {spec.table} IN SHARE ROW EXCLUSIVE MODE")
+            dependents = [r["dependent"] for r in await conn.fetch(_DEPENDENTS_SQL, spec.table)]
+            if dependents:
+                raise RuntimeError(
+                    f"{spec.table} cannot be swapped: {', '.join(dependents)} would stay bound to the retired table"
+                )
+            await self._catch_up(conn, spec, shadow)
+            if await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {shadow} "
+                f"WHERE embedding IS NULL AND btrim(COALESCE({spec.text}, '')) <> '')"
+            ):
+                raise _SwapResidue()
+            if await conn.fetchval(_NOT_NULL_SQL, spec.table):
+                await conn.execute(f"ALTER TABLE {shadow} ALTER COLUMN embedding SET NOT NULL")
+
+            triggers = await conn.fetch(_TRIGGERS_SQL, spec.table)
+            foreign_keys = await conn.fetch(_FOREIGN_KEYS_SQL, spec.table)
+            live_indexes = await conn.fetch(_INDEXES_SQL, spec.table)
+            shadow_indexes = await conn.fetch(_INDEXES_SQL, shadow)
+
+            for trigger in triggers:
+                await conn.execute(f"DROP TRIGGER {trigger['name']} ON {spec.table}")
+            for fk in foreign_keys:
+                await conn.execute(f"ALTER TABLE {spec.table} DROP CONSTRAINT {fk['name']}")
+            for index in live_indexes:
+                await conn.execute(f"ALTER INDEX {spec.schema}.{index['name']} RENAME TO {index['name']}_v{live.version}")
+            await conn.execute(f"ALTER TABLE {spec.table} RENAME TO {base}_v{live.version}")
+
+            for index in shadow_indexes:
+                name = index["name"]
+                if name.endswith(suffix):
+                    await conn.execute(f"ALTER INDEX {spec.schema}.{name} RENAME TO {name[:-len(suffix)]}")
+            await conn.execute(f"ALTER TABLE {shadow} RENAME TO {base}")
+            # Definitions name the live table, which is now the candidate
+            for trigger in triggers:
+                await conn.execute(trigger["definition"])
+            for fk in foreign_keys:
+                await conn.execute(f"ALTER TABLE {spec.table} ADD CONSTRAINT {fk['name']} {fk['definition']} NOT VALID")
+
+            await conn.execute(_RETIRE_LIVE_SQL.format(registry=spec.registry), spec.name, retired)
+            await conn.execute(_GO_LIVE_SQL.format(registry=spec.registry), spec.name, candidate.version, spec.table)
+        return [fk["name"] for fk in foreign_keys]
+
+    async def _requeue_stale_products(self, model: str) -> None:
+        await asyncio.sleep(_REPAIR_DELAY_SECONDS)
+        try:
+            from src.database.pg_client import get_pool
+
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(_REQUEUE_STALE_PRODUCTS_SQL, model)
+        except Exception as exc:
+            logger.warning("Embedding versions: stale product vectors not re-queued: %s", exc)
+
+    async def _reembed_recent_knowledge(self, since: Any, model: str, dimensions: int) -> None:
+        await asyncio.sleep(_REPAIR_DELAY_SECONDS)
+        from src.database.supabase_client import _vec_to_pg
+
+        embedder = self._embedder(model, dimensions)
+        after, repaired = "", 0
+        try:
+            pool = await self._required_pool("knowledge")
+            while True:
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch(_KNOWLEDGE_WRITTEN_SINCE_SQL, since, after, _BUILD_BATCH_SIZE)
+                if not rows:
+                    break
+                vectors = await embedder.generate_embeddings([r["text"] for r in rows])
+                async with pool.acquire() as conn:
+                    await conn.execute(
+                        _KNOWLEDGE_REEMBED_SQL, [r["key"] for r in rows], [_vec_to_pg(v) for v in vectors]
+                    )
+                after, repaired = rows[-1]["key"], repaired + len(rows)
+        except Exception as exc:
+            logger.warning("Embedding versions: knowledge written during the swap not re-embedded: %s", exc)
+            return
+        if repaired:
+            logger.info("Embedding versions: re-embedded %d knowledge rows written during the swap", repaired)
+
+    # ------------------------------------------------------------------
+    # GC
+    # ------------------------------------------------------------------
+
+    async def gc(self, target: str, keep: Optional[int] = None) -> List[int]:
+        """
+        Drop the tables of rejected and failed builds and of retired versions
+        beyond the keep (EMBEDDING_VERSIONS_RETAINED) most recent. Returns the
+        dropped versions.
+        """
+        spec = _targets()[target]
+        keep = settings.embedding_versions_retained if keep is None else keep
+        dropped: List[int] = []
+        async with self._exclusive(f"gc {target}"):
+            pool = await self._required_pool(target)
+            async with pool.acquire() as conn:
+                if not await conn.fetchval(_TRY_LOCK_SQL, target):
+                    raise RuntimeError(f"An embedding version of '{target}' is being built or swapped elsewhere")
+                try:
+                    retired = 0
+                    for r in await conn.fetch(_VERSIONS_SQL.format(registry=spec.registry), target):
+                        if r["status"] == "retired":
+                            retired += 1
+                            if retired <= keep:
+                                continue
+                        elif r["status"] not in ("rejected", "failed"):
+                            continue
+                        async with conn.transaction():
+                            await conn.execute(f"DROP TABLE IF EXISTS {r['table_name']}")
+                            await conn.execute(_DROPPED_SQL.format(registry=spec.registry), target, r["version"])
+                        dropped.append(r["version"])
+                finally:
+                    await conn.execute(_UNLOCK_SQL, target)
+        if dropped:
+            logger.info("Embedding versions: dropped %s versions %s", target, dropped)
+        return dropped
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _exclusive(self, operation: str) -> "_Exclusive":
+        if self._lock.locked():
+            raise RuntimeError(f"Embedding versions: '{self._running}' is already running")
+        return _Exclusive(self, operation)
+
+    async def _pool(self, target: str):
+        if target == "products":
+            if not settings.catalog_db_url:
+                return None
+            from src.database.pg_client import get_pool
+            return await get_pool()
+        if not settings.agents_db_url:
+            return None
+        from src.database.supabase_client import db
+        return await db._get_pool()
+
+    async def _required_pool(self, target: str):
+        pool = await self._pool(target)
+        if pool is None:
+            raise RuntimeError(f"No database configured for '{target}' embeddings")
+        return pool
+
+
+def _check_dimensions(target: str, live: int, dimensions: int) -> None:
+    if target in _FIXED_DIMENSION_TARGETS and dimensions != live:
+        raise ValueError(
+            f"{target} vectors must keep {live} dimensions (store and taxonomy vectors are "
+            f"fixed-size); got {dimensions}"
+        )
+
+
+class _Exclusive:
+    """One build / swap / GC at a time per process; records failures for status()."""
+
+    def __init__(self, service: EmbeddingVersionService, operation: str) -> None:
+        self._service = service
+        self._operation = operation
+
+    async def __aenter__(self) -> None:
+        await self._service._lock.acquire()
+        self._service._running = self._operation
+        self._service._last_error = None
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self._service._last_error = f"{self._operation}: {exc}"
+            logger.error("Embedding versions: %s failed: %s", self._operation, exc)
+        self._service._running = None
+        self._service._lock.release()
+
+
+# Global embedding version service instance
+embedding_version_service = EmbeddingVersionService()
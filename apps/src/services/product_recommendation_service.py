@@ -1,15 +1,183 @@
 """
 Product recommendation service.
-Provides product recommendations based on user context and preferences.
+
+"More like this" from the vectors already stored in shop.product_embeddings:
+the reference product's own embedding is the query (no embeddings call), its
+nearest searchable products are re-ranked with MMR so the list is not one
+store or one craft, and an optional price band keeps them near the
+reference price. The top-N lists of every product are precomputed nightly
+into shop.product_neighbors; reads hit that table and fall back to the live
+search when it has too few matches.
 """
 
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
-from src.database.supabase_client import db
+
+from src.api.config import settings
+from src.database.pg_client import get_pool
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nearest neighbours fetched per product before the MMR re-rank
+_CANDIDATE_FACTOR = 3
+_MAX_CANDIDATES = 200
+_PRECOMPUTE_CONCURRENCY = 4
+# Cluster-wide: only one process rebuilds shop.product_neighbors at a time
+_PRECOMPUTE_LOCK_KEY = 0x70726F646E6E   # "prodnn"
+
+_CARD_COLUMNS = """
+    c.product_id, c.product_name, c.short_description, c.store_id, c.store_name,
+    c.primary_craft_id, c.craft_name, c.category_name, c.price, c.currency, c.stock, c.images
+"""
+
+# The reference is a scalar subquery, so the ORDER BY runs on the HNSW index
+_REFERENCE_VECTOR = "(SELECT embedding FROM shop.product_embeddings WHERE product_id = $1)"
+
+_REFERENCE_SQL = """
+SELECT c.price
+FROM shop.product_embeddings pe
+LEFT JOIN shop.product_search_cards c ON c.product_id = pe.product_id
+WHERE pe.product_id = $1
+"""
+
+_NEIGHBORS_SQL = f"""
+SELECT n.similarity, {_CARD_COLUMNS}
+FROM shop.product_neighbors n
+JOIN shop.product_search_cards c ON c.product_id = n.neighbor_id
+WHERE n.product_id = $1
+  AND ($2::bigint IS NULL OR c.price >= $2)
+  AND ($3::bigint IS NULL OR c.price <= $3)
+ORDER BY n.rank
+LIMIT $4
+"""
+
+_PRECOMPUTE_PRODUCTS_SQL = """
+SELECT c.product_id
+FROM shop.product_search_cards c
+JOIN shop.product_embeddings pe ON pe.product_id = c.product_id
+ORDER BY c.product_id
+"""
+
+
+def _related_ann_query(
+    product_id: str,
+    limit: int,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+) -> tuple:
+    """Nearest searchable products to the stored vector of product_id."""
+    args: List[Any] = [product_id, limit]
+    where = ["pe.product_id <> $1"]
+    if price_min is not None:
+        args.append(price_min)
+        where.append(f"c.price >= ${len(args)}")
+    if price_max is not None:
+        args.append(price_max)
+        where.append(f"c.price <= ${len(args)}")
+    sql = f"""
+SELECT 1 - (pe.embedding <=> {_REFERENCE_VECTOR}) AS similarity, {_CARD_COLUMNS}
+FROM shop.product_embeddings pe
+JOIN shop.product_search_cards c ON c.product_id = pe.product_id
+WHERE {" AND ".join(where)}
+ORDER BY pe.embedding <=> {_REFERENCE_VECTOR}
+LIMIT $2
+"""
+    return sql, args
+
+
+def _price_bounds(price: Optional[int], price_band: Optional[float]) -> tuple:
+    """(min, max) within price_band (e.g. 0.5 = +/-50%) of the reference price."""
+    if price_band is None or not price:
+        return None, None
+    return int(price * max(1 - price_band, 0)), int(price * (1 + price_band))
+
+
+def _mmr(candidates: List[Dict[str, Any]], limit: int, diversity: float) -> List[Dict[str, Any]]:
+    """
+    Maximal marginal relevance over (similarity, store, craft): each pick
+    maximizes (1 - diversity) * similarity - diversity * redundancy, where
+    redundancy is how much its store and craft repeat an earlier pick.
+    """
+    remaining = list(candidates)
+    selected: List[Dict[str, Any]] = []
+
+    def redundancy(c: Dict[str, Any]) -> float:
+        worst = 0.0
+        for s in selected:
+            overlap = 0.5 * (c["store_id"] is not None and c["store_id"] == s["store_id"])
+            overlap += 0.5 * (c["primary_craft_id"] is not None and c["primary_craft_id"] == s["primary_craft_id"])
+            worst = max(worst, overlap)
+        return worst
+
+    while remaining and len(selected) < limit:
+        best = max(remaining, key=lambda c: (1 - diversity) * c["similarity"] - diversity * redundancy(c))
+        remaining.remove(best)
+        selected.append(best)
+    return selected
+
+
+def _to_product(row: Any) -> Dict[str, Any]:
+    images = row["images"]
+    return {
+        "id": str(row["product_id"]),
+        "name": row["product_name"],
+        "description": row["short_description"] or "",
+        "store_id": str(row["store_id"]) if row["store_id"] else None,
+        "store_name": row["store_name"],
+        "craft_name": row["craft_name"],
+        "category_name": row["category_name"],
+        "price": int(row["price"]) if row["price"] is not None else None,
+        "currency": row["currency"],
+        "stock": int(row["stock"]),
+        "images": json.loads(images) if isinstance(images, str) else (list(images) if images else []),
+        "similarity": round(float(row["similarity"]), 4) if row["similarity"] is not None else None,
+    }
 
 
 class ProductRecommendationService:
     """Service for generating product recommendations."""
-    
+
+    def __init__(self) -> None:
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._last_refresh: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle (nightly neighbour refresh)
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Schedule the nightly rebuild of shop.product_neighbors (app startup)."""
+        if settings.related_products_refresh_hour < 0:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._nightly_refresh())
+
+    def stop(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+    async def _nightly_refresh(self) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+            next_run = now.replace(
+                hour=settings.related_products_refresh_hour, minute=0, second=0, microsecond=0
+            )
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await self.precompute_neighbors()
+            except Exception as exc:
+                logger.error("Related products refresh failed: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Recommendations
+    # ------------------------------------------------------------------
+
     async def get_recommendations(
         self,
         user_id: Optional[str] = None,
@@ -19,64 +187,157 @@ class ProductRecommendationService:
     ) -> List[Dict[str, Any]]:
         """
         Get product recommendations.
-        
+
         Args:
             user_id: Optional user ID for personalized recommendations
-            category: Optional category to filter by
+            category: Optional category name to filter by
             limit: Maximum number of recommendations
-            context: Additional context for recommendations
-            
+            context: Additional context; a "product_id" returns the products
+                     related to it instead
+
         Returns:
             List of recommended products
         """
-        query = db.table("products").select("*")
-        
-        # Apply filters
-        if category:
-            query = query.eq("category", category)
-        
-        # Apply limit
-        query = query.limit(limit)
-        
-        # Execute query
-        response = query.execute()
-        
-        return response.data if response.data else []
-    
+        if context and context.get("product_id"):
+            return await self.get_related_products(context["product_id"], limit=limit)
+
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT NULL::float8 AS similarity, {_CARD_COLUMNS}
+                FROM shop.product_search_cards c
+                WHERE ($1::text IS NULL OR c.category_name = $1)
+                ORDER BY c.stock > 0 DESC, c.refreshed_at DESC
+                LIMIT $2
+                """,
+                category,
+                limit,
+            )
+        return [_to_product(r) for r in rows]
+
     async def get_related_products(
         self,
         product_id: str,
-        limit: int = 5
+        limit: int = 5,
+        price_band: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         Get products related to a given product.
-        
+
+        Served from the precomputed neighbour list; computed live when the
+        product has none yet or the price band leaves fewer than limit.
+
         Args:
             product_id: ID of the reference product
             limit: Maximum number of related products
-            
+            price_band: Keep prices within this fraction of the reference
+                        price (0.5 = +/-50%)
+
         Returns:
-            List of related products
+            List of related products, most similar first (after diversity)
+        """
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            reference = await conn.fetchrow(_REFERENCE_SQL, product_id)
+            if reference is None:
+                return []    # no embedding yet
+            price_min, price_max = _price_bounds(reference["price"], price_band)
+
+            rows = await conn.fetch(_NEIGHBORS_SQL, product_id, price_min, price_max, limit)
+            if len(rows) >= limit:
+                return [_to_product(r) for r in rows]
+
+            related = await self._live_related(conn, product_id, limit, price_min, price_max)
+        return [_to_product(r) for r in related]
+
+    async def _live_related(
+        self,
+        conn,
+        product_id: str,
+        limit: int,
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        candidates = min(max(limit * _CANDIDATE_FACTOR, limit), _MAX_CANDIDATES)
+        sql, args = _related_ann_query(product_id, candidates, price_min, price_max)
+        async with conn.transaction():
+            # Transaction-local: HNSW returns at most ef_search rows per scan
+            await conn.execute(
+                "SELECT set_config('hnsw.ef_search', $1, true)",
+                str(max(settings.hnsw_ef_search, candidates)),
+            )
+            rows = await conn.fetch(sql, *args)
+        return _mmr([dict(r) for r in rows], limit, settings.related_products_diversity)
+
+    # ------------------------------------------------------------------
+    # Nightly precompute
+    # ------------------------------------------------------------------
+
+    async def precompute_neighbors(self) -> Dict[str, Any]:
+        """
+        Rebuild shop.product_neighbors: RELATED_PRODUCTS_TOP_N diverse
+        neighbours for every searchable product with an embedding. Skipped
+        when another process holds the rebuild lock.
         """
-        # Get the reference product
-        product_response = db.table("products").select("*").eq("id", product_id).execute()
-        
-        if not product_response.data:
-            return []
-        
-        product = product_response.data[0]
-        category = product.get("category")
-        
-        # Get products in same category (excluding the reference product)
-        query = db.table("products").select("*")
-        
-        if category:
-            query = query.eq("category", category)
-        
-        query = query.neq("id", product_id).limit(limit)
-        
-        response = query.execute()
-        return response.data if response.data else []
+        top_n = max(settings.related_products_top_n, 1)
+        started = time.time()
+        pool = await get_pool()
+        async with pool.acquire() as lock_conn:
+            if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1)", _PRECOMPUTE_LOCK_KEY):
+                logger.info("Related products refresh already running elsewhere, skipping")
+                return self._last_refresh
+            try:
+                products = await lock_conn.fetch(_PRECOMPUTE_PRODUCTS_SQL)
+                slots = asyncio.Semaphore(_PRECOMPUTE_CONCURRENCY)
+                failed = 0
+
+                async def refresh(product_id: Any) -> None:
+                    nonlocal failed
+                    async with slots, pool.acquire() as conn:
+                        try:
+                            related = await self._live_related(conn, product_id, top_n)
+                            async with conn.transaction():
+                                await conn.execute(
+                                    "DELETE FROM shop.product_neighbors WHERE product_id = $1", product_id
+                                )
+                                await conn.executemany(
+                                    "INSERT INTO shop.product_neighbors "
+                                    "(product_id, rank, neighbor_id, similarity) VALUES ($1, $2, $3, $4)",
+                                    [
+                                        (product_id, rank, r["product_id"], float(r["similarity"]))
+                                        for rank, r in enumerate(related, 1)
+                                    ],
+                                )
+                        except Exception as exc:
+                            failed += 1
+                            logger.warning("Neighbours of %s failed: %s", product_id, exc)
+
+                await asyncio.gather(*(refresh(p["product_id"]) for p in products))
+                # Lists of products that are no longer searchable
+                await lock_conn.execute(
+                    "DELETE FROM shop.product_neighbors n WHERE NOT EXISTS "
+                    "(SELECT 1 FROM shop.product_search_cards c WHERE c.product_id = n.product_id)"
+                )
+            finally:
+                await lock_conn.execute("SELECT pg_advisory_unlock($1)", _PRECOMPUTE_LOCK_KEY)
+
+        self._last_refresh = {
+            "products": len(products),
+            "failed": failed,
+            "top_n": top_n,
+            "elapsed_seconds": round(time.time() - started, 1),
+            "finished_at": time.time(),
+        }
+        logger.info("Related products refreshed: %s", self._last_refresh)
+        return self._last_refresh
+
+    def refresh_status(self) -> Dict[str, Any]:
+        return {
+            "scheduled": self._refresh_task is not None and not self._refresh_task.done(),
+            "refresh_hour_utc": settings.related_products_refresh_hour,
+            "last_refresh": self._last_refresh or None,
+        }
 
 
 # Global product recommendation service instance
@@ -0,0 +1,362 @@
+"""
+Vector search tuning service.
+
+Measures the recall and latency of the HNSW indexes and turns the results
+into per-quality settings for vector queries. There are two targets:
+
+  - products:  shop.product_embeddings (catalog pool)
+  - knowledge: RAG chunks in agents.agent_knowledge_embeddings (agents pool)
+
+A calibration works in four steps:
+
+  1. Sample stored vectors to use as queries.
+  2. Compute each query's exact top-k with index scans disabled. This is the
+     ground truth.
+  3. Sweep hnsw.ef_search over the live index.
+  4. Optionally build shadow HNSW indexes with other m / ef_construction
+     values, on an unlogged copy of the vectors, so the production index is
+     never touched.
+
+The "fast" preset uses the smallest swept ef_search that reaches
+VECTOR_RECALL_FAST, and "balanced" the smallest that reaches
+VECTOR_RECALL_BALANCED. "exact" skips the index.
+
+Calibrations are stored in shop.vector_search_calibrations and loaded at
+startup. Until a target is calibrated, its presets derive from
+HNSW_EF_SEARCH.
+"""
+
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+from src.api.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+SearchQuality = Literal["fast", "balanced", "exact"]
+QUALITIES: Tuple[str, ...] = ("fast", "balanced", "exact")
+
+# ef_search values tried on every calibration (pgvector caps it at 1000)
+_EF_SEARCH_SWEEP = (10, 20, 40, 64, 100, 200, 400, 1000)
+
+_ANN_SESSION_SQL = "SELECT set_config('hnsw.ef_search', $1, true)"
+_EXACT_SESSION_SQL = "SELECT set_config('enable_indexscan', 'off', true)"
+
+
+@dataclass(frozen=True)
+class _Target:
+    name: str
+    table: str
+    id_column: str
+    scope: str          # predicate on alias e; must match partial index predicates
+    index: str
+
+
+def _targets() -> Dict[str, _Target]:
+    from src.database.supabase_client import _KNOWLEDGE_SCOPE
+
+    return {
+        "products": _Target(
+            "products", "shop.product_embeddings", "product_id", "true", "idx_product_embeddings_hnsw"
+        ),
+        "knowledge": _Target(
+            "knowledge", "agents.agent_knowledge_embeddings", "id", _KNOWLEDGE_SCOPE,
+            "idx_embeddings_knowledge_hnsw",
+        ),
+    }
+
+
+TARGETS = ("products", "knowledge")
+
+# Vectors travel as text so the same SQL works on the catalog pool (pgvector
+# codec registered) and the agents pool (no codec).
+_SAMPLE_SQL = """
+SELECT e.{id}::text AS id, e.embedding::text AS embedding
+FROM {table} e
+WHERE {scope}
+ORDER BY random()
+LIMIT $1
+"""
+
+# The sampled row is its own nearest neighbour: one extra row is fetched and
+# the sample dropped in Python (_neighbours()). Filtering it in the query
+# would spend one of the ef_search candidates on it, capping recall at
+# (k-1)/k when ef_search == k.
+_NEAREST_SQL = """
+SELECT e.{id}::text AS id
+FROM {table} e
+WHERE {scope}
+ORDER BY e.embedding <=> $1::text::vector
+LIMIT $2
+"""
+
+_UPSERT_CALIBRATION_SQL = """
+INSERT INTO shop.vector_search_calibrations (target, report, computed_at)
+VALUES ($1, $2::jsonb, now())
+ON CONFLICT (target) DO UPDATE SET report = EXCLUDED.report, computed_at = now()
+"""
+
+_LOAD_CALIBRATIONS_SQL = "SELECT target, report FROM shop.vector_search_calibrations"
+
+
+def _neighbours(rows: List[Any], sample_id: str, top_k: int, column: str = "id") -> set:
+    """The top_k ids of a _NEAREST_SQL-shaped result (top_k + 1 rows), without the sample itself."""
+    return set([r[column] for r in rows if r[column] != sample_id][:top_k])
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return round(ordered[rank - 1], 3)
+
+
+def _presets(sweep: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Smallest swept ef_search reaching each quality's target recall (else the largest)."""
+    presets: Dict[str, Dict[str, Any]] = {}
+    for quality, target in (
+        ("fast", settings.vector_recall_fast),
+        ("balanced", settings.vector_recall_balanced),
+    ):
+        chosen = next((row for row in sweep if row["recall"] >= target), sweep[-1])
+        presets[quality] = {**chosen, "target_recall": target}
+    presets["exact"] = {"ef_search": None, "recall": 1.0}
+    return presets
+
+
+class VectorTuningService:
+    """Calibrates HNSW search settings per target and serves the presets."""
+
+    def __init__(self) -> None:
+        self._calibrations: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._running: Optional[str] = None
+        self._last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Presets
+    # ------------------------------------------------------------------
+
+    def ef_search(self, target: str, quality: Optional[str] = None) -> Optional[int]:
+        """hnsw.ef_search for a search of target at quality; None means exact (no index)."""
+        quality = quality or "balanced"
+        if quality == "exact":
+            return None
+        calibration = self._calibrations.get(target)
+        if calibration is not None:
+            return calibration["presets"][quality]["ef_search"]
+        if quality == "fast":
+            return max(settings.hnsw_ef_search // 2, 10)
+        return settings.hnsw_ef_search
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "last_error": self._last_error,
+            "targets": {
+                target: {
+                    "calibrated": target in self._calibrations,
+                    "presets": {q: self.ef_search(target, q) for q in QUALITIES},
+                    "report": self._calibrations.get(target),
+                }
+                for target in TARGETS
+            },
+        }
+
+    async def load(self) -> None:
+        """Load stored calibrations (app startup)."""
+        from src.database.pg_client import get_pool
+
+        if not settings.catalog_db_url:
+            return
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(_LOAD_CALIBRATIONS_SQL)
+        for r in rows:
+            report = r["report"]
+            self._calibrations[r["target"]] = json.loads(report) if isinstance(report, str) else report
+        logger.info("Vector tuning: loaded calibrations for %s", sorted(self._calibrations) or "no targets")
+
+    # ------------------------------------------------------------------
+    # Calibration
+    # ------------------------------------------------------------------
+
+    async def calibrate(
+        self,
+        target: str,
+        sample_size: int = 100,
+        top_k: int = 10,
+        build_params: Sequence[Tuple[int, int]] = (),
+    ) -> Dict[str, Any]:
+        """
+        Calibrate one target and store the result. build_params lists
+        (m, ef_construction) pairs to evaluate on shadow indexes; the live
+        index is only read.
+        """
+        spec = _targets()[target]
+        if self._lock.locked():
+            raise RuntimeError(f"A calibration of '{self._running}' is already running")
+        async with self._lock:
+            self._running = target
+            self._last_error = None
+            started = time.time()
+            try:
+                pool = await self._pool(target)
+                async with pool.acquire() as conn:
+                    samples = [
+                        (r["id"], r["embedding"])
+                        for r in await conn.fetch(_SAMPLE_SQL.format(
+                            id=spec.id_column, table=spec.table, scope=spec.scope
+                        ), sample_size)
+                    ]
+                    if not samples:
+                        raise RuntimeError(f"No vectors to sample in {spec.table}")
+                    truth = await self._ground_truth(conn, spec, samples, top_k)
+                    sweep = await self._sweep(conn, spec, samples, truth, top_k)
+                    builds = [
+                        await self._shadow_build(conn, spec, samples, truth, top_k, m, ef_construction)
+                        for m, ef_construction in build_params
+                    ]
+            except Exception as exc:
+                self._last_error = str(exc)
+                logger.error("Vector tuning of %s failed: %s", target, exc)
+                raise
+            finally:
+                self._running = None
+
+        report = {
+            "target": target,
+            "index": spec.index,
+            "sample_size": len(samples),
+            "top_k": top_k,
+            "sweep": sweep,
+            "presets": _presets(sweep),
+            "builds": builds,
+            "elapsed_seconds": round(time.time() - started, 1),
+            "computed_at": time.time(),
+        }
+        self._calibrations[target] = report
+        await self._store(target, report)
+        logger.info("Vector tuning of %s: %s", target, {q: self.ef_search(target, q) for q in QUALITIES})
+        return report
+
+    async def _pool(self, target: str):
+        if target == "products":
+            from src.database.pg_client import get_pool
+            return await get_pool()
+        from src.database.supabase_client import db
+        return await db._get_pool()
+
+    async def _store(self, target: str, report: Dict[str, Any]) -> None:
+        from src.database.pg_client import get_pool
+
+        if not settings.catalog_db_url:
+            return
+        try:
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(_UPSERT_CALIBRATION_SQL, target, json.dumps(report))
+        except Exception as exc:
+            # Presets still apply in this process until the next restart
+            logger.warning("Vector tuning: calibration of %s not stored: %s", target, exc)
+
+    @staticmethod
+    def _nearest_sql(spec: _Target) -> str:
+        return _NEAREST_SQL.format(id=spec.id_column, table=spec.table, scope=spec.scope)
+
+    async def _ground_truth(
+        self, conn, spec: _Target, samples: List[Tuple[str, str]], top_k: int
+    ) -> List[set]:
+        sql = self._nearest_sql(spec)
+        truth = []
+        for sample_id, vector in samples:
+            async with conn.transaction():
+                await conn.execute(_EXACT_SESSION_SQL)
+                truth.append(_neighbours(await conn.fetch(sql, vector, top_k + 1), sample_id, top_k))
+        return truth
+
+    async def _sweep(
+        self,
+        conn,
+        spec: _Target,
+        samples: List[Tuple[str, str]],
+        truth: List[set],
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        """recall@top_k and latency of the index at each ef_search >= top_k."""
+        sql = self._nearest_sql(spec)
+        sweep = []
+        for ef_search in (e for e in _EF_SEARCH_SWEEP if e >= top_k):
+            latencies: List[float] = []
+            recalls: List[float] = []
+            for (sample_id, vector), expected in zip(samples, truth):
+                async with conn.transaction():
+                    # +1: the sample takes a candidate slot a real query vector would not
+                    await conn.execute(_ANN_SESSION_SQL, str(ef_search + 1))
+                    start = time.perf_counter()
+                    found = _neighbours(await conn.fetch(sql, vector, top_k + 1), sample_id, top_k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                if expected:
+                    recalls.append(len(expected & found) / len(expected))
+            sweep.append({
+                "ef_search": ef_search,
+                "recall": round(sum(recalls) / len(recalls), 4) if recalls else 1.0,
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+            })
+        return sweep
+
+    async def _shadow_build(
+        self,
+        conn,
+        spec: _Target,
+        samples: List[Tuple[str, str]],
+        truth: List[set],
+        top_k: int,
+        m: int,
+        ef_construction: int,
+    ) -> Dict[str, Any]:
+        """Build an HNSW index with (m, ef_construction) on a copy of the vectors and sweep it."""
+        schema = spec.table.split(".")[0]
+        shadow = replace(
+            spec,
+            table=f"{schema}.vector_tuning_shadow",
+            scope="true",
+            index="vector_tuning_shadow_hnsw",
+        )
+        await conn.execute(f"DROP TABLE IF EXISTS {shadow.table}")
+        try:
+            await conn.execute(
+                f"CREATE UNLOGGED TABLE {shadow.table} AS "
+                f"SELECT e.{spec.id_column}, e.embedding FROM {spec.table} e WHERE {spec.scope}"
+            )
+            start = time.perf_counter()
+            await conn.execute(
+                f"CREATE INDEX {shadow.index} ON {shadow.table} USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+            )
+            build_seconds = round(time.perf_counter() - start, 1)
+            size = await conn.fetchval("SELECT pg_relation_size($1::regclass)", f"{schema}.{shadow.index}")
+            await conn.execute(f"ANALYZE {shadow.table}")
+            sweep = await self._sweep(conn, shadow, samples, truth, top_k)
+        finally:
+            await conn.execute(f"DROP TABLE IF EXISTS {shadow.table}")
+        return {
+            "m": m,
+            "ef_construction": ef_construction,
+            "build_seconds": build_seconds,
+            "index_bytes": size,
+            "sweep": sweep,
+            "presets": _presets(sweep),
+        }
+
+
+# Global vector tuning service instance
+vector_tuning_service = VectorTuningService()
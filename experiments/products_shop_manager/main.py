@@ -7,6 +7,7 @@ from sqlalchemy.engine import URL
 from sqlalchemy.pool import QueuePool
 import uuid
 import json
+import unicodedata
 from openai import OpenAI
 
 # --- 1. CONFIGURACIÓN INICIAL ---
@@ -112,8 +113,73 @@ def get_cached_legacy_products(shop_id):
         return {str(p.id): p.name for p in prods}
 # --- 2. CONFIGURACIÓN IA (LLM) ---
 client = OpenAI(api_key=st.secrets["openai"]["api_key"])
+
+# Prefiltro de taxonomía: en vez de mandar todos los oficios/técnicas al LLM,
+# se mandan los TOP_K más cercanos al producto. Los vectores los mantiene el
+# TaxonomyService de apps/agents en taxonomy.taxonomy_embeddings (mismo modelo).
+TAXONOMY_PREFILTER_TOP_K = 20
+TAXONOMY_EMBEDDING_MODEL = "text-embedding-3-small"
+
+_TAXONOMY_NEAREST_SQL = """
+SELECT kind, id FROM (
+    SELECT kind, taxonomy_id::text AS id,
+           ROW_NUMBER() OVER (PARTITION BY kind ORDER BY embedding <=> CAST(:vec AS vector)) AS rank
+    FROM taxonomy.taxonomy_embeddings
+    WHERE kind = ANY(:kinds)
+) ranked
+WHERE rank <= :k
+ORDER BY kind, rank
+"""
+
+def _normalize(texto):
+    sin_tildes = "".join(c for c in unicodedata.normalize("NFKD", texto or "") if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in sin_tildes.lower()).split())
+
+def prefilter_taxonomy(query_text, catalogs, top_k=TAXONOMY_PREFILTER_TOP_K):
+    """
+    catalogs: {"crafts": {id: name}, "techniques": {id: name}}.
+    Devuelve (catalogs filtrados, True) o (catalogs completos, False) si no hay
+    vectores o falla la consulta. Los nombres mencionados literalmente en el
+    texto siempre se incluyen.
+    """
+    try:
+        emb = client.embeddings.create(
+            model=TAXONOMY_EMBEDDING_MODEL, input=query_text[:8000], dimensions=1536
+        ).data[0].embedding
+        with SessionLocal() as temp_db:
+            rows = temp_db.execute(text(_TAXONOMY_NEAREST_SQL), {
+                "vec": "[" + ",".join(str(v) for v in emb) + "]",
+                "kinds": list(catalogs.keys()),
+                "k": top_k,
+            }).all()
+    except Exception as e:
+        st.caption(f"Prefiltro de taxonomía no disponible, se usa el catálogo completo ({e})")
+        return catalogs, False
+
+    if not rows:
+        return catalogs, False
+
+    texto = f" {_normalize(query_text)} "
+    filtered = {}
+    for kind, valid in catalogs.items():
+        ids = [k for k, v in valid.items() if f" {_normalize(v)} " in texto]
+        ids += [r.id for r in rows if r.kind == kind and r.id in valid and r.id not in ids]
+        # Tipo sin vectores (sync pendiente): se manda completo
+        filtered[kind] = {k: valid[k] for k in ids} if any(r.kind == kind for r in rows) else valid
+    return filtered, True
+
 @st.cache_data(show_spinner=False)
 def suggest_product_migration(_legacy_product, valid_crafts, valid_techniques, valid_cats):
+    full_catalog_chars = len(json.dumps(valid_crafts)) + len(json.dumps(valid_techniques))
+    query_text = "\n".join(str(x) for x in (
+        _legacy_product.name, _legacy_product.description,
+        _legacy_product.category, _legacy_product.subcategory,
+        json.dumps(_legacy_product.materials) if _legacy_product.materials else None,
+        json.dumps(_legacy_product.techniques) if _legacy_product.techniques else None,
+    ) if x)
+    catalogs, prefiltered = prefilter_taxonomy(query_text, {"crafts": valid_crafts, "techniques": valid_techniques})
+    valid_crafts, valid_techniques = catalogs["crafts"], catalogs["techniques"]
+
     crafts_ctx = [{"id": str(k), "name": v} for k, v in valid_crafts.items()]
     techs_ctx = [{"id": str(k), "name": v} for k, v in valid_techniques.items()]
     cats_ctx = [{"id": str(k), "name": v} for k, v in valid_cats.items()]
@@ -183,10 +249,40 @@ def suggest_product_migration(_legacy_product, valid_crafts, valid_techniques, v
             ],
             temperature=0.1
         )
-        return json.loads(response.choices[0].message.content)
+        result = json.loads(response.choices[0].message.content)
+        # Tokens ahorrados estimados con la proporción tokens/caracteres del prompt real
+        prompt_chars = len(system_prompt) + len(user_prompt)
+        removed_chars = full_catalog_chars - len(json.dumps(crafts_ctx)) - len(json.dumps(techs_ctx))
+        prompt_tokens = response.usage.prompt_tokens
+        result["_prefilter"] = {
+            "enabled": prefiltered,
+            "crafts": len(crafts_ctx),
+            "techniques": len(techs_ctx),
+            "prompt_tokens": prompt_tokens,
+            "tokens_saved_est": max(0, round(prompt_tokens * removed_chars / prompt_chars)) if prefiltered else 0,
+        }
+        return result
     except Exception as e:
         st.error(f"Error LLM: {e}")
         return {}
+
+def record_suggestion_acceptance(sug, confirmed):
+    """Guarda en la sesión si el humano mantuvo los IDs sugeridos por la IA."""
+    if not sug:
+        return
+    group = "prefiltro" if (sug.get("_prefilter") or {}).get("enabled") else "completo"
+    st.session_state.setdefault("ai_acceptance", []).append({
+        "group": group,
+        "tokens_saved_est": (sug.get("_prefilter") or {}).get("tokens_saved_est", 0),
+        **{f: sug.get(f) is not None and sug.get(f) == confirmed.get(f) for f in confirmed},
+    })
+
+def acceptance_summary():
+    rows = st.session_state.get("ai_acceptance", [])
+    if not rows:
+        return None
+    df = pd.DataFrame(rows)
+    return df.groupby("group").agg(["mean", "count"]).round(2)
 # --- 3. MODELOS ORM (CON UUIDS Y NOMBRES SQL) ---
 
 # -- TAXONOMÍA --
@@ -964,6 +1060,16 @@ elif menu == "📦 Migración de Productos":
                             with st.spinner("🧠 Infiriendo estructura..."):
                                 st.session_state[f"ai_sug_{p_legacy.id}"] = suggest_product_migration(p_legacy, crafts, techniques, curatorial_cats)
                                 st.success("¡Datos extraídos!")
+                        pf = st.session_state.get(f"ai_sug_{p_legacy.id}", {}).get("_prefilter")
+                        if pf:
+                            st.caption(
+                                f"Prompt: {pf['prompt_tokens']} tokens · {pf['crafts']} oficios / {pf['techniques']} técnicas enviados"
+                                + (f" · ~{pf['tokens_saved_est']} tokens ahorrados por el prefiltro" if pf["enabled"] else " · catálogo completo")
+                            )
+                        summary = acceptance_summary()
+                        if summary is not None:
+                            with st.expander("📊 Aceptación de sugerencias IA (esta sesión)"):
+                                st.dataframe(summary)
 
                     with col_right:
                         st.header("➡️ Nueva Arquitectura")
@@ -1115,6 +1221,12 @@ elif menu == "📦 Migración de Productos":
                                             db.add(variante_base)
                                                 
                                             db.commit()
+                                            record_suggestion_acceptance(sug, {
+                                                "primary_craft_id": sel_craft,
+                                                "primary_technique_id": sel_tech,
+                                                "secondary_technique_id": sel_tech_sec,
+                                                "curatorial_category_id": sel_cat,
+                                            })
                                             st.success("¡Producto verificado y guardado correctamente!")
                                         except Exception as e:
                                             db.rollback()